@@ -0,0 +1,114 @@
+"""
+bench_access_log.py
+
+量測 access_log 存取記錄解析器的吞吐量 (行/秒)。以每種預設格式 (與一個自訂正規表達式)
+產生大型合成日誌，其中約 2% 是不符合格式的其他輸出 (以 PM2 時間戳開頭的啟動訊息等)。
+
+- parse：在記憶體中以 ACCESS_LOG_READ_BYTES 大小的區段呼叫 AccessLogParser.parse()。
+- monitor：寫入暫存檔後以 AccessLogMonitor.poll() 讀取與解析 (包含檔案 I/O 與分位數計算)。
+
+用法:
+    python benchmarks/bench_access_log.py --lines 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from src import config
+from src.access_log import AccessLogMonitor, AccessLogParser, AccessStats
+
+STATUSES = [200] * 90 + [201, 204, 301, 304, 400, 404, 404, 500, 502, 503]
+PATHS = ["/", "/api/v1/users", "/api/v1/orders?page=2", "/health", "/static/app.js"]
+AGENTS = ["curl/8.4.0", "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0"]
+
+CUSTOM_REGEX = r'^\S+ "(?:GET|POST|PUT|DELETE) [^"]*" (?P<status>\d{3}) (?P<latency_ms>[\d.]+)ms$'
+
+
+def make_line(fmt: str, rng: random.Random) -> str:
+    status = rng.choice(STATUSES)
+    path = rng.choice(PATHS)
+    seconds = rng.lognormvariate(-4, 1)
+    common = (f'10.0.{rng.randrange(256)}.{rng.randrange(256)} - - [17/Oct/2026:07:{rng.randrange(60):02d}:'
+              f'{rng.randrange(60):02d} +0000] "GET {path} HTTP/1.1" {status} {rng.randrange(50000)}')
+    if fmt == "common":
+        return common
+    combined = f'{common} "-" "{rng.choice(AGENTS)}"'
+    if fmt == "combined":
+        return combined
+    if fmt == "combined_timed":
+        return f"{combined} {seconds:.3f}"
+    if fmt == "tiny":
+        return f"GET {path} {status} {rng.randrange(50000)} - {seconds * 1000:.3f} ms"
+    return f'2026-10-17T07:00:00 "GET {path}" {status} {seconds * 1000:.3f}ms'
+
+
+def make_log(path: str, fmt: str, lines: int, seed: int = 1):
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for i in range(lines):
+            if rng.random() < 0.02:
+                f.write(f"2026-10-17T07:00:00: Server listening on port 3001 (worker {i})\n")
+            else:
+                f.write(make_line(fmt, rng) + "\n")
+
+
+def bench_parse(path: str, parser: AccessLogParser) -> dict:
+    with open(path, "rb") as f:
+        data = f.read()
+    chunks = []
+    start = 0
+    while start < len(data):
+        end = data.rfind(b"\n", start, start + config.ACCESS_LOG_READ_BYTES) + 1 or len(data)
+        chunks.append(data[start:end])
+        start = end
+    stats = AccessStats()
+    started = time.perf_counter()
+    for chunk in chunks:
+        parser.parse(chunk, stats)
+    values = stats.values(1.0)
+    return {"seconds": time.perf_counter() - started, "count": stats.count, "values": values}
+
+
+def bench_monitor(path: str, fmt: str) -> dict:
+    apis = [{"pm_id": 0, "name": "api", "log_file_path": path,
+             "metadata": {"access_log_regex": CUSTOM_REGEX} if fmt == "regex" else {"access_log_format": fmt}}]
+    monitor = AccessLogMonitor()
+    monitor.set_sources(apis)
+    monitor.poll()  # 從結尾開始追蹤
+    monitor._files[path]["offset"] = 0  # 改為從頭處理整個檔案
+    started = time.perf_counter()
+    monitor.poll()
+    return {"seconds": time.perf_counter() - started, "values": monitor.latest(0)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="存取記錄解析吞吐量基準測試")
+    parser.add_argument('--lines', type=int, default=1_000_000, help="每種格式的合成日誌行數")
+    parser.add_argument('--formats', nargs='+', default=["common", "combined", "combined_timed", "tiny", "regex"],
+                        help="要測試的格式 (預設格式名稱或 regex)")
+    args = parser.parse_args()
+
+    print(f"{'格式':<16} {'模式':<8} {'MB':>7} {'秒':>7} {'行/秒':>12} {'請求數':>10} {'p95 ms':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in args.formats:
+            path = os.path.join(directory, f"{fmt}.log")
+            make_log(path, fmt, args.lines)
+            megabytes = os.path.getsize(path) / (1024 * 1024)
+            access_parser = AccessLogParser(regex=CUSTOM_REGEX) if fmt == "regex" else AccessLogParser(fmt)
+            parsed = bench_parse(path, access_parser)
+            monitored = bench_monitor(path, fmt)
+            for mode, result in (("parse", parsed), ("monitor", monitored)):
+                print(f"{fmt:<16} {mode:<8} {megabytes:>7.1f} {result['seconds']:>7.2f} "
+                      f"{args.lines / result['seconds']:>12.0f} {parsed['count']:>10} "
+                      f"{result['values']['latency_p95']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+bench_action_queue.py
+
+量測操作佇列在重複點擊時節省的 pm2 呼叫。模擬使用者在短時間內對少數 API 送出一連串隨機的
+start/restart/stop 請求 (專案操作與單一 API 操作混合)，比較直接執行時的 pm2 呼叫次數與經由 ActionQueue 合併後的次數，
+並列出佇列的合併/取代次數與等待時間。每次 pm2 呼叫以固定的延遲模擬。
+
+用法:
+    python benchmarks/bench_action_queue.py --requests 200 --targets 10
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from src.action_queue import ActionQueue
+
+
+def main():
+    parser = argparse.ArgumentParser(description="操作佇列合併基準測試")
+    parser.add_argument('--requests', type=int, default=200, help="送出的請求數")
+    parser.add_argument('--targets', type=int, default=10, help="API 數量")
+    parser.add_argument('--interval', type=float, default=0.005, help="請求之間的平均間隔 (秒)")
+    parser.add_argument('--call-latency', type=float, default=0.3, help="模擬的每次 pm2 呼叫耗時 (秒)")
+    parser.add_argument('--seed', type=int, default=1, help="隨機種子")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    targets = [{"pm_id": pm_id, "name": f"api{pm_id}", "project_name": "bench", "host": "localhost"}
+               for pm_id in range(args.targets)]
+    requests = []
+    for _ in range(args.requests):
+        verb = rng.choices(["restart", "start", "stop"], weights=[6, 2, 2])[0]
+        chosen = targets if rng.random() < 0.2 else [rng.choice(targets)]  # 20% 是整個專案的操作
+        requests.append((verb, chosen))
+
+    calls = []
+
+    def execute(verb, batch):
+        calls.append((verb, len(batch)))
+        time.sleep(args.call_latency)
+        return [dict(target, ok=True, error=None) for target in batch]
+
+    done = threading.Semaphore(0)
+    queue = ActionQueue(execute=execute).start()
+    started = time.perf_counter()
+    for verb, chosen in requests:
+        queue.submit(verb, chosen, lambda results: done.release())
+        time.sleep(rng.expovariate(1 / args.interval))
+    for _ in requests:
+        done.acquire()
+    elapsed = time.perf_counter() - started
+    queue.stop()
+
+    metrics = queue.get_metrics()
+    direct_calls = len(requests)
+    print(f"請求數：{len(requests)}，API 數：{args.targets}")
+    print(f"直接執行：pm2 呼叫 {direct_calls} 次，約 {direct_calls * args.call_latency:.1f} 秒 (依序執行)")
+    print(f"操作佇列：pm2 呼叫 {len(calls)} 次，{elapsed:.1f} 秒，派發 {metrics['dispatched']} 個目標")
+    print(f"合併 {metrics['merged']}，取代 {metrics['superseded']}，"
+          f"等待 p50 {metrics['wait_p50']:.0f} ms，p95 {metrics['wait_p95']:.0f} ms，最大 {metrics['wait_max']:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
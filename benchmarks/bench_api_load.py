@@ -0,0 +1,150 @@
+"""
+bench_api_load.py
+
+以 load_generator 對隨附的範例 API (python_api.py 的各個引擎、php_api.php、go_api.go、dummy_api.js) 進行壓力測試並比較結果。
+每個服務以它的默認端口啟動 (缺少直譯器/編譯器或端口已被佔用時略過)，依序執行固定並行數與固定速率兩種模式，
+測試期間以 ProcSampler 每 0.5 秒取樣服務的整棵程序樹 (go run 會另外啟動編譯後的執行檔) 的 CPU/記憶體。
+也可以用 --target 名稱=端口 測試已在執行的服務 (此時不取樣資源)。
+
+用法:
+    python benchmarks/bench_api_load.py --duration 5 --concurrency 16 --rate 500
+    python benchmarks/bench_api_load.py --target node=3001 --target go=8003
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from src import load_generator
+from src import process_tree
+from src.proc_sampler import ProcSampler
+
+# 名稱 -> (需要的執行檔, 啟動命令, 端口)
+SERVICES = {
+    "python": ("python", [sys.executable, "python_api.py", "--no-access-log"], 8001),
+    "python-prefork": ("python", [sys.executable, "python_api.py", "--engine", "prefork", "--port", "8004",
+                                  "--no-access-log"], 8004),
+    "python-asyncio": ("python", [sys.executable, "python_api.py", "--engine", "asyncio", "--port", "8005",
+                                  "--no-access-log"], 8005),
+    "php": ("php", ["php", "-S", "localhost:8002", "php_api.php"], 8002),
+    "go": ("go", ["go", "run", "go_api.go"], 8003),
+    "node": ("node", ["node", "dummy_api.js", "--port", "3001"], 3001),
+}
+
+
+def _port_open(port: int) -> bool:
+    try:
+        socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+        return True
+    except OSError:
+        return False
+
+
+def _start_service(name: str):
+    executable, command, port = SERVICES[name]
+    if executable != "python" and shutil.which(executable) is None:
+        print(f"略過 {name}：找不到 {executable}")
+        return None
+    if _port_open(port):
+        print(f"略過 {name}：端口 {port} 已被佔用")
+        return None
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               start_new_session=True)
+    deadline = time.time() + 60  # go run 需要編譯
+    while time.time() < deadline and process.poll() is None:
+        if _port_open(port):
+            return process
+        time.sleep(0.1)
+    print(f"略過 {name}：服務沒有在端口 {port} 上啟動")
+    _stop_service(process)
+    return None
+
+
+def _stop_service(process):
+    # 終止整個程序群組，連同 go run 啟動的執行檔
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def _run(port: int, mode: str, args, pid: int = None) -> dict:
+    samples = []
+    sampler = None
+    if pid is not None:
+        sampler = ProcSampler()
+        tree = process_tree.ProcessTree()
+
+        def refresh():
+            tree.refresh()
+            sampler.set_pids(tree.expand({0: pid}))
+
+        def collect(result):
+            total = process_tree.rollup(result).get(0)
+            if total is not None and "cpu" in total:
+                samples.append(total)
+
+        refresh()
+        sampler.start(collect, 0.5, refresh=refresh)
+    report = asyncio.run(load_generator.run_load_test(
+        "127.0.0.1", port, args.path, mode, concurrency=args.concurrency, rate=args.rate, duration=args.duration))
+    if sampler is not None:
+        sampler.stop()
+    if samples:
+        cpu = [sample["cpu"] for sample in samples]
+        memory = [sample["memory"] / (1024 * 1024) for sample in samples]
+        report["resources"] = {"samples": len(samples), "cpu_avg": sum(cpu) / len(cpu), "cpu_max": max(cpu),
+                               "memory_avg": sum(memory) / len(memory), "memory_max": max(memory)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="範例 API 壓力測試比較")
+    parser.add_argument('--services', nargs='+', default=list(SERVICES), choices=list(SERVICES))
+    parser.add_argument('--target', action='append', default=[], help="測試已在執行的服務，格式為 名稱=端口")
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=500.0)
+    parser.add_argument('--path', default="/")
+    args = parser.parse_args()
+
+    rows = []
+    targets = [(name, int(port), None) for name, port in (target.split("=", 1) for target in args.target)]
+    processes = []
+    if not targets:
+        for name in args.services:
+            process = _start_service(name)
+            if process is not None:
+                processes.append(process)
+                targets.append((name, SERVICES[name][2], process))
+    try:
+        for name, port, process in targets:
+            for mode in (load_generator.MODE_CLOSED, load_generator.MODE_OPEN):
+                report = _run(port, mode, args, process.pid if process is not None else None)
+                print(f"[{name}]\n{load_generator.format_report(report)}\n")
+                rows.append((name, mode, report))
+    finally:
+        for process in processes:
+            _stop_service(process)
+
+    print(f"{'服務':<14} {'模式':<7} {'請求/秒':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'最大 ms':>9} "
+          f"{'錯誤率':>8} {'CPU%':>7}")
+    for name, mode, report in rows:
+        latency = report["latency"] or {key: float("nan") for key in ("p50", "p95", "p99", "max")}
+        cpu = report.get("resources", {}).get("cpu_avg", float("nan"))
+        print(f"{name:<14} {mode:<7} {report['throughput']:>10.1f} {latency['p50']:>9.2f} {latency['p95']:>9.2f} "
+              f"{latency['p99']:>9.2f} {latency['max']:>9.2f} {report['error_rate'] * 100:>7.2f}% {cpu:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+bench_error_fingerprint.py
+
+量測 error_fingerprint 在大型合成錯誤日誌上的吞吐量。日誌由少數幾種 Node.js/Python 堆疊追蹤
+與單行錯誤重複組成，每次出現的數字、id、IP 與 PM2 時間戳都不同，因此應該歸類為固定數量的指紋。
+
+- stream：在記憶體中逐行餵給 FingerprintStream 與 ErrorTable。
+- tracker：寫入暫存檔後以 ErrorTracker.poll() 逐段讀取 (包含檔案 I/O)。
+
+用法:
+    python benchmarks/bench_error_fingerprint.py --sizes 10 50
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from src import config
+from src.error_fingerprint import ErrorTable, ErrorTracker, FingerprintStream
+
+TEMPLATES = [
+    "TypeError: Cannot read properties of undefined (reading 'id') for user {id}\n"
+    "    at getUser (/srv/api/users.js:{n}:15)\n"
+    "    at Layer.handle (/srv/api/node_modules/express/lib/router/layer.js:95:5)\n"
+    "    at next (/srv/api/node_modules/express/lib/router/route.js:137:13)\n",
+    "Error: connect ECONNREFUSED {ip}:5432\n"
+    "    at TCPConnectWrap.afterConnect [as oncomplete] (node:net:1278:16)\n",
+    "Traceback (most recent call last):\n"
+    "  File \"/srv/api/app.py\", line {n}, in handler\n"
+    "    order = orders[order_id]\n"
+    "KeyError: 'order-{n}'\n",
+    "Warning: request {uuid} took {n} ms\n",
+    "UnhandledPromiseRejectionWarning: Error: timeout after {n}ms (request 0x{hex})\n",
+]
+
+
+def make_log(path: str, megabytes: float, seed: int = 1) -> int:
+    """
+    寫入約 megabytes MB 的合成錯誤日誌，返回寫入的事件數。
+    """
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    written = events = 0
+    with open(path, "w") as f:
+        while written < target:
+            stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(1_700_000_000 + events))
+            text = rng.choice(TEMPLATES).format(
+                id=rng.randrange(10 ** 6), n=rng.randrange(1, 5000), ip=f"10.0.{rng.randrange(256)}.{rng.randrange(256)}",
+                uuid=uuid.UUID(int=rng.getrandbits(128)), hex=f"{rng.getrandbits(32):x}")
+            text = "".join(f"{stamp}: {line}\n" for line in text.splitlines())
+            f.write(text)
+            written += len(text)
+            events += 1
+    return events
+
+
+def bench_stream(path: str) -> dict:
+    with open(path, "rb") as f:
+        lines = f.read().split(b"\n")
+    table = ErrorTable()
+    stream = FingerprintStream(lambda fingerprint, message, sample, timestamp:
+                               table.record("api", "P", fingerprint, message, sample, timestamp))
+    started = time.perf_counter()
+    for line in lines:
+        stream.feed(line, 0)
+    stream.flush()
+    return {"seconds": time.perf_counter() - started, "lines": len(lines), "table": table}
+
+
+def bench_tracker(path: str) -> dict:
+    config.ERROR_FINGERPRINT_BACKFILL_BYTES = os.path.getsize(path)  # 從頭處理整個檔案
+    tracker = ErrorTracker()
+    tracker.set_sources([{"name": "api", "project_name": "P", "error_log_path": path}])
+    started = time.perf_counter()
+    while tracker.poll():
+        pass
+    return {"seconds": time.perf_counter() - started, "table": tracker.table}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="錯誤指紋吞吐量基準測試")
+    parser.add_argument('--sizes', nargs='+', type=float, default=[10.0, 50.0], help="合成日誌大小 (MB)")
+    args = parser.parse_args()
+
+    print(f"{'大小 MB':>8} {'事件數':>10} {'模式':<8} {'秒':>7} {'MB/秒':>8} {'行/秒':>11} {'指紋數':>6}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f"error-{size:g}.log")
+            events = make_log(path, size)
+            megabytes = os.path.getsize(path) / (1024 * 1024)
+            stream = bench_stream(path)
+            tracker = bench_tracker(path)
+            for mode, result in (("stream", stream), ("tracker", tracker)):
+                count = sum(entry["count"] for entry in result["table"].top(limit=100))
+                assert count == events, (count, events)
+                print(f"{megabytes:>8.1f} {events:>10} {mode:<8} {result['seconds']:>7.2f} "
+                      f"{megabytes / result['seconds']:>8.1f} {stream['lines'] / result['seconds']:>11.0f} "
+                      f"{len(result['table'].top(limit=100)):>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+bench_jlist_decoder.py
+
+比較 `json.loads` 整體解析與 jlist_decoder 選擇性解碼在合成 jlist 輸出上的解析時間、
+記憶體高峰 (RSS 與 tracemalloc) 以及解析後保留的記憶體。
+每種模式都在獨立的子程序中執行，以取得乾淨的 ru_maxrss。
+
+用法:
+    python benchmarks/bench_jlist_decoder.py --sizes 1000 5000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def make_payload(count: int) -> str:
+    """
+    產生含有 count 個程序的合成 jlist 輸出，每個程序帶有完整大小的 pm2_env。
+    """
+    processes = []
+    for pm_id in range(count):
+        env = {f"ENV_VAR_{i}": f"value-{pm_id}-{i}-" + "x" * 40 for i in range(60)}
+        processes.append({
+            "pid": 20000 + pm_id,
+            "name": f"api-{pm_id}",
+            "pm_id": pm_id,
+            "monit": {"memory": 50_000_000 + pm_id, "cpu": pm_id % 100},
+            "pm2_env": dict(env, **{
+                "status": "online",
+                "created_at": 1_700_000_000_000,
+                "pm_uptime": 1_700_000_000_000,
+                "restart_time": 3,
+                "args": ["--port", str(3000 + pm_id)],
+                "pm_out_log_path": f"/home/user/.pm2/logs/api-{pm_id}-out.log",
+                "pm_err_log_path": f"/home/user/.pm2/logs/api-{pm_id}-error.log",
+                "pm_exec_path": f"/srv/api-{pm_id}/index.js",
+                "pm_cwd": f"/srv/api-{pm_id}",
+                "exec_mode": "fork_mode",
+                "env": env,
+                "axm_monitor": {"Heap Size": {"value": "40.5", "unit": "MiB"}},
+                "axm_options": {"metrics": {"http": True}, "profiling": True, "blob": "y" * 400},
+                "axm_dynamic": {},
+                "versioning": {"type": "git", "url": "https://example.invalid/repo.git", "revision": "a" * 40},
+            }),
+        })
+    return json.dumps(processes)
+
+
+def _run_mode(mode: str, count: int):
+    from src.jlist_decoder import decode_jlist
+    payload = make_payload(count)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = json.loads(payload) if mode == "json.loads" else decode_jlist(payload)
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss 在 Linux 上以 KB 為單位，在 macOS 上以 bytes 為單位
+    scale = 1 if sys.platform == "darwin" else 1024
+    print(json.dumps({
+        "payload_mb": len(payload) / 1e6,
+        "count": len(result),
+        "seconds": elapsed,
+        "peak_heap_mb": peak / 1e6,
+        "retained_mb": retained / 1e6,
+        "rss_growth_mb": (peak_rss - baseline_rss) * scale / 1e6,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="jlist 解碼基準測試")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--_mode', help=argparse.SUPPRESS)
+    parser.add_argument('--_count', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._mode:
+        _run_mode(args._mode, args._count)
+        return
+
+    print(f"{'程序數':>6} {'模式':<12} {'輸出MB':>8} {'解析秒':>8} {'heap高峰MB':>11} {'保留MB':>8} {'RSS增量MB':>10}")
+    for count in args.sizes:
+        for mode in ("json.loads", "selective"):
+            output = subprocess.run([sys.executable, __file__, '--_mode', mode, '--_count', str(count)],
+                                    capture_output=True, text=True, check=True).stdout
+            r = json.loads(output)
+            print(f"{count:>6} {mode:<12} {r['payload_mb']:>8.1f} {r['seconds']:>8.3f} "
+                  f"{r['peak_heap_mb']:>11.1f} {r['retained_mb']:>8.1f} {r['rss_growth_mb']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+bench_pm2_rpc.py
+
+比較 PM2 原生 RPC 客戶端與 CLI 子程序路徑在 list / start / stop / restart 上的延遲。
+
+兩條路徑都對同一個 fake_pm2_daemon 替身操作。CLI 路徑預設使用 tests/fake_pm2_daemon.py
+作為 `pm2` 替身 (每次呼叫啟動一個新的直譯器)；安裝了真實 PM2 時可以用 --cli pm2 改用它。
+
+用法:
+    python benchmarks/bench_pm2_rpc.py --processes 50 --iterations 20
+"""
+
+import argparse
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from src.pm2_rpc import PM2RpcClient
+from fake_pm2_daemon import FakePM2Daemon, make_process
+
+
+def _measure(func, iterations: int) -> list:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _report(label: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<22} mean {statistics.mean(samples):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[3])
+    parser.add_argument('--processes', type=int, default=50)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--cli', default=f"{shlex.quote(sys.executable)} "
+                                         f"{shlex.quote(os.path.join(ROOT, 'tests', 'fake_pm2_daemon.py'))}",
+                        help="CLI 路徑使用的 pm2 命令")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pm2_home:
+        processes = [make_process(i, f"api-{i}") for i in range(args.processes)]
+        with FakePM2Daemon(pm2_home, processes):
+            client = PM2RpcClient(pm2_home)
+            cli = shlex.split(args.cli)
+            env = dict(os.environ, PM2_HOME=pm2_home)
+
+            def run_cli(*cli_args):
+                subprocess.run(cli + list(cli_args), capture_output=True, text=True, check=True, env=env)
+
+            print(f"{args.processes} 個程序, 每項 {args.iterations} 次")
+            _report("rpc  list", _measure(client.list_processes, args.iterations))
+            _report("cli  jlist", _measure(lambda: run_cli("jlist"), args.iterations))
+            for verb in ("stop", "start", "restart"):
+                method = getattr(client, f"{verb}_process")
+                _report(f"rpc  {verb}", _measure(lambda: method(0), args.iterations))
+                _report(f"cli  {verb}", _measure(lambda: run_cli(verb, "0"), args.iterations))
+            client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+bench_proc_sampler.py
+
+量測 ProcSampler 每一輪批量取樣的成本 (換算為每 100 個程序)。
+測試會啟動指定數量的閒置子程序作為取樣對象，分別量測不讀取 PSS 的一般取樣、
+每輪都讀取 smaps_rollup 的取樣，以及 psutil 後備路徑。
+
+用法:
+    python benchmarks/bench_proc_sampler.py --processes 100 500 --rounds 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from src import proc_sampler
+from src.proc_sampler import ProcSampler
+
+
+def _measure(sampler: ProcSampler, rounds: int) -> float:
+    sampler.sample()  # 建立基準
+    started = time.perf_counter()
+    for _ in range(rounds):
+        sampler.sample()
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/proc 取樣基準測試")
+    parser.add_argument('--processes', type=int, nargs='+', default=[100, 500])
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    modes = []
+    if os.path.exists("/proc/self/stat"):
+        modes += [("/proc", {"smaps_interval": float("inf")}, True),
+                  ("/proc+smaps", {"smaps_interval": 0}, True)]
+    if proc_sampler.psutil is not None:
+        modes.append(("psutil", {"smaps_interval": float("inf")}, False))
+
+    print(f"{'程序數':>6} {'模式':<12} {'每輪毫秒':>10} {'每100程序毫秒':>14} {'每程序微秒':>12}")
+    for count in args.processes:
+        children = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(3600)"])
+                    for _ in range(count)]
+        try:
+            time.sleep(0.5)
+            pids = {index: child.pid for index, child in enumerate(children)}
+            for name, options, use_proc in modes:
+                sampler = ProcSampler(**options)
+                sampler.use_proc = use_proc
+                sampler.set_pids(pids)
+                seconds = _measure(sampler, args.rounds)
+                print(f"{count:>6} {name:<12} {seconds * 1000:>10.2f} {seconds * 1000 * 100 / count:>14.2f} "
+                      f"{seconds * 1e6 / count:>12.1f}")
+        finally:
+            for child in children:
+                child.kill()
+            for child in children:
+                child.wait()
+
+
+if __name__ == '__main__':
+    main()
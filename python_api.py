@@ -1,18 +1,100 @@
-from http.server import BaseHTTPRequestHandler, HTTPServer
+"""
+python_api.py
+
+模擬 Python API 服務。可以選擇不同的服務引擎，以便和 Go/Node 範例公平比較：
+
+- single：單線程的 HTTPServer，一次只處理一個請求，每個請求後關閉連線 (HTTP/1.0)。
+- threaded：每個連線一個線程的 ThreadingHTTPServer (默認)。
+- prefork：啟動多個工作程序，各自以 SO_REUSEPORT 綁定同一個端口，由核心分配連線，可以使用所有 CPU 核心。
+- asyncio：單線程的 asyncio 伺服器。
+
+其他引擎都支援 HTTP/1.1 keep-alive (單線程下閒置的 keep-alive 連線會讓其他客戶端無法連線)。回應中只有 timestamp 會改變，其餘部分預先編碼並快取。
+以 PM2 的多個實例 (fork 模式) 執行時加上 --reuse-port，讓所有實例共用同一個端口。
+所有引擎默認都與原本的 HTTPServer 一樣把每個請求記錄到 stderr，壓力測試時可以用 --no-access-log 關閉。
+
+用法:
+    python python_api.py --engine prefork --workers 4 --port 8001
+"""
+
+import argparse
+import asyncio
+import functools
 import json
+import os
+import signal
+import socket
+import sys
 import time
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+
+ENGINES = ("single", "threaded", "prefork", "asyncio")
+
+# 回應主體中固定的部分只編碼一次，每個請求只需要格式化 timestamp
+_BODY_PREFIX, _BODY_SUFFIX = (part.encode("utf-8") for part in json.dumps({
+    "message": "Hello from Python API!",
+    "timestamp": 0,
+    "language": "Python"
+}).split("0", 1))
+_HEADER_TEMPLATE = "HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: {}\r\n{}\r\n"
+
+
+def build_body() -> bytes:
+    """
+    返回回應主體：與 json.dumps({"message": ..., "timestamp": time.time(), "language": ...}) 相同的位元組。
+    """
+    return _BODY_PREFIX + repr(time.time()).encode("ascii") + _BODY_SUFFIX
+
+
+def log_request_line(address: str, request_line: str, code: int):
+    """
+    以與 BaseHTTPRequestHandler.log_request() 相同的格式把一個請求記錄到 stderr (asyncio 引擎使用)。
+    """
+    year, month, day, hour, minute, second, *_ = time.localtime()
+    date = "%02d/%3s/%04d %02d:%02d:%02d" % (day, BaseHTTPRequestHandler.monthname[month], year, hour, minute, second)
+    sys.stderr.write('%s - - [%s] "%s" %s -\n' % (address, date, request_line, code))
+
 
 class SimpleHTTPRequestHandler(BaseHTTPRequestHandler):
+    access_log = True  # 與原本的 HTTPServer 相同，默認記錄每個請求
+
     def do_GET(self):
+        body = build_body()
         self.send_response(200)
         self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        response = {
-            "message": "Hello from Python API!",
-            "timestamp": time.time(),
-            "language": "Python"
-        }
-        self.wfile.write(json.dumps(response).encode('utf-8'))
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.access_log:
+            super().log_message(format, *args)
+
+
+class KeepAliveRequestHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 保持 keep-alive 連線
+    disable_nagle_algorithm = True  # 標頭與主體分開寫入，避免 Nagle 與延遲 ACK 造成每個請求約 40 ms 的延遲
+
+
+class ReusePortMixin:
+    """
+    reuse_port 為 True 時在綁定前設定 SO_REUSEPORT，讓多個程序可以綁定同一個端口。
+    """
+    reuse_port = False
+
+    def server_bind(self):
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+class SingleServer(ReusePortMixin, HTTPServer):
+    pass
+
+
+class ThreadedServer(ReusePortMixin, ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
 
 def run(server_class=HTTPServer, handler_class=SimpleHTTPRequestHandler, port=8001):
     server_address = ('', port)
@@ -20,5 +102,112 @@ def run(server_class=HTTPServer, handler_class=SimpleHTTPRequestHandler, port=80
     print(f"Starting Python API on port {port}...")
     httpd.serve_forever()
 
+
+def run_prefork(port=8001, workers=None, handler_class=KeepAliveRequestHandler):
+    """
+    啟動 workers 個工作程序 (默認為 CPU 核心數)，各自以 SO_REUSEPORT 綁定端口並執行 threaded 引擎。
+    主程序收到 SIGTERM/SIGINT 時會結束所有工作程序。
+    """
+    workers = workers or os.cpu_count() or 1
+    ThreadedServer.reuse_port = True
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                run(ThreadedServer, handler_class, port)
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def shutdown(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    print(f"Starting Python API on port {port} with {workers} workers...")
+    for child in children:
+        while True:
+            try:
+                os.waitpid(child, 0)
+                break
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+
+async def _handle_connection(reader, writer, access_log=True):
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            version = lines[0].rsplit(" ", 1)[-1]
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                if name:
+                    headers[name.strip().lower()] = value.strip().lower()
+            if "content-length" in headers:
+                await reader.readexactly(int(headers["content-length"]))
+            keep_alive = headers.get("connection") != "close" and (version != "HTTP/1.0"
+                                                                   or headers.get("connection") == "keep-alive")
+            body = build_body()
+            if access_log:
+                log_request_line((writer.get_extra_info("peername") or ("-",))[0], lines[0], 200)
+            writer.write(_HEADER_TEMPLATE.format(len(body), "" if keep_alive else "Connection: close\r\n")
+                         .encode("ascii") + body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_asyncio_server(port=8001, host=None, reuse_port=False, access_log=True):
+    """
+    建立 asyncio 引擎的伺服器 (尚未開始 serve_forever)。
+    """
+    handler = functools.partial(_handle_connection, access_log=access_log)
+    return await asyncio.start_server(handler, host, port, reuse_port=reuse_port or None, backlog=128)
+
+
+def run_asyncio(port=8001, reuse_port=False, access_log=True):
+    async def serve():
+        server = await start_asyncio_server(port, reuse_port=reuse_port, access_log=access_log)
+        print(f"Starting Python API on port {port} (asyncio)...")
+        async with server:
+            await server.serve_forever()
+    asyncio.run(serve())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Python 範例 API")
+    parser.add_argument('--engine', choices=ENGINES, default="threaded")
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--workers', type=int, default=None, help="prefork 引擎的工作程序數，默認為 CPU 核心數")
+    parser.add_argument('--reuse-port', action='store_true', help="以 SO_REUSEPORT 綁定 (多個 PM2 實例共用端口)")
+    parser.add_argument('--no-access-log', dest='access_log', action='store_false',
+                        help="不記錄每個請求 (默認會記錄到 stderr)")
+    args = parser.parse_args(argv)
+    SimpleHTTPRequestHandler.access_log = args.access_log
+    if args.engine == "prefork":
+        run_prefork(args.port, args.workers)
+    elif args.engine == "asyncio":
+        run_asyncio(args.port, args.reuse_port, args.access_log)
+    else:
+        server_class, handler_class = ((ThreadedServer, KeepAliveRequestHandler) if args.engine == "threaded"
+                                       else (SingleServer, SimpleHTTPRequestHandler))
+        server_class.reuse_port = args.reuse_port
+        run(server_class, handler_class, args.port)
+
+
 if __name__ == '__main__':
-    run() 
\ No newline at end of file
+    sys.exit(main())
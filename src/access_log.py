@@ -0,0 +1,377 @@
+"""
+access_log.py
+
+此模組從 PM2 輸出日誌中的存取記錄 (access log) 推導每個 API 的請求速率、狀態碼組成與延遲分位數，
+不需要在服務中加入任何監控程式碼。
+
+- 每個 API 的格式在 api.json 中設定：access_log_format 為預設格式名稱 (見 PRESETS) 或 nginx 風格的
+  格式模板 (例如 '$remote_addr [$time_local] "$request" $status $request_time')；
+  access_log_regex 為含有 status 與 latency_ms/latency_s/latency_us 具名群組的正規表達式。
+- 格式在設定時編譯成一個 bytes 正規表達式，每一輪以 findall() 一次掃描新增的整段內容，
+  只擷取狀態碼與延遲，不逐行解碼或分割；不符合格式的行 (例如啟動訊息) 會被忽略。
+- AccessLogMonitor 在背景線程中從日誌結尾開始追蹤新增的完整行，每 ACCESS_LOG_INTERVAL 秒
+  把這段時間的統計 (ACCESS_COLUMNS) 交給 record 回調寫入歷史數據。
+"""
+
+import os
+import re
+import threading
+import time
+from collections import Counter
+from operator import itemgetter
+
+import numpy as np
+
+from src import config
+
+ACCESS_COLUMNS = ("req_rate", "rate_2xx", "rate_3xx", "rate_4xx", "rate_5xx",
+                  "latency_p50", "latency_p95", "latency_p99")
+"""
+寫入歷史數據的欄位：總請求速率與各狀態碼類別的速率 (req/s)，以及延遲 p50/p95/p99 (ms)。
+"""
+
+PRESETS = {
+    "common": '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent',
+    "combined": '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent '
+                '"$http_referer" "$http_user_agent"',
+    "combined_timed": '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent '
+                      '"$http_referer" "$http_user_agent" $request_time',
+    "tiny": '$method $url $status $res_length - $response_time ms',
+}
+"""
+預設的格式模板：nginx/Apache 的 common 與 combined、在 combined 結尾加上 $request_time 的 combined_timed，
+以及 morgan 的 tiny。
+"""
+
+# 模板中代表延遲的變數與換算為毫秒的倍數
+LATENCY_VARIABLES = {"request_time": 1000.0, "upstream_response_time": 1000.0, "response_time": 1.0}
+_LATENCY_GROUPS = {"latency_ms": 1.0, "latency_s": 1000.0, "latency_us": 0.001}
+_VARIABLE_RE = re.compile(r"\$(\w+)")
+
+
+class AccessLogParser:
+    """
+    編譯後的存取記錄格式。
+
+    Attributes:
+        pattern (re.Pattern): bytes 正規表達式。
+        latency_scale (float): 延遲換算為毫秒的倍數，格式沒有延遲時為 None。
+    """
+    def __init__(self, template: str = None, regex: str = None):
+        """
+        以格式模板 (或預設格式名稱) 或正規表達式建立解析器。
+
+        Args:
+            template (str, optional): PRESETS 中的名稱或 nginx 風格的格式模板。
+            regex (str, optional): 含有 status 具名群組 (與可選的延遲群組) 的正規表達式。
+
+        Raises:
+            ValueError: 格式無效或沒有狀態碼。
+        """
+        if regex is not None:
+            self.pattern, self.latency_scale = self._compile_regex(regex)
+        elif template is not None:
+            self.pattern, self.latency_scale = self._compile_template(PRESETS.get(template, template))
+        else:
+            raise ValueError("必須指定 access_log_format 或 access_log_regex")
+        groups = self.pattern.groupindex
+        # findall() 在只有一個群組時返回字串而非 tuple
+        self._single = self.pattern.groups == 1
+        self._status = itemgetter(groups["status"] - 1)
+        self._latency = None
+        if self.latency_scale is not None:
+            name = next(name for name in ("latency",) + tuple(_LATENCY_GROUPS) if name in groups)
+            self._latency = itemgetter(groups[name] - 1)
+
+    @staticmethod
+    def _compile_regex(regex: str) -> tuple:
+        try:
+            pattern = re.compile(regex.encode("utf-8"), re.MULTILINE)
+        except re.error as e:
+            raise ValueError(f"無效的 access_log_regex：{e}") from e
+        if "status" not in pattern.groupindex:
+            raise ValueError("access_log_regex 必須包含 status 具名群組")
+        scales = [scale for name, scale in _LATENCY_GROUPS.items() if name in pattern.groupindex]
+        return pattern, scales[0] if scales else None
+
+    @staticmethod
+    def _compile_template(template: str) -> tuple:
+        # 每個變數匹配到下一個字面字元為止 (不跨行)，只有狀態碼與延遲是擷取群組
+        parts = _VARIABLE_RE.split(template)
+        regex = []
+        latency_scale = None
+        for i, part in enumerate(parts):
+            if i % 2 == 0:
+                regex.append(re.escape(part))
+                continue
+            following = parts[i + 1][:1] if i + 1 < len(parts) else ""
+            if part == "status":
+                regex.append(r"(?P<status>\d{3})")
+            elif part in LATENCY_VARIABLES and latency_scale is None:
+                regex.append(r"(?P<latency>\d+(?:\.\d+)?|-)")
+                latency_scale = LATENCY_VARIABLES[part]
+            elif following:
+                regex.append(f"[^{re.escape(following)}\\n]*")
+            else:
+                regex.append(r"[^\n]*")
+        if "(?P<status>" not in "".join(regex):
+            raise ValueError(f"access_log_format 必須包含 $status：{template}")
+        return re.compile(("".join(regex) + r"\r?$").encode("utf-8"), re.MULTILINE), latency_scale
+
+    def parse(self, data: bytes, stats: "AccessStats"):
+        """
+        解析一段完整行並累加到 stats。
+
+        Args:
+            data (bytes): 以換行符號結尾的日誌內容。
+            stats (AccessStats): 要累加的統計。
+        """
+        matches = self.pattern.findall(data)
+        if not matches:
+            return
+        if self._single:
+            matches = [(match,) for match in matches]
+        stats.count += len(matches)
+        stats.statuses.update(map(self._status, matches))
+        if self._latency is not None:
+            values = [value for value in map(self._latency, matches) if value and value != b"-"]
+            if values:
+                try:
+                    latencies = np.array(values, dtype=np.bytes_).astype(np.float64)
+                except ValueError:
+                    latencies = np.array([float(value) for value in values if _is_number(value)])
+                stats.latencies.append(latencies * self.latency_scale)
+
+
+def _is_number(value: bytes) -> bool:
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+class AccessStats:
+    """
+    一段時間內的存取記錄統計。
+
+    Attributes:
+        count (int): 請求數。
+        statuses (Counter): 狀態碼 (bytes) 到次數的對應。
+        latencies (list): 延遲毫秒數的 NumPy 陣列列表。
+    """
+    def __init__(self):
+        self.count = 0
+        self.statuses = Counter()
+        self.latencies = []
+
+    def values(self, elapsed: float) -> dict:
+        """
+        返回 ACCESS_COLUMNS 各欄位的數值。沒有延遲數據時延遲欄位為 0。
+
+        Args:
+            elapsed (float): 統計涵蓋的秒數。
+        """
+        elapsed = max(elapsed, 1e-6)
+        values = {"req_rate": self.count / elapsed}
+        for digit in "2345":
+            count = sum(n for status, n in self.statuses.items() if status[:1] == digit.encode())
+            values[f"rate_{digit}xx"] = count / elapsed
+        latencies = np.concatenate(self.latencies) if self.latencies else np.empty(0)
+        if latencies.size:
+            p50, p95, p99 = np.percentile(latencies, (50, 95, 99))
+        else:
+            p50 = p95 = p99 = 0.0
+        values.update(latency_p50=float(p50), latency_p95=float(p95), latency_p99=float(p99))
+        return values
+
+
+def format_access(values: dict) -> str:
+    """
+    將最近一次的統計格式化為一行文字，例如 "12.0 req/s｜2xx 95% 5xx 5%｜p50 3 ms p95 10 ms p99 40 ms"。
+    """
+    if not values:
+        return "N/A"
+    rate = values["req_rate"]
+    text = f"{rate:.1f} req/s"
+    if rate:
+        mix = " ".join(f"{digit}xx {values[f'rate_{digit}xx'] / rate:.0%}" for digit in "2345"
+                       if values[f"rate_{digit}xx"])
+        text += f"｜{mix}" if mix else ""
+        if values["latency_p99"]:
+            text += "｜" + " ".join(f"{q} {values[f'latency_{q}']:.0f} ms" for q in ("p50", "p95", "p99"))
+    return text
+
+
+def build_sources(apis: list) -> list:
+    """
+    從解析後的 API 列表中找出有設定存取記錄格式的輸出日誌 (同一個檔案只出現一次)。
+
+    Args:
+        apis (list): parse_pm2_list_output() 的結果。
+
+    Returns:
+        list: 包含 path、pm_id、name、template 與 regex 的字典列表。
+    """
+    sources = {}
+    for api in apis:
+        metadata = api.get("metadata") or {}
+        template = metadata.get("access_log_format") or config.ACCESS_LOG_DEFAULT_FORMAT
+        regex = metadata.get("access_log_regex")
+        path = api.get("log_file_path")
+        if (template is None and regex is None) or path in (None, "N/A") or path in sources:
+            continue
+        sources[path] = {"path": path, "pm_id": api.get("pm_id"), "name": api.get("name"),
+                         "template": template, "regex": regex}
+    return list(sources.values())
+
+
+class AccessLogMonitor:
+    """
+    在背景線程中追蹤存取記錄並定期產生每個 API 的請求統計。
+
+    Attributes:
+        record (callable): 以 (pm_id, epoch 毫秒時間戳, 欄位數值字典) 呼叫的回調。
+    """
+    def __init__(self, record=None, clock=time.time):
+        """
+        初始化 AccessLogMonitor。
+
+        Args:
+            record (callable, optional): 每個 API 每一輪統計的回調。默認為 None。
+            clock (callable, optional): 返回 epoch 秒數的時鐘 (測試用)。
+        """
+        self.record = record
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sources = []
+        self._parsers = {}  # (template, regex) -> AccessLogParser，無效的格式為 None
+        self._files = {}  # 路徑 -> {"inode", "offset", "since"}
+        self._latest = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def set_sources(self, apis: list):
+        """
+        以解析後的 API 列表設定要追蹤的日誌與格式。
+        """
+        sources = []
+        for source in build_sources(apis):
+            key = (source["template"], source["regex"])
+            if key not in self._parsers:
+                try:
+                    self._parsers[key] = AccessLogParser(*key)
+                except ValueError as e:
+                    print(f"錯誤：{source['name']} 的存取記錄格式無效。錯誤訊息：{e}")
+                    self._parsers[key] = None
+            if self._parsers[key] is not None:
+                sources.append(dict(source, parser=self._parsers[key]))
+        with self._lock:
+            self._sources = sources
+            paths = {source["path"] for source in sources}
+            self._files = {path: state for path, state in self._files.items() if path in paths}
+            pm_ids = {source["pm_id"] for source in sources}
+            self._latest = {pm_id: values for pm_id, values in self._latest.items() if pm_id in pm_ids}
+
+    def latest(self, pm_id) -> dict:
+        """
+        返回 API 最近一輪的統計 (ACCESS_COLUMNS 各欄位)，沒有數據時返回 None。
+        """
+        return self._latest.get(pm_id)
+
+    def poll(self) -> int:
+        """
+        讀取每個日誌新增的完整行，並為每個 API 產生這一輪的統計。
+        第一次看到的日誌 (或被輪替的日誌) 從結尾開始，這一輪不產生統計。
+
+        Returns:
+            int: 這一輪處理的位元組數。
+        """
+        with self._lock:
+            sources = list(self._sources)
+        processed = 0
+        now = self._clock()
+        for source in sources:
+            path = source["path"]
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            with self._lock:
+                state = self._files.get(path)
+                if state is None or state["inode"] != stat.st_ino or state["offset"] > stat.st_size:
+                    # 從結尾開始：只統計開始追蹤之後的請求
+                    self._files[path] = {"inode": stat.st_ino, "offset": stat.st_size, "since": now}
+                    continue
+            stats = AccessStats()
+            try:
+                processed += self._read(path, state, stat.st_size, source["parser"], stats)
+            except OSError as e:
+                print(f"讀取存取記錄 {path} 時發生錯誤：{e}")
+                continue
+            values = stats.values(now - state["since"])
+            state["since"] = now
+            self._latest[source["pm_id"]] = values
+            if self.record is not None:
+                self.record(source["pm_id"], int(now * 1000), values)
+        return processed
+
+    @staticmethod
+    def _read(path: str, state: dict, size: int, parser: AccessLogParser, stats: AccessStats) -> int:
+        processed = 0
+        with open(path, "rb") as f:
+            while state["offset"] < size:
+                f.seek(state["offset"])
+                data = f.read(min(size - state["offset"], config.ACCESS_LOG_READ_BYTES))
+                end = data.rfind(b"\n") + 1
+                if end == 0:
+                    if len(data) < config.ACCESS_LOG_READ_BYTES:
+                        break  # 最後一行還沒寫完
+                    # 一行比一次讀取的量還長：不是存取記錄，跳過整行
+                    state["skip_partial"] = True
+                    state["offset"] += len(data)
+                    processed += len(data)
+                    continue
+                start = data.find(b"\n") + 1 if state.pop("skip_partial", False) else 0
+                parser.parse(data[start:end] if start or end < len(data) else data, stats)
+                state["offset"] += end
+                processed += end
+        return processed
+
+    def is_running(self) -> bool:
+        """
+        背景線程是否正在運行。
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = None):
+        """
+        啟動背景線程，每 interval 秒產生一輪統計。
+
+        Args:
+            interval (float, optional): 間隔秒數。默認為 config.ACCESS_LOG_INTERVAL。
+        """
+        if self.is_running():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval or config.ACCESS_LOG_INTERVAL,),
+                                        name="access-log-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        """
+        停止背景線程。
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, interval: float):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"處理存取記錄時發生錯誤：{e}")
+            self._stop.wait(interval)
@@ -0,0 +1,144 @@
+"""
+action_executor.py
+
+此模組提供並行的 API 操作執行器。它將 plan_project_action() 解析出的目標依主機分組、
+切成批次，在有上限的線程池中並行執行，並為每個 API 回報 queued/running/ok/failed 進度事件。
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src import config
+from src import pm2_manager
+
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_OK = "ok"
+STATE_FAILED = "failed"
+
+
+class ActionExecutor:
+    """
+    有並行上限的啟動/停止/重啟執行器。
+
+    Attributes:
+        max_workers (int): 線程池的最大線程數。
+        host_concurrency (int): 每台主機同時進行的批次數上限。
+        batch_size (int): 每個批次的 API 數量，0 表示自動。
+        progress_callback (callable): 接收進度事件字典的回調函數，會在工作線程中被呼叫。
+    """
+    def __init__(self, max_workers: int = None, host_concurrency: int = None,
+                 batch_size: int = None, progress_callback=None):
+        """
+        初始化 ActionExecutor。
+
+        Args:
+            max_workers (int, optional): 最大線程數。默認為 config.ACTION_MAX_WORKERS。
+            host_concurrency (int, optional): 每台主機的並行上限。默認為 config.ACTION_HOST_CONCURRENCY。
+            batch_size (int, optional): 每個批次的 API 數量。默認為 config.ACTION_BATCH_SIZE。
+            progress_callback (callable, optional): 進度回調函數。默認為 None。
+        """
+        self.max_workers = max(1, max_workers or config.ACTION_MAX_WORKERS)
+        self.host_concurrency = max(1, host_concurrency or config.ACTION_HOST_CONCURRENCY)
+        self.batch_size = config.ACTION_BATCH_SIZE if batch_size is None else batch_size
+        self.progress_callback = progress_callback
+        self._host_semaphores = {}
+        self._semaphores_lock = threading.Lock()
+
+    def run(self, verb: str, targets: list) -> list:
+        """
+        並行執行操作並等待全部完成。
+
+        Args:
+            verb (str): 操作名稱，"start"、"restart" 或 "stop"。
+            targets (list): plan_project_action() 回傳的目標字典列表。
+
+        Returns:
+            list: 與 targets 同順序的結果字典，包含目標的欄位以及 ok、error 和 duration (秒)。
+        """
+        if not targets:
+            return []
+        for target in targets:
+            self._emit(target, STATE_QUEUED)
+
+        batches = self._make_batches(targets)
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches)),
+                                thread_name_prefix="pm2-action") as pool:
+            futures = [pool.submit(self._run_batch, verb, host, batch) for host, batch in batches]
+            for future in futures:
+                results.update(future.result())
+        return [results[index] for index in range(len(targets))]
+
+    def _make_batches(self, targets: list) -> list:
+        """
+        依主機分組並切成批次。
+
+        Args:
+            targets (list): 目標字典列表。
+
+        Returns:
+            list: (host, [(index, target), ...]) 元組的列表。
+        """
+        by_host = {}
+        for index, target in enumerate(targets):
+            by_host.setdefault(target.get("host", "localhost"), []).append((index, target))
+
+        batches = []
+        for host, items in by_host.items():
+            size = self.batch_size
+            if not size or size < 1:
+                slots = min(self.host_concurrency, self.max_workers)
+                size = math.ceil(len(items) / slots)
+            for start in range(0, len(items), size):
+                batches.append((host, items[start:start + size]))
+        return batches
+
+    def _host_semaphore(self, host: str) -> threading.Semaphore:
+        with self._semaphores_lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.Semaphore(self.host_concurrency)
+            return self._host_semaphores[host]
+
+    def _run_batch(self, verb: str, host: str, batch: list) -> dict:
+        """
+        在主機並行上限內執行一個批次。
+
+        Returns:
+            dict: 以目標索引為鍵的結果字典。
+        """
+        results = {}
+        with self._host_semaphore(host):
+            for _, target in batch:
+                self._emit(target, STATE_RUNNING)
+            started = time.perf_counter()
+            try:
+                errors = pm2_manager.run_bulk_action(verb, [target["pm_id"] for _, target in batch])
+            except Exception as e:
+                errors = {target["pm_id"]: str(e) for _, target in batch}
+            duration = time.perf_counter() - started
+
+        for index, target in batch:
+            error = errors.get(target["pm_id"], "沒有收到結果")
+            state = STATE_OK if error is None else STATE_FAILED
+            self._emit(target, state, duration, error)
+            results[index] = dict(target, ok=error is None, error=error, duration=duration)
+        return results
+
+    def _emit(self, target: dict, state: str, duration: float = 0.0, error: str = None):
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback({
+                "pm_id": target.get("pm_id"),
+                "name": target.get("name"),
+                "project_name": target.get("project_name"),
+                "host": target.get("host", "localhost"),
+                "state": state,
+                "duration": duration,
+                "error": error,
+            })
+        except Exception as e:
+            print(f"進度回調時發生錯誤：{e}")
@@ -0,0 +1,239 @@
+"""
+action_queue.py
+
+此模組提供合併重複操作的 API 操作佇列。GUI 線程送出的每個操作請求先以 pm_id 為單位放入佇列:
+
+- 同一個目標上等待中的相同操作會被合併，多個請求共用同一次執行結果。
+- 互相衝突的操作以最後的意圖為準：等待中的 start/restart/reload 被 stop 取代 (反之亦然)，
+  被取代的請求收到「已被取代」的結果；start、reload、restart 之間則合併為較強的操作 (restart > reload > start)。
+- 在 ACTION_QUEUE_BATCH_WINDOW 秒內陸續送出的操作會一起派發，同一種操作的所有目標只經過一次 ActionExecutor。
+
+背景線程負責派發，並記錄佇列深度、合併/取代次數與每個目標從進入佇列到開始執行的等待時間。
+"""
+
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from src import config
+from src.action_executor import ActionExecutor
+
+# 非 stop 操作的強度：合併時保留較強的操作
+_VERB_STRENGTH = {"start": 0, "reload": 1, "restart": 2}
+
+
+def merge_verbs(pending: str, new: str) -> str:
+    """
+    返回同一個目標上等待中的操作與新操作合併後應執行的操作。
+
+    Args:
+        pending (str): 等待中的操作。
+        new (str): 新送出的操作。
+
+    Returns:
+        str: 合併後的操作。
+    """
+    if pending == new or "stop" in (pending, new):
+        return new
+    return max(pending, new, key=lambda verb: _VERB_STRENGTH.get(verb, 0))
+
+
+class ActionQueue:
+    """
+    以背景線程派發、合併重複操作的佇列。
+
+    Attributes:
+        batch_window (float): 最後一個請求送出後等待多少秒沒有新請求才派發。
+        max_delay (float): 最早的等待中操作最多等待多少秒就會被派發 (避免持續送出的請求讓佇列一直不派發)。
+    """
+    def __init__(self, execute=None, progress_callback=None, batch_window: float = None, max_delay: float = None,
+                 clock=time.monotonic):
+        """
+        初始化 ActionQueue。
+
+        Args:
+            execute (callable, optional): 具有 ActionExecutor.run() 簽名的函數。
+                                          默認為以 progress_callback 建立的 ActionExecutor。
+            progress_callback (callable, optional): 傳給默認 ActionExecutor 的進度回調函數。
+            batch_window (float, optional): 默認為 config.ACTION_QUEUE_BATCH_WINDOW。
+            max_delay (float, optional): 默認為 config.ACTION_QUEUE_MAX_DELAY。
+            clock (callable, optional): 單調時鐘 (測試用)。
+        """
+        self._execute = execute or ActionExecutor(progress_callback=progress_callback).run
+        self.batch_window = config.ACTION_QUEUE_BATCH_WINDOW if batch_window is None else batch_window
+        self.max_delay = config.ACTION_QUEUE_MAX_DELAY if max_delay is None else max_delay
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._pending = {}  # pm_id -> {"verb", "target", "requests", "queued_at"}，依進入佇列的順序
+        self._requests = {}
+        self._ids = itertools.count(1)
+        self._last_submit = 0.0
+        self._counters = {"submitted": 0, "merged": 0, "superseded": 0, "dispatched": 0, "batches": 0}
+        self._waits = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    def submit(self, verb: str, targets: list, callback=None) -> int:
+        """
+        將一個操作請求放入佇列。
+
+        Args:
+            verb (str): 操作名稱，"start"、"restart"、"stop" 或 "reload"。
+            targets (list): plan_project_action() 格式的目標字典列表 (至少包含 pm_id 和 name)。
+            callback (callable, optional): 請求的所有目標都有結果後，在派發線程中以結果列表呼叫。
+                                           結果與 targets 同順序，包含目標的欄位以及 ok、error、verb (實際執行的操作)
+                                           和 superseded (是否被後續的衝突操作取代)。
+
+        Returns:
+            int: 請求 ID。
+        """
+        with self._cond:
+            request_id = next(self._ids)
+            request = {"verb": verb, "targets": list(targets), "callback": callback, "results": {},
+                       "remaining": set()}
+            self._requests[request_id] = request
+            now = self._clock()
+            for target in targets:
+                pm_id = target["pm_id"]
+                request["remaining"].add(pm_id)
+                entry = self._pending.get(pm_id)
+                if entry is None:
+                    self._pending[pm_id] = {"verb": verb, "target": target, "requests": [request_id], "queued_at": now}
+                    continue
+                merged = merge_verbs(entry["verb"], verb)
+                if "stop" in (entry["verb"], merged) and entry["verb"] != merged:
+                    # 衝突的操作：等待中的請求不會得到它要的結果，改為回報被取代
+                    for previous in entry["requests"]:
+                        self._resolve(previous, pm_id, dict(target, ok=False, verb=merged, superseded=True,
+                                                            error=f"已被後續的 {merged} 取代"))
+                    self._counters["superseded"] += len(entry["requests"])
+                    entry["requests"] = []
+                else:
+                    self._counters["merged"] += 1
+                entry.update(verb=merged, target=target)
+                entry["requests"].append(request_id)
+            self._counters["submitted"] += 1
+            self._last_submit = now
+            self._cond.notify_all()
+        return request_id
+
+    def dispatch(self) -> int:
+        """
+        立即派發所有等待中的操作並等待它們完成。
+
+        Returns:
+            int: 派發的目標數量。
+        """
+        with self._cond:
+            entries = list(self._pending.values())
+            self._pending.clear()
+            now = self._clock()
+            for entry in entries:
+                self._waits.append(now - entry["queued_at"])
+            del self._waits[:-config.ACTION_QUEUE_STATS_WINDOW]
+            self._counters["dispatched"] += len(entries)
+        by_verb = {}
+        for entry in entries:
+            by_verb.setdefault(entry["verb"], []).append(entry)
+        for verb, group in by_verb.items():
+            try:
+                results = self._execute(verb, [entry["target"] for entry in group])
+            except Exception as e:
+                results = [dict(entry["target"], ok=False, error=str(e)) for entry in group]
+            with self._cond:
+                self._counters["batches"] += 1
+                for entry, result in zip(group, results):
+                    for request_id in entry["requests"]:
+                        self._resolve(request_id, entry["target"]["pm_id"],
+                                      dict(result, verb=verb, superseded=False))
+        return len(entries)
+
+    def _resolve(self, request_id: int, pm_id, result: dict):
+        """
+        記錄請求中一個目標的結果，全部目標都有結果時呼叫回調函數。呼叫端必須持有鎖。
+        """
+        request = self._requests.get(request_id)
+        if request is None or pm_id not in request["remaining"]:
+            return
+        request["results"][pm_id] = result
+        request["remaining"].discard(pm_id)
+        if request["remaining"]:
+            return
+        del self._requests[request_id]
+        if request["callback"] is not None:
+            results = [request["results"][target["pm_id"]] for target in request["targets"]]
+            try:
+                request["callback"](results)
+            except Exception as e:
+                print(f"操作佇列回調時發生錯誤：{e}")
+
+    def get_metrics(self) -> dict:
+        """
+        返回佇列的統計。
+
+        Returns:
+            dict: 包含 depth (等待中的目標數)、pending_requests (尚未完成的請求數)、submitted、merged、superseded、
+                  dispatched、batches，以及最近 ACTION_QUEUE_STATS_WINDOW 個目標的等待時間 wait_p50、wait_p95、wait_max
+                  (毫秒，沒有數據時為 None)。
+        """
+        with self._cond:
+            metrics = dict(self._counters, depth=len(self._pending), pending_requests=len(self._requests))
+            waits = np.asarray(self._waits, dtype=np.float64) * 1000
+        if waits.size:
+            p50, p95 = np.percentile(waits, [50, 95])
+            metrics.update(wait_p50=float(p50), wait_p95=float(p95), wait_max=float(waits.max()))
+        else:
+            metrics.update(wait_p50=None, wait_p95=None, wait_max=None)
+        return metrics
+
+    def start(self):
+        """
+        在背景線程中開始派發。
+
+        Returns:
+            ActionQueue: self，方便鏈式呼叫。
+        """
+        if self.is_running():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="action-queue", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """
+        停止背景線程。等待中的操作不會被執行。
+        """
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _next_dispatch_delay(self) -> float:
+        """
+        返回距離下一次派發的秒數，沒有等待中的操作時返回 None。呼叫端必須持有鎖。
+        """
+        if not self._pending:
+            return None
+        now = self._clock()
+        oldest = min(entry["queued_at"] for entry in self._pending.values())
+        return max(0.0, min(self._last_submit + self.batch_window, oldest + self.max_delay) - now)
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                delay = self._next_dispatch_delay()
+                if delay is None or delay > 0:
+                    self._cond.wait(delay)
+                    continue
+            try:
+                self.dispatch()
+            except Exception as e:
+                print(f"派發操作佇列時發生錯誤：{e}")
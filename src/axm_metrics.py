@@ -0,0 +1,94 @@
+"""
+axm_metrics.py
+
+此模組把 PM2 附在 pm2_env.axm_monitor 中的自訂指標 (使用 @pm2/io 的 Node 應用程式會自動回報
+事件迴圈延遲、heap 使用量、active handles 與 HTTP 延遲等) 解析為固定單位的數值，
+以便寫入歷史數據並繪製成圖表。
+
+axm_monitor 的格式為 {指標名稱: {"value": 數值或字串, "unit": 單位, ...}}，數值可能是 "18.50" 之類的字串，
+單位則依應用程式使用的 @pm2/io 版本而不同 (例如 MiB/MB、ms/µs)，因此統一換算為 MB 與毫秒。
+"""
+
+import math
+
+METRIC_COLUMNS = ("loop_lag", "loop_lag_p95", "heap_used", "heap_size", "heap_usage",
+                  "active_handles", "active_requests", "http_rate", "http_latency", "http_p95")
+"""
+寫入歷史數據的自訂指標欄位：事件迴圈延遲平均值/p95 (ms)、已使用/總 heap (MB)、heap 使用率 (%)、
+active handles/requests 數、HTTP 請求速率 (req/min) 以及 HTTP 平均/p95 延遲 (ms)。
+"""
+
+LATENCY_COLUMNS = ("loop_lag", "loop_lag_p95", "http_latency", "http_p95")
+"""
+以毫秒為單位的延遲欄位，與 CPU 走勢一起繪製。
+"""
+
+# 欄位 -> (@pm2/io 的指標名稱 (小寫), 單位種類)
+_METRIC_NAMES = {
+    "loop_lag": (("event loop latency", "event loop lag"), "time"),
+    "loop_lag_p95": (("event loop latency p95", "event loop lag p95"), "time"),
+    "heap_used": (("used heap size",), "bytes"),
+    "heap_size": (("heap size",), "bytes"),
+    "heap_usage": (("heap usage",), None),
+    "active_handles": (("active handles",), None),
+    "active_requests": (("active requests",), None),
+    "http_rate": (("http",), None),
+    "http_latency": (("http mean latency",), "time"),
+    "http_p95": (("http p95 latency",), "time"),
+}
+_COLUMN_BY_NAME = {name: column for column, (names, _) in _METRIC_NAMES.items() for name in names}
+
+# 換算為 MB 與毫秒的倍數；未知或未提供的單位視為已是目標單位
+_UNIT_SCALE = {
+    "bytes": {"b": 1 / (1024 * 1024), "bytes": 1 / (1024 * 1024), "kb": 1 / 1024, "kib": 1 / 1024,
+              "mb": 1, "mib": 1, "gb": 1024, "gib": 1024},
+    "time": {"ns": 1e-6, "us": 1e-3, "µs": 1e-3, "ms": 1, "s": 1000, "sec": 1000},
+}
+
+
+def parse_value(entry):
+    """
+    取得單一 axm_monitor 項目的數值。
+
+    Args:
+        entry: axm_monitor 中的項目 ({"value": ..., "unit": ...})，或直接是數值/字串。
+
+    Returns:
+        tuple: (數值, 單位字串)；無法轉換為有限數值 (例如 "N/A") 時數值為 None。
+    """
+    unit = ""
+    if isinstance(entry, dict):
+        unit = str(entry.get("unit") or "")
+        entry = entry.get("value")
+    if isinstance(entry, bool):
+        return None, unit
+    try:
+        value = float(str(entry).strip().rstrip('%')) if isinstance(entry, str) else float(entry)
+    except (TypeError, ValueError):
+        return None, unit
+    return (value if math.isfinite(value) else None), unit
+
+
+def parse_axm_monitor(axm_monitor: dict) -> dict:
+    """
+    將 axm_monitor 中已知的指標解析為 METRIC_COLUMNS 欄位的數值，並換算為固定單位。
+
+    Args:
+        axm_monitor (dict): pm2_env.axm_monitor，沒有時為 None。
+
+    Returns:
+        dict: 欄位名稱到數值的字典，只包含程序有回報的欄位；沒有任何已知指標時為空字典。
+    """
+    values = {}
+    if not isinstance(axm_monitor, dict):
+        return values
+    for name, entry in axm_monitor.items():
+        column = _COLUMN_BY_NAME.get(str(name).strip().lower())
+        if column is None:
+            continue
+        value, unit = parse_value(entry)
+        if value is None:
+            continue
+        scale = _UNIT_SCALE.get(_METRIC_NAMES[column][1], {}).get(unit.strip().lower(), 1)
+        values[column] = value * scale
+    return values
@@ -0,0 +1,282 @@
+"""
+command_engine.py
+
+此模組提供執行 PM2 命令的共用引擎。所有 pm2 CLI 命令與 RPC 呼叫都經由它執行，以便:
+
+- 每個命令都有期限 (依命令類型設定，見 config.PM2_COMMAND_TIMEOUTS)，卡住的守護程序不會讓工作線程永遠等待。
+- 只讀的命令 (例如 jlist) 逾時後以指數退避有限次數重試；會改變狀態的操作不重試，避免重複執行。
+- 追蹤守護程序的健康狀態：連續 PM2_DAEMON_FAILURE_THRESHOLD 次逾時後視為沒有回應，
+  之後的命令立即失敗 (DaemonUnresponsive)，每 PM2_DAEMON_PROBE_INTERVAL 秒才放行一個命令作為探測，
+  任何一次成功都會恢復正常。呼叫端可以改用快取的數據。
+- 協作式取消：cancel_pending() 讓所有已開始的命令在下一個檢查點 (開始前、退避等待中、只讀命令返回後)
+  拋出 CommandCancelled，進行中的子程序仍受期限限制。已經完成的狀態變更操作照常返回結果。
+- 依命令類型統計延遲分位數與錯誤、逾時、重試次數。
+"""
+
+import socket
+import subprocess
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from src import config
+
+
+class CommandCancelled(Exception):
+    """
+    命令在完成前被 cancel_pending() 取消。
+    """
+
+
+class DaemonUnresponsive(TimeoutError):
+    """
+    PM2 守護程序被判定為沒有回應，命令沒有被執行。
+    """
+
+
+class CommandEngine:
+    """
+    有期限、重試、取消與守護程序健康追蹤的 PM2 命令執行器。可以被多個線程同時使用。
+
+    Attributes:
+        timeouts (dict): 命令類型到期限秒數的對應，沒有列出的類型使用 default_timeout。
+        default_timeout (float): 默認的命令期限 (秒)。
+        retries (dict): 命令類型到逾時重試次數的對應，沒有列出的類型不重試。
+        backoff (float): 第一次重試前等待的秒數，之後每次加倍。
+        failure_threshold (int): 判定守護程序沒有回應所需的連續逾時次數。
+        probe_interval (float): 守護程序沒有回應時放行探測命令的間隔 (秒)。
+        read_only (set): 只讀的命令類型，取消後才返回的結果會被丟棄。
+    """
+    def __init__(self, timeouts: dict = None, default_timeout: float = None, retries: dict = None,
+                 backoff: float = None, failure_threshold: int = None, probe_interval: float = None,
+                 read_only=None, runner=None, clock=time.monotonic):
+        """
+        初始化 CommandEngine。
+
+        Args:
+            timeouts (dict, optional): 默認為 config.PM2_COMMAND_TIMEOUTS。
+            default_timeout (float, optional): 默認為 config.PM2_COMMAND_TIMEOUT。
+            retries (dict, optional): 默認為 config.PM2_COMMAND_RETRIES。
+            backoff (float, optional): 默認為 config.PM2_COMMAND_BACKOFF。
+            failure_threshold (int, optional): 默認為 config.PM2_DAEMON_FAILURE_THRESHOLD。
+            probe_interval (float, optional): 默認為 config.PM2_DAEMON_PROBE_INTERVAL。
+            read_only (iterable, optional): 默認為 config.PM2_READ_ONLY_COMMANDS。
+            runner (callable, optional): 具有 subprocess.run 簽名的函數。默認在呼叫時使用 subprocess.run。
+            clock (callable, optional): 單調時鐘 (測試用)。
+        """
+        self.timeouts = config.PM2_COMMAND_TIMEOUTS if timeouts is None else timeouts
+        self.default_timeout = default_timeout or config.PM2_COMMAND_TIMEOUT
+        self.retries = config.PM2_COMMAND_RETRIES if retries is None else retries
+        self.backoff = config.PM2_COMMAND_BACKOFF if backoff is None else backoff
+        self.failure_threshold = max(1, failure_threshold or config.PM2_DAEMON_FAILURE_THRESHOLD)
+        self.probe_interval = config.PM2_DAEMON_PROBE_INTERVAL if probe_interval is None else probe_interval
+        self.read_only = set(config.PM2_READ_ONLY_COMMANDS if read_only is None else read_only)
+        self._runner = runner
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._cancel_generation = 0
+        self._stats = {}
+        self._consecutive_timeouts = 0
+        self._last_attempt = None
+        self._last_success = None
+        self._last_error = None
+
+    def run(self, command: list, kind: str = None, timeout: float = None, **kwargs):
+        """
+        以期限執行一個 pm2 CLI 命令，參數與 subprocess.run 相同 (timeout 由引擎決定)。
+
+        Args:
+            command (list): 命令與參數。
+            kind (str, optional): 命令類型，用於期限、重試與統計。默認為命令的第二個元素 (例如 "jlist")。
+            timeout (float, optional): 覆寫這次呼叫的期限秒數。
+
+        Returns:
+            subprocess.CompletedProcess: 命令的結果。
+
+        Raises:
+            subprocess.TimeoutExpired: 所有嘗試都超過期限 (子程序已被結束)。
+            DaemonUnresponsive: 守護程序被判定為沒有回應，命令沒有執行。
+            CommandCancelled: 命令被 cancel_pending() 取消 (已完成的狀態變更命令不會拋出)。
+            FileNotFoundError, subprocess.CalledProcessError: 與 subprocess.run 相同。
+        """
+        kind = kind or (command[1] if len(command) > 1 else command[0])
+        timeout = timeout or self.timeouts.get(kind, self.default_timeout)
+        retries = self.retries.get(kind, 0)
+        generation = self._cancel_generation
+        for attempt in range(retries + 1):
+            self._admit(kind, generation)
+            started = self._clock()
+            try:
+                result = (self._runner or subprocess.run)(command, timeout=timeout, **kwargs)
+            except subprocess.TimeoutExpired as e:
+                self._record(kind, started, timeout=True, error=e)
+                if attempt == retries:
+                    raise
+                self._backoff(kind, attempt, generation)
+                continue
+            except subprocess.CalledProcessError as e:
+                self._record(kind, started, error=e)  # 守護程序有回應，只是命令失敗
+                raise
+            except Exception as e:
+                self._record(kind, started, error=e, daemon=False)
+                raise
+            self._record(kind, started)
+            if kind in self.read_only:
+                self._check_cancelled(generation)
+            return result
+
+    def call(self, kind: str, func, *args):
+        """
+        以相同的健康追蹤、取消與統計執行一個 RPC 呼叫。期限由 RPC 連線的 socket 逾時提供。
+
+        Args:
+            kind (str): 命令類型 (例如 "rpc:list")。
+            func (callable): 要呼叫的函數。
+            *args: 傳給 func 的參數。
+
+        Returns:
+            func 的回傳值。
+
+        Raises:
+            DaemonUnresponsive: 守護程序被判定為沒有回應，沒有呼叫 func。
+            CommandCancelled: 呼叫被 cancel_pending() 取消 (已完成的狀態變更呼叫不會拋出)。
+            Exception: func 拋出的例外。
+        """
+        generation = self._cancel_generation
+        self._admit(kind, generation)
+        started = self._clock()
+        try:
+            result = func(*args)
+        except (TimeoutError, socket.timeout) as e:  # Python 3.10 之前 socket.timeout 不是 TimeoutError
+            self._record(kind, started, timeout=True, error=e)
+            raise
+        except (ConnectionError, FileNotFoundError) as e:
+            self._record(kind, started, error=e, daemon=False)  # 沒有連上守護程序，與是否卡住無關
+            raise
+        except Exception as e:
+            self._record(kind, started, error=e)
+            raise
+        self._record(kind, started)
+        if kind in self.read_only:
+            self._check_cancelled(generation)  # 操作已經執行，只丟棄過時的查詢結果
+        return result
+
+    def cancel_pending(self):
+        """
+        取消所有已開始的命令：它們會在下一個檢查點拋出 CommandCancelled。之後開始的命令不受影響。
+        """
+        with self._cond:
+            self._cancel_generation += 1
+            self._cond.notify_all()
+
+    def is_responsive(self) -> bool:
+        """
+        返回守護程序目前是否被視為有回應。
+        """
+        with self._cond:
+            return self._consecutive_timeouts < self.failure_threshold
+
+    def get_health(self) -> dict:
+        """
+        返回守護程序的健康狀態。
+
+        Returns:
+            dict: 包含:
+                  - "responsive" (bool): 是否有回應。
+                  - "consecutive_timeouts" (int): 連續逾時次數。
+                  - "since_success" (float): 距離上次成功的秒數，從未成功時為 None。
+                  - "last_error" (str): 最近一次錯誤的訊息。
+        """
+        with self._cond:
+            return {
+                "responsive": self._consecutive_timeouts < self.failure_threshold,
+                "consecutive_timeouts": self._consecutive_timeouts,
+                "since_success": None if self._last_success is None else self._clock() - self._last_success,
+                "last_error": self._last_error,
+            }
+
+    def get_stats(self) -> dict:
+        """
+        返回每種命令類型的統計。
+
+        Returns:
+            dict: 以命令類型為鍵，每個值包含 count、errors、timeouts、retries、rejected (因守護程序沒有回應而沒有執行)
+                  以及最近 PM2_COMMAND_STATS_WINDOW 次呼叫的 p50、p95、max 延遲 (毫秒，沒有數據時為 None)。
+        """
+        with self._cond:
+            stats = {}
+            for kind, entry in self._stats.items():
+                latencies = np.asarray(entry["latencies"], dtype=np.float64)
+                stats[kind] = {key: entry[key] for key in ("count", "errors", "timeouts", "retries", "rejected")}
+                if latencies.size:
+                    p50, p95 = np.percentile(latencies, [50, 95])
+                    stats[kind].update(p50=float(p50), p95=float(p95), max=float(latencies.max()))
+                else:
+                    stats[kind].update(p50=None, p95=None, max=None)
+            return stats
+
+    def _entry(self, kind: str) -> dict:
+        entry = self._stats.get(kind)
+        if entry is None:
+            entry = self._stats[kind] = {"count": 0, "errors": 0, "timeouts": 0, "retries": 0, "rejected": 0,
+                                         "latencies": deque(maxlen=config.PM2_COMMAND_STATS_WINDOW)}
+        return entry
+
+    def _admit(self, kind: str, generation: int):
+        """
+        檢查命令是否可以執行：沒有被取消，且守護程序有回應或已到了探測的時間。
+        """
+        with self._cond:
+            if self._cancel_generation != generation:
+                raise CommandCancelled(f"命令 {kind} 已被取消")
+            now = self._clock()
+            if self._consecutive_timeouts >= self.failure_threshold and self._last_attempt is not None \
+                    and now - self._last_attempt < self.probe_interval:
+                self._entry(kind)["rejected"] += 1
+                wait = self.probe_interval - (now - self._last_attempt)
+                raise DaemonUnresponsive(f"PM2 守護程序沒有回應 (連續 {self._consecutive_timeouts} 次逾時)，"
+                                         f"{wait:.0f} 秒後再嘗試")
+            self._last_attempt = now
+
+    def _record(self, kind: str, started: float, timeout: bool = False, error: Exception = None,
+                daemon: bool = True):
+        """
+        記錄一次呼叫的延遲與結果，並更新守護程序的健康狀態。
+
+        Args:
+            daemon (bool): 結果是否反映守護程序的狀態 (例如找不到 pm2 命令時為 False)。
+        """
+        with self._cond:
+            entry = self._entry(kind)
+            entry["count"] += 1
+            entry["latencies"].append((self._clock() - started) * 1000)
+            if timeout:
+                entry["timeouts"] += 1
+                self._consecutive_timeouts += 1
+            elif daemon:
+                self._consecutive_timeouts = 0
+                self._last_success = self._clock()
+            if timeout or error is not None or not daemon:
+                entry["errors"] += 1
+                if error is not None:
+                    self._last_error = str(error)
+
+    def _backoff(self, kind: str, attempt: int, generation: int):
+        """
+        在重試前等待，等待期間被取消時立即拋出 CommandCancelled。
+        """
+        with self._cond:
+            self._entry(kind)["retries"] += 1
+            deadline = self._clock() + self.backoff * (2 ** attempt)
+            while self._cancel_generation == generation:
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    return
+                self._cond.wait(remaining)
+            raise CommandCancelled(f"命令 {kind} 已被取消")
+
+    def _check_cancelled(self, generation: int):
+        if self._cancel_generation != generation:
+            raise CommandCancelled("命令已被取消")
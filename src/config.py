@@ -26,4 +26,347 @@ API_CONFIGS = {
 """
 API 配置字典，用於儲存各個 API 的詳細資訊，如端口和描述。這是應用程式的預設配置，
 也可以從 `dummy_api_project/docs/api.json` 載入。
-"""
\ No newline at end of file
+"""
+PM2_HOME = None
+"""
+PM2 守護程序的主目錄 (包含 rpc.sock 與 pub.sock)。如果設置為 None，
+會依序使用環境變數 PM2_HOME 或 ~/.pm2。
+"""
+PM2_USE_RPC = True
+"""
+是否優先透過 RPC socket 直接與 PM2 守護程序溝通。設置為 False 時一律使用 pm2 CLI。
+"""
+PM2_RPC_TIMEOUT = 5.0
+"""
+PM2 RPC 呼叫的 socket 逾時秒數。
+"""
+PM2_RPC_POOL_SIZE = 4
+"""
+保持開啟的 PM2 RPC 連線數上限。並行的操作各自借用一條連線，超過上限時臨時建立的連線用完即關閉。
+"""
+PM2_SNAPSHOT_TTL = 2.0
+"""
+PM2 程序快照的快取秒數。在此時間內的查詢會共用同一份 `pm2 jlist` 結果，
+任何啟動/停止/重啟操作完成後快照都會立即失效。
+"""
+ACTION_MAX_WORKERS = 8
+"""
+並行執行啟動/停止/重啟操作的最大工作線程數。
+"""
+ACTION_HOST_CONCURRENCY = 4
+"""
+同一台主機 (api.json 中的 host，默認為 localhost) 上同時進行的操作批次數上限。
+"""
+ACTION_BATCH_SIZE = 0
+"""
+每個並行操作批次包含的 API 數量。設置為 0 時會自動將每台主機的目標平均分配到它的並行槽位上。
+"""
+METRICS_SERIES_TTL = 600.0
+"""
+PM2 程序超過多少秒沒有出現在查詢結果中，就從歷史數據儲存區中移除。
+"""
+METRICS_MAX_SERIES = 1000
+"""
+歷史數據儲存區最多保留的程序數，超過時移除最久沒有更新的程序。
+"""
+METRICS_ROLLUP_TIERS = [(1, 600), (60, 86400), (3600, 2592000)]
+"""
+CPU/記憶體歷史數據的解析度分層，每一層為 (解析度秒數, 保留秒數)。
+第一層保存原始數據點 (點數上限為 保留秒數 / 解析度秒數)，之後每一層都由前一層彙總出 min/avg/max。
+默認為：原始數據保留 10 分鐘、每分鐘彙總保留 24 小時、每小時彙總保留 30 天。
+"""
+METRICS_PERSIST_DIR = "~/.api_manager/metrics"
+"""
+歷史數據環形檔案所在的目錄，應用程式啟動時會映射其中已有的檔案，讓歷史數據在重新啟動後仍然存在。
+設置為 None 時歷史數據只保存在記憶體中。
+"""
+METRICS_PERSIST_RETENTION = 30 * 86400
+"""
+程序的最後一筆歷史數據超過多少秒後，其環形檔案會在整理時被刪除。
+"""
+METRICS_PERSIST_MAX_BYTES = 256 * 1024 * 1024
+"""
+歷史數據目錄的總大小上限 (bytes)，超過時從最久沒有更新的程序開始刪除。
+"""
+METRICS_COMPACT_INTERVAL = 3600
+"""
+定期整理歷史數據目錄的間隔秒數。
+"""
+PM2_USE_BUS = True
+"""
+是否訂閱 PM2 事件匯流排 (pub.sock)，在程序狀態改變時立即更新畫面。
+"""
+DATA_REFRESH_INTERVAL = 30
+"""
+無法連線到 PM2 事件匯流排時，定時重新載入 API 列表的間隔秒數。
+"""
+PM2_RECONCILE_INTERVAL = 300
+"""
+已連線到 PM2 事件匯流排時，定時重新載入 API 列表以校正遺漏事件的間隔秒數。
+"""
+POLL_MIN_INTERVAL = 2.0
+"""
+正在查看的 API 以及指標或狀態剛改變的程序的輪詢間隔秒數。
+"""
+POLL_MAX_INTERVAL = 60.0
+"""
+穩定程序的輪詢間隔會以指數方式退避到此秒數。
+"""
+POLL_BACKOFF = 2.0
+"""
+程序的指標沒有明顯變化時，每次輪詢後間隔放大的倍數。
+"""
+POLL_CPU_CHANGE = 5.0
+"""
+CPU 使用率變化超過多少個百分點時視為活躍。
+"""
+POLL_MEMORY_CHANGE = 0.05
+"""
+記憶體使用量變化超過多少比例時視為活躍。
+"""
+POLL_CPU_BUDGET = 0.05
+"""
+應用程式本身 (包含 pm2 子程序) 的 CPU 使用率上限，1.0 表示一個完整核心。超過時所有輪詢間隔會被放大。
+"""
+POLL_SUBPROCESS_BUDGET = 12
+"""
+輪詢時每分鐘允許啟動的 pm2 子程序數上限 (使用 RPC 時不會啟動子程序)。設置為 None 表示不限制。
+"""
+POLL_MAX_THROTTLE = 16.0
+"""
+因超出預算而放大輪詢間隔的最大倍數。
+"""
+PROC_SAMPLER_ENABLED = True
+"""
+是否直接讀取 /proc (或使用 psutil) 取樣程序的 CPU/記憶體，取代 pm2 jlist 中較粗略的 monit 數據。
+"""
+PROC_SAMPLE_INTERVAL = 1.0
+"""
+/proc 取樣的間隔 (秒)。
+"""
+PROC_SMAPS_INTERVAL = 10.0
+"""
+讀取 /proc/<pid>/smaps_rollup (PSS) 的間隔 (秒)。核心產生這個檔案需要走訪整個位址空間，因此比其他指標讀取得少。
+"""
+HEALTH_PROBE_ENABLED = True
+"""
+是否定期對所有 online 的 API 進行 HTTP 健康檢查。
+"""
+HEALTH_PROBE_PATH = "/"
+"""
+默認的健康檢查路徑。可以在 api.json 中以 health_path 為個別 API 設定。
+"""
+HEALTH_PROBE_INTERVAL = 10.0
+"""
+健康檢查的間隔秒數 (每次會加上 HEALTH_PROBE_JITTER 比例的隨機抖動)。可以在 api.json 中以 health_interval 設定。
+"""
+HEALTH_PROBE_TIMEOUT = 2.0
+"""
+單次健康檢查的逾時秒數。可以在 api.json 中以 health_timeout 設定。
+"""
+HEALTH_PROBE_JITTER = 0.2
+"""
+健康檢查間隔的隨機抖動比例，避免所有請求同時送出。
+"""
+HEALTH_PROBE_CONCURRENCY = 64
+"""
+同時進行的健康檢查請求數上限。
+"""
+HEALTH_DEGRADED_LATENCY = 1000.0
+"""
+健康檢查的回應時間超過此毫秒數視為過慢。
+"""
+HEALTH_FAILURE_THRESHOLD = 2
+"""
+連續失敗或過慢幾次後，PM2 顯示為 online 的 API 會被標記為 degraded。
+"""
+LOAD_TEST_DURATION = 10.0
+"""
+壓力測試的默認秒數。
+"""
+LOAD_TEST_CONCURRENCY = 10
+"""
+固定並行數 (closed-loop) 壓力測試的默認並行數。
+"""
+LOAD_TEST_RATE = 100.0
+"""
+固定速率 (open-loop) 壓力測試的默認每秒請求數。
+"""
+LOAD_TEST_TIMEOUT = 5.0
+"""
+壓力測試中單一請求的逾時秒數。
+"""
+LOAD_TEST_MAX_IN_FLIGHT = 1000
+"""
+固定速率壓力測試同時進行的請求上限，超過時丟棄請求並計為錯誤。
+"""
+LOG_INDEX_STRIDE = 1000
+"""
+日誌行偏移索引的間隔行數：每隔幾行記錄一次行首位置。跳到任意行最多需要往後掃描這麼多行。
+"""
+LOG_VIEWER_MAX_LINE_BYTES = 64 * 1024
+"""
+日誌檢視器每一行最多解碼並顯示的位元組數，避免超長的單行 (例如整段 JSON) 拖慢繪製。
+"""
+LOG_SEARCH_ENABLED = True
+"""
+是否在背景為所有 API 的 PM2 日誌建立全文索引。
+"""
+LOG_SEARCH_DIR = "~/.api_manager/log_index"
+"""
+日誌全文索引的目錄。
+"""
+LOG_SEARCH_INTERVAL = 5.0
+"""
+背景索引線程讀取日誌新增內容的間隔 (秒)。
+"""
+LOG_SEARCH_READ_BYTES = 4 * 1024 * 1024
+"""
+每個日誌檔每一輪最多讀取的位元組數，讓補建大型日誌的索引時不會佔用過多記憶體。
+"""
+LOG_SEARCH_BUFFER_POSTINGS = 200000
+"""
+寫成區段前記憶體中最多暫存的 posting 數。
+"""
+LOG_SEARCH_MAX_SEGMENTS = 8
+"""
+索引區段數超過此值時合併最小的幾個區段。
+"""
+LOG_SEARCH_MERGE_FACTOR = 4
+"""
+每次合併的區段數。
+"""
+LOG_SEARCH_MERGE_MAX_POSTINGS = 20000000
+"""
+單次合併的 posting 總數上限，限制合併時的記憶體用量。
+"""
+LOG_SEARCH_RETENTION = 7 * 24 * 3600
+"""
+日誌索引的保留秒數，最新一行早於此時間的區段會被刪除。
+"""
+LOG_SEARCH_RESULT_LIMIT = 200
+"""
+日誌搜尋最多返回的筆數。
+"""
+ERROR_FINGERPRINT_ENABLED = True
+"""
+是否在背景追蹤錯誤日誌並產生錯誤排行。
+"""
+ERROR_FINGERPRINT_INTERVAL = 2.0
+"""
+處理錯誤日誌新增內容的間隔 (秒)。
+"""
+ERROR_FINGERPRINT_FRAMES = 5
+"""
+計算錯誤指紋時使用的堆疊框架數 (從最內層開始)。
+"""
+ERROR_FINGERPRINT_MAX_ENTRIES = 5000
+"""
+錯誤排行表的 (API, 指紋) 項目數上限。
+"""
+ERROR_FINGERPRINT_READ_BYTES = 4 * 1024 * 1024
+"""
+每個錯誤日誌每一輪最多讀取的位元組數。
+"""
+ERROR_FINGERPRINT_BACKFILL_BYTES = 1024 * 1024
+"""
+第一次看到錯誤日誌時從結尾往回讀取的位元組數。
+"""
+ACCESS_LOG_ENABLED = True
+"""
+是否從輸出日誌中的存取記錄推導請求速率、狀態碼組成與延遲分位數。
+"""
+ACCESS_LOG_INTERVAL = 5.0
+"""
+產生一輪存取記錄統計的間隔 (秒)，也是寫入歷史數據的解析度。
+"""
+ACCESS_LOG_READ_BYTES = 4 * 1024 * 1024
+"""
+讀取存取記錄時每次讀取的位元組數。
+"""
+ACCESS_LOG_DEFAULT_FORMAT = None
+"""
+api.json 中沒有設定 access_log_format/access_log_regex 的 API 使用的格式 (預設格式名稱或格式模板)，
+None 表示不解析這些 API 的日誌。
+"""
+ROLLING_RESTART_BATCH_SIZE = 1
+"""
+滾動重啟時每一批同時重啟的實例數。
+"""
+ROLLING_RESTART_ONLINE_TIMEOUT = 30.0
+"""
+滾動重啟時等待一批實例回到 online 的秒數上限，逾時即中止。
+"""
+ROLLING_RESTART_HEALTH_TIMEOUT = 30.0
+"""
+滾動重啟時等待一批實例通過端口健康檢查的秒數上限，逾時即中止。
+"""
+ROLLING_RESTART_POLL_INTERVAL = 0.5
+"""
+滾動重啟時檢查實例狀態與健康檢查的間隔 (秒)。
+"""
+ROLLING_RESTART_SETTLE = 5.0
+"""
+每一批通過檢查後、比較錯誤率之前等待的秒數 (至少一輪 ACCESS_LOG_INTERVAL)。
+"""
+ROLLING_RESTART_MAX_ERROR_RATE_INCREASE = 0.05
+"""
+滾動重啟時錯誤率 (5xx 比例) 相對重啟前可以上升的幅度，超過即中止。
+"""
+STARTUP_MAX_WORKERS = 16
+"""
+依依賴圖啟動專案時同時啟動中 (包含等待就緒) 的 API 數量上限。
+"""
+STARTUP_READY_TIMEOUT = 60.0
+"""
+依依賴圖啟動時每個 API 從啟動到通過就緒檢查的秒數上限。可以在 api.json 中以 ready_timeout 設定。
+"""
+STARTUP_POLL_INTERVAL = 0.25
+"""
+依依賴圖啟動時檢查程序狀態與就緒檢查的間隔 (秒)。
+"""
+PM2_COMMAND_TIMEOUT = 30.0
+"""
+pm2 CLI 命令的默認期限 (秒)，超過時子程序會被結束並拋出 subprocess.TimeoutExpired。
+"""
+PM2_COMMAND_TIMEOUTS = {"jlist": 10.0}
+"""
+依命令類型 (pm2 的子命令，例如 "jlist"、"start") 覆寫的期限秒數。
+"""
+PM2_COMMAND_RETRIES = {"jlist": 1}
+"""
+依命令類型設定的逾時重試次數。只有只讀的命令應該重試，沒有列出的類型不重試。
+"""
+PM2_READ_ONLY_COMMANDS = ("jlist", "rpc:list")
+"""
+只讀的命令類型。只有這些命令在取消後才返回的結果會被丟棄 (拋出 CommandCancelled)；
+其他命令會改變狀態，已經完成時照常返回結果，讓呼叫端正確回報操作已執行。
+"""
+PM2_COMMAND_BACKOFF = 0.5
+"""
+命令逾時後第一次重試前等待的秒數，之後每次重試加倍。
+"""
+PM2_DAEMON_FAILURE_THRESHOLD = 2
+"""
+連續多少次命令逾時後判定 PM2 守護程序沒有回應。之後的命令立即失敗，程序列表改用上次成功取得的快取。
+"""
+PM2_DAEMON_PROBE_INTERVAL = 15.0
+"""
+守護程序沒有回應時，每隔多少秒放行一個命令探測它是否恢復。
+"""
+PM2_COMMAND_STATS_WINDOW = 256
+"""
+每種命令類型保留多少次最近呼叫的延遲用於計算分位數。
+"""
+ACTION_QUEUE_BATCH_WINDOW = 0.2
+"""
+操作佇列在最後一個請求送出後等待多少秒沒有新請求才派發，期間送出的操作會合併並一起執行。
+"""
+ACTION_QUEUE_MAX_DELAY = 1.0
+"""
+操作佇列中最早的操作最多等待多少秒就會被派發。
+"""
+ACTION_QUEUE_STATS_WINDOW = 256
+"""
+操作佇列保留多少個最近派發目標的等待時間用於計算分位數。
+"""
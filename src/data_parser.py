@@ -9,6 +9,8 @@ import os
 from datetime import datetime
 import re
 
+from src import axm_metrics
+
 
 def load_all_api_configs():
     """
@@ -96,6 +98,7 @@ def parse_pm2_list_output(api_list: list) -> list:
                 "uptime": get_api_uptime(api),  # 使用新的函數來計算運行時間
                 "log_file_path": (api.get('pm2_env', {}).get('pm_out_log_path') or
                                   api.get('pm2_env', {}).get('log_file') or "N/A"),
+                "error_log_path": api.get('pm2_env', {}).get('pm_err_log_path') or "N/A",
                 "project_path": (api.get('pm_exec_path') or
                                  api.get('pm2_env', {}).get('PWD') or
                                  os.path.dirname(
@@ -103,7 +106,9 @@ def parse_pm2_list_output(api_list: list) -> list:
                 "project_name": project_name,  # 從 api.json 獲取的專案名稱
                 "port": get_api_port(api, api_config),  # 傳遞 api_config
                 "description": get_api_description(api, api_config),  # 傳遞 api_config
-                "metadata": api_config  # 直接將 api_config 作為 metadata
+                "metadata": api_config,  # 直接將 api_config 作為 metadata
+                **format_process_resources(api.get('resources')),  # /proc 取樣的擴充指標
+                **format_custom_metrics(api.get('pm2_env', {}).get('axm_monitor'))  # PM2/io 自訂指標
             }
             parsed_data.append(api_info)
     except Exception as e:
@@ -112,6 +117,67 @@ def parse_pm2_list_output(api_list: list) -> list:
     return parsed_data
 
 
+def format_process_resources(sample: dict) -> dict:
+    """
+    將 /proc 取樣結果 (pm2_manager.get_latest_process_sample()) 格式化為詳細面板顯示的文字。
+
+    Args:
+        sample (dict): 取樣結果，沒有取樣數據時為 None。
+
+    Returns:
+        dict: 包含 process_count、threads、fds、disk_io、context_switches 與 memory_breakdown 的字典，
+              無法取得的欄位為 "N/A"。
+    """
+    sample = sample or {}
+
+    def value(name, template):
+        return template.format(sample[name]) if name in sample else "N/A"
+
+    resources = {
+        "process_count": value("processes", "{}"),
+        "threads": value("threads", "{}"),
+        "fds": value("fds", "{}"),
+        "disk_io": "N/A",
+        "context_switches": "N/A",
+        "memory_breakdown": "N/A",
+    }
+    if "io_read" in sample or "io_write" in sample:
+        resources["disk_io"] = f"讀 {value('io_read', '{:.1f}')} KB/s，寫 {value('io_write', '{:.1f}')} KB/s"
+    if "ctx_vol" in sample:
+        resources["context_switches"] = f"自願 {value('ctx_vol', '{:.0f}')}/s，非自願 {value('ctx_invol', '{:.0f}')}/s"
+    if "memory" in sample:
+        mb = {name: f"{sample[name] / (1024 * 1024):.1f} MB" if name in sample else "N/A"
+              for name in ("memory", "pss", "swap")}
+        resources["memory_breakdown"] = f"RSS {mb['memory']}，PSS {mb['pss']}，Swap {mb['swap']}"
+    return resources
+
+
+def format_custom_metrics(axm_monitor: dict) -> dict:
+    """
+    將 pm2_env.axm_monitor 中的 PM2/io 自訂指標格式化為詳細面板顯示的文字。
+
+    Args:
+        axm_monitor (dict): pm2_env.axm_monitor，沒有時為 None。
+
+    Returns:
+        dict: 包含 event_loop_lag (事件迴圈延遲平均值與 p95) 與 custom_metrics (所有有數值的指標) 的字典，
+              無法取得的欄位為 "N/A"。
+    """
+    values = axm_metrics.parse_axm_monitor(axm_monitor)
+    metrics = {"event_loop_lag": "N/A", "custom_metrics": "N/A"}
+    if "loop_lag" in values or "loop_lag_p95" in values:
+        lag = {name: f"{values[name]:.2f} ms" if name in values else "N/A" for name in ("loop_lag", "loop_lag_p95")}
+        metrics["event_loop_lag"] = f"{lag['loop_lag']} (p95 {lag['loop_lag_p95']})"
+    entries = []
+    for name, entry in (axm_monitor or {}).items():
+        value, unit = axm_metrics.parse_value(entry)
+        if value is not None:
+            entries.append(f"{name} {value:g}{' ' + unit if unit else ''}")
+    if entries:
+        metrics["custom_metrics"] = "，".join(entries)
+    return metrics
+
+
 def get_project_name(api: dict, all_api_configs: dict) -> str:
     """
     從 API 資訊中提取專案名稱。
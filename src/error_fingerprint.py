@@ -0,0 +1,333 @@
+"""
+error_fingerprint.py
+
+此模組將 PM2 錯誤日誌串流式地歸類為「錯誤指紋」，產生每個 API 與每個專案的即時錯誤排行。
+
+- 每個錯誤事件由一行訊息與其後縮排的堆疊框架組成 (Node.js 的 "    at ..."，Python 的 Traceback，
+  此時以最後一行例外作為訊息)。跨讀取區段的事件會保留到下一輪，檔案沒有新內容時才結束。
+- 訊息與前 ERROR_FINGERPRINT_FRAMES 個框架經過正規化 (移除行首時間戳，數字、十六進位 id、UUID、IP
+  改為佔位符) 後雜湊成指紋，因此只差在數值或 id 的重複錯誤會歸為同一類。
+- 每個 (API, 指紋) 記錄次數、首次與最後出現時間與一個原始範例。表格大小有上限，
+  超過時保留次數最多、最近出現的項目。
+- ErrorTracker 在背景線程中只讀取每個錯誤日誌新增的完整行，第一次看到日誌時只讀取最後
+  ERROR_FINGERPRINT_BACKFILL_BYTES 位元組。
+"""
+
+import functools
+import hashlib
+import os
+import re
+import threading
+import time
+
+from src import config
+from src.log_search import build_sources, line_timestamp
+
+_TIMESTAMP_PREFIX_RE = re.compile(
+    r"^\s*\[?\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2})?(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?\]?:? ?")  # 保留其後的縮排
+_SUBSTITUTIONS = (
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE), "<uuid>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}\b"), "<ip>"),
+    (re.compile(r"\b0x[0-9a-f]+\b", re.IGNORECASE), "<hex>"),
+    (re.compile(r"\b(?=[0-9a-f]*\d)[0-9a-f]{8,}\b", re.IGNORECASE), "<hex>"),
+    (re.compile(r"\d+"), "<n>"),
+    (re.compile(r"\s+"), " "),
+)
+_FRAME_RE = re.compile(r"^(?:\s+\S|\s*at\s|\s*\.\.\. \d+ more)")
+_TRACEBACK_HEADER = "Traceback (most recent call last):"
+
+
+@functools.lru_cache(maxsize=8192)
+def normalize(line: str) -> str:
+    """
+    正規化一行錯誤訊息或堆疊框架：移除行首時間戳，並將 UUID、IP、十六進位 id 與數字改為佔位符。
+    重複的框架行很多，因此結果會被快取。
+
+    Args:
+        line (str): 原始的一行。
+
+    Returns:
+        str: 正規化後的文字。
+    """
+    line = _TIMESTAMP_PREFIX_RE.sub("", line)
+    for pattern, replacement in _SUBSTITUTIONS:
+        line = pattern.sub(replacement, line)
+    return line.strip()
+
+
+def fingerprint(message: str, frames: list) -> str:
+    """
+    以正規化後的訊息與前 ERROR_FINGERPRINT_FRAMES 個框架計算指紋。
+
+    Returns:
+        str: 16 個字元的十六進位指紋。
+    """
+    text = "\n".join([normalize(message)] + [normalize(frame) for frame in frames[:config.ERROR_FINGERPRINT_FRAMES]])
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class FingerprintStream:
+    """
+    將單一日誌檔的行組合成錯誤事件，每個事件結束時以 (指紋, 正規化訊息, 原始訊息, 時間) 呼叫 emit。
+    """
+    def __init__(self, emit):
+        self._emit = emit
+        self._message = None
+        self._frames = []
+        self._timestamp = None
+
+    def feed(self, line: bytes, now: int):
+        """
+        處理一行 (不含換行符號)。
+        """
+        # PM2 的 log_date_format 會在每一行 (包含框架) 前加上時間戳
+        text = _TIMESTAMP_PREFIX_RE.sub("", line.decode("utf-8", errors="replace").rstrip("\r"))
+        if self._message is not None and _FRAME_RE.match(text):
+            if len(self._frames) < config.ERROR_FINGERPRINT_FRAMES:
+                self._frames.append(text)
+            return
+        if self._message == _TRACEBACK_HEADER and self._frames and text.strip():
+            # Python：框架之後的那一行才是例外訊息
+            self._message = text
+            self.flush()
+            return
+        self.flush()
+        if text.strip():
+            self._message = text
+            self._timestamp = line_timestamp(line, now)
+
+    def flush(self):
+        """
+        結束目前的事件 (如果有)。
+        """
+        if self._message is None:
+            return
+        message, frames = self._message, self._frames
+        self._message, self._frames = None, []
+        self._emit(fingerprint(message, frames), normalize(message), message, self._timestamp)
+
+
+class ErrorTable:
+    """
+    有大小上限的 (API, 指紋) 計數表。
+
+    Attributes:
+        max_entries (int): 項目數上限。
+    """
+    def __init__(self, max_entries: int = None):
+        """
+        初始化 ErrorTable。
+
+        Args:
+            max_entries (int, optional): 項目數上限。默認為 config.ERROR_FINGERPRINT_MAX_ENTRIES。
+        """
+        self.max_entries = max_entries or config.ERROR_FINGERPRINT_MAX_ENTRIES
+        self._entries = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record(self, name: str, project_name: str, fingerprint: str, message: str, sample: str, timestamp: int):
+        """
+        記錄一次錯誤。
+        """
+        entry = self._entries.get((name, fingerprint))
+        if entry is None:
+            if len(self._entries) >= self.max_entries:
+                self._prune()
+            self._entries[(name, fingerprint)] = {
+                "name": name, "project_name": project_name, "fingerprint": fingerprint, "message": message,
+                "sample": sample, "count": 1, "first_seen": timestamp, "last_seen": timestamp}
+            return
+        entry["count"] += 1
+        entry["first_seen"] = min(entry["first_seen"], timestamp)
+        entry["last_seen"] = max(entry["last_seen"], timestamp)
+        entry["project_name"] = project_name
+
+    def _prune(self):
+        # 一次移除約 10%，讓清理的成本分攤到之後的插入
+        keep = int(self.max_entries * 0.9)
+        ranked = sorted(self._entries.items(), key=lambda item: (item[1]["count"], item[1]["last_seen"]), reverse=True)
+        self._entries = dict(ranked[:keep])
+
+    def top(self, name: str = None, project_name: str = None, limit: int = 10) -> list:
+        """
+        返回最常見的錯誤。指定 name 時只包含該 API；否則同一個指紋在多個 API 中的次數會合併。
+
+        Args:
+            name (str, optional): API 名稱。
+            project_name (str, optional): 專案名稱。
+            limit (int, optional): 最多返回的筆數。默認為 10。
+
+        Returns:
+            list: 包含 fingerprint、message、sample、count、first_seen、last_seen 與 names 的字典列表，依次數排序。
+        """
+        merged = {}
+        for entry in self._entries.values():
+            if (name is not None and entry["name"] != name) or \
+                    (project_name is not None and entry["project_name"] != project_name):
+                continue
+            total = merged.get(entry["fingerprint"])
+            if total is None:
+                merged[entry["fingerprint"]] = dict(entry, names=[entry["name"]])
+                continue
+            total["count"] += entry["count"]
+            total["first_seen"] = min(total["first_seen"], entry["first_seen"])
+            total["last_seen"] = max(total["last_seen"], entry["last_seen"])
+            total["names"].append(entry["name"])
+        return sorted(merged.values(), key=lambda entry: (entry["count"], entry["last_seen"]), reverse=True)[:limit]
+
+
+def format_top_errors(entries: list, limit: int = 3) -> str:
+    """
+    將錯誤排行格式化為一行文字，例如 "×120 TypeError: ...；×3 Error: ..."。
+    """
+    if not entries:
+        return "N/A"
+    return "；".join(f"×{entry['count']} {entry['sample'][:80]}" for entry in entries[:limit])
+
+
+class ErrorTracker:
+    """
+    在背景線程中追蹤所有 API 的錯誤日誌並維護錯誤排行。
+
+    Attributes:
+        table (ErrorTable): 錯誤計數表。
+    """
+    def __init__(self, table: ErrorTable = None, clock=time.time):
+        """
+        初始化 ErrorTracker。
+
+        Args:
+            table (ErrorTable, optional): 錯誤計數表。默認建立新的表格。
+            clock (callable, optional): 返回 epoch 秒數的時鐘 (測試用)。
+        """
+        self.table = table if table is not None else ErrorTable()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sources = []
+        self._files = {}  # 路徑 -> {"inode", "offset", "stream"}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def set_sources(self, apis: list):
+        """
+        以解析後的 API 列表設定要追蹤的錯誤日誌。
+        """
+        sources = [source for source in build_sources(apis) if source["stream"] == "err"]
+        with self._lock:
+            self._sources = sources
+            paths = {source["path"] for source in sources}
+            self._files = {path: state for path, state in self._files.items() if path in paths}
+
+    def top(self, name: str = None, project_name: str = None, limit: int = 10) -> list:
+        """
+        返回錯誤排行，參數同 ErrorTable.top()。
+        """
+        with self._lock:
+            return self.table.top(name, project_name, limit)
+
+    def poll(self) -> int:
+        """
+        讀取並處理每個錯誤日誌新增的內容。
+
+        Returns:
+            int: 這一輪處理的位元組數。
+        """
+        with self._lock:
+            sources = list(self._sources)
+        processed = 0
+        for source in sources:
+            path = source["path"]
+            try:
+                stat = os.stat(path)
+                with self._lock:
+                    state = self._files.get(path)
+                    if state is None or state["inode"] != stat.st_ino or state["offset"] > stat.st_size:
+                        if state is not None:
+                            state["stream"].flush()  # 日誌被輪替或截斷，結束舊檔案的最後一個事件
+                        state = self._new_state(source, stat)
+                if stat.st_size <= state["offset"]:
+                    with self._lock:
+                        state["stream"].flush()  # 沒有新內容，最後一個事件已經完整
+                    continue
+                with open(path, "rb") as f:
+                    f.seek(state["offset"])
+                    data = f.read(min(stat.st_size - state["offset"], config.ERROR_FINGERPRINT_READ_BYTES))
+            except OSError:
+                continue
+            end = data.rfind(b"\n") + 1
+            if end == 0:
+                if len(data) < config.ERROR_FINGERPRINT_READ_BYTES:
+                    continue  # 最後一行還沒寫完
+                # 一行比一次讀取的量還長：只保留開頭作為一個事件，跳過這一行剩下的部分
+                if not state.get("skip_partial"):
+                    with self._lock:
+                        state["stream"].feed(data, int(self._clock()))
+                    state["skip_partial"] = True
+                state["offset"] += len(data)
+                processed += len(data)
+                continue
+            if state.pop("skip_partial", False):
+                data = data[data.find(b"\n") + 1:end]  # 從回填範圍中的第一個完整行開始
+                state["offset"] += end - len(data)
+            else:
+                data = data[:end]
+            now = int(self._clock())
+            with self._lock:
+                for line in data.split(b"\n")[:-1]:
+                    state["stream"].feed(line, now)
+            state["offset"] += len(data)
+            processed += len(data)
+        return processed
+
+    def _new_state(self, source: dict, stat) -> dict:
+        name, project_name = source.get("name"), source.get("project_name")
+
+        def emit(fingerprint_, message, sample, timestamp):
+            self.table.record(name, project_name, fingerprint_, message, sample, timestamp)
+
+        offset = max(0, stat.st_size - config.ERROR_FINGERPRINT_BACKFILL_BYTES)
+        state = {"inode": stat.st_ino, "offset": offset, "stream": FingerprintStream(emit)}
+        if offset:
+            state["skip_partial"] = True
+        self._files[source["path"]] = state
+        return state
+
+    def is_running(self) -> bool:
+        """
+        背景線程是否正在運行。
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = None):
+        """
+        啟動背景線程，每 interval 秒處理一次錯誤日誌新增的內容。
+
+        Args:
+            interval (float, optional): 間隔秒數。默認為 config.ERROR_FINGERPRINT_INTERVAL。
+        """
+        if self.is_running():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval or config.ERROR_FINGERPRINT_INTERVAL,),
+                                        name="error-tracker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        """
+        停止背景線程。
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, interval: float):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"處理錯誤日誌時發生錯誤：{e}")
+            self._stop.wait(interval)
@@ -4,16 +4,25 @@ gui_components.py
 此模組包含 PM2 API 管理應用中可重複使用的 GUI 組件，例如狀態燈、API 列表表格、詳細資訊面板和性能圖表。
 """
 
+import os
+import time
+
 import matplotlib
+import numpy as np
 matplotlib.use('QtAgg')  # 確保 Matplotlib 使用 PyQt6 後端
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-from PyQt6.QtCore import Qt, QSize, pyqtSignal
+from PyQt6.QtCore import Qt, QSize, QFileSystemWatcher, QTimer, pyqtSignal
+from PyQt6.QtGui import QFontDatabase, QPainter
 from PyQt6.QtWidgets import (
     QLabel, QWidget, QTableWidget, QVBoxLayout, QHBoxLayout, QHeaderView,
-    QTableWidgetItem, QMessageBox, QPushButton
+    QTableWidgetItem, QMessageBox, QPushButton, QComboBox, QDialog, QFormLayout,
+    QSpinBox, QDoubleSpinBox, QLineEdit, QPlainTextEdit, QAbstractScrollArea
 )
 
+from src import config
+from src import load_generator
+from src import log_index
 from src import pm2_manager
 
 
@@ -22,7 +31,7 @@ class ApiStatusLight(QWidget):
     一個小部件，根據 API 狀態顯示不同顏色的圓點和狀態文字。
 
     Attributes:
-        _status (str): 當前 API 的狀態 (e.g., "online", "stopped", "errored").
+        _status (str): 當前 API 的狀態 (e.g., "online", "stopped", "errored", "degraded").
         layout (QHBoxLayout): 用於佈局圓點和狀態文字的佈局管理器。
         color_circle (QLabel): 顯示狀態圓點的 QLabel。
         status_label (QLabel): 顯示狀態文字的 QLabel。
@@ -94,6 +103,8 @@ class ApiStatusLight(QWidget):
             color_name = "#dc3545"  # Red
         elif self._status == "errored" or self._status == "unstable":
             color_name = "#ffc107"  # Yellow
+        elif self._status == "degraded":
+            color_name = "#fd7e14"  # Orange：PM2 顯示 online 但健康檢查失敗或過慢
 
         self.color_circle.setStyleSheet(f"""
             border-radius: 8px;
@@ -176,6 +187,8 @@ class ApiDetailPanel(QWidget):
         start_button (QPushButton): 啟動 API 按鈕。
         restart_button (QPushButton): 重啟 API 按鈕。
         stop_button (QPushButton): 停止 API 按鈕。
+        log_button (QPushButton): 開啟日誌檢視器按鈕。
+        log_paths (dict): 當前 API 的日誌檔路徑 (顯示名稱 -> 路徑)。
     """
     single_api_action_requested = pyqtSignal(object, str, str, str) # action_func, api_id, api_name, action_type
 
@@ -192,6 +205,7 @@ class ApiDetailPanel(QWidget):
         self.info_labels = {}
         self.current_api_id = None  # Store the pm_id of the currently displayed API
         self.current_api_name = None # Store the name of the currently displayed API
+        self.log_paths = {}
         self.refresh_callback = refresh_callback  # Store the callback function
         self.labels_data = {
             "名稱": "name",
@@ -201,6 +215,19 @@ class ApiDetailPanel(QWidget):
             "記憶體": "memory",
             "重啟次數": "restarts",
             "運行時間": "uptime",
+            "更新間隔": "poll_interval",
+            "健康檢查": "health",
+            "實例": "instances_summary",
+            "程序數": "process_count",
+            "執行緒": "threads",
+            "檔案描述符": "fds",
+            "磁碟讀寫": "disk_io",
+            "上下文切換": "context_switches",
+            "記憶體組成": "memory_breakdown",
+            "事件迴圈延遲": "event_loop_lag",
+            "自訂指標": "custom_metrics",
+            "常見錯誤": "top_errors",
+            "請求統計": "access_summary",
             "日誌路徑": "log_file_path",
             "專案路徑": "project_path",
             "端口": "port",
@@ -225,10 +252,12 @@ class ApiDetailPanel(QWidget):
         self.start_button = QPushButton("啟動")
         self.restart_button = QPushButton("重啟")
         self.stop_button = QPushButton("停止")
+        self.log_button = QPushButton("查看日誌")
 
         control_buttons_layout.addWidget(self.start_button)
         control_buttons_layout.addWidget(self.restart_button)
         control_buttons_layout.addWidget(self.stop_button)
+        control_buttons_layout.addWidget(self.log_button)
         self.layout.addLayout(control_buttons_layout)
 
         self.layout.addStretch(1)
@@ -237,6 +266,7 @@ class ApiDetailPanel(QWidget):
         self.start_button.clicked.connect(self._start_api)
         self.restart_button.clicked.connect(self._restart_api)
         self.stop_button.clicked.connect(self._stop_api)
+        self.log_button.clicked.connect(self._open_logs)
 
     def update_detail(self, api_data: dict):
         """
@@ -253,6 +283,8 @@ class ApiDetailPanel(QWidget):
 
         self.current_api_id = api_data.get('pm_id')  # Store the current API ID
         self.current_api_name = api_data.get('name') # Store the current API name
+        self.log_paths = {name: api_data.get(key) for name, key in (("輸出", "log_file_path"), ("錯誤", "error_log_path"))
+                          if api_data.get(key) not in (None, "N/A")}
 
         # Use labels_data to iterate
         for display_text, key_path in self.labels_data.items():
@@ -273,6 +305,7 @@ class ApiDetailPanel(QWidget):
         """
         self.current_api_id = None
         self.current_api_name = None
+        self.log_paths = {}
         for display_text, key_path in self.labels_data.items():
             label = self.info_labels[key_path]
             label.setText(f"{display_text}: N/A")
@@ -310,6 +343,17 @@ class ApiDetailPanel(QWidget):
                                     f"正在停止 API: {self.current_api_name} (ID: {self.current_api_id})")
             self.single_api_action_requested.emit(pm2_manager.stop_api, str(self.current_api_id), self.current_api_name, "停止")
 
+    def _open_logs(self):
+        """
+        處理查看日誌按鈕的點擊事件，以日誌檢視器開啟當前 API 的日誌。
+        """
+        if not self.log_paths:
+            QMessageBox.information(self, "查看日誌", "此 API 沒有日誌檔路徑")
+            return
+        dialog = LogViewerDialog(self.current_api_name, self.log_paths, self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+
 
 class PerformanceGraph(QWidget):
     """
@@ -361,7 +405,7 @@ class PerformanceGraph(QWidget):
         self.ax.clear()
 
         # CPU 圓餅圖
-        cpu_remaining = 100 - cpu_usage
+        cpu_remaining = max(0, 100 - cpu_usage) # 多核心程序的使用率可能超過 100%
         sizes = [cpu_usage, cpu_remaining]
         labels = ['CPU', '']
         colors = ['#28a745', '#555']  # Green for CPU, Gray for remaining
@@ -404,13 +448,180 @@ class PerformanceGraph(QWidget):
         return QSize(200, 250)
 
 
+class HistoryGraph(QWidget):
+    """
+    顯示 API CPU 和記憶體使用率走勢的折線圖，可選擇顯示的時間範圍。
+    直接繪製歷史數據儲存區返回的 NumPy 視圖，不會先轉換成 Python 列表；
+    彙總數據會以陰影區域顯示每個時間桶的最小值到最大值。
+    下方的延遲圖顯示使用 @pm2/io 的程序回報的事件迴圈延遲與 HTTP 延遲，
+    以及從存取記錄推導的請求延遲分位數與請求速率 (右側軸)。
+
+    Signals:
+        range_changed (int): 使用者選擇新的時間範圍時發出，參數為秒數。
+
+    Attributes:
+        figure (matplotlib.figure.Figure): Matplotlib 圖形對象。
+        canvas (matplotlib.backends.backend_qtagg.FigureCanvasQTAgg): 圖形繪製區域。
+        ax (matplotlib.axes.Axes): CPU 使用率 (%) 的軸對象。
+        mem_ax (matplotlib.axes.Axes): 記憶體使用量 (MB) 的軸對象，與 ax 共用 X 軸。
+        lag_ax (matplotlib.axes.Axes): 延遲 (ms) 的軸對象，與 ax 共用 X 軸。
+        rate_ax (matplotlib.axes.Axes): 請求速率 (req/s) 的軸對象，與 lag_ax 共用 X 軸。
+        range_combo (QComboBox): 時間範圍選擇器。
+    """
+    range_changed = pyqtSignal(int)
+
+    RANGES = [("10 分鐘", 600), ("1 小時", 3600), ("24 小時", 86400), ("7 天", 7 * 86400), ("30 天", 30 * 86400)]
+
+    def __init__(self, parent=None):
+        """
+        初始化 HistoryGraph。
+
+        Args:
+            parent (QWidget, optional): 父小部件。默認為 None。
+        """
+        super().__init__(parent)
+        self.figure = Figure()
+        self.canvas = FigureCanvas(self.figure)
+        self.layout = QVBoxLayout(self)
+        self.range_combo = QComboBox()
+        for label, seconds in self.RANGES:
+            self.range_combo.addItem(label, seconds)
+        self.range_combo.currentIndexChanged.connect(lambda _: self.range_changed.emit(self.range_seconds()))
+        self.layout.addWidget(self.range_combo)
+        self.layout.addWidget(self.canvas)
+        self.ax = self.figure.add_subplot(211)
+        self.mem_ax = self.ax.twinx()
+        self.lag_ax = self.figure.add_subplot(212, sharex=self.ax)
+        self.rate_ax = self.lag_ax.twinx()
+        self.clear_graph()
+
+    def range_seconds(self) -> int:
+        """
+        返回目前選擇的時間範圍 (秒)。
+        """
+        return self.range_combo.currentData()
+
+    def _setup_axes(self):
+        self.ax.set_title('CPU/Memory History', color='white')
+        self.ax.set_ylabel('CPU (%)', color='#28a745')
+        self.mem_ax.set_ylabel('Memory (MB)', color='#17a2b8')
+        for axis in (self.ax, self.mem_ax):
+            axis.tick_params(axis='x', colors='white', labelsize=7)
+            axis.tick_params(axis='y', colors='white', labelsize=7)
+
+    def _setup_lag_axis(self):
+        self.lag_ax.set_ylabel('Latency (ms)', color='#ffc107')
+        self.lag_ax.tick_params(axis='x', colors='white', labelsize=7)
+        self.lag_ax.tick_params(axis='y', colors='white', labelsize=7)
+
+    def _setup_rate_axis(self):
+        self.rate_ax.set_ylabel('Requests (req/s)', color='#e83e8c')
+        self.rate_ax.tick_params(axis='y', colors='white', labelsize=7)
+
+    def plot_history(self, time_history, cpu_history, memory_history, cpu_range=None, memory_range=None):
+        """
+        繪製歷史走勢。
+
+        Args:
+            time_history (np.ndarray): epoch 毫秒時間戳。
+            cpu_history (np.ndarray): CPU 使用率 (%)。
+            memory_history (np.ndarray): 記憶體使用量 (MB)。
+            cpu_range (tuple, optional): 彙總數據的 (最小值, 最大值) 陣列。默認為 None。
+            memory_range (tuple, optional): 彙總數據的 (最小值, 最大值) 陣列。默認為 None。
+        """
+        times = np.asarray(time_history, dtype=np.int64)
+        if times.size == 0:
+            self.clear_graph()
+            return
+        # 轉換為 datetime64 讓 Matplotlib 直接以時間格式顯示 X 軸 (向量化，不逐點轉換)
+        x = times.astype('datetime64[ms]')
+        self.ax.clear()
+        self.mem_ax.clear()
+        self.ax.plot(x, np.asarray(cpu_history), color='#28a745', linewidth=1)
+        self.mem_ax.plot(x, np.asarray(memory_history), color='#17a2b8', linewidth=1)
+        if cpu_range is not None:
+            self.ax.fill_between(x, cpu_range[0], cpu_range[1], color='#28a745', alpha=0.2, linewidth=0)
+        if memory_range is not None:
+            self.mem_ax.fill_between(x, memory_range[0], memory_range[1], color='#17a2b8', alpha=0.2, linewidth=0)
+        self._setup_axes()
+        self.figure.autofmt_xdate()
+        self.canvas.draw_idle()
+
+    def plot_latency(self, series: list):
+        """
+        繪製延遲走勢 (事件迴圈延遲、HTTP 延遲等)。
+
+        Args:
+            series (list): (標籤, epoch 毫秒時間戳, 延遲毫秒數) 的列表；空列表表示沒有延遲數據。
+        """
+        self.lag_ax.clear()
+        plotted = False
+        for label, time_history, values in series:
+            times = np.asarray(time_history, dtype=np.int64)
+            if times.size:
+                self.lag_ax.plot(times.astype('datetime64[ms]'), np.asarray(values), linewidth=1, label=label)
+                plotted = True
+        if plotted:
+            self.lag_ax.legend(loc='upper left', fontsize=6)
+        self._setup_lag_axis()
+        self.canvas.draw_idle()
+
+    def plot_request_rate(self, series: list):
+        """
+        在延遲圖的右側軸繪製請求速率走勢。
+
+        Args:
+            series (list): (標籤, epoch 毫秒時間戳, req/s) 的列表；空列表表示沒有存取記錄數據。
+        """
+        self.rate_ax.clear()
+        plotted = False
+        for label, time_history, values in series:
+            times = np.asarray(time_history, dtype=np.int64)
+            if times.size:
+                self.rate_ax.plot(times.astype('datetime64[ms]'), np.asarray(values), color='#e83e8c',
+                                  linewidth=1, linestyle='--', label=label)
+                plotted = True
+        if plotted:
+            self.rate_ax.legend(loc='upper right', fontsize=6)
+        self._setup_rate_axis()
+        self.canvas.draw_idle()
+
+    def clear_graph(self):
+        """
+        清除圖表。
+        """
+        self.ax.clear()
+        self.mem_ax.clear()
+        self.lag_ax.clear()
+        self.rate_ax.clear()
+        self._setup_axes()
+        self._setup_lag_axis()
+        self._setup_rate_axis()
+        self.canvas.draw_idle()
+
+    def sizeHint(self) -> QSize:
+        """
+        返回小部件的推薦大小。
+
+        Returns:
+            QSize: 推薦的大小 (200, 200)。
+        """
+        return QSize(200, 200)
+
+
 class LoadingOverlay(QWidget):
     """
     一個半透明的覆蓋層，用於在後台操作時顯示載入訊息。
 
+    Signals:
+        cancel_requested: 使用者按下「取消」時發出。
+
     Attributes:
         message_label (QLabel): 顯示載入訊息的標籤。
+        cancel_button (QPushButton): 取消進行中操作的按鈕。
     """
+    cancel_requested = pyqtSignal()
+
     def __init__(self, parent=None):
         """
         初始化 LoadingOverlay。
@@ -431,6 +642,9 @@ class LoadingOverlay(QWidget):
             font-weight: bold;
         """)
         layout.addWidget(self.message_label)
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.clicked.connect(self.cancel_requested)
+        layout.addWidget(self.cancel_button, 0, Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop)
         self.setLayout(layout)
 
     def resizeEvent(self, event):
@@ -465,4 +679,512 @@ class LoadingOverlay(QWidget):
         """
         隱藏覆蓋層。
         """
-        self.hide() 
\ No newline at end of file
+        self.hide() 
+
+
+class LoadTestDialog(QDialog):
+    """
+    設定並啟動對單一 API 的壓力測試，並顯示測試報告。測試本身由呼叫端執行。
+
+    Signals:
+        start_requested (dict): 使用者按下開始時發出，參數為 mode、concurrency、rate、duration 與 path。
+
+    Attributes:
+        mode_combo (QComboBox): 測試模式選擇器。
+        concurrency_spin (QSpinBox): 固定並行數。
+        rate_spin (QDoubleSpinBox): 固定速率 (每秒請求數)。
+        duration_spin (QDoubleSpinBox): 測試秒數。
+        path_edit (QLineEdit): 請求路徑。
+        start_button (QPushButton): 開始按鈕。
+        result_view (QPlainTextEdit): 測試報告。
+    """
+    start_requested = pyqtSignal(dict)
+
+    def __init__(self, api_name: str, path: str = "/", parent=None):
+        """
+        初始化 LoadTestDialog。
+
+        Args:
+            api_name (str): 目標 API 的名稱。
+            path (str, optional): 默認的請求路徑。默認為 "/"。
+            parent (QWidget, optional): 父小部件。默認為 None。
+        """
+        super().__init__(parent)
+        self.setWindowTitle(f"壓力測試 - {api_name}")
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItem("固定並行數 (closed-loop)", load_generator.MODE_CLOSED)
+        self.mode_combo.addItem("固定速率 (open-loop)", load_generator.MODE_OPEN)
+        self.mode_combo.currentIndexChanged.connect(lambda _: self._update_mode())
+        self.concurrency_spin = QSpinBox()
+        self.concurrency_spin.setRange(1, 1000)
+        self.concurrency_spin.setValue(config.LOAD_TEST_CONCURRENCY)
+        self.rate_spin = QDoubleSpinBox()
+        self.rate_spin.setRange(1, 100000)
+        self.rate_spin.setValue(config.LOAD_TEST_RATE)
+        self.duration_spin = QDoubleSpinBox()
+        self.duration_spin.setRange(1, 3600)
+        self.duration_spin.setValue(config.LOAD_TEST_DURATION)
+        self.path_edit = QLineEdit(path)
+        form.addRow("模式", self.mode_combo)
+        form.addRow("並行數", self.concurrency_spin)
+        form.addRow("每秒請求數", self.rate_spin)
+        form.addRow("秒數", self.duration_spin)
+        form.addRow("路徑", self.path_edit)
+        layout.addLayout(form)
+        self.start_button = QPushButton("開始")
+        self.start_button.clicked.connect(self._start)
+        layout.addWidget(self.start_button)
+        self.result_view = QPlainTextEdit()
+        self.result_view.setReadOnly(True)
+        layout.addWidget(self.result_view)
+        self._update_mode()
+
+    def options(self) -> dict:
+        """
+        返回目前的測試設定。
+        """
+        return {
+            "mode": self.mode_combo.currentData(),
+            "concurrency": self.concurrency_spin.value(),
+            "rate": self.rate_spin.value(),
+            "duration": self.duration_spin.value(),
+            "path": self.path_edit.text() or "/",
+        }
+
+    def _update_mode(self):
+        closed = self.mode_combo.currentData() == load_generator.MODE_CLOSED
+        self.concurrency_spin.setEnabled(closed)
+        self.rate_spin.setEnabled(not closed)
+
+    def _start(self):
+        self.set_running(True)
+        self.start_requested.emit(self.options())
+
+    def set_running(self, running: bool):
+        """
+        測試進行中時停用開始按鈕。
+        """
+        self.start_button.setEnabled(not running)
+        if running:
+            self.result_view.setPlainText("測試進行中...")
+
+    def show_report(self, text: str):
+        """
+        顯示測試報告並重新啟用開始按鈕。
+        """
+        self.result_view.setPlainText(text)
+        self.set_running(False)
+
+
+class LogView(QAbstractScrollArea):
+    """
+    虛擬化的日誌檢視區：只讀取並繪製畫面上可見的幾行。
+
+    垂直捲軸對應檔案中的位元組位置而不是行號，因此開啟時不需要知道檔案總行數。
+    顯示檔案結尾時處於跟隨模式，檔案增長後自動捲到新的結尾。
+
+    Signals:
+        position_changed: 可見範圍改變時發出。
+
+    Attributes:
+        log_file (LogFile): 顯示中的日誌檔。
+        top_offset (int): 第一個可見行的行首偏移。
+        follow (bool): 是否跟隨檔案結尾。
+    """
+    position_changed = pyqtSignal()
+    SCROLL_STEPS = 10000
+
+    def __init__(self, parent=None):
+        """
+        初始化 LogView。
+
+        Args:
+            parent (QWidget, optional): 父小部件。默認為 None。
+        """
+        super().__init__(parent)
+        self.log_file = None
+        self.top_offset = 0
+        self.follow = True
+        self.viewport().setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.setRange(0, self.SCROLL_STEPS)
+        scroll_bar.setPageStep(self.SCROLL_STEPS // 100)
+        scroll_bar.valueChanged.connect(self._scrolled)
+
+    def set_log_file(self, log_file):
+        """
+        顯示另一個日誌檔，從結尾開始並進入跟隨模式。
+        """
+        self.log_file = log_file
+        self.top_offset = 0
+        self.scroll_to_end()
+        self.viewport().update()
+
+    def visible_line_count(self) -> int:
+        return max(1, self.viewport().height() // self.viewport().fontMetrics().lineSpacing())
+
+    def visible_lines(self) -> list:
+        """
+        返回目前可見的 (行首偏移, 文字) 列表。
+        """
+        if self.log_file is None:
+            return []
+        return self.log_file.lines_from(self.top_offset, self.visible_line_count())
+
+    def _last_top(self) -> int:
+        # 最後一頁第一行的偏移，捲動不會超過這裡
+        lines = self.log_file.tail(self.visible_line_count())
+        return lines[0][0] if lines else 0
+
+    def _set_top(self, offset: int):
+        last_top = self._last_top()
+        self.top_offset = min(self.log_file.line_start(offset), last_top)
+        self.follow = self.top_offset >= last_top
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.blockSignals(True)
+        scroll_bar.setValue(self.SCROLL_STEPS if self.follow else
+                            self.top_offset * self.SCROLL_STEPS // max(1, self.log_file.size))
+        scroll_bar.blockSignals(False)
+        self.viewport().update()
+        self.position_changed.emit()
+
+    def scroll_to_offset(self, offset: int):
+        """
+        捲動到包含 offset 的那一行。
+        """
+        if self.log_file is not None:
+            self._set_top(offset)
+
+    def scroll_to_end(self):
+        """
+        捲動到檔案結尾並進入跟隨模式。
+        """
+        if self.log_file is not None:
+            self._set_top(self.log_file.size)
+
+    def scroll_lines(self, delta: int):
+        """
+        往下 (正數) 或往上 (負數) 捲動 delta 行。
+        """
+        if self.log_file is None or delta == 0:
+            return
+        if delta > 0:
+            lines = self.log_file.lines_from(self.top_offset, delta + 1)
+            self._set_top(lines[-1][0] if lines else self.top_offset)
+        else:
+            lines = self.log_file.lines_before(self.top_offset, -delta)
+            self._set_top(lines[0][0] if lines else 0)
+
+    def file_changed(self):
+        """
+        日誌檔變更 (已呼叫 LogFile.refresh()) 後更新顯示。
+        """
+        if self.log_file is None:
+            return
+        self._set_top(self.log_file.size if self.follow else self.top_offset)
+
+    def _scrolled(self, value: int):
+        if self.log_file is not None:
+            self._set_top(value * self.log_file.size // self.SCROLL_STEPS)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        metrics = painter.fontMetrics()
+        y = metrics.ascent()
+        for _, text in self.visible_lines():
+            painter.drawText(4, y, text)
+            y += metrics.lineSpacing()
+        painter.end()
+
+    def wheelEvent(self, event):
+        self.scroll_lines(-event.angleDelta().y() // 40)  # 每格滾輪 3 行
+
+    def keyPressEvent(self, event):
+        page = self.visible_line_count() - 1
+        actions = {
+            Qt.Key.Key_Up: lambda: self.scroll_lines(-1),
+            Qt.Key.Key_Down: lambda: self.scroll_lines(1),
+            Qt.Key.Key_PageUp: lambda: self.scroll_lines(-page),
+            Qt.Key.Key_PageDown: lambda: self.scroll_lines(page),
+            Qt.Key.Key_Home: lambda: self.scroll_to_offset(0),
+            Qt.Key.Key_End: self.scroll_to_end,
+        }
+        action = actions.get(event.key())
+        if action is None:
+            super().keyPressEvent(event)
+        else:
+            action()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.file_changed()
+
+
+class LogViewerDialog(QDialog):
+    """
+    檢視 API 的輸出/錯誤日誌。以 mmap 與稀疏行索引開啟檔案 (log_index.LogFile)，
+    並以 QFileSystemWatcher (Linux 上為 inotify) 追蹤新增的內容，而不是定期重新讀取。
+
+    Attributes:
+        log_combo (QComboBox): 日誌檔選擇器，項目資料為檔案路徑。
+        line_spin (QSpinBox): 要跳到的行號 (從 1 開始)。
+        view (LogView): 日誌內容。
+        status_label (QLabel): 位置與檔案大小。
+        watcher (QFileSystemWatcher): 日誌檔變更監視器。
+    """
+    def __init__(self, api_name: str, log_paths: dict, parent=None):
+        """
+        初始化 LogViewerDialog。
+
+        Args:
+            api_name (str): API 名稱。
+            log_paths (dict): 顯示名稱 -> 日誌檔路徑，例如 {"輸出": ..., "錯誤": ...}。
+            parent (QWidget, optional): 父小部件。默認為 None。
+        """
+        super().__init__(parent)
+        self.setWindowTitle(f"日誌 - {api_name}")
+        self.resize(900, 600)
+        self.log_file = None
+        layout = QVBoxLayout(self)
+        controls = QHBoxLayout()
+        self.log_combo = QComboBox()
+        for name, path in log_paths.items():
+            self.log_combo.addItem(f"{name}：{path}", path)
+        self.line_spin = QSpinBox()
+        self.line_spin.setRange(1, 2 ** 31 - 1)
+        jump_button = QPushButton("跳至行")
+        end_button = QPushButton("跳至結尾")
+        controls.addWidget(self.log_combo, 1)
+        controls.addWidget(self.line_spin)
+        controls.addWidget(jump_button)
+        controls.addWidget(end_button)
+        layout.addLayout(controls)
+        self.view = LogView()
+        layout.addWidget(self.view, 1)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._file_changed)
+        self.log_combo.currentIndexChanged.connect(lambda _: self.open_log(self.log_combo.currentData()))
+        jump_button.clicked.connect(lambda: self.jump_to_line(self.line_spin.value()))
+        end_button.clicked.connect(self.view.scroll_to_end)
+        self.view.position_changed.connect(self._update_status)
+        if self.log_combo.count():
+            self.open_log(self.log_combo.currentData())
+
+    def open_log(self, path: str):
+        """
+        開啟並顯示日誌檔。無法開啟時在狀態列顯示錯誤。
+        """
+        self._close_log()
+        try:
+            self.log_file = log_index.LogFile(path)
+        except OSError as e:
+            self.view.set_log_file(None)
+            self.status_label.setText(f"無法開啟日誌：{e}")
+            return
+        self.watcher.addPath(path)
+        self.view.set_log_file(self.log_file)
+        self._update_status()
+
+    def jump_to_line(self, line: int):
+        """
+        跳到第 line 行 (從 1 開始)。超過檔案行數時在狀態列提示。
+        """
+        if self.log_file is None:
+            return
+        offset = self.log_file.offset_of_line(line - 1)
+        if offset is None:
+            self.status_label.setText(f"日誌沒有第 {line} 行")
+            return
+        self.view.scroll_to_offset(offset)
+
+    def _file_changed(self, path: str):
+        if self.log_file is None or path != self.log_file.path:
+            return
+        if path not in self.watcher.files() and os.path.exists(path):
+            self.watcher.addPath(path)  # 日誌被輪替後重新監視新檔案
+        if self.log_file.refresh():
+            self.view.file_changed()
+
+    def _update_status(self):
+        if self.log_file is None:
+            return
+        size = self.log_file.size
+        position = "結尾 (跟隨中)" if self.view.follow else f"{self.view.top_offset * 100 / max(1, size):.1f}%"
+        self.status_label.setText(f"位置：{position}，檔案大小：{size / (1024 * 1024):.1f} MB")
+
+    def _close_log(self):
+        if self.log_file is not None:
+            self.watcher.removePath(self.log_file.path)
+            self.log_file.close()
+            self.log_file = None
+
+    def done(self, result: int):
+        self._close_log()
+        super().done(result)
+
+
+class LogSearchDialog(QDialog):
+    """
+    在所有 API 的日誌中搜尋 (log_search.LogIndex)。雙擊結果以日誌檢視器開啟該行。
+
+    Attributes:
+        query_edit (QLineEdit): 查詢字串。
+        project_combo (QComboBox): 專案範圍，項目資料為專案名稱 (全部時為 None)。
+        range_combo (QComboBox): 時間範圍，項目資料為秒數 (不限時為 None)。
+        search_button (QPushButton): 搜尋按鈕。
+        results_table (QTableWidget): 搜尋結果。
+        status_label (QLabel): 結果數與耗時。
+        hits (list): 目前的搜尋結果。
+    """
+    RANGES = (("過去 15 分鐘", 900), ("過去 1 小時", 3600), ("過去 24 小時", 86400), ("不限時間", None))
+
+    def __init__(self, search_func, projects: list, project: str = None, parent=None):
+        """
+        初始化 LogSearchDialog。
+
+        Args:
+            search_func (callable): 具有 LogIndex.search() 簽名的搜尋函數。
+            projects (list): 可選擇的專案名稱。
+            project (str, optional): 默認選取的專案。默認為全部。
+            parent (QWidget, optional): 父小部件。默認為 None。
+        """
+        super().__init__(parent)
+        self.setWindowTitle("搜尋日誌")
+        self.resize(900, 500)
+        self.search_func = search_func
+        self.hits = []
+        layout = QVBoxLayout(self)
+        controls = QHBoxLayout()
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("例如 ECONNRESET")
+        self.project_combo = QComboBox()
+        self.project_combo.addItem("所有專案", None)
+        for name in projects:
+            self.project_combo.addItem(name, name)
+        if project is not None:
+            self.project_combo.setCurrentIndex(max(0, self.project_combo.findData(project)))
+        self.range_combo = QComboBox()
+        for label, seconds in self.RANGES:
+            self.range_combo.addItem(label, seconds)
+        self.range_combo.setCurrentIndex(1)
+        self.search_button = QPushButton("搜尋")
+        controls.addWidget(self.query_edit, 1)
+        controls.addWidget(self.project_combo)
+        controls.addWidget(self.range_combo)
+        controls.addWidget(self.search_button)
+        layout.addLayout(controls)
+        self.results_table = QTableWidget(0, 4)
+        self.results_table.setHorizontalHeaderLabels(["時間", "API", "日誌", "內容"])
+        self.results_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.results_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.results_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.results_table.verticalHeader().setVisible(False)
+        layout.addWidget(self.results_table, 1)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.search_button.clicked.connect(self.search)
+        self.query_edit.returnPressed.connect(self.search)
+        self.results_table.cellDoubleClicked.connect(lambda row, _: self.open_hit(row))
+
+    def search(self):
+        """
+        以目前的條件搜尋並顯示結果。
+        """
+        query = self.query_edit.text().strip()
+        if not query:
+            return
+        seconds = self.range_combo.currentData()
+        project = self.project_combo.currentData()
+        started = time.perf_counter()
+        self.hits = self.search_func(query, since=time.time() - seconds if seconds else None,
+                                     projects={project} if project is not None else None)
+        elapsed = (time.perf_counter() - started) * 1000
+        self.results_table.setRowCount(len(self.hits))
+        for row, hit in enumerate(self.hits):
+            values = (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(hit["time"])), hit.get("name") or "N/A",
+                      "錯誤" if hit.get("stream") == "err" else "輸出", hit["line"])
+            for column, value in enumerate(values):
+                self.results_table.setItem(row, column, QTableWidgetItem(str(value)))
+        self.status_label.setText(f"{len(self.hits)} 筆結果 ({elapsed:.1f} ms)")
+
+    def open_hit(self, row: int):
+        """
+        以日誌檢視器開啟第 row 筆結果所在的行。
+        """
+        hit = self.hits[row]
+        stream = "錯誤" if hit.get("stream") == "err" else "輸出"
+        dialog = LogViewerDialog(hit.get("name") or "N/A", {stream: hit["path"]}, self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.view.scroll_to_offset(hit["offset"])
+        dialog.show()
+        return dialog
+
+
+class TopErrorsDialog(QDialog):
+    """
+    顯示錯誤指紋排行 (error_fingerprint.ErrorTracker)，開啟時定期刷新。
+
+    Attributes:
+        provider (callable): 不帶參數、返回 ErrorTable.top() 格式列表的函數。
+        table (QTableWidget): 錯誤排行。
+        status_label (QLabel): 顯示錯誤種類數與更新時間。
+        timer (QTimer): 定期刷新的定時器。
+        entries (list): 目前顯示的排行。
+    """
+    def __init__(self, title: str, provider, parent=None):
+        """
+        初始化 TopErrorsDialog。
+
+        Args:
+            title (str): 排行的範圍 (API 或專案名稱)。
+            provider (callable): 返回錯誤排行的函數。
+            parent (QWidget, optional): 父小部件。默認為 None。
+        """
+        super().__init__(parent)
+        self.setWindowTitle(f"錯誤排行 - {title}")
+        self.resize(900, 400)
+        self.provider = provider
+        self.entries = []
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["次數", "API", "首次", "最後", "錯誤"])
+        self.table.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table, 1)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(int(config.ERROR_FINGERPRINT_INTERVAL * 1000))
+        self.refresh()
+
+    def refresh(self):
+        """
+        重新取得並顯示錯誤排行。
+        """
+        self.entries = self.provider()
+        self.table.setRowCount(len(self.entries))
+        for row, entry in enumerate(self.entries):
+            values = (entry["count"], ", ".join(entry["names"]),
+                      time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["first_seen"])),
+                      time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["last_seen"])), entry["sample"])
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(str(value))
+                if column == 4:
+                    item.setToolTip(entry["message"])
+                self.table.setItem(row, column, item)
+        self.status_label.setText(f"{len(self.entries)} 種錯誤，更新於 {time.strftime('%H:%M:%S')}")
+
+    def done(self, result: int):
+        """
+        關閉對話框時停止刷新。
+        """
+        self.timer.stop()
+        super().done(result)
@@ -0,0 +1,456 @@
+"""
+health_prober.py
+
+此模組提供以 asyncio 實作的 HTTP 健康檢查引擎。
+PM2 的 online 只代表程序還在執行，卡住的伺服器也會顯示為 online；健康檢查器在背景線程的事件迴圈中
+同時對所有 API 的健康路徑 (api.json 的 port 與 health_path) 發出 GET 請求，
+每個目標保持一條 keep-alive 連線重複使用，並套用個別的逾時與加上隨機抖動的檢查間隔，
+避免所有請求同時送出。每個目標的回應時間記錄在延遲直方圖中，
+連續失敗或過慢的目標會被標記為 degraded，顯示在 ApiStatusLight 上。
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+from src import config
+
+DEGRADED_STATUS = "degraded"
+
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+"""
+延遲直方圖各區間的上限 (毫秒)，超過最後一個上限的樣本計入溢位區間。
+"""
+
+
+class LatencyHistogram:
+    """
+    固定區間的延遲直方圖。記錄是 O(區間數)，記憶體用量與樣本數無關。
+
+    Attributes:
+        bounds (tuple): 各區間的上限 (毫秒)。
+        counts (list): 各區間的樣本數，最後一個為溢位區間。
+        count (int): 樣本總數。
+        total (float): 延遲總和 (毫秒)。
+        max (float): 最大延遲 (毫秒)。
+    """
+    def __init__(self, bounds: tuple = HISTOGRAM_BOUNDS_MS):
+        """
+        初始化 LatencyHistogram。
+
+        Args:
+            bounds (tuple, optional): 各區間的上限 (毫秒)。默認為 HISTOGRAM_BOUNDS_MS。
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency_ms: float):
+        """
+        記錄一個延遲樣本。
+        """
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if latency_ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += latency_ms
+        self.max = max(self.max, latency_ms)
+
+    def percentile(self, q: float) -> float:
+        """
+        估計第 q 百分位數：返回包含該樣本的區間上限 (不超過最大延遲)。
+
+        Args:
+            q (float): 百分位數 (0-100)。
+
+        Returns:
+            float: 估計的延遲毫秒數，沒有樣本時返回 None。
+        """
+        if self.count == 0:
+            return None
+        rank = max(1, int(round(q / 100 * self.count)))
+        seen = 0
+        for i, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        """
+        平均延遲 (毫秒)，沒有樣本時為 None。
+        """
+        return self.total / self.count if self.count else None
+
+
+class HttpConnection:
+    """
+    對單一目標重複使用的最小 HTTP/1.1 keep-alive 客戶端。
+
+    Attributes:
+        host (str): 主機名稱。
+        port (int): 端口。
+        connections_opened (int): 已建立的 TCP 連線數 (用於確認連線被重複使用)。
+    """
+    def __init__(self, host: str, port: int):
+        """
+        初始化 HttpConnection。
+
+        Args:
+            host (str): 主機名稱。
+            port (int): 端口。
+        """
+        self.host = host
+        self.port = port
+        self.connections_opened = 0
+        self._reader = None
+        self._writer = None
+
+    async def get(self, path: str) -> int:
+        """
+        發出 GET 請求並讀取完整回應。重複使用的連線已被伺服器關閉時，會以新連線重試一次。
+
+        Args:
+            path (str): 請求路徑。
+
+        Returns:
+            int: HTTP 狀態碼。
+        """
+        reused = self._writer is not None
+        try:
+            return await self._get_once(path)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            if not reused:
+                raise
+        return await self._get_once(path)
+
+    async def _get_once(self, path: str) -> int:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            self.connections_opened += 1
+        self._writer.write(f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                           f"User-Agent: api-manager-health\r\nConnection: keep-alive\r\n\r\n".encode("ascii"))
+        await self._writer.drain()
+        head = await self._reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        version, status_code = lines[0].split(" ", 2)[:2]
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip().lower()
+        keep_alive = headers.get("connection") != "close" and (version != "HTTP/1.0"
+                                                               or headers.get("connection") == "keep-alive")
+        if "content-length" in headers:
+            await self._reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self._reader.read()  # 沒有長度資訊時讀到連線關閉為止
+            keep_alive = False
+        if not keep_alive:
+            self.close()
+        return int(status_code)
+
+    def close(self):
+        """
+        關閉目前的連線。
+        """
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+def build_targets(apis: list) -> dict:
+    """
+    依解析後的 API 列表建立健康檢查目標：只檢查 online 且有數字端口的 API。
+    api.json 中可以為每個 API 設定 host、health_path、health_timeout 與 health_interval。
+
+    Args:
+        apis (list): parse_pm2_list_output() 返回的 API 字典列表。
+
+    Returns:
+        dict: pm_id 到目標字典 (host、port、path、timeout、interval) 的對應。
+    """
+    targets = {}
+    for api in apis:
+        port = str(api.get("port", ""))
+        if api.get("status") != "online" or not port.isdigit():
+            continue
+        metadata = api.get("metadata") or {}
+        targets[api.get("pm_id")] = {
+            "host": metadata.get("host", "localhost"),
+            "port": int(port),
+            "path": metadata.get("health_path", config.HEALTH_PROBE_PATH),
+            "timeout": float(metadata.get("health_timeout", config.HEALTH_PROBE_TIMEOUT)),
+            "interval": float(metadata.get("health_interval", config.HEALTH_PROBE_INTERVAL)),
+        }
+    return targets
+
+
+def derive_status(pm2_status: str, health: dict) -> str:
+    """
+    結合 PM2 狀態與健康檢查結果：PM2 顯示 online 但健康檢查判定為 degraded 時返回 DEGRADED_STATUS。
+
+    Args:
+        pm2_status (str): PM2 回報的狀態。
+        health (dict): HealthProber.result() 的結果，沒有結果時為 None。
+
+    Returns:
+        str: 要顯示的狀態。
+    """
+    if pm2_status == "online" and health and health.get("degraded"):
+        return DEGRADED_STATUS
+    return pm2_status
+
+
+def format_health(health: dict) -> str:
+    """
+    將健康檢查結果格式化為詳細面板顯示的文字。
+
+    Args:
+        health (dict): HealthProber.result() 的結果，沒有結果時為 None。
+
+    Returns:
+        str: 例如 "HTTP 200，3.2 ms (p50 5.0 ms，p95 10.0 ms)"，沒有結果時為 "N/A"。
+    """
+    if not health:
+        return "N/A"
+    if health["ok"]:
+        text = f"HTTP {health['status_code']}，{health['latency_ms']:.1f} ms"
+    else:
+        text = f"失敗 ({health['error']})"
+    histogram = health["histogram"]
+    if histogram.count:
+        text += f" (p50 {histogram.percentile(50):.1f} ms，p95 {histogram.percentile(95):.1f} ms)"
+    return text
+
+
+class HealthProber:
+    """
+    在背景線程的 asyncio 事件迴圈中定期檢查所有目標。
+
+    Attributes:
+        callback (callable): 每次檢查完成時以 (pm_id, 結果字典) 呼叫的回調函數，會在檢查線程中被呼叫。
+        degraded_latency (float): 回應時間超過此毫秒數視為過慢。
+        failure_threshold (int): 連續失敗或過慢幾次後標記為 degraded。
+        jitter (float): 檢查間隔的隨機抖動比例。
+        max_concurrency (int): 同時進行的請求數上限。
+    """
+    def __init__(self, callback=None, degraded_latency: float = None, failure_threshold: int = None,
+                 jitter: float = None, max_concurrency: int = None, rng=random.random):
+        """
+        初始化 HealthProber。
+
+        Args:
+            callback (callable, optional): 檢查結果的回調函數。默認為 None。
+            degraded_latency (float, optional): 過慢的門檻 (毫秒)。默認為 config.HEALTH_DEGRADED_LATENCY。
+            failure_threshold (int, optional): degraded 的連續次數門檻。默認為 config.HEALTH_FAILURE_THRESHOLD。
+            jitter (float, optional): 間隔抖動比例。默認為 config.HEALTH_PROBE_JITTER。
+            max_concurrency (int, optional): 並行請求上限。默認為 config.HEALTH_PROBE_CONCURRENCY。
+            rng (callable, optional): 返回 [0, 1) 亂數的函數 (測試用)。
+        """
+        self.callback = callback
+        self.degraded_latency = degraded_latency or config.HEALTH_DEGRADED_LATENCY
+        self.failure_threshold = failure_threshold or config.HEALTH_FAILURE_THRESHOLD
+        self.jitter = config.HEALTH_PROBE_JITTER if jitter is None else jitter
+        self.max_concurrency = max_concurrency or config.HEALTH_PROBE_CONCURRENCY
+        self._rng = rng
+        self._targets = {}
+        self._results = {}
+        self._connections = {}
+        self._tasks = {}
+        self._task_targets = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+
+    def set_targets(self, targets: dict):
+        """
+        更新要檢查的目標。新增的目標會開始檢查，移除或改變的目標會停止 (或重新開始) 並關閉連線。
+
+        Args:
+            targets (dict): build_targets() 的結果。
+        """
+        with self._lock:
+            self._targets = dict(targets)
+            for pm_id in list(self._results):
+                if pm_id not in self._targets:
+                    del self._results[pm_id]
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._sync_tasks)
+
+    def result(self, pm_id) -> dict:
+        """
+        取得目標最近一次的檢查結果。
+
+        Returns:
+            dict: 包含 ok、status_code、latency_ms、error、checked_at、consecutive_bad、degraded
+                  與 histogram (LatencyHistogram) 的字典；尚未檢查過時返回 None。
+        """
+        with self._lock:
+            return self._results.get(pm_id)
+
+    def is_running(self) -> bool:
+        """
+        返回檢查線程是否正在執行。
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        啟動檢查線程與其中的事件迴圈。
+        """
+        if self.is_running():
+            return self
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="health-prober", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        """
+        停止所有檢查、關閉連線並結束檢查線程。
+        """
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, ready: threading.Event):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._loop = loop
+        loop.call_soon(self._sync_tasks)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            for task in self._tasks.values():
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*self._tasks.values(), return_exceptions=True))
+            for connection in self._connections.values():
+                connection.close()
+            self._tasks = {}
+            self._task_targets = {}
+            self._connections = {}
+            self._loop = None
+            loop.close()
+
+    def _sync_tasks(self):
+        with self._lock:
+            targets = dict(self._targets)
+        for pm_id in list(self._tasks):
+            target = targets.get(pm_id)
+            if target is None or self._task_targets[pm_id] != target:
+                self._tasks.pop(pm_id).cancel()
+                del self._task_targets[pm_id]
+                connection = self._connections.pop(pm_id, None)
+                if connection is not None:
+                    connection.close()
+        for pm_id, target in targets.items():
+            if pm_id not in self._tasks:
+                self._tasks[pm_id] = self._loop.create_task(self._probe_loop(pm_id, target))
+                self._task_targets[pm_id] = target
+
+    async def _probe_loop(self, pm_id, target: dict):
+        # 第一次檢查分散在整個間隔內，之後每次間隔加上 ±jitter 的隨機抖動
+        await asyncio.sleep(target["interval"] * self._rng())
+        while True:
+            await self.probe(pm_id, target)
+            await asyncio.sleep(target["interval"] * (1 + self.jitter * (2 * self._rng() - 1)))
+
+    async def probe(self, pm_id, target: dict) -> dict:
+        """
+        對目標進行一次檢查並更新結果。5xx 回應、連線錯誤與逾時視為失敗。
+
+        Args:
+            pm_id: 目標的 PM2 ID。
+            target (dict): 目標字典。
+
+        Returns:
+            dict: 更新後的結果字典。
+        """
+        connection = self._connections.get(pm_id)
+        if connection is None or (connection.host, connection.port) != (target["host"], target["port"]):
+            connection = self._connections[pm_id] = HttpConnection(target["host"], target["port"])
+        status_code, error = None, None
+        started = time.perf_counter()
+        try:
+            async with self._semaphore:
+                status_code = await asyncio.wait_for(connection.get(target["path"]), target["timeout"])
+        except asyncio.TimeoutError:
+            connection.close()
+            error = "逾時"
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            connection.close()
+            error = str(e) or type(e).__name__
+        latency_ms = (time.perf_counter() - started) * 1000
+        ok = status_code is not None and status_code < 500
+        if ok is False and error is None:
+            error = f"HTTP {status_code}"
+        with self._lock:
+            previous = self._results.get(pm_id)
+            histogram = previous["histogram"] if previous else LatencyHistogram()
+            if ok:
+                histogram.record(latency_ms)
+            bad = not ok or latency_ms > self.degraded_latency
+            consecutive_bad = (previous["consecutive_bad"] + 1 if previous else 1) if bad else 0
+            result = {
+                "ok": ok,
+                "status_code": status_code,
+                "latency_ms": latency_ms,
+                "error": error,
+                "checked_at": time.time(),
+                "consecutive_bad": consecutive_bad,
+                "degraded": consecutive_bad >= self.failure_threshold,
+                "histogram": histogram,
+            }
+            if not self.is_running() or pm_id in self._targets:  # 已移除的目標不再保留結果
+                self._results[pm_id] = result
+        if self.callback is not None:
+            try:
+                self.callback(pm_id, result)
+            except Exception as e:
+                print(f"處理健康檢查結果時發生錯誤：{e}")
+        return result
+
+    async def probe_all(self, targets: dict) -> dict:
+        """
+        同時檢查所有目標一次 (不啟動背景線程時使用，例如測試或命令列工具)。
+        連線會保留給同一個事件迴圈中的下一次呼叫重複使用，結束前應呼叫 close()。
+
+        Args:
+            targets (dict): build_targets() 的結果。
+
+        Returns:
+            dict: pm_id 到結果字典的對應。
+        """
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(*(self.probe(pm_id, target) for pm_id, target in targets.items()))
+        return dict(zip(targets, results))
+
+    def close(self):
+        """
+        關閉所有 probe_all() 使用的連線。
+        """
+        for connection in self._connections.values():
+            connection.close()
+        self._connections = {}
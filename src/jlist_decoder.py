@@ -0,0 +1,237 @@
+"""
+jlist_decoder.py
+
+此模組提供 `pm2 jlist` 輸出的增量式選擇性解碼器。
+PM2 會為每個程序附上完整的 pm2_env (所有環境變數、axm_* 區塊等)，但應用程式只用到其中少數欄位。
+解碼器逐一解析陣列中的每個程序，只保留 JLIST_FIELDS 中列出的路徑並立即丟棄其餘內容，
+因此記憶體高峰只與單一程序的大小有關，而不是整個 jlist 輸出。
+"""
+
+import codecs
+import json
+import re
+
+JLIST_FIELDS = {
+    "name": True,
+    "pm_id": True,
+    "pid": True,
+    "status": True,
+    "restart_time": True,
+    "pm_exec_path": True,
+    "monit": {"cpu": True, "memory": True},
+    "pm2_env": {
+        "status": True,
+        "created_at": True,
+        "pm_uptime": True,
+        "restart_time": True,
+        "unstable_restarts": True,
+        "args": True,
+        "pm_out_log_path": True,
+        "pm_err_log_path": True,
+        "log_file": True,
+        "pm_exec_path": True,
+        "pm_cwd": True,
+        "PWD": True,
+        "script": True,
+        "exec_mode": True,
+        "instances": True,
+        "namespace": True,
+        "axm_monitor": True,
+    },
+}
+"""
+需要保留的欄位路徑。值為 True 表示保留整個值，值為字典表示只保留其中列出的子欄位。
+"""
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_CHUNK_SIZE = 1 << 20
+
+
+def select_fields(value, fields):
+    """
+    依照欄位規格從解析後的值中挑出需要的部分。
+
+    Args:
+        value: 已解析的 JSON 值。
+        fields (dict | bool): 欄位規格，True 表示保留整個值。
+
+    Returns:
+        與 value 同結構、只包含指定欄位的值。
+    """
+    if fields is True or not isinstance(value, dict):
+        return value
+    return {key: select_fields(value[key], sub) for key, sub in fields.items() if key in value}
+
+
+class JlistDecoder:
+    """
+    增量式的 jlist 陣列解碼器。可以分多次餵入任意切割的 str 或 UTF-8 bytes。
+
+    Attributes:
+        fields (dict): 要保留的欄位規格。
+    """
+    def __init__(self, fields: dict = None):
+        """
+        初始化 JlistDecoder。
+
+        Args:
+            fields (dict, optional): 要保留的欄位規格。默認為 JLIST_FIELDS。
+        """
+        self.fields = fields or JLIST_FIELDS
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"  # start -> first -> (item <-> after) -> done
+        self._need = 0
+        self._json = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+
+    def feed(self, chunk) -> list:
+        """
+        餵入一段輸出並取出其中已完整的程序。
+
+        Args:
+            chunk (str | bytes): 下一段 jlist 輸出。
+
+        Returns:
+            list: 已完整解析並精簡的程序字典。
+
+        Raises:
+            json.JSONDecodeError: 輸出不是 JSON 陣列。
+        """
+        if not isinstance(chunk, str):
+            chunk = self._text.decode(chunk)
+        if self._state == "done":
+            return []
+        if self._pos:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        self._buffer += chunk
+        if len(self._buffer) < self._need:
+            return []
+        return self._drain(final=False)
+
+    def close(self) -> list:
+        """
+        結束輸入並取出剩下的程序。
+
+        Returns:
+            list: 剩下的程序字典。
+
+        Raises:
+            json.JSONDecodeError: 輸出被截斷或格式錯誤。
+        """
+        self._buffer = self._buffer[self._pos:] + self._text.decode(b'', final=True)
+        self._pos = 0
+        items = self._drain(final=True)
+        if self._state != "done":
+            raise json.JSONDecodeError("Unterminated array", self._buffer, len(self._buffer))
+        return items
+
+    def _drain(self, final: bool) -> list:
+        items = []
+        buffer = self._buffer
+        pos = self._pos
+        state = self._state
+        self._need = 0
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos >= len(buffer) or state == "done":
+                break
+            char = buffer[pos]
+            if state == "start":
+                if char != '[':
+                    raise json.JSONDecodeError("Expecting '['", buffer, pos)
+                pos += 1
+                state = "first"
+            elif char == ']' and state in ("first", "after"):
+                pos += 1
+                state = "done"
+            elif state == "after":
+                if char != ',':
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+                pos += 1
+                state = "item"
+            else:
+                try:
+                    value, end = self._json.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    # 這個程序還沒有完整收到：至少等到未解析的部分再增加同樣長度後才重試，避免重複解析。
+                    # 下一次 feed() 會先切掉 pos 之前已解析的部分，所以門檻以切掉後的緩衝區計算
+                    self._need = len(buffer) - pos + max(len(buffer) - pos, 1)
+                    break
+                items.append(select_fields(value, self.fields))
+                pos = end
+                state = "after"
+        self._pos = pos
+        self._state = state
+        if state == "done":
+            self._buffer = ""
+            self._pos = 0
+        return items
+
+
+def decode_jlist(data, fields: dict = None) -> list:
+    """
+    選擇性地解碼完整的 jlist 輸出。
+
+    Args:
+        data (str | bytes): `pm2 jlist` 的輸出。
+        fields (dict, optional): 要保留的欄位規格。默認為 JLIST_FIELDS。
+
+    Returns:
+        list: 精簡後的程序字典列表。
+
+    Raises:
+        json.JSONDecodeError: 輸出不是有效的 JSON 陣列。
+    """
+    decoder = JlistDecoder(fields)
+    items = []
+    for start in range(0, len(data), _CHUNK_SIZE):
+        items.extend(decoder.feed(data[start:start + _CHUNK_SIZE]))
+    items.extend(decoder.close())
+    return items
+
+
+def decode_jlist_stream(stream, fields: dict = None) -> list:
+    """
+    從檔案類物件 (例如子程序的 stdout) 串流解碼 jlist 輸出。
+
+    Args:
+        stream: 具有 read(size) 方法的物件。
+        fields (dict, optional): 要保留的欄位規格。默認為 JLIST_FIELDS。
+
+    Returns:
+        list: 精簡後的程序字典列表。
+    """
+    decoder = JlistDecoder(fields)
+    items = []
+    while True:
+        chunk = stream.read(_CHUNK_SIZE)
+        if not chunk:
+            break
+        items.extend(decoder.feed(chunk))
+    items.extend(decoder.close())
+    return items
+
+
+_MONITOR_REPLY_PREFIX = re.compile(rb'\s*\{\s*"args"\s*:\s*\[\s*(?=\[)')
+
+
+def decode_monitor_reply(body: bytes, fields: dict = None):
+    """
+    選擇性地解碼守護程序 getMonitorData 的 RPC 回覆本文 (`{"args":[[...]]}`)。
+
+    Args:
+        body (bytes): 回覆的 JSON 本文 (不含 `j:` 前綴)。
+        fields (dict, optional): 要保留的欄位規格。默認為 JLIST_FIELDS。
+
+    Returns:
+        list | dict: 成功時返回精簡後的程序列表；回覆不是這個格式 (例如錯誤回覆) 時
+                     返回完整解析的回覆字典，由呼叫端處理。
+    """
+    match = _MONITOR_REPLY_PREFIX.match(body)
+    if not match:
+        return json.loads(body)
+    return decode_jlist(memoryview(body)[match.end():], fields)
@@ -0,0 +1,212 @@
+"""
+load_generator.py
+
+此模組提供對受管理 API 進行壓力測試的負載產生器，以 asyncio 與 health_prober.HttpConnection
+(keep-alive 連線) 發出 HTTP GET 請求。支援兩種模式：
+
+- 固定並行數 (closed-loop)：concurrency 個工作者各自在前一個請求完成後立即發出下一個請求，量測伺服器的最大吞吐量。
+- 固定速率 (open-loop)：依 rate 每秒固定發出請求，不等待先前的請求完成。延遲從請求「預定」送出的時間起算，
+  伺服器變慢時排隊的時間也會被計入 (避免 coordinated omission)。
+
+結果包含吞吐量、p50/p95/p99/最大延遲與錯誤率，以及測試的起訖時間，
+可以用 pm2_manager.get_resource_summary() 對照同一段時間內該程序的 CPU/記憶體。
+"""
+
+import asyncio
+import time
+from collections import Counter
+
+import numpy as np
+
+from src import config
+from src.health_prober import HttpConnection
+
+MODE_CLOSED = "closed"
+MODE_OPEN = "open"
+
+
+class _Recorder:
+    """
+    收集單次測試的延遲、狀態碼與錯誤。
+    """
+    def __init__(self):
+        self.latencies = []
+        self.status_codes = Counter()
+        self.errors = Counter()
+
+    def response(self, status_code: int, latency_ms: float):
+        self.latencies.append(latency_ms)
+        self.status_codes[status_code] += 1
+        if status_code >= 500:
+            self.errors[f"HTTP {status_code}"] += 1
+
+    def error(self, kind: str):
+        self.errors[kind] += 1
+
+
+async def _request(connection: HttpConnection, path: str, timeout: float, recorder: _Recorder,
+                   started: float, clock) -> bool:
+    """
+    發出一個請求並記錄結果。返回連線是否可以繼續使用。
+    """
+    try:
+        status_code = await asyncio.wait_for(connection.get(path), timeout)
+    except asyncio.TimeoutError:
+        recorder.error("逾時")
+    except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+        recorder.error(type(e).__name__)
+    else:
+        recorder.response(status_code, (clock() - started) * 1000)
+        return True
+    connection.close()
+    return False
+
+
+async def _closed_loop(host, port, path, concurrency, duration, timeout, recorder, clock):
+    deadline = clock() + duration
+
+    async def worker():
+        connection = HttpConnection(host, port)
+        while clock() < deadline:
+            await _request(connection, path, timeout, recorder, clock(), clock)
+        connection.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def _open_loop(host, port, path, rate, duration, timeout, max_in_flight, recorder, clock):
+    interval = 1.0 / rate
+    idle = []  # 可以重複使用的 keep-alive 連線
+    in_flight = set()
+
+    async def send(scheduled):
+        connection = idle.pop() if idle else HttpConnection(host, port)
+        if await _request(connection, path, timeout, recorder, scheduled, clock):
+            idle.append(connection)
+
+    start = clock()
+    for index in range(int(duration * rate)):
+        scheduled = start + index * interval
+        delay = scheduled - clock()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            recorder.error("超過同時請求上限")  # 伺服器跟不上速率，丟棄而不是無限累積
+            continue
+        task = asyncio.ensure_future(send(scheduled))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    for connection in idle:
+        connection.close()
+
+
+async def run_load_test(host: str, port: int, path: str = "/", mode: str = MODE_CLOSED, concurrency: int = None,
+                        rate: float = None, duration: float = None, timeout: float = None,
+                        max_in_flight: int = None, clock=time.perf_counter) -> dict:
+    """
+    對單一目標執行一次壓力測試。
+
+    Args:
+        host (str): 主機名稱。
+        port (int): 端口。
+        path (str, optional): 請求路徑。默認為 "/"。
+        mode (str, optional): MODE_CLOSED (固定並行數) 或 MODE_OPEN (固定速率)。默認為 MODE_CLOSED。
+        concurrency (int, optional): closed-loop 的並行數。默認為 config.LOAD_TEST_CONCURRENCY。
+        rate (float, optional): open-loop 每秒的請求數。默認為 config.LOAD_TEST_RATE。
+        duration (float, optional): 測試秒數。默認為 config.LOAD_TEST_DURATION。
+        timeout (float, optional): 單一請求的逾時秒數。默認為 config.LOAD_TEST_TIMEOUT。
+        max_in_flight (int, optional): open-loop 同時進行的請求上限。默認為 config.LOAD_TEST_MAX_IN_FLIGHT。
+        clock (callable, optional): 單調時鐘 (測試用)。
+
+    Returns:
+        dict: summarize() 返回的測試報告。
+
+    Raises:
+        ValueError: mode 不是 MODE_CLOSED 或 MODE_OPEN。
+    """
+    concurrency = concurrency or config.LOAD_TEST_CONCURRENCY
+    rate = rate or config.LOAD_TEST_RATE
+    duration = duration or config.LOAD_TEST_DURATION
+    timeout = timeout or config.LOAD_TEST_TIMEOUT
+    max_in_flight = max_in_flight or config.LOAD_TEST_MAX_IN_FLIGHT
+    recorder = _Recorder()
+    started_at = int(time.time() * 1000)
+    started = clock()
+    if mode == MODE_CLOSED:
+        await _closed_loop(host, port, path, concurrency, duration, timeout, recorder, clock)
+    elif mode == MODE_OPEN:
+        await _open_loop(host, port, path, rate, duration, timeout, max_in_flight, recorder, clock)
+    else:
+        raise ValueError(f"未知的壓力測試模式：{mode}")
+    report = summarize(recorder, clock() - started)
+    report.update(mode=mode, target=f"{host}:{port}{path}", started_at=started_at, ended_at=int(time.time() * 1000),
+                  concurrency=concurrency if mode == MODE_CLOSED else None, rate=rate if mode == MODE_OPEN else None)
+    return report
+
+
+def summarize(recorder: _Recorder, elapsed: float) -> dict:
+    """
+    將收集到的結果彙總為報告。
+
+    Args:
+        recorder (_Recorder): 測試期間的記錄。
+        elapsed (float): 實際經過的秒數。
+
+    Returns:
+        dict: 包含 requests、errors、error_rate、throughput (每秒成功回應數)、duration、
+              latency (p50、p95、p99、max、mean 毫秒數，沒有回應時為 None)、status_codes 與 error_kinds 的字典。
+    """
+    latencies = np.asarray(recorder.latencies, dtype=np.float64)
+    errors = sum(recorder.errors.values())
+    failed = errors - sum(count for kind, count in recorder.errors.items() if kind.startswith("HTTP "))
+    requests = len(latencies) + failed
+    latency = None
+    if latencies.size:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        latency = {"p50": float(p50), "p95": float(p95), "p99": float(p99),
+                   "max": float(latencies.max()), "mean": float(latencies.mean())}
+    return {
+        "requests": requests,
+        "errors": errors,
+        "error_rate": errors / requests if requests else 0.0,
+        "throughput": (len(latencies) - (errors - failed)) / elapsed if elapsed > 0 else 0.0,
+        "duration": elapsed,
+        "latency": latency,
+        "status_codes": dict(recorder.status_codes),
+        "error_kinds": dict(recorder.errors),
+    }
+
+
+def format_report(report: dict) -> str:
+    """
+    將測試報告 (以及 resources 欄位中的 CPU/記憶體摘要) 格式化為多行文字。
+
+    Args:
+        report (dict): run_load_test() 的結果，可以另外包含 pm2_manager.get_resource_summary() 的 resources。
+
+    Returns:
+        str: 顯示用的文字。
+    """
+    if report["mode"] == MODE_CLOSED:
+        mode = f"固定並行數 {report['concurrency']}"
+    else:
+        mode = f"固定速率 {report['rate']:g} 請求/秒"
+    lines = [
+        f"目標：{report['target']} ({mode}，{report['duration']:.1f} 秒)",
+        f"請求數：{report['requests']}，吞吐量：{report['throughput']:.1f} 請求/秒，"
+        f"錯誤率：{report['error_rate'] * 100:.2f}%",
+    ]
+    latency = report["latency"]
+    if latency:
+        lines.append(f"延遲：p50 {latency['p50']:.2f} ms，p95 {latency['p95']:.2f} ms，"
+                     f"p99 {latency['p99']:.2f} ms，最大 {latency['max']:.2f} ms")
+    if report["error_kinds"]:
+        lines.append("錯誤：" + "，".join(f"{kind} ×{count}" for kind, count in report["error_kinds"].items()))
+    resources = report.get("resources")
+    if resources:
+        lines.append(f"程序資源 ({resources['samples']} 個取樣點)：CPU 平均 {resources['cpu_avg']:.1f}%，"
+                     f"最高 {resources['cpu_max']:.1f}%；記憶體平均 {resources['memory_avg']:.1f} MB，"
+                     f"最高 {resources['memory_max']:.1f} MB")
+    return "\n".join(lines)
@@ -0,0 +1,201 @@
+"""
+log_index.py
+
+此模組以 mmap 讀取 PM2 日誌檔，讓數 GB 的日誌也能立即開啟：
+
+- 不讀入整個檔案，只在需要時讀取畫面上的幾行。跳到檔案結尾或任意位元組位置只需要往回找到行首。
+- 稀疏的行偏移索引每 stride 行記錄一次行首位置，只在跳到某一行時才向後掃描建立到該行為止，
+  之後跳到已建立範圍內的任意行最多只需要掃描 stride 行。
+- 檔案增長時 refresh() 只重新映射，不重新讀取；檔案被截斷或輪替 (inode 改變) 時重置索引。
+"""
+
+import bisect
+import mmap
+import os
+
+import numpy as np
+
+from src import config
+
+_NEWLINE = ord("\n")
+_SCAN_CHUNK = 16 * 1024 * 1024  # 建立索引時每次掃描的位元組數
+
+
+class LogFile:
+    """
+    以 mmap 讀取的日誌檔與它的稀疏行偏移索引。
+
+    Attributes:
+        path (str): 日誌檔路徑。
+        stride (int): 每隔幾行記錄一次行首偏移。
+        size (int): 目前映射的檔案大小 (位元組)。
+    """
+    def __init__(self, path: str, stride: int = None):
+        """
+        開啟並映射日誌檔。
+
+        Args:
+            path (str): 日誌檔路徑。
+            stride (int, optional): 稀疏索引的間隔行數。默認為 config.LOG_INDEX_STRIDE。
+
+        Raises:
+            OSError: 無法開啟檔案。
+        """
+        self.path = path
+        self.stride = stride or config.LOG_INDEX_STRIDE
+        self.size = 0
+        self._file = None
+        self._map = None
+        self._inode = None
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, "rb")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._reset_index()
+        self._remap()
+
+    def _reset_index(self):
+        self._offsets = [0]  # 第 i * stride 行的行首偏移
+        self._lines = 0  # 已掃描範圍內的換行符號數
+        self._scanned = 0  # 已掃描到的位元組位置
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self.size = os.fstat(self._file.fileno()).st_size
+        if self.size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def refresh(self) -> bool:
+        """
+        檢查檔案是否有變更並更新映射。
+
+        Returns:
+            bool: 檔案大小或 inode 改變時返回 True。
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if stat.st_ino != self._inode or stat.st_size < self.size:
+            # 日誌被輪替或截斷，已建立的索引不再有效
+            self.close()
+            self._open()
+            return True
+        if stat.st_size == self.size:
+            return False
+        self._remap()
+        return True
+
+    def close(self):
+        """
+        關閉映射與檔案。
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def line_start(self, offset: int) -> int:
+        """
+        返回包含 offset 的那一行的行首偏移。
+        """
+        offset = max(0, min(offset, self.size))
+        if offset == 0:
+            return 0
+        return self._map.rfind(b"\n", 0, offset) + 1
+
+    def _line_end(self, offset: int) -> int:
+        end = self._map.find(b"\n", offset)
+        return self.size if end == -1 else end
+
+    def _decode(self, start: int, end: int) -> str:
+        end = min(end, start + config.LOG_VIEWER_MAX_LINE_BYTES)
+        return self._map[start:end].rstrip(b"\r").decode("utf-8", errors="replace")
+
+    def lines_from(self, offset: int, count: int) -> list:
+        """
+        從 offset 所在的行開始往後讀取最多 count 行。
+
+        Returns:
+            list: (行首偏移, 文字) 的列表。
+        """
+        lines = []
+        position = self.line_start(offset)
+        while len(lines) < count and position < self.size:
+            end = self._line_end(position)
+            lines.append((position, self._decode(position, end)))
+            position = end + 1
+        return lines
+
+    def lines_before(self, offset: int, count: int) -> list:
+        """
+        讀取 offset 所在行之前 (不含該行) 的最多 count 行。
+
+        Returns:
+            list: 依檔案順序排列的 (行首偏移, 文字) 列表。
+        """
+        lines = []
+        end = self.line_start(offset) - 1
+        while len(lines) < count and end >= 0:
+            start = self.line_start(end)
+            lines.append((start, self._decode(start, end)))
+            end = start - 1
+        lines.reverse()
+        return lines
+
+    def tail(self, count: int) -> list:
+        """
+        返回檔案最後 count 行。結尾的換行符號之後不算一行。
+        """
+        start = self.line_start(self.size)
+        partial = start < self.size  # 最後一行還沒有換行符號
+        lines = self.lines_before(self.size, count - partial)
+        if partial:
+            lines.append((start, self._decode(start, self.size)))
+        return lines
+
+    def _scan_chunk(self):
+        # 從上次掃描的位置往後掃描一段，記錄行號為 stride 倍數的行首
+        length = min(_SCAN_CHUNK, self.size - self._scanned)
+        chunk = np.frombuffer(self._map, dtype=np.uint8, count=length, offset=self._scanned)
+        starts = np.flatnonzero(chunk == _NEWLINE) + (self._scanned + 1)
+        del chunk  # 釋放對 mmap 的參照，之後才能關閉或重新映射
+        numbers = np.arange(self._lines + 1, self._lines + 1 + len(starts))
+        self._offsets.extend(starts[numbers % self.stride == 0].tolist())
+        self._lines += len(starts)
+        self._scanned += length
+
+    def offset_of_line(self, line: int):
+        """
+        返回第 line 行 (從 0 開始) 的行首偏移。
+
+        Returns:
+            int | None: 行首偏移，檔案沒有這麼多行時返回 None。
+        """
+        if line < 0 or not self.size:
+            return None
+        while len(self._offsets) <= line // self.stride and self._scanned < self.size:
+            self._scan_chunk()
+        index = min(line // self.stride, len(self._offsets) - 1)
+        position = self._offsets[index]
+        for _ in range(line - index * self.stride):
+            end = self._map.find(b"\n", position)
+            if end == -1:
+                return None
+            position = end + 1
+        return position if position < self.size else None
+
+    def line_number(self, offset: int) -> int:
+        """
+        返回 offset 所在的行號 (從 0 開始)。索引會建立到 offset 為止。
+        """
+        offset = self.line_start(offset)
+        while self._scanned < offset:
+            self._scan_chunk()
+        index = bisect.bisect_right(self._offsets, offset) - 1
+        return index * self.stride + self._map[self._offsets[index]:offset].count(b"\n") if offset else 0
@@ -0,0 +1,509 @@
+"""
+log_search.py
+
+此模組為所有受管理程序的 PM2 輸出/錯誤日誌建立磁碟上的倒排索引，讓 GUI 可以在數毫秒內回答
+「過去一小時 project_B 中哪裡出現 ECONNRESET」這類查詢，而不需要逐一 grep 每個日誌檔。
+
+- 背景線程定期讀取每個日誌檔新增的位元組 (只到最後一個完整的行)，將每一行切成 token：
+  英數字詞 (轉為小寫) 以及非 ASCII 文字 (例如中文) 的雙字 n-gram。
+- 每個 (token, 行) 產生一筆 posting：(時間, 檔案編號, 行首偏移)。時間優先使用行首的時間戳
+  (PM2 的 log_date_format，例如 "2024-05-01 12:00:00")，沒有時使用讀取到該行的時間。
+- posting 先暫存在記憶體中，達到 LOG_SEARCH_BUFFER_POSTINGS 筆或一輪讀取結束時寫成一個不可變的區段
+  (vocab.npy 排序後的 token、starts.npy 每個 token 的起點、postings.npy)，查詢時以 mmap 映射，記憶體用量有上限。
+- 區段過多時合併最小的幾個，超過 LOG_SEARCH_RETENTION 的區段會被刪除。
+- state.json 記錄每個日誌檔已寫入區段的偏移，重新啟動後從該處繼續；日誌被輪替或截斷時從頭開始並使用新的檔案編號。
+"""
+
+import functools
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from src import config
+from src import metrics_persist
+
+TOKEN_BYTES = 32
+POSTING_DTYPE = np.dtype([("time", "<u4"), ("file", "<u4"), ("offset", "<u8")])
+STATE_FILENAME = "state.json"
+SEGMENT_PREFIX = "seg-"
+STREAMS = (("out", "log_file_path"), ("err", "error_log_path"))
+
+_WORD_RE = re.compile(r"[0-9a-z_]{2,}")
+_ASCII_WORD_RE = re.compile(rb"([0-9a-z_]{2,%d})[0-9a-z_]*" % TOKEN_BYTES)  # 直接截斷為 TOKEN_BYTES
+_WIDE_RE = re.compile(r"[^\x00-\x7f\s]+")
+_TIMESTAMP_RE = re.compile(rb"^(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})")
+_OFFSET_BITS = 40  # 查詢時將 (檔案編號, 偏移) 合併為一個 uint64 鍵
+
+
+def tokenize(text: str) -> set:
+    """
+    將一行文字切成 token：英數字詞 (至少 2 個字元) 與非 ASCII 文字的雙字 n-gram (單獨一個字時為單字)。
+
+    Args:
+        text (str): 一行日誌或查詢字串。
+
+    Returns:
+        set: 以 UTF-8 編碼並截斷為 TOKEN_BYTES 位元組的 token。
+    """
+    text = text.lower()
+    tokens = set(_WORD_RE.findall(text))
+    for run in _WIDE_RE.findall(text):
+        tokens.update(run[i:i + 2] for i in range(max(1, len(run) - 1)))
+    return {token.encode("utf-8")[:TOKEN_BYTES] for token in tokens}
+
+
+def _tokenize_line(line: bytes) -> set:
+    # 純 ASCII 的行 (日誌的大多數) 不需要解碼
+    if line.isascii():
+        return set(_ASCII_WORD_RE.findall(line.lower()))
+    return tokenize(line.decode("utf-8", errors="ignore"))
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_timestamp(date: bytes, clock: bytes):
+    try:
+        return int(time.mktime(time.strptime(f"{date.decode()} {clock.decode()}", "%Y-%m-%d %H:%M:%S")))
+    except (ValueError, OverflowError):
+        return None
+
+
+def line_timestamp(line: bytes, default: int) -> int:
+    """
+    返回行首時間戳 (本地時間) 的 epoch 秒數，沒有時返回 default。
+    """
+    match = _TIMESTAMP_RE.match(line)
+    if match is None:
+        return default
+    timestamp = _parse_timestamp(*match.groups())
+    return default if timestamp is None else timestamp
+
+
+def build_sources(apis: list) -> list:
+    """
+    從解析後的 API 列表建立要索引的日誌檔列表。
+
+    Args:
+        apis (list): data_parser.parse_pm2_list_output() 返回的 API 字典列表。
+
+    Returns:
+        list: 包含 path、stream ("out"/"err")、pm_id、name 與 project_name 的字典列表 (路徑不重複)。
+    """
+    sources = {}
+    for api in apis:
+        for stream, key in STREAMS:
+            path = api.get(key)
+            if path and path != "N/A" and path != "/dev/null" and path not in sources:
+                sources[path] = {"path": path, "stream": stream, "pm_id": api.get("pm_id"),
+                                 "name": api.get("name"), "project_name": api.get("project_name")}
+    return list(sources.values())
+
+
+class _Segment:
+    """
+    以 mmap 映射的不可變索引區段。
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.vocab = np.load(os.path.join(path, "vocab.npy"), mmap_mode="r")
+        self.starts = np.load(os.path.join(path, "starts.npy"), mmap_mode="r")
+        self.postings = np.load(os.path.join(path, "postings.npy"), mmap_mode="r")
+
+    def lookup(self, token: bytes) -> np.ndarray:
+        index = int(np.searchsorted(self.vocab, token))
+        if index >= len(self.vocab) or self.vocab[index] != token:
+            return self.postings[:0]
+        return self.postings[self.starts[index]:self.starts[index + 1]]
+
+
+def _write_segment(path: str, token_ids: np.ndarray, vocab: np.ndarray, postings: np.ndarray):
+    """
+    將 posting 依 (token, 時間, 檔案, 偏移) 排序後寫成區段目錄 (先寫入暫存目錄再改名)。
+    """
+    order = np.lexsort((postings["offset"], postings["file"], postings["time"], token_ids))
+    counts = np.bincount(token_ids, minlength=len(vocab))
+    temporary = path + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    np.save(os.path.join(temporary, "vocab.npy"), vocab)
+    np.save(os.path.join(temporary, "starts.npy"), np.concatenate(([0], np.cumsum(counts))).astype(np.int64))
+    np.save(os.path.join(temporary, "postings.npy"), postings[order])
+    os.replace(temporary, path)
+
+
+class LogIndex:
+    """
+    PM2 日誌的增量倒排索引。
+
+    Attributes:
+        path (str): 索引目錄。
+        readonly (bool): 另一個實例持有寫入鎖時為 True，此時只能查詢。
+    """
+    def __init__(self, path: str = None, buffer_postings: int = None, max_segments: int = None, clock=time.time):
+        """
+        開啟 (或建立) 索引目錄並載入上次的進度。
+
+        Args:
+            path (str, optional): 索引目錄。默認為 config.LOG_SEARCH_DIR。
+            buffer_postings (int, optional): 記憶體中暫存的 posting 上限。默認為 config.LOG_SEARCH_BUFFER_POSTINGS。
+            max_segments (int, optional): 區段數超過時進行合併。默認為 config.LOG_SEARCH_MAX_SEGMENTS。
+            clock (callable, optional): 返回 epoch 秒數的時鐘 (測試用)。
+
+        Raises:
+            OSError: 無法建立索引目錄。
+        """
+        self.path = os.path.expanduser(path or config.LOG_SEARCH_DIR)
+        self.buffer_postings = buffer_postings or config.LOG_SEARCH_BUFFER_POSTINGS
+        self.max_segments = max_segments or config.LOG_SEARCH_MAX_SEGMENTS
+        self._clock = clock
+        os.makedirs(self.path, exist_ok=True)
+        self._writer_lock = metrics_persist.WriterLock(self.path)
+        self.readonly = not self._writer_lock.acquire()
+        self._lock = threading.RLock()
+        self._sources = []
+        self._state_mtime = None
+        self._load_state()
+        self._reset_buffer()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _state_path(self) -> str:
+        return os.path.join(self.path, STATE_FILENAME)
+
+    def _load_state(self):
+        state = {}
+        try:
+            with open(self._state_path(), encoding="utf-8") as f:
+                state = json.load(f)
+            self._state_mtime = os.stat(self._state_path()).st_mtime_ns
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"錯誤：無法讀取日誌索引狀態，重新建立索引。錯誤訊息：{e}")
+        self._files = {int(file_id): meta for file_id, meta in state.get("files", {}).items()}
+        self._next_file_id = state.get("next_file_id", 0)
+        self._next_segment = state.get("next_segment", 0)
+        self._segment_meta = [meta for meta in state.get("segments", [])
+                              if os.path.isdir(os.path.join(self.path, meta["name"]))]
+        self._segments = {}
+        self._pending_offsets = {file_id: meta["offset"] for file_id, meta in self._files.items()}
+
+    def _save_state(self):
+        state = {"files": self._files, "next_file_id": self._next_file_id, "next_segment": self._next_segment,
+                 "segments": self._segment_meta}
+        temporary = self._state_path() + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temporary, self._state_path())
+
+    def _segment(self, name: str) -> _Segment:
+        segment = self._segments.get(name)
+        if segment is None:
+            segment = self._segments[name] = _Segment(os.path.join(self.path, name))
+        return segment
+
+    def _reload_if_changed(self):
+        # 唯讀實例：寫入的實例更新狀態後重新載入
+        try:
+            mtime = os.stat(self._state_path()).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._state_mtime:
+            self._load_state()
+
+    def set_sources(self, sources: list):
+        """
+        設定要索引的日誌檔 (build_sources() 的結果)。
+        """
+        with self._lock:
+            self._sources = list(sources)
+
+    def _file_id(self, source: dict, stat) -> int:
+        # 返回日誌檔目前的檔案編號；新檔案、輪替 (inode 改變) 或截斷時配置新的編號
+        path = source["path"]
+        current = next((file_id for file_id, meta in self._files.items()
+                        if meta["path"] == path and meta.get("active", True)), None)
+        if current is not None:
+            meta = self._files[current]
+            if meta["inode"] == stat.st_ino and self._pending_offsets[current] <= stat.st_size:
+                meta.update(pm_id=source.get("pm_id"), name=source.get("name"),
+                            project_name=source.get("project_name"))
+                return current
+            meta["active"] = False
+        file_id = self._next_file_id
+        self._next_file_id += 1
+        self._files[file_id] = {"path": path, "inode": stat.st_ino, "offset": 0, "stream": source.get("stream"),
+                                "pm_id": source.get("pm_id"), "name": source.get("name"),
+                                "project_name": source.get("project_name")}
+        self._pending_offsets[file_id] = 0
+        return file_id
+
+    def _reset_buffer(self):
+        self._buffer_tokens = []
+        self._buffer_times = []
+        self._buffer_files = []
+        self._buffer_offsets = []
+
+    def _add_lines(self, file_id: int, base: int, data: bytes, now: int):
+        position = base
+        for line in data.split(b"\n"):
+            tokens = _tokenize_line(line)
+            if tokens:
+                count = len(tokens)
+                self._buffer_tokens.extend(tokens)
+                self._buffer_times.extend([line_timestamp(line, now)] * count)
+                self._buffer_files.extend([file_id] * count)
+                self._buffer_offsets.extend([position] * count)
+            position += len(line) + 1
+
+    def index_once(self) -> int:
+        """
+        讀取並索引每個日誌檔新增的內容，然後將暫存的 posting 寫成區段。
+
+        Returns:
+            int: 這一輪索引的位元組數。唯讀時返回 0。
+        """
+        if self.readonly:
+            return 0
+        indexed = 0
+        with self._lock:
+            sources = list(self._sources)
+        for source in sources:
+            try:
+                stat = os.stat(source["path"])
+                with self._lock:
+                    file_id = self._file_id(source, stat)
+                    offset = self._pending_offsets[file_id]
+                if stat.st_size <= offset:
+                    continue
+                with open(source["path"], "rb") as f:
+                    f.seek(offset)
+                    data = f.read(min(stat.st_size - offset, config.LOG_SEARCH_READ_BYTES))
+            except OSError:
+                continue
+            end = data.rfind(b"\n") + 1
+            if end == 0 and len(data) < config.LOG_SEARCH_READ_BYTES:
+                continue  # 最後一行還沒寫完，下一輪再索引
+            data = data[:end] if end else data
+            with self._lock:
+                self._add_lines(file_id, offset, data, int(self._clock()))
+                self._pending_offsets[file_id] = offset + len(data)
+                if len(self._buffer_tokens) >= self.buffer_postings:
+                    self.flush()
+            indexed += len(data)
+        self.flush()
+        return indexed
+
+    def flush(self):
+        """
+        將暫存的 posting 寫成新的區段並記錄進度，必要時合併區段並刪除過期的區段。
+        """
+        if self.readonly:
+            return
+        with self._lock:
+            changed = any(self._pending_offsets[file_id] != meta["offset"] for file_id, meta in self._files.items())
+            if self._buffer_tokens:
+                # 以 Python 的 set/dict 去除重複比 np.unique 排序字串快得多
+                words = sorted(set(self._buffer_tokens))
+                ids = {word: index for index, word in enumerate(words)}
+                vocab = np.array(words, dtype=f"S{TOKEN_BYTES}")
+                token_ids = np.fromiter(map(ids.__getitem__, self._buffer_tokens), dtype=np.int64,
+                                        count=len(self._buffer_tokens))
+                postings = np.empty(len(token_ids), dtype=POSTING_DTYPE)
+                postings["time"] = self._buffer_times
+                postings["file"] = self._buffer_files
+                postings["offset"] = self._buffer_offsets
+                self._add_segment(token_ids, vocab, postings)
+                self._reset_buffer()
+                changed = True
+            for file_id, offset in self._pending_offsets.items():
+                self._files[file_id]["offset"] = offset
+            changed = self._expire_segments() or changed
+            if len(self._segment_meta) > self.max_segments:
+                self._merge_smallest()
+                changed = True
+            if changed:
+                self._save_state()
+
+    def _add_segment(self, token_ids, vocab, postings, replace: list = None):
+        name = f"{SEGMENT_PREFIX}{self._next_segment:06d}"
+        self._next_segment += 1
+        _write_segment(os.path.join(self.path, name), token_ids, vocab, postings)
+        meta = {"name": name, "count": int(len(postings)),
+                "min_time": int(postings["time"].min()), "max_time": int(postings["time"].max())}
+        if replace:
+            index = min(self._segment_meta.index(old) for old in replace)
+            self._segment_meta = [old for old in self._segment_meta if old not in replace]
+            self._segment_meta.insert(index, meta)
+        else:
+            self._segment_meta.append(meta)
+
+    def _remove_segments(self, metas: list):
+        for meta in metas:
+            self._segments.pop(meta["name"], None)
+            shutil.rmtree(os.path.join(self.path, meta["name"]), ignore_errors=True)
+
+    def _expire_segments(self) -> bool:
+        cutoff = self._clock() - config.LOG_SEARCH_RETENTION
+        expired = [meta for meta in self._segment_meta if meta["max_time"] < cutoff]
+        if not expired:
+            return False
+        self._segment_meta = [meta for meta in self._segment_meta if meta not in expired]
+        self._save_state()
+        self._remove_segments(expired)
+        return True
+
+    def _merge_smallest(self):
+        # 合併最小的幾個區段；合計超過 LOG_SEARCH_MERGE_MAX_POSTINGS 時不合併，以限制合併時的記憶體用量
+        selected = sorted(self._segment_meta, key=lambda meta: meta["count"])[:config.LOG_SEARCH_MERGE_FACTOR]
+        if len(selected) < 2 or sum(meta["count"] for meta in selected) > config.LOG_SEARCH_MERGE_MAX_POSTINGS:
+            return
+        segments = [self._segment(meta["name"]) for meta in selected]
+        vocab = np.unique(np.concatenate([np.asarray(segment.vocab) for segment in segments]))
+        token_ids = np.concatenate([np.repeat(np.searchsorted(vocab, segment.vocab), np.diff(segment.starts))
+                                    for segment in segments])
+        postings = np.concatenate([np.asarray(segment.postings) for segment in segments])
+        self._add_segment(token_ids, vocab, postings, replace=selected)
+        self._save_state()
+        self._remove_segments(selected)
+
+    def search(self, query: str, since: float = None, until: float = None, projects=None, names=None,
+               limit: int = None) -> list:
+        """
+        搜尋同時包含查詢中所有 token 的日誌行，最新的在前。
+
+        Args:
+            query (str): 查詢字串，例如 "ECONNRESET" 或 "timeout upstream"。
+            since (float, optional): 只包含這個 epoch 秒數之後的行。默認為不限。
+            until (float, optional): 只包含這個 epoch 秒數之前的行。默認為不限。
+            projects (iterable, optional): 只搜尋這些專案的日誌。默認為全部。
+            names (iterable, optional): 只搜尋這些 API 名稱的日誌。默認為全部。
+            limit (int, optional): 最多返回的筆數。默認為 config.LOG_SEARCH_RESULT_LIMIT。
+
+        Returns:
+            list: 包含 time、path、offset、line、stream、pm_id、name 與 project_name 的字典列表。
+        """
+        tokens = sorted(tokenize(query))
+        if not tokens:
+            return []
+        limit = limit or config.LOG_SEARCH_RESULT_LIMIT
+        low = 0 if since is None else int(since)
+        high = 2 ** 32 - 1 if until is None else int(until)
+        with self._lock:
+            if self.readonly:
+                self._reload_if_changed()
+            files = {file_id: dict(meta) for file_id, meta in self._files.items()
+                     if (projects is None or meta.get("project_name") in projects)
+                     and (names is None or meta.get("name") in names)}
+            if not files:
+                return []
+            allowed = np.fromiter(files, dtype=np.uint64)
+            candidates = []
+            for meta in self._segment_meta:
+                if meta["max_time"] < low or meta["min_time"] > high:
+                    continue
+                segment = self._segment(meta["name"])
+                keys = times = None
+                # 從最少的 posting 開始取交集
+                for postings in sorted((segment.lookup(token) for token in tokens), key=len):
+                    postings = postings[(postings["time"] >= low) & (postings["time"] <= high)]
+                    token_keys = (postings["file"].astype(np.uint64) << np.uint64(_OFFSET_BITS)) | postings["offset"]
+                    if keys is None:
+                        order = np.argsort(token_keys)
+                        keys, times = token_keys[order], postings["time"][order]
+                    else:
+                        mask = np.isin(keys, token_keys, assume_unique=True)
+                        keys, times = keys[mask], times[mask]
+                    if not len(keys):
+                        break
+                mask = np.isin(keys >> np.uint64(_OFFSET_BITS), allowed)
+                candidates.append((times[mask], keys[mask]))
+        if not candidates:
+            return []
+        times = np.concatenate([pair[0] for pair in candidates])
+        keys = np.concatenate([pair[1] for pair in candidates])
+        order = np.lexsort((keys, times))[::-1]
+        hits = []
+        handles = {}
+        try:
+            for index in order:
+                if len(hits) >= limit:
+                    break
+                file_id = int(keys[index] >> np.uint64(_OFFSET_BITS))
+                offset = int(keys[index] & np.uint64((1 << _OFFSET_BITS) - 1))
+                meta = files[file_id]
+                line = self._read_line(handles, meta, offset)
+                if line is None or not set(tokens) <= tokenize(line):
+                    continue  # 日誌已被輪替或內容不符
+                hits.append({"time": int(times[index]), "path": meta["path"], "offset": offset, "line": line,
+                             "stream": meta.get("stream"), "pm_id": meta.get("pm_id"), "name": meta.get("name"),
+                             "project_name": meta.get("project_name")})
+        finally:
+            for handle in handles.values():
+                if handle is not None:
+                    handle.close()
+        return hits
+
+    @staticmethod
+    def _read_line(handles: dict, meta: dict, offset: int):
+        path = meta["path"]
+        if path not in handles:
+            try:
+                handle = open(path, "rb")
+                handles[path] = handle if os.fstat(handle.fileno()).st_ino == meta["inode"] else handle.close()
+            except OSError:
+                handles[path] = None
+        handle = handles[path]
+        if handle is None:
+            return None
+        handle.seek(offset)
+        return handle.readline(config.LOG_VIEWER_MAX_LINE_BYTES).rstrip(b"\r\n").decode("utf-8", errors="replace")
+
+    def is_running(self) -> bool:
+        """
+        背景索引線程是否正在運行。
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = None):
+        """
+        啟動背景索引線程，每 interval 秒索引一次新增的日誌內容。唯讀時不啟動。
+
+        Args:
+            interval (float, optional): 索引間隔 (秒)。默認為 config.LOG_SEARCH_INTERVAL。
+        """
+        if self.readonly or self.is_running():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval or config.LOG_SEARCH_INTERVAL,),
+                                        name="log-indexer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """
+        停止背景索引線程。
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self):
+        """
+        停止背景索引線程並釋放寫入鎖，之後只能查詢。
+        """
+        self.stop()
+        self._writer_lock.release()
+        self.readonly = True
+
+    def _run(self, interval: float):
+        while not self._stop.is_set():
+            try:
+                self.index_once()
+            except Exception as e:
+                print(f"索引日誌時發生錯誤：{e}")
+            self._stop.wait(interval)
@@ -4,8 +4,10 @@ main_app.py
 此模組負責構建 PM2 API 管理應用的主 GUI 介面，包括主視窗、整體佈局和核心交互邏輯。
 """
 
+import asyncio
 import sys
-from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableWidget, QMainWindow, QHeaderView, QAbstractItemView, QTreeWidgetItem, QTreeWidget, QMessageBox, QMenu
+import threading
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableWidget, QMainWindow, QHeaderView, QAbstractItemView, QTreeWidgetItem, QTreeWidget, QMessageBox, QMenu, QInputDialog
 from PyQt6.QtCore import Qt, QTimer, QObject, QThread, pyqtSignal
 
 # 為了讓應用程式能夠找到 src 目錄下的模組，將 src 目錄添加到 Python 路徑中
@@ -13,9 +15,25 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # 匯入後端模組
+from src import access_log
+from src import axm_metrics
+from src import config
+from src import error_fingerprint
+from src import health_prober
+from src import load_generator
+from src import log_search
+from src import pm2_bus
 from src import pm2_manager
-from src.data_parser import parse_pm2_list_output, get_project_name, load_all_api_configs
-from src.gui_components import ApiStatusLight, ApiDetailPanel, PerformanceGraph, LoadingOverlay
+from src import process_tree
+from src import rolling_restart
+from src.command_engine import CommandCancelled
+from src import startup_dag
+from src.action_queue import ActionQueue
+from src.poll_scheduler import PollScheduler
+from src.action_executor import ActionExecutor, STATE_QUEUED, STATE_OK, STATE_FAILED
+from src.data_parser import parse_pm2_list_output, format_process_resources, format_custom_metrics
+from src.gui_components import ApiStatusLight, ApiDetailPanel, PerformanceGraph, HistoryGraph, LoadingOverlay, \
+    LoadTestDialog, LogSearchDialog, TopErrorsDialog
 
 # 載入 QSS 樣式表
 def load_stylesheet(filename):
@@ -25,6 +43,10 @@ def load_stylesheet(filename):
             return f.read()
     return ""
 
+# 單一 API 操作函數對應的操作名稱，經由操作佇列執行時使用
+_SINGLE_ACTION_VERBS = {pm2_manager.start_api: "start", pm2_manager.restart_api: "restart",
+                        pm2_manager.stop_api: "stop"}
+
 class Worker(QObject):
     """
     獨立於主線程執行耗時操作的 Worker 物件。
@@ -34,14 +56,24 @@ class Worker(QObject):
         finished: 當任務完成時發出信號。
         error (str): 當任務中發生錯誤時，帶有錯誤訊息發出信號。
         data_loaded (list): 當 API 數據成功載入時，帶有解析後的 API 列表發出信號。
-        action_completed (bool, int, int, str): 當專案操作完成時發出信號，包含成功狀態、成功計數、總計數和操作名稱。
+        action_completed (bool, int, int, str): 當專案操作完成時發出信號，包含成功狀態、成功 API 數、API 總數和操作名稱。
         single_action_completed (bool, str, str, str): 用於單一 API 操作完成
+        action_progress (dict): 專案操作中每個 API 的進度事件 (queued/running/ok/failed 與耗時)。
+        rolling_restart_completed (dict, str): 滾動重啟完成時發出信號，包含 RollingRestart.run() 的報告和操作名稱。
+        metrics_polled (list): 輕量指標輪詢完成時，帶有 PM2 原始程序列表發出信號 (失敗時為空列表)。
+
+    Attributes:
+        action_queue (ActionQueue): 設定時專案與單一 API 操作會放入此佇列合併後執行，
+                                    操作完成 (而不是放入佇列) 時才發出完成信號與 finished。默認為 None (直接執行)。
     """
     finished = pyqtSignal()
     error = pyqtSignal(str)
     data_loaded = pyqtSignal(list)
     action_completed = pyqtSignal(bool, int, int, str)
     single_action_completed = pyqtSignal(bool, str, str, str)
+    action_progress = pyqtSignal(dict)
+    rolling_restart_completed = pyqtSignal(dict, str)
+    metrics_polled = pyqtSignal(list)
 
     def __init__(self, parent=None):
         """
@@ -51,6 +83,7 @@ class Worker(QObject):
             parent (QObject, optional): 父物件。默認為 None。
         """
         super().__init__(parent)
+        self.action_queue = None
 
     def load_data_task(self):
         """
@@ -58,20 +91,41 @@ class Worker(QObject):
         完成後發出 `data_loaded` 或 `error` 信號，最終發出 `finished` 信號。
         """
         try:
-            raw_pm2_list = pm2_manager.get_pm2_list()
+            # 定時刷新需要新的數據，但仍會共用其他呼叫端正在進行的查詢
+            raw_pm2_list = pm2_manager.get_pm2_snapshot(max_age=0)
             if raw_pm2_list:
                 parsed_apis = parse_pm2_list_output(raw_pm2_list)
                 self.data_loaded.emit(parsed_apis)
             else:
                 self.data_loaded.emit([]) # Emit empty list if no APIs found
+        except CommandCancelled:
+            print("載入 API 數據已取消。")
         except Exception as e:
             self.error.emit(f"載入 API 數據時發生錯誤: {e}")
         finally:
             self.finished.emit()
 
+    def poll_metrics_task(self, scheduler):
+        """
+        在單獨的線程中輪詢 PM2 指標，只記錄排程器判定已到期的程序。
+        與 load_data_task 不同，此任務不解析 API 設定也不重建列表，失敗時只輸出訊息而不彈出對話框。
+
+        Args:
+            scheduler (PollScheduler): 決定哪些程序需要記錄的輪詢排程器。
+        """
+        raw_pm2_list = []
+        try:
+            raw_pm2_list = pm2_manager.get_pm2_list(scheduler=scheduler)
+            scheduler.update_budget()
+        except Exception as e:
+            print(f"輪詢 PM2 指標時發生錯誤: {e}")
+        finally:
+            self.metrics_polled.emit(raw_pm2_list)
+
     def perform_single_action_task(self, action_func, api_id, api_name, action_type):
         """
         在單獨的線程中執行單一 API 操作（啟動、重啟、停止）。
+        設定了 action_queue 時，以數字 ID 指定的操作會放入佇列，與其他等待中的操作合併後執行。
 
         Args:
             action_func (callable): 要執行的 PM2 管理函數。
@@ -79,11 +133,18 @@ class Worker(QObject):
             api_name (str): API 的名稱。
             action_type (str): 操作類型 (e.g., "啟動", "停止", "重啟").
         """
+        if self.action_queue is not None and str(api_id).isdigit() and action_func in _SINGLE_ACTION_VERBS:
+            target = {"pm_id": int(api_id), "name": api_name, "project_name": None, "host": "localhost"}
+            self.action_queue.submit(_SINGLE_ACTION_VERBS[action_func], [target],
+                                     lambda results: self._report_single_action(results[0], api_name, action_type))
+            return
         success = False
         message = ""
         try:
             success = action_func(api_id)
             message = "成功" if success else "失敗"
+        except CommandCancelled:
+            message = "已取消"
         except Exception as e:
             message = f"執行 {action_type} {api_name} 時發生錯誤: {e}"
             self.error.emit(message) # 也發出錯誤信號到主線程
@@ -91,32 +152,88 @@ class Worker(QObject):
             self.single_action_completed.emit(success, api_name, action_type, message)
             self.finished.emit()
 
-    def perform_action_task(self, action_func, action_name: str, project_names: set):
+    def _report_single_action(self, result: dict, api_name: str, action_type: str):
+        """
+        操作佇列完成單一 API 操作時 (在派發線程中) 發出完成信號。
+        """
+        message = "成功" if result["ok"] else f"失敗：{result['error']}"
+        self.single_action_completed.emit(result["ok"], api_name, action_type, message)
+        self.finished.emit()
+
+    def perform_action_task(self, verb: str, action_name: str, project_names: set):
         """
         在單獨的線程中執行專案層級的 API 操作（啟動、重啟、停止）。
+        所有專案的目標 API 從同一份快照中解析，再由 ActionExecutor 分批並行執行
+        (啟動時有 API 宣告 depends_on 則由 StartupScheduler 依依賴圖並行啟動)，
+        每個 API 的進度透過 `action_progress` 信號回報，成功與總數依每個 API 的實際結果計算。
 
         Args:
-            action_func (callable): 要執行的 PM2 管理函數 (e.g., `pm2_manager.start_project_apis`).
-            action_name (str): 操作的名稱 (e.g., "啟動").
+            verb (str): 操作名稱 (e.g., "start", "restart", "stop").
+            action_name (str): 操作的顯示名稱 (e.g., "啟動").
             project_names (set): 要執行操作的專案名稱集合。
         """
         success_count = 0
         total_count = 0
+        queued = False
         try:
-            # 在 worker 線程中載入 API 配置
-            all_api_configs = load_all_api_configs()
-            for project_name in sorted(list(project_names)):
-                # Get the number of APIs in this project within the worker thread
-                project_apis = [api for api in parse_pm2_list_output(pm2_manager.get_pm2_list()) if get_project_name(api, all_api_configs) == project_name]
-                if project_apis:
-                    total_count += len(project_apis)
-                    if action_func(project_name):
-                        success_count += len(project_apis) # Assuming success for all APIs in the project if the function returns True
+            plan = pm2_manager.plan_project_action(verb, sorted(project_names))
+            total_count = len(plan["targets"])
+            if total_count and verb == "start" and startup_dag.has_dependencies(plan["targets"]):
+                results = startup_dag.StartupScheduler(progress_callback=self.action_progress.emit).run(plan["targets"])
+            elif total_count and self.action_queue is not None:
+                self.action_queue.submit(plan["verb"], plan["targets"],
+                                         lambda results: self._report_project_action(results, action_name))
+                queued = True
+                return
+            elif total_count:
+                executor = ActionExecutor(progress_callback=self.action_progress.emit)
+                results = executor.run(plan["verb"], plan["targets"])
+            else:
+                results = []
+            success_count = sum(1 for result in results if result["ok"])
+            for result in results:
+                if not result["ok"]:
+                    print(f"{action_name} - {result['name']} (ID: {result['pm_id']}) 失敗：{result['error']}")
             self.action_completed.emit(True, success_count, total_count, action_name)
         except Exception as e:
             self.error.emit(f"執行 {action_name} 專案 API 時發生錯誤: {e}")
             self.action_completed.emit(False, success_count, total_count, action_name) # Emit false on error
         finally:
+            if not queued:
+                self.finished.emit()
+
+    def _report_project_action(self, results: list, action_name: str):
+        """
+        操作佇列完成專案操作時 (在派發線程中) 回報結果。被後續衝突操作取代的 API 計為未成功。
+        """
+        for result in results:
+            if not result["ok"]:
+                print(f"{action_name} - {result['name']} (ID: {result['pm_id']}) 失敗：{result['error']}")
+        success_count = sum(1 for result in results if result["ok"])
+        self.action_completed.emit(True, success_count, len(results), action_name)
+        self.finished.emit()
+
+    def perform_rolling_restart_task(self, project_name: str, batch_size: int, error_rate):
+        """
+        在單獨的線程中滾動重啟專案的所有 API 實例，每批 batch_size 個，
+        每一批都要回到 online 並通過健康檢查、錯誤率沒有上升才繼續。
+
+        Args:
+            project_name (str): 專案名稱。
+            batch_size (int): 每批重啟的實例數。
+            error_rate (callable): 以 pm_id 列表呼叫、返回目前錯誤率的函數，None 表示不檢查錯誤率。
+        """
+        action_name = f"滾動重啟 {project_name}"
+        report = {"ok": False, "aborted": None, "results": [], "steps": [], "skipped": [], "duration": 0.0}
+        try:
+            plan = pm2_manager.plan_project_action("restart", [project_name])
+            restarter = rolling_restart.RollingRestart(batch_size=batch_size, error_rate=error_rate,
+                                                       progress_callback=self.action_progress.emit)
+            report = restarter.run(plan["targets"])
+        except Exception as e:
+            self.error.emit(f"執行 {action_name} 時發生錯誤: {e}")
+        finally:
+            self.rolling_restart_completed.emit(report, action_name)
             self.finished.emit()
 
 class MainApp(QMainWindow):
@@ -134,16 +251,34 @@ class MainApp(QMainWindow):
         api_list_widget (QTreeWidget): 顯示 API 列表的樹狀部件。
         api_detail_panel (ApiDetailPanel): 顯示選定 API 詳細資訊的面板。
         performance_graph (PerformanceGraph): 顯示 CPU/記憶體使用率圖表的部件。
+        history_graph (HistoryGraph): 顯示 CPU/記憶體歷史走勢的部件。
         _last_expanded_state (set): 儲存樹狀列表上次展開狀態的集合。
         _last_selected_item_data (dict): 儲存上次選取項目數據的字典。
         data_loading_in_progress (bool): 標記數據載入進度。
         data_ready_for_overlay_hide (bool): 新增旗標：數據是否已準備好隱藏疊加層
         min_overlay_display_timer (QTimer): 用於確保加載動畫至少顯示 1 秒的定時器
+        _action_progress (dict): 目前專案操作的進度統計 (name、total、done、failed)。
+        bus_subscriber (PM2BusSubscriber): PM2 事件匯流排訂閱者，未啟用時為 None。
+        reconcile_timer (QTimer): 收到無法就地套用的事件 (例如新增或刪除程序) 時，延遲重新載入列表的定時器。
+        poll_scheduler (PollScheduler): 決定每個程序指標輪詢間隔的排程器。
+        poll_timer (QTimer): 在下一個程序到期時觸發輕量指標輪詢的單次定時器。
+        sample_timer (QTimer): 以 /proc 取樣的頻率刷新選定 API 圖表的定時器。
+        health_prober (HealthProber): 背景 HTTP 健康檢查器，未啟用時為 None。
+        log_index (LogIndex): 背景日誌全文索引，未啟用或無法開啟時為 None。
+        error_tracker (ErrorTracker): 背景錯誤指紋追蹤器，未啟用時為 None。
+        access_monitor (AccessLogMonitor): 背景存取記錄統計，未啟用時為 None。
+        _load_test_dialogs (set): 目前開啟的壓力測試對話框。
     """
     # 定義自定義信號
     load_data_signal = pyqtSignal()
-    perform_action_signal = pyqtSignal(object, str, set) # action_func, action_name, project_names
+    perform_action_signal = pyqtSignal(str, str, set) # verb, action_name, project_names
     perform_single_action_signal = pyqtSignal(object, str, str, str) # action_func, api_id, api_name, action_type
+    perform_rolling_restart_signal = pyqtSignal(str, int, object) # project_name, batch_size, error_rate
+    bus_event_received = pyqtSignal(dict) # 由匯流排訂閱線程發出，在主線程中處理
+    bus_connection_changed = pyqtSignal(bool)
+    poll_metrics_signal = pyqtSignal(object) # scheduler
+    health_result_received = pyqtSignal(object, dict) # pm_id, 結果；由健康檢查線程發出
+    load_test_finished = pyqtSignal(object, dict) # 對話框, 測試報告；由壓力測試線程發出
 
     def __init__(self):
         """
@@ -159,13 +294,19 @@ class MainApp(QMainWindow):
 
         self._last_expanded_state = set() # 用於儲存樹狀列表的展開狀態
         self._last_selected_item_data = None # 用於儲存選取的項目數據
+        self._api_items = {} # pm_id -> 樹狀列表中的 API 項目
+        self._service_items = {} # 名稱 -> 同名多實例 (cluster 模式) 的服務項目
+        self._poll_in_progress = False
+        self._load_test_dialogs = set()
         # 初始化數據載入進度旗標
         self.data_loading_in_progress = False
         self.data_ready_for_overlay_hide = False # 新增旗標：數據是否已準備好隱藏疊加層
+        self._action_progress = {"name": "", "total": 0, "done": 0, "failed": 0}
 
         self.init_ui()
         self.loading_overlay = LoadingOverlay(self) # 實例化 LoadingOverlay
         self.loading_overlay.hide() # 初始隱藏
+        self.loading_overlay.cancel_requested.connect(self._cancel_pending_commands)
         
         # 處理數據載入完成後的動作，即使數據載入速度非常快，也確保加載動畫至少顯示 1 秒
         self.min_overlay_display_timer = QTimer(self)
@@ -182,22 +323,36 @@ class MainApp(QMainWindow):
         self.load_data_worker.finished.connect(self.load_api_data_finished)
         # 連接自定義信號到 worker 的任務方法
         self.load_data_signal.connect(self.load_data_worker.load_data_task)
+        self.load_data_worker.metrics_polled.connect(self.handle_metrics_polled)
+        self.poll_metrics_signal.connect(self.load_data_worker.poll_metrics_task)
         self.load_data_thread.start() # 啟動線程，但不執行任何任務
 
         self.action_thread = QThread()
         self.action_worker = Worker()
         self.action_worker.moveToThread(self.action_thread)
         self.action_worker.action_completed.connect(self.handle_action_completed)
+        self.action_worker.action_progress.connect(self.handle_action_progress)
         self.action_worker.error.connect(self.handle_error)
         self.action_worker.finished.connect(self._refresh_data_after_action) # 動作完成後刷新數據
         # 連接自定義信號到 worker 的任務方法
         self.perform_action_signal.connect(self.action_worker.perform_action_task)
         self.action_worker.single_action_completed.connect(self.handle_single_action_completed) # 連接單一 API 操作完成信號
         self.perform_single_action_signal.connect(self.action_worker.perform_single_action_task) # 連接單一 API 動作信號到 worker
+        self.action_worker.rolling_restart_completed.connect(self.handle_rolling_restart_completed)
+        self.perform_rolling_restart_signal.connect(self.action_worker.perform_rolling_restart_task)
         self.action_thread.start() # 啟動線程，但不執行任何任務
+        self.setup_action_queue()
 
         self.load_api_data() # 首次載入數據
         self.setup_data_refresh_timer()
+        self.setup_event_bus()
+        self.setup_poll_scheduler()
+        self.setup_process_sampler()
+        self.setup_health_prober()
+        self.setup_log_index()
+        self.setup_error_tracker()
+        self.setup_access_monitor()
+        self.load_test_finished.connect(self.handle_load_test_finished)
 
     def init_ui(self):
         """
@@ -207,15 +362,21 @@ class MainApp(QMainWindow):
         top_layout = QHBoxLayout()
         title_label = QLabel("<h1>PM2 API Manager Dashboard</h1>")
         top_layout.addWidget(title_label)
+        self.daemon_status_label = QLabel()
+        self.daemon_status_label.setStyleSheet("color: orange; font-weight: bold;")
+        self.daemon_status_label.hide()
+        top_layout.addWidget(self.daemon_status_label)
 
         global_control_buttons_layout = QHBoxLayout()
         start_all_button = QPushButton("啟動所有")
         restart_all_button = QPushButton("重啟所有")
         stop_all_button = QPushButton("停止所有")
+        search_logs_button = QPushButton("搜尋日誌")
 
         global_control_buttons_layout.addWidget(start_all_button)
         global_control_buttons_layout.addWidget(restart_all_button)
         global_control_buttons_layout.addWidget(stop_all_button)
+        global_control_buttons_layout.addWidget(search_logs_button)
         top_layout.addLayout(global_control_buttons_layout)
         self.main_layout.addLayout(top_layout)
 
@@ -223,6 +384,7 @@ class MainApp(QMainWindow):
         start_all_button.clicked.connect(self._start_all_projects)
         restart_all_button.clicked.connect(self._restart_all_projects)
         stop_all_button.clicked.connect(self._stop_all_projects)
+        search_logs_button.clicked.connect(lambda: self._open_log_search())
 
         # Main content area: API list (left) and detail/graph (right)
         content_layout = QHBoxLayout()
@@ -244,8 +406,11 @@ class MainApp(QMainWindow):
         # 連接 ApiDetailPanel 發出的單一 API 操作請求信號到 MainApp 的 perform_single_action_signal
         self.api_detail_panel.single_api_action_requested.connect(self.perform_single_action_signal)
         self.performance_graph = PerformanceGraph()
+        self.history_graph = HistoryGraph()
+        self.history_graph.range_changed.connect(lambda _: self._plot_api_history(self._last_selected_item_data))
         right_panel_layout.addWidget(self.api_detail_panel)
         right_panel_layout.addWidget(self.performance_graph)
+        right_panel_layout.addWidget(self.history_graph)
         content_layout.addLayout(right_panel_layout, 1) #占 1/3 寬度
 
         self.main_layout.addLayout(content_layout)
@@ -280,6 +445,7 @@ class MainApp(QMainWindow):
     def update_api_tree_widget(self, parsed_apis: list):
         """
         根據解析後的 API 數據更新 API 樹狀列表。
+        同名的多個實例 (cluster 模式) 會彙總為一個服務項目，各實例列在其下。
         會保留上次的展開狀態和選取狀態。
 
         Args:
@@ -287,26 +453,21 @@ class MainApp(QMainWindow):
         """
         # 儲存當前展開的項目和選取的項目
         expanded_items = set()
-        selected_api_id = None # 儲存選取的 API ID，用於重新選取
-
         root = self.api_list_widget.invisibleRootItem()
         for i in range(root.childCount()):
             project_item = root.child(i)
             if project_item.isExpanded():
                 expanded_items.add(project_item.text(0))
-            
-            # 檢查每個子項目是否被選取
-            for j in range(project_item.childCount()):
-                api_item = project_item.child(j)
-                if api_item.isSelected():
-                    api_data = api_item.data(0, Qt.ItemDataRole.UserRole)
-                    if api_data and 'pm_id' in api_data: # 使用 pm_id 作為唯一識別碼
-                        selected_api_id = api_data['pm_id']
-                    break # 找到選取的項目後即可退出內層循環
-            if selected_api_id is not None: # 如果找到選取的項目，退出外層循環
-                break
+        for name, service_item in self._service_items.items():
+            if service_item.isExpanded():
+                expanded_items.add(("service", name))
+        selected_item = self.api_list_widget.currentItem()
+        selected_data = selected_item.data(0, Qt.ItemDataRole.UserRole) if selected_item is not None else None
+        selected_api_id = selected_data.get('pm_id') if selected_data and selected_data.get("type") != "project" else None
 
         self.api_list_widget.clear()
+        self._api_items = {}
+        self._service_items = {}
         # Group APIs by project name
         projects = {}
         for api in parsed_apis:
@@ -320,24 +481,48 @@ class MainApp(QMainWindow):
             project_item = QTreeWidgetItem([project_name, ""]) # 專案項目不顯示狀態
             project_item.setData(0, Qt.ItemDataRole.UserRole, {"type": "project", "name": project_name}) # 標記為專案類型
             self.api_list_widget.addTopLevelItem(project_item)
-
-            for api in sorted(apis, key=lambda x: x.get('name', '')):
-                api_name = api.get("name", "N/A")
-                status_light_widget = ApiStatusLight(api.get("status", "unknown"))
-                
-                api_item = QTreeWidgetItem([api_name, ""])
-                api_item.setData(0, Qt.ItemDataRole.UserRole, api) # 將完整的 api_data 存儲在 item 的 user data 中
-                project_item.addChild(api_item)
-                self.api_list_widget.setItemWidget(api_item, 1, status_light_widget) # 將狀態燈號放置在第二列
-
-                # 恢復展開狀態
-                if project_name in expanded_items:
-                    project_item.setExpanded(True)
-
-                # 恢復選取狀態
-                if selected_api_id is not None and api.get('pm_id') == selected_api_id:
-                    self.api_list_widget.setCurrentItem(api_item) # 選取該項目
-                    self.display_api_details(api_item) # 重新顯示詳細資訊
+            # 恢復展開狀態
+            if project_name in expanded_items:
+                project_item.setExpanded(True)
+
+            for api_name, instances in sorted(process_tree.group_instances(apis).items(), key=lambda x: x[0] or ''):
+                parent_item = project_item
+                if len(instances) > 1:
+                    service = process_tree.aggregate_instances(instances)
+                    parent_item = QTreeWidgetItem([f"{api_name} (×{len(instances)})", ""])
+                    parent_item.setData(0, Qt.ItemDataRole.UserRole, service)
+                    project_item.addChild(parent_item)
+                    self.api_list_widget.setItemWidget(parent_item, 1, ApiStatusLight(self._display_status(service)))
+                    self._service_items[api_name] = parent_item
+                    if ("service", api_name) in expanded_items:
+                        parent_item.setExpanded(True)
+                    if selected_api_id is not None and selected_api_id == api_name:
+                        self.api_list_widget.setCurrentItem(parent_item)
+                        self.display_api_details(parent_item)
+
+                for api in instances:
+                    label = api.get("name", "N/A") if len(instances) == 1 else f"{api_name} #{api.get('pm_id')}"
+                    status_light_widget = ApiStatusLight(self._display_status(api))
+
+                    api_item = QTreeWidgetItem([label, ""])
+                    api_item.setData(0, Qt.ItemDataRole.UserRole, api) # 將完整的 api_data 存儲在 item 的 user data 中
+                    parent_item.addChild(api_item)
+                    self._api_items[api.get('pm_id')] = api_item
+                    self.api_list_widget.setItemWidget(api_item, 1, status_light_widget) # 將狀態燈號放置在第二列
+
+                    # 恢復選取狀態
+                    if selected_api_id is not None and api.get('pm_id') == selected_api_id:
+                        self.api_list_widget.setCurrentItem(api_item) # 選取該項目
+                        self.display_api_details(api_item) # 重新顯示詳細資訊
+
+        if getattr(self, "health_prober", None) is not None:
+            self.health_prober.set_targets(health_prober.build_targets(parsed_apis))
+        if getattr(self, "log_index", None) is not None:
+            self.log_index.set_sources(log_search.build_sources(parsed_apis))
+        if getattr(self, "error_tracker", None) is not None:
+            self.error_tracker.set_sources(parsed_apis)
+        if getattr(self, "access_monitor", None) is not None:
+            self.access_monitor.set_sources(parsed_apis)
 
     def display_api_details(self, item: QTreeWidgetItem):
         """
@@ -351,40 +536,106 @@ class MainApp(QMainWindow):
             # if api_data.get("name") == "python-api":
             #     print("python-api") # 診斷用
             self._last_selected_item_data = api_data # 儲存選取的項目數據
-            self.api_detail_panel.update_detail(api_data)
+            self._set_poll_focus(self._instance_ids(api_data))
+            self._show_detail(api_data)
             cpu_usage = api_data.get("cpu", 0)
             memory_usage = api_data.get("memory", 0) # 確保這裡傳遞的是原始的位元組值
             self.performance_graph.plot_graph(cpu_usage, memory_usage)
+            self._plot_api_history(api_data)
         else:
             # 如果點擊的是專案，清空詳細面板
             self.api_detail_panel.clear_detail()
             self.performance_graph.clear_graph()
+            self.history_graph.clear_graph()
             self._last_selected_item_data = None # 如果選取了專案，則清空上次選取的 API 數據
+            self._set_poll_focus(())
+
+    def _plot_api_history(self, api_data: dict):
+        """
+        依目前選擇的時間範圍繪製 API 的歷史走勢。較長的範圍會使用彙總數據，並顯示最小/最大值範圍。
+
+        Args:
+            api_data (dict): 選定 API 的數據，沒有選定 API 時為 None。
+        """
+        if not api_data:
+            self.history_graph.clear_graph()
+            return
+        instance_ids = self._instance_ids(api_data)
+        history = pm2_manager.get_api_history_range(instance_ids, self.history_graph.range_seconds())
+        rolled_up = history["resolution"] > config.METRICS_ROLLUP_TIERS[0][0]
+        self.history_graph.plot_history(
+            history["time"], history["cpu"], history["memory"],
+            cpu_range=(history["cpu_min"], history["cpu_max"]) if rolled_up else None,
+            memory_range=(history["memory_min"], history["memory_max"]) if rolled_up else None)
+        access = pm2_manager.get_access_metrics_range(instance_ids, self.history_graph.range_seconds())
+        self.history_graph.plot_latency(self._latency_series(
+            pm2_manager.get_custom_metrics_range(instance_ids, self.history_graph.range_seconds()))
+            + self._access_latency_series(access))
+        self.history_graph.plot_request_rate(
+            [("req/s" if len(access) <= 1 else f"#{pm_id} req/s", history["time"], history["req_rate"])
+             for pm_id, history in access.items()])
+
+    @staticmethod
+    def _access_latency_series(histories: dict) -> list:
+        """
+        把存取記錄統計的歷史數據轉換為延遲圖的 (標籤, 時間, 數值) 列表 (只顯示 p95)。
+
+        Args:
+            histories (dict): pm2_manager.get_access_metrics_range() 的結果。
+        """
+        return [("access p95" if len(histories) <= 1 else f"#{pm_id} access p95", history["time"],
+                 history["latency_p95"])
+                for pm_id, history in histories.items() if history["latency_p95_max"].any()]
+
+    @staticmethod
+    def _latency_series(histories: dict) -> list:
+        """
+        把各程序的自訂指標歷史數據轉換為延遲圖的 (標籤, 時間, 數值) 列表。
+        單一程序顯示所有回報的延遲指標；多個實例只比較各實例的事件迴圈延遲。
+
+        Args:
+            histories (dict): pm2_manager.get_custom_metrics_range() 的結果。
+        """
+        series = []
+        columns = axm_metrics.LATENCY_COLUMNS if len(histories) <= 1 else ("loop_lag",)
+        for pm_id, history in histories.items():
+            for column in columns:
+                if history[f"{column}_max"].any():  # 程序沒有回報的欄位全為 0
+                    label = column if len(histories) <= 1 else f"#{pm_id} {column}"
+                    series.append((label, history["time"], history[column]))
+        return series
 
     def _start_all_projects(self):
         """
         啟動所有專案中的所有 API 服務。
         """
-        self._perform_project_action(pm2_manager.start_project_apis, "啟動所有 API")
+        self._perform_project_action("start", "啟動所有 API")
 
     def _restart_all_projects(self):
         """
         重啟所有專案中的所有 API 服務。
         """
-        self._perform_project_action(pm2_manager.restart_project_apis, "重啟所有 API")
+        self._perform_project_action("restart", "重啟所有 API")
 
     def _stop_all_projects(self):
         """
         停止所有專案中的所有 API 服務。
         """
-        self._perform_project_action(pm2_manager.stop_project_apis, "停止所有 API")
+        self._perform_project_action("stop", "停止所有 API")
+
+    def setup_action_queue(self):
+        """
+        建立操作佇列：重複點擊或重疊的專案與單一 API 操作在佇列中合併，短時間內送出的操作一起派發。
+        """
+        self.action_queue = ActionQueue(progress_callback=self.action_worker.action_progress.emit).start()
+        self.action_worker.action_queue = self.action_queue
 
-    def _perform_project_action(self, action_func, action_name: str, target_projects: set = None):
+    def _perform_project_action(self, verb: str, action_name: str, target_projects: set = None):
         """
         執行一個通用的專案級別 API 操作。
 
         Args:
-            action_func (callable): 要執行的 PM2 管理函數 (e.g., `pm2_manager.start_project_apis`).
+            verb (str): 操作名稱 (e.g., "start", "restart", "stop").
             action_name (str): 操作的名稱 (e.g., "啟動").
             target_projects (set, optional): 要操作的專案名稱集合。如果為 None，則操作所有專案。默認為 None。
         """
@@ -395,10 +646,11 @@ class MainApp(QMainWindow):
             QMessageBox.information(self, "操作提示", f"沒有找到任何可執行的 API 服務來 {action_name}。")
             return
 
+        self._action_progress = {"name": action_name, "total": 0, "done": 0, "failed": 0}
         self.loading_overlay.set_message(f"{action_name} 中...")
         self.loading_overlay.show_overlay()
         # 發射信號以在 worker 線程中執行動作
-        self.perform_action_signal.emit(action_func, action_name, target_projects)
+        self.perform_action_signal.emit(verb, action_name, target_projects)
 
     def setup_data_refresh_timer(self):
         """
@@ -406,10 +658,391 @@ class MainApp(QMainWindow):
         """
         print("setup_data_refresh_timer: 設置定時器")
         self.timer = QTimer(self)
-        self.timer.setInterval(30000) # 將刷新間隔從 5 秒改為 30 秒
+        self.timer.setInterval(config.DATA_REFRESH_INTERVAL * 1000) # 連線到事件匯流排後會改為較長的對帳間隔
         self.timer.timeout.connect(self.load_api_data)
         self.timer.start() # 在這裡啟動定時器，並使其持續運行
 
+    def setup_event_bus(self):
+        """
+        訂閱 PM2 事件匯流排，讓程序狀態的改變立即反映在列表上。
+        訂閱線程透過信號把事件交給主線程處理；無法連線時會自動重試，期間維持原本的定時刷新。
+        """
+        self.reconcile_timer = QTimer(self)
+        self.reconcile_timer.setInterval(1000)
+        self.reconcile_timer.setSingleShot(True)
+        self.reconcile_timer.timeout.connect(self.load_api_data)
+        self.bus_subscriber = None
+        if not config.PM2_USE_BUS:
+            return
+        self.bus_event_received.connect(self.handle_bus_event)
+        self.bus_connection_changed.connect(self.handle_bus_connection_changed)
+        self.bus_subscriber = pm2_bus.PM2BusSubscriber(self.bus_event_received.emit,
+                                                       connection_callback=self.bus_connection_changed.emit,
+                                                       event_types={"process", "exception"})
+        self.bus_subscriber.start()
+
+    def handle_bus_connection_changed(self, connected: bool):
+        """
+        根據事件匯流排的連線狀態調整定時刷新的間隔。連線 (或重新連線) 時會立即對帳一次，補上斷線期間遺漏的事件。
+
+        Args:
+            connected (bool): 是否已連線到事件匯流排。
+        """
+        interval = config.PM2_RECONCILE_INTERVAL if connected else config.DATA_REFRESH_INTERVAL
+        print(f"PM2 事件匯流排{'已連線' if connected else '已斷線'}，刷新間隔改為 {interval} 秒")
+        self.timer.setInterval(interval * 1000)
+        if connected:
+            self.reconcile_timer.start()
+
+    def handle_bus_event(self, event: dict):
+        """
+        將 PM2 事件匯流排的狀態改變套用到列表中對應的 API。
+        找不到對應的 API (新增的程序) 或程序被刪除時，改為延遲重新載入整個列表。
+
+        Args:
+            event (dict): pm2_bus.parse_bus_message() 返回的事件字典。
+        """
+        pm2_manager.invalidate_pm2_snapshot()
+        status = event.get("status")
+        api_item = self._find_api_item(event.get("pm_id"))
+        if api_item is None or status == "deleted":
+            self.reconcile_timer.start()
+            return
+        api_data = dict(api_item.data(0, Qt.ItemDataRole.UserRole), status=status)
+        api_item.setData(0, Qt.ItemDataRole.UserRole, api_data)
+        status_light = self.api_list_widget.itemWidget(api_item, 1)
+        if status_light is not None:
+            status_light.set_status(self._display_status(api_data))
+        if self._last_selected_item_data and self._last_selected_item_data.get("pm_id") == api_data.get("pm_id"):
+            self._last_selected_item_data = api_data
+            self._show_detail(api_data)
+        if api_item.parent() is not None and api_data.get("name") in self._service_items:
+            self._refresh_service_item(api_data.get("name"))
+
+    def _find_api_item(self, pm_id):
+        """
+        在樹狀列表中尋找指定 pm_id 的 API 項目。
+
+        Returns:
+            QTreeWidgetItem: 找到的項目，找不到時返回 None。
+        """
+        if pm_id is None:
+            return None
+        return self._api_items.get(pm_id)
+
+    def setup_poll_scheduler(self):
+        """
+        設置自適應的指標輪詢：每次輪詢只查詢一次程序列表，但只記錄到期的程序，
+        並在最早到期的程序到期時 (至少 POLL_MIN_INTERVAL 秒後) 再次輪詢。
+        """
+        self.poll_scheduler = PollScheduler(subprocess_counter=pm2_manager.get_subprocess_count)
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setSingleShot(True)
+        self.poll_timer.timeout.connect(self.poll_metrics)
+        self.poll_timer.start(int(self.poll_scheduler.next_delay() * 1000))
+
+    def setup_process_sampler(self):
+        """
+        啟動背景 /proc 取樣，並以相同的頻率刷新選定 API 的 CPU/記憶體與歷史圖表。
+        此平台無法取樣時，圖表只在指標輪詢時更新。
+        """
+        self.sample_timer = QTimer(self)
+        self.sample_timer.setInterval(int(config.PROC_SAMPLE_INTERVAL * 1000))
+        self.sample_timer.timeout.connect(self._refresh_selected_sample)
+        if pm2_manager.start_process_sampler():
+            self.sample_timer.start()
+
+    def _refresh_selected_sample(self):
+        """
+        以最近一次的 /proc 取樣結果更新選定 API 的詳細資訊 (包含擴充指標) 與圖表。
+        """
+        api_data = self._last_selected_item_data
+        if not api_data:
+            return
+        instance_ids = self._instance_ids(api_data)
+        samples = {(api_data.get("pm_id"), pm_id): pm2_manager.get_latest_process_sample(pm_id) for pm_id in instance_ids}
+        sample = process_tree.rollup({key: value for key, value in samples.items() if value}).get(api_data.get("pm_id"))
+        if sample is None or "cpu" not in sample:
+            return
+        api_data = dict(api_data, cpu=round(sample["cpu"], 1), memory=sample["memory"],
+                        **format_process_resources(sample))
+        self._last_selected_item_data = api_data
+        self._show_detail(api_data)
+        self.performance_graph.plot_graph(api_data["cpu"], api_data["memory"])
+        if self.history_graph.range_seconds() <= config.METRICS_ROLLUP_TIERS[0][1]:
+            self._plot_api_history(api_data) # 較長的範圍使用彙總數據，不需要每秒重繪
+
+    def poll_metrics(self):
+        """
+        在 worker 線程中執行一次輕量指標輪詢，上一輪尚未完成時跳過。
+        """
+        if self._poll_in_progress:
+            return
+        self._poll_in_progress = True
+        self.poll_metrics_signal.emit(self.poll_scheduler)
+
+    def handle_metrics_polled(self, raw_pm2_list: list):
+        """
+        將輕量輪詢的結果就地套用到列表：更新狀態改變的燈號，以及選定 API 的詳細資訊與圖表，
+        然後依排程器排定下一次輪詢。
+
+        Args:
+            raw_pm2_list (list): pm2_manager.get_pm2_list() 返回的原始程序列表。
+        """
+        self._poll_in_progress = False
+        self._update_daemon_status()
+        selected_id = self._last_selected_item_data.get("pm_id") if self._last_selected_item_data else None
+        changed_services = set()
+        for api in raw_pm2_list:
+            pm_id = api.get("pm_id")
+            api_item = self._find_api_item(pm_id)
+            if api_item is None:
+                continue
+            api_data = api_item.data(0, Qt.ItemDataRole.UserRole)
+            status = api.get("pm2_env", {}).get("status", "unknown")
+            monit = api.get("monit", {})
+            if pm_id != selected_id and api_data.get("status") == status:
+                continue
+            api_data = dict(api_data, status=status, cpu=monit.get("cpu", 0), memory=monit.get("memory", 0),
+                            **format_custom_metrics(api.get("pm2_env", {}).get("axm_monitor")))
+            api_item.setData(0, Qt.ItemDataRole.UserRole, api_data)
+            status_light = self.api_list_widget.itemWidget(api_item, 1)
+            if status_light is not None:
+                status_light.set_status(self._display_status(api_data))
+            if api_item.parent() is not None and api_data.get("name") in self._service_items:
+                changed_services.add(api_data.get("name"))
+            if pm_id == selected_id:
+                self._last_selected_item_data = api_data
+                self._show_detail(api_data)
+                self.performance_graph.plot_graph(api_data["cpu"], api_data["memory"])
+                self._plot_api_history(api_data)
+        for name in changed_services:
+            self._refresh_service_item(name)
+        self.poll_timer.start(int(self.poll_scheduler.next_delay() * 1000))
+
+    def _refresh_service_item(self, name: str):
+        """
+        依各實例目前的數據重新計算服務項目的彙總狀態與使用量；選定的是該服務時一併更新詳細面板。
+
+        Args:
+            name (str): 服務 (實例共用) 的名稱。
+        """
+        service_item = self._service_items.get(name)
+        if service_item is None:
+            return
+        instances = [service_item.child(i).data(0, Qt.ItemDataRole.UserRole) for i in range(service_item.childCount())]
+        service = process_tree.aggregate_instances(instances)
+        service_item.setData(0, Qt.ItemDataRole.UserRole, service)
+        status_light = self.api_list_widget.itemWidget(service_item, 1)
+        if status_light is not None:
+            status_light.set_status(self._display_status(service))
+        if self._last_selected_item_data and self._last_selected_item_data.get("pm_id") == name:
+            self._last_selected_item_data = service
+            self._show_detail(service)
+            self.performance_graph.plot_graph(service["cpu"], service["memory"])
+
+    @staticmethod
+    def _instance_ids(api_data: dict) -> list:
+        """
+        返回 API 項目對應的 pm_id 列表：服務項目為所有實例，一般 API 為自己的 pm_id。
+        """
+        return api_data.get("instance_ids") or [api_data.get("pm_id")]
+
+    def _set_poll_focus(self, pm_ids):
+        """
+        讓排程器以最短間隔輪詢選定的 API (服務項目為所有實例)；焦點改變時立即輪詢一次。
+        """
+        scheduler = getattr(self, "poll_scheduler", None)
+        if scheduler is None:
+            return
+        focus = set(pm_ids)
+        if focus == scheduler.focus:
+            return
+        scheduler.set_focus(focus)
+        if focus:
+            self.poll_timer.start(0)
+
+    def _show_detail(self, api_data: dict):
+        """
+        在詳細面板顯示 API 數據，並加上目前的輪詢間隔、健康檢查結果、最常見的錯誤與存取記錄統計。
+        """
+        instance_ids = self._instance_ids(api_data)
+        tracker = getattr(self, "error_tracker", None)
+        top_errors = tracker.top(name=api_data.get("name")) if tracker is not None else []
+        self.api_detail_panel.update_detail(dict(api_data, poll_interval=self._format_poll_interval(instance_ids[0]),
+                                                 health=self._format_health(instance_ids),
+                                                 top_errors=error_fingerprint.format_top_errors(top_errors),
+                                                 access_summary=self._format_access(instance_ids)))
+
+    def _format_access(self, pm_ids: list) -> str:
+        """
+        返回存取記錄統計的文字；多個實例時分別列出有數據的實例。
+        """
+        monitor = getattr(self, "access_monitor", None)
+        if monitor is None:
+            return "N/A"
+        if len(pm_ids) == 1:
+            return access_log.format_access(monitor.latest(pm_ids[0]))
+        parts = [f"#{pm_id} {access_log.format_access(monitor.latest(pm_id))}" for pm_id in pm_ids
+                 if monitor.latest(pm_id) is not None]
+        return "；".join(parts) or "N/A"
+
+    def _health_result(self, pm_id) -> dict:
+        prober = getattr(self, "health_prober", None)
+        return prober.result(pm_id) if prober is not None else None
+
+    def _display_status(self, api_data: dict) -> str:
+        """
+        返回狀態燈號要顯示的狀態：PM2 顯示 online 但健康檢查判定為 degraded 的 API 顯示為 degraded
+        (服務項目只要有一個實例 degraded 即是)。
+        """
+        status = api_data.get("status", "unknown")
+        for pm_id in self._instance_ids(api_data):
+            if health_prober.derive_status(status, self._health_result(pm_id)) == health_prober.DEGRADED_STATUS:
+                return health_prober.DEGRADED_STATUS
+        return status
+
+    def _format_health(self, pm_ids: list) -> str:
+        """
+        返回健康檢查結果的文字；多個實例時分別列出。
+        """
+        if len(pm_ids) == 1:
+            return health_prober.format_health(self._health_result(pm_ids[0]))
+        return "；".join(f"#{pm_id} {health_prober.format_health(self._health_result(pm_id))}" for pm_id in pm_ids)
+
+    def setup_health_prober(self):
+        """
+        啟動背景 HTTP 健康檢查。檢查線程透過信號把結果交給主線程，只有 degraded 狀態改變
+        或選定的 API 才需要更新畫面。目標在每次重新載入列表時更新。
+        """
+        self.health_prober = None
+        if not config.HEALTH_PROBE_ENABLED:
+            return
+        self.health_result_received.connect(self.handle_health_result)
+        self.health_prober = health_prober.HealthProber(callback=self.health_result_received.emit).start()
+
+    def handle_health_result(self, pm_id, result: dict):
+        """
+        將健康檢查結果套用到對應 API 的狀態燈號與詳細面板。
+
+        Args:
+            pm_id: 被檢查 API 的 PM2 ID。
+            result (dict): HealthProber.result() 格式的結果字典。
+        """
+        api_item = self._find_api_item(pm_id)
+        if api_item is None:
+            return
+        api_data = api_item.data(0, Qt.ItemDataRole.UserRole)
+        status_light = self.api_list_widget.itemWidget(api_item, 1)
+        if status_light is not None:
+            status_light.set_status(self._display_status(api_data))
+        if api_item.parent() is not None and api_data.get("name") in self._service_items:
+            self._refresh_service_item(api_data.get("name"))
+        if self._last_selected_item_data and self._last_selected_item_data.get("pm_id") == pm_id:
+            self._show_detail(self._last_selected_item_data)
+
+    def setup_log_index(self):
+        """
+        開啟日誌全文索引並啟動背景索引線程。要索引的日誌檔在每次重新載入列表時更新。
+        另一個實例正在索引時只開放搜尋。
+        """
+        self.log_index = None
+        if not config.LOG_SEARCH_ENABLED:
+            return
+        try:
+            self.log_index = log_search.LogIndex().start()
+        except OSError as e:
+            print(f"錯誤：無法開啟日誌索引目錄。錯誤訊息：{e}")
+
+    def _open_log_search(self, project_name: str = None):
+        """
+        開啟日誌搜尋對話框。
+
+        Args:
+            project_name (str, optional): 默認的專案範圍。默認為全部專案。
+        """
+        if self.log_index is None:
+            QMessageBox.warning(self, "搜尋日誌", "日誌索引未啟用")
+            return
+        root = self.api_list_widget.invisibleRootItem()
+        projects = [root.child(i).text(0) for i in range(root.childCount())]
+        dialog = LogSearchDialog(self.log_index.search, projects, project_name, self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+
+    def setup_error_tracker(self):
+        """
+        啟動背景錯誤指紋追蹤。要追蹤的錯誤日誌在每次重新載入列表時更新。
+        """
+        self.error_tracker = None
+        if not config.ERROR_FINGERPRINT_ENABLED:
+            return
+        self.error_tracker = error_fingerprint.ErrorTracker().start()
+
+    def setup_access_monitor(self):
+        """
+        啟動背景存取記錄統計，結果寫入歷史數據。要追蹤的日誌與格式在每次重新載入列表時更新。
+        """
+        self.access_monitor = None
+        if not config.ACCESS_LOG_ENABLED:
+            return
+        self.access_monitor = access_log.AccessLogMonitor(pm2_manager.record_access_metrics).start()
+
+    def _open_top_errors(self, name: str = None, project_name: str = None):
+        """
+        開啟錯誤排行對話框。
+
+        Args:
+            name (str, optional): 只顯示此 API 的錯誤。
+            project_name (str, optional): 只顯示此專案的錯誤。
+        """
+        if self.error_tracker is None:
+            QMessageBox.warning(self, "錯誤排行", "錯誤指紋追蹤未啟用")
+            return
+        tracker = self.error_tracker
+        dialog = TopErrorsDialog(name or project_name or "所有 API",
+                                 lambda: tracker.top(name=name, project_name=project_name, limit=50), self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+
+    def _format_poll_interval(self, pm_id) -> str:
+        """
+        返回選定 API 目前的輪詢間隔文字 (已套用開銷預算的倍數)。
+        """
+        scheduler = getattr(self, "poll_scheduler", None)
+        cadence = scheduler.cadence(pm_id) if scheduler is not None else None
+        if cadence is None:
+            return "N/A"
+        if scheduler.throttle > 1:
+            return f"{cadence:.0f} 秒 (節流 ×{scheduler.throttle:.1f})"
+        return f"{cadence:.0f} 秒"
+
+    def closeEvent(self, event):
+        """
+        關閉視窗時停止事件匯流排訂閱線程、操作佇列、健康檢查、日誌索引、錯誤追蹤、存取記錄統計、指標輪詢與 /proc 取樣。
+
+        Args:
+            event (QCloseEvent): 關閉事件。
+        """
+        if getattr(self, "bus_subscriber", None) is not None:
+            self.bus_subscriber.stop()
+        if getattr(self, "action_queue", None) is not None:
+            self.action_queue.stop()
+        if getattr(self, "health_prober", None) is not None:
+            self.health_prober.stop()
+        if getattr(self, "log_index", None) is not None:
+            self.log_index.close()
+        if getattr(self, "error_tracker", None) is not None:
+            self.error_tracker.stop()
+        if getattr(self, "access_monitor", None) is not None:
+            self.access_monitor.stop()
+        if getattr(self, "poll_timer", None) is not None:
+            self.poll_timer.stop()
+        if getattr(self, "sample_timer", None) is not None:
+            self.sample_timer.stop()
+            pm2_manager.stop_process_sampler()
+        super().closeEvent(event)
+
     def handle_error(self, error_message: str):
         """
         處理在 Worker 線程中發生的錯誤並顯示錯誤訊息。
@@ -439,6 +1072,31 @@ class MainApp(QMainWindow):
         else:
             QMessageBox.critical(self, "操作失敗", f"{action_name} 失敗。成功 {success_count} / {total_count} 個 API。")
 
+    def handle_action_progress(self, event: dict):
+        """
+        處理專案操作中單一 API 的進度事件，並在加載覆蓋層上顯示即時進度。
+
+        Args:
+            event (dict): ActionExecutor 發出的進度事件，包含 name、state、duration 和 error。
+        """
+        progress = self._action_progress
+        state = event.get("state")
+        if state == rolling_restart.STEP_EVENT:
+            step = event["step"]
+            print(f"{progress['name']} - 第 {step['batch']} 批 ({event.get('name')}): 操作 {step['action']:.2f} 秒，"
+                  f"online {step['online']:.2f} 秒，健康檢查 {step['health']:.2f} 秒")
+        elif state == STATE_QUEUED:
+            progress["total"] += 1
+        elif state in (STATE_OK, STATE_FAILED):
+            progress["done"] += 1
+            if state == STATE_FAILED:
+                progress["failed"] += 1
+            print(f"{progress['name']} - {event.get('name')}: {state} ({event.get('duration', 0):.2f} 秒)")
+        message = f"{progress['name']} 中... {progress['done']} / {progress['total']}"
+        if progress["failed"]:
+            message += f" (失敗 {progress['failed']})"
+        self.loading_overlay.set_message(message)
+
     def handle_single_action_completed(self, success: bool, api_name: str, action_type: str, message: str):
         """
         處理單一 API 操作完成的結果。
@@ -459,22 +1117,14 @@ class MainApp(QMainWindow):
         print("load_api_data_finished: 數據載入完成，隱藏 overlay，重置旗標")
         self.data_ready_for_overlay_hide = True # 數據已準備好隱藏疊加層
         self._check_and_hide_overlay() # 嘗試隱藏疊加層
+        self._update_daemon_status()
         # 確保在數據載入完成後，如果之前有選取的項目，重新選取並顯示其詳細信息
         if self._last_selected_item_data:
             pm_id_to_select = self._last_selected_item_data.get('pm_id')
-            if pm_id_to_select:
-                root = self.api_list_widget.invisibleRootItem()
-                for i in range(root.childCount()):
-                    project_item = root.child(i)
-                    for j in range(project_item.childCount()):
-                        api_item = project_item.child(j)
-                        api_data = api_item.data(0, Qt.ItemDataRole.UserRole)
-                        if api_data and api_data.get('pm_id') == pm_id_to_select:
-                            self.api_list_widget.setCurrentItem(api_item) # 選取該項目
-                            self.display_api_details(api_item) # 重新顯示詳細資訊
-                            break
-                    if self.api_list_widget.currentItem(): # 如果已選取，則退出外層循環
-                        break
+            api_item = self._find_api_item(pm_id_to_select) or self._service_items.get(pm_id_to_select)
+            if api_item is not None:
+                self.api_list_widget.setCurrentItem(api_item) # 選取該項目
+                self.display_api_details(api_item) # 重新顯示詳細資訊
 
     def _show_context_menu(self, point):
         """
@@ -496,6 +1146,13 @@ class MainApp(QMainWindow):
                 start_project_action.triggered.connect(lambda: self._start_selected_project_apis(project_name))
                 stop_project_action.triggered.connect(lambda: self._stop_selected_project_apis(project_name))
                 restart_project_action.triggered.connect(lambda: self._restart_selected_project_apis(project_name)) # 新增重啟
+                rolling_action = menu.addAction(f"滾動重啟 {project_name}...")
+                rolling_action.triggered.connect(lambda: self._rolling_restart_project(project_name))
+                menu.addSeparator()
+                search_action = menu.addAction(f"搜尋 {project_name} 日誌")
+                search_action.triggered.connect(lambda: self._open_log_search(project_name))
+                errors_action = menu.addAction(f"錯誤排行 {project_name}")
+                errors_action.triggered.connect(lambda: self._open_top_errors(project_name=project_name))
             else: # API item
                 # 單一 API 層級的菜單
                 api_id = api_data.get("pm_id") if api_data else None
@@ -507,9 +1164,72 @@ class MainApp(QMainWindow):
                     start_action.triggered.connect(lambda: self.perform_single_action_signal.emit(pm2_manager.start_api, str(api_id), api_name, "啟動"))
                     restart_action.triggered.connect(lambda: self.perform_single_action_signal.emit(pm2_manager.restart_api, str(api_id), api_name, "重啟"))
                     stop_action.triggered.connect(lambda: self.perform_single_action_signal.emit(pm2_manager.stop_api, str(api_id), api_name, "停止"))
+                    if str(api_data.get("port", "")).isdigit():
+                        menu.addSeparator()
+                        load_test_action = menu.addAction(f"壓力測試 {api_name}")
+                        load_test_action.triggered.connect(lambda: self._open_load_test(api_data))
+                    menu.addSeparator()
+                    errors_action = menu.addAction(f"錯誤排行 {api_name}")
+                    errors_action.triggered.connect(lambda: self._open_top_errors(name=api_name))
 
             menu.exec(self.api_list_widget.mapToGlobal(point))
 
+    def _open_load_test(self, api_data: dict):
+        """
+        開啟對選定 API (使用 api.json 中的端口) 的壓力測試對話框。
+
+        Args:
+            api_data (dict): 選定 API 或服務項目的數據。
+        """
+        metadata = api_data.get("metadata") or {}
+        dialog = LoadTestDialog(api_data.get("name", "N/A"), metadata.get("health_path", "/"), self)
+        dialog.start_requested.connect(lambda options: self._start_load_test(dialog, api_data, options))
+        dialog.finished.connect(lambda _: self._load_test_dialogs.discard(dialog))
+        self._load_test_dialogs.add(dialog)
+        dialog.show()
+
+    def _start_load_test(self, dialog: LoadTestDialog, api_data: dict, options: dict):
+        """
+        在背景線程中執行壓力測試。測試期間讓排程器以最短間隔輪詢該 API，
+        以便之後對照同一段時間的 CPU/記憶體。
+
+        Args:
+            dialog (LoadTestDialog): 發出請求的對話框。
+            api_data (dict): 目標 API 的數據。
+            options (dict): LoadTestDialog.options() 的設定。
+        """
+        instance_ids = self._instance_ids(api_data)
+        self._set_poll_focus(instance_ids)
+        host = (api_data.get("metadata") or {}).get("host", "localhost")
+        port = int(api_data.get("port"))
+
+        def run():
+            try:
+                report = asyncio.run(load_generator.run_load_test(
+                    host, port, options["path"], options["mode"], concurrency=options["concurrency"],
+                    rate=options["rate"], duration=options["duration"]))
+                report["pm_ids"] = instance_ids
+            except Exception as e:
+                report = {"error": str(e)}
+            self.load_test_finished.emit(dialog, report)
+
+        threading.Thread(target=run, name="load-test", daemon=True).start()
+
+    def handle_load_test_finished(self, dialog: LoadTestDialog, report: dict):
+        """
+        在對話框中顯示壓力測試報告，並附上測試期間該程序的 CPU/記憶體摘要。
+
+        Args:
+            dialog (LoadTestDialog): 發出請求的對話框。
+            report (dict): load_generator.run_load_test() 的結果，失敗時只包含 error。
+        """
+        if "error" in report:
+            dialog.show_report(f"壓力測試失敗：{report['error']}")
+            return
+        report["resources"] = pm2_manager.get_resource_summary(report["pm_ids"], report["started_at"],
+                                                               report["ended_at"] + 1)
+        dialog.show_report(load_generator.format_report(report))
+
     def _stop_selected_project_apis(self, project_name: str):
         """
         停止選定專案中的所有 API 服務。
@@ -517,7 +1237,7 @@ class MainApp(QMainWindow):
         Args:
             project_name (str): 要停止的專案名稱。
         """
-        self._perform_project_action(pm2_manager.stop_project_apis, f"停止 {project_name} 的 API", {project_name})
+        self._perform_project_action("stop", f"停止 {project_name} 的 API", {project_name})
 
     def _start_selected_project_apis(self, project_name: str):
         """
@@ -526,7 +1246,7 @@ class MainApp(QMainWindow):
         Args:
             project_name (str): 要啟動的專案名稱。
         """
-        self._perform_project_action(pm2_manager.start_project_apis, f"啟動 {project_name} 的 API", {project_name})
+        self._perform_project_action("start", f"啟動 {project_name} 的 API", {project_name})
 
     def _restart_selected_project_apis(self, project_name: str):
         """
@@ -535,7 +1255,88 @@ class MainApp(QMainWindow):
         Args:
             project_name (str): 要重啟的專案名稱。
         """
-        self._perform_project_action(pm2_manager.restart_project_apis, f"重啟 {project_name} 的 API", {project_name})
+        self._perform_project_action("restart", f"重啟 {project_name} 的 API", {project_name})
+
+    def _rolling_restart_project(self, project_name: str):
+        """
+        詢問批次大小後滾動重啟專案的所有 API 實例。
+
+        Args:
+            project_name (str): 要重啟的專案名稱。
+        """
+        batch_size, accepted = QInputDialog.getInt(self, "滾動重啟", f"{project_name} 每批重啟的實例數：",
+                                                   config.ROLLING_RESTART_BATCH_SIZE, 1, 100)
+        if not accepted:
+            return
+        action_name = f"滾動重啟 {project_name}"
+        self._action_progress = {"name": action_name, "total": 0, "done": 0, "failed": 0}
+        self.loading_overlay.set_message(f"{action_name} 中...")
+        self.loading_overlay.show_overlay()
+        error_rate = self._access_error_rate if getattr(self, "access_monitor", None) is not None else None
+        self.perform_rolling_restart_signal.emit(project_name, batch_size, error_rate)
+
+    def _access_error_rate(self, pm_ids: list):
+        """
+        以存取記錄統計最近一輪的結果計算實例的 5xx 比例，沒有流量時返回 None。
+        """
+        latest = [self.access_monitor.latest(pm_id) for pm_id in pm_ids]
+        latest = [values for values in latest if values]
+        requests = sum(values["req_rate"] for values in latest)
+        return sum(values["rate_5xx"] for values in latest) / requests if requests else None
+
+    def handle_rolling_restart_completed(self, report: dict, action_name: str):
+        """
+        顯示滾動重啟的結果與每一批的計時。
+
+        Args:
+            report (dict): RollingRestart.run() 的報告。
+            action_name (str): 操作名稱。
+        """
+        self.loading_overlay.hide_overlay()
+        if not report["results"]:
+            QMessageBox.information(self, "操作提示", f"沒有找到任何 API 來 {action_name}。")
+        elif report["ok"]:
+            QMessageBox.information(self, "操作成功", f"{action_name} 完成。\n{rolling_restart.format_steps(report)}")
+        else:
+            QMessageBox.critical(self, "操作失敗", f"{action_name} 已中止：{report['aborted']}\n"
+                                                    f"{rolling_restart.format_steps(report)}")
+
+    def _cancel_pending_commands(self):
+        """
+        取消進行中的 PM2 命令並立即解除載入狀態，讓之後的刷新不會被卡住的命令阻擋。
+        已經在執行的子程序仍會在期限內結束。
+        """
+        print("取消進行中的 PM2 命令。")
+        pm2_manager.cancel_pending_commands()
+        self.loading_overlay.hide_overlay()
+        self.data_loading_in_progress = False
+        self.data_ready_for_overlay_hide = False
+
+    def _update_daemon_status(self):
+        """
+        守護程序沒有回應時在標題旁顯示警告 (列表為快取數據)，並在提示中列出每種命令的延遲統計與操作佇列的統計。
+        """
+        health = pm2_manager.get_daemon_health()
+        lines = []
+        for kind, stats in sorted(pm2_manager.get_command_stats().items()):
+            line = f"{kind}: {stats['count']} 次，逾時 {stats['timeouts']}，錯誤 {stats['errors']}"
+            if stats["p50"] is not None:
+                line += f"，p50 {stats['p50']:.0f} ms，p95 {stats['p95']:.0f} ms"
+            lines.append(line)
+        queue = self.action_queue.get_metrics()
+        line = (f"操作佇列: 深度 {queue['depth']}，合併 {queue['merged']}，取代 {queue['superseded']}，"
+                f"批次 {queue['batches']}")
+        if queue["wait_p50"] is not None:
+            line += f"，等待 p50 {queue['wait_p50']:.0f} ms，p95 {queue['wait_p95']:.0f} ms"
+        lines.append(line)
+        self.daemon_status_label.setToolTip("\n".join(lines))
+        if health["responsive"]:
+            self.daemon_status_label.hide()
+            return
+        since = health["since_success"]
+        age = f"，資料為 {since:.0f} 秒前" if since is not None else ""
+        self.daemon_status_label.setText(f"PM2 守護程序沒有回應{age}")
+        self.daemon_status_label.show()
 
     def _refresh_data_after_action(self):
         """
@@ -559,6 +1360,7 @@ def main():
     """
     app = QApplication(sys.argv)
     app.setStyleSheet(load_stylesheet("style.qss")) # 載入 QSS 樣式表
+    pm2_manager.open_metrics_history() # 映射磁碟上的歷史數據，讓重新啟動前的數據也能顯示
     main_app = MainApp()
     main_app.show()
     sys.exit(app.exec())
@@ -0,0 +1,271 @@
+"""
+metrics_persist.py
+
+此模組提供歷史數據的磁碟環形檔案格式。每個程序的每一層解析度各有一個固定大小的檔案，
+以 mmap 直接映射成 NumPy 陣列，寫入一筆數據只會弄髒記憶體頁面而不需要額外的系統呼叫，
+由作業系統在背景寫回磁碟。檔案格式如下 (小端序)：
+
+    [0:8]     魔術字串 b"PM2RING1"
+    [8:24]    uint32 × 4：capacity、欄位數、寫入位置、數據點數
+    [24:1024] 以逗號分隔的欄位名稱 (UTF-8，以 NUL 補齊)
+    [1024:]   int64 時間戳 × (2 × capacity)，接著 float32 數值 × (欄位數 × 2 × capacity)
+"""
+
+import mmap
+import os
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl，此時不做跨程序的寫入鎖定
+    fcntl = None
+
+MAGIC = b"PM2RING1"
+HEADER_SIZE = 1024
+RING_SUFFIX = ".ring"
+LOCK_FILENAME = ".lock"
+_COLUMNS_OFFSET = 24
+
+
+def ring_file_size(capacity: int, column_count: int) -> int:
+    """
+    計算環形檔案的大小 (bytes)。
+    """
+    return HEADER_SIZE + 2 * capacity * 8 + column_count * 2 * capacity * 4
+
+
+def key_to_filename(key) -> str:
+    """
+    將程序識別值轉換為檔案名稱。
+    """
+    return f"{key}{RING_SUFFIX}"
+
+
+def filename_to_key(filename: str):
+    """
+    將檔案名稱轉換回程序識別值 (數字會轉回 int)，不是環形檔案時返回 None。
+    """
+    if not filename.endswith(RING_SUFFIX):
+        return None
+    stem = filename[:-len(RING_SUFFIX)]
+    return int(stem) if stem.isdigit() else stem
+
+
+class RingFile:
+    """
+    映射到記憶體的環形檔案。
+
+    Attributes:
+        path (str): 檔案路徑。
+        meta (np.ndarray): uint32 × 4 的表頭視圖 (capacity、欄位數、寫入位置、數據點數)。
+        times (np.ndarray): int64 時間戳視圖，長度為 2 × capacity。
+        values (np.ndarray): float32 數值視圖，形狀為 (欄位數, 2 × capacity)。
+        columns (tuple): 欄位名稱。
+        readonly (bool): 是否以唯讀方式映射。
+    """
+    def __init__(self, path: str, buffer, readonly: bool):
+        self.path = path
+        self.readonly = readonly
+        self._buffer = buffer
+        self.meta = np.frombuffer(buffer, dtype='<u4', count=4, offset=8)
+        capacity, column_count = int(self.meta[0]), int(self.meta[1])
+        self.times = np.frombuffer(buffer, dtype='<i8', count=2 * capacity, offset=HEADER_SIZE)
+        self.values = np.frombuffer(buffer, dtype='<f4', count=column_count * 2 * capacity,
+                                    offset=HEADER_SIZE + 2 * capacity * 8).reshape(column_count, 2 * capacity)
+        raw_columns = bytes(buffer[_COLUMNS_OFFSET:HEADER_SIZE]).rstrip(b"\0").decode('utf-8')
+        self.columns = tuple(raw_columns.split(",")) if raw_columns else ()
+
+    def last_timestamp(self):
+        """
+        返回最後一筆數據的時間戳，沒有數據時返回 None。
+        """
+        capacity, pos, count = int(self.meta[0]), int(self.meta[2]), int(self.meta[3])
+        if count == 0:
+            return None
+        return int(self.times[pos + capacity - 1])
+
+
+def _read_header(path: str):
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:8] != MAGIC:
+        return None
+    capacity, column_count = np.frombuffer(header, dtype='<u4', count=2, offset=8)
+    return int(capacity), int(column_count), os.path.getsize(path)
+
+
+def open_ring_file(path: str, readonly: bool = False):
+    """
+    映射一個已存在的環形檔案。
+
+    Args:
+        path (str): 檔案路徑。
+        readonly (bool, optional): 是否以唯讀方式映射。默認為 False。
+
+    Returns:
+        RingFile: 映射後的檔案；檔案不存在或格式不正確時返回 None。
+    """
+    try:
+        header = _read_header(path)
+        if header is None or header[2] != ring_file_size(header[0], header[1]):
+            return None
+        with open(path, 'rb' if readonly else 'r+b') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE)
+    except (OSError, ValueError):
+        return None
+    return RingFile(path, buffer, readonly)
+
+
+def create_ring_file(path: str, capacity: int, columns: tuple) -> RingFile:
+    """
+    建立 (或覆蓋) 一個空的環形檔案並以讀寫方式映射。
+
+    Args:
+        path (str): 檔案路徑。
+        capacity (int): 數據點數上限。
+        columns (tuple): 欄位名稱。
+
+    Returns:
+        RingFile: 映射後的檔案。
+    """
+    encoded = ",".join(columns).encode('utf-8')
+    if len(encoded) > HEADER_SIZE - _COLUMNS_OFFSET:
+        raise ValueError("欄位名稱過長，無法寫入環形檔案表頭")
+    header = bytearray(HEADER_SIZE)
+    header[:8] = MAGIC
+    header[8:24] = np.array([capacity, len(columns), 0, 0], dtype='<u4').tobytes()
+    header[_COLUMNS_OFFSET:_COLUMNS_OFFSET + len(encoded)] = encoded
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.truncate(ring_file_size(capacity, len(columns)))
+    os.replace(tmp_path, path)
+    return open_ring_file(path)
+
+
+def resize_ring_file(path: str, capacity: int, columns: tuple) -> RingFile:
+    """
+    將環形檔案改寫為新的 capacity/欄位 (壓縮)，保留最新的數據點與兩邊都有的欄位。
+
+    Args:
+        path (str): 檔案路徑。
+        capacity (int): 新的數據點數上限。
+        columns (tuple): 新的欄位名稱。
+
+    Returns:
+        RingFile: 改寫後以讀寫方式映射的檔案。
+    """
+    old = open_ring_file(path, readonly=True)
+    new = create_ring_file(path + ".new", capacity, columns)
+    if old is not None:
+        old_capacity, pos, count = int(old.meta[0]), int(old.meta[2]), int(old.meta[3])
+        keep = min(count, capacity)
+        end = pos + old_capacity
+        new.times[:keep] = new.times[capacity:capacity + keep] = old.times[end - keep:end]
+        for index, name in enumerate(columns):
+            if name in old.columns:
+                source = old.values[old.columns.index(name), end - keep:end]
+                new.values[index, :keep] = new.values[index, capacity:capacity + keep] = source
+        new.meta[2] = keep % capacity
+        new.meta[3] = keep
+        del old
+    new._buffer.flush()
+    del new
+    os.replace(path + ".new", path)
+    return open_ring_file(path)
+
+
+def compact_directory(path: str, capacity: int, columns: tuple, retention_ms: int = None,
+                      now_ms: int = None, max_bytes: int = None, keep: set = ()) -> list:
+    """
+    整理一個解析度層的目錄：移除超過保留期限或無法辨識的檔案，改寫 capacity/欄位與目前設定不同的檔案，
+    並在總大小超過上限時從最久沒有更新的程序開始刪除。
+
+    Args:
+        path (str): 目錄路徑。
+        capacity (int): 目前設定的數據點數上限。
+        columns (tuple): 目前設定的欄位名稱。
+        retention_ms (int, optional): 最後一筆數據超過多久 (毫秒) 就刪除。默認為不限。
+        now_ms (int, optional): 目前的 epoch 毫秒時間戳。
+        max_bytes (int, optional): 目錄總大小上限。默認為不限。
+        keep (set, optional): 不可刪除的程序識別值 (例如仍在收集中的程序)。
+
+    Returns:
+        list: 被刪除的程序識別值。
+    """
+    removed = []
+    entries = []
+    try:
+        filenames = os.listdir(path)
+    except OSError:
+        return removed
+    for filename in filenames:
+        file_path = os.path.join(path, filename)
+        key = filename_to_key(filename)
+        if key is None:
+            if filename.endswith((".tmp", ".new")):
+                os.remove(file_path)
+            continue
+        ring = open_ring_file(file_path, readonly=True)
+        if ring is None:
+            os.remove(file_path)
+            removed.append(key)
+            continue
+        last = ring.last_timestamp()
+        mismatched = int(ring.meta[0]) != capacity or ring.columns != tuple(columns)
+        del ring
+        if key not in keep and (last is None or (retention_ms is not None and now_ms - last > retention_ms)):
+            os.remove(file_path)
+            removed.append(key)
+            continue
+        if mismatched and key not in keep:
+            resize_ring_file(file_path, capacity, columns)
+        entries.append((last or 0, key, file_path))
+
+    if max_bytes is not None:
+        total = sum(os.path.getsize(p) for _, _, p in entries)
+        for _, key, file_path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= max_bytes:
+                break
+            if key in keep:
+                continue
+            total -= os.path.getsize(file_path)
+            os.remove(file_path)
+            removed.append(key)
+    return removed
+
+
+class WriterLock:
+    """
+    歷史數據目錄的寫入鎖。同一時間只有一個應用程式實例可以寫入，其他實例以唯讀方式映射。
+    """
+    def __init__(self, path: str):
+        self.path = os.path.join(path, LOCK_FILENAME)
+        self._file = None
+
+    def acquire(self) -> bool:
+        """
+        嘗試取得寫入鎖 (不等待)。
+
+        Returns:
+            bool: 成功取得時返回 True。
+        """
+        if fcntl is None:
+            return True
+        self._file = open(self.path, 'a')
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self):
+        """
+        釋放寫入鎖。
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,664 @@
+"""
+metrics_store.py
+
+此模組提供以 NumPy 為基礎的欄式環形緩衝區，用來儲存每個 PM2 程序的 CPU/記憶體歷史數據，
+以及在其上按時間桶逐層彙總 min/avg/max 的多解析度儲存區。
+每個程序預先配置固定大小的 float32 數值欄位與 int64 epoch 毫秒時間戳，新增一筆是 O(1)，
+讀取最近 N 筆時默認直接返回底層陣列的視圖 (不複製)，
+要把數據交給其他線程 (例如 GUI) 的呼叫端以 copy=True 取得在鎖內複製的陣列。長時間沒有更新的程序會依 TTL 被移除，
+程序數超過上限時則依 LRU 移除最久沒有更新的程序。
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src import metrics_persist
+
+DEFAULT_COLUMNS = ("cpu", "memory")
+"""
+默認的數值欄位：CPU 使用率 (%) 與記憶體使用量 (MB)。
+"""
+
+
+class _Series:
+    """
+    單一程序的環形緩衝區。
+
+    每一筆數據會同時寫入位置 i 與 i + capacity (雙寫)，因此任何最近 N 筆
+    (N <= capacity) 都是陣列中的一段連續區間，可以直接以切片視圖返回。
+    寫入位置與數據點數存放在 meta 陣列中，陣列可以是記憶體中的，也可以是映射到磁碟檔案的視圖。
+    """
+    __slots__ = ("capacity", "meta", "times", "values", "last_seen", "ring")
+
+    def __init__(self, capacity: int, column_count: int, ring=None):
+        self.capacity = capacity
+        self.ring = ring
+        if ring is not None:
+            self.meta, self.times, self.values = ring.meta, ring.times, ring.values
+        else:
+            self.meta = np.array([capacity, column_count, 0, 0], dtype=np.uint32)
+            self.times = np.zeros(2 * capacity, dtype=np.int64)
+            self.values = np.zeros((column_count, 2 * capacity), dtype=np.float32)
+        self.last_seen = 0.0
+
+    def append(self, timestamp_ms: int, values):
+        pos = int(self.meta[2])
+        mirror = pos + self.capacity
+        self.times[pos] = self.times[mirror] = timestamp_ms
+        self.values[:, pos] = self.values[:, mirror] = values
+        # 先寫數據再更新位置，映射的檔案在任何時間點被讀取都是一致的
+        self.meta[2] = (pos + 1) % self.capacity
+        if self.meta[3] < self.capacity:
+            self.meta[3] += 1
+
+    def bounds(self, points: int = None) -> tuple:
+        count = int(self.meta[3])
+        n = count if points is None else max(0, min(points, count))
+        end = int(self.meta[2]) + self.capacity
+        return end - n, end
+
+
+class MetricsStore:
+    """
+    多個程序共用的指標儲存區。
+
+    返回的陣列默認是環形緩衝區的視圖，只保證在該程序下一次 append() 之前內容不變，只適合與寫入端同一個線程的呼叫端；
+    要在其他線程中使用或長期保留時應傳入 copy=True，在鎖內複製，避免複製時數據被同時寫入。
+
+    指定 path 時，每個程序的緩衝區是 path 目錄下映射到記憶體的環形檔案 (見 metrics_persist)，
+    啟動時會映射目錄中已有的檔案，因此歷史數據在應用程式重新啟動後仍然存在。
+    被 TTL/LRU 移除的程序只會解除映射，檔案由 compact() 依保留期限清理。
+
+    Attributes:
+        capacity (int): 每個程序保留的數據點數。
+        columns (tuple): 數值欄位名稱。
+        ttl (float): 程序多久 (秒) 沒有新數據就會被移除，None 表示不依時間移除。
+        max_series (int): 最多保留的程序數，None 表示不限制。
+        path (str): 環形檔案所在的目錄，None 表示只保存在記憶體中。
+        readonly (bool): 是否以唯讀方式映射檔案；唯讀時 append() 不會寫入任何數據。
+    """
+    def __init__(self, capacity: int = 60, columns: tuple = DEFAULT_COLUMNS,
+                 ttl: float = None, max_series: int = None, path: str = None, readonly: bool = False):
+        """
+        初始化 MetricsStore。
+
+        Args:
+            capacity (int, optional): 每個程序保留的數據點數。默認為 60。
+            columns (tuple, optional): 數值欄位名稱。默認為 ("cpu", "memory")。
+            ttl (float, optional): 程序的存活秒數。默認為 None。
+            max_series (int, optional): 最多保留的程序數。默認為 None。
+            path (str, optional): 環形檔案所在的目錄。默認為 None。
+            readonly (bool, optional): 是否以唯讀方式映射檔案。默認為 False。
+        """
+        if capacity < 1:
+            raise ValueError("capacity 必須大於 0")
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self.ttl = ttl
+        self.max_series = max_series
+        self.path = path
+        self.readonly = readonly
+        self._column_index = {name: i for i, name in enumerate(self.columns)}
+        self._series = OrderedDict()  # 依最後更新時間排序，最舊的在最前面
+        self._lock = threading.Lock()
+        self._empty_times = np.zeros(0, dtype=np.int64)
+        self._empty_values = np.zeros(0, dtype=np.float32)
+        if path is not None:
+            if not readonly:
+                os.makedirs(path, exist_ok=True)
+            self._load_existing()
+
+    def _load_existing(self):
+        """
+        映射目錄中已有的環形檔案，依最後一筆數據的時間排序 (最舊的在最前面)。
+        """
+        try:
+            filenames = os.listdir(self.path)
+        except OSError:
+            return
+        loaded = []
+        for filename in filenames:
+            key = metrics_persist.filename_to_key(filename)
+            if key is None:
+                continue
+            series = self._map_series(key, create=False)
+            if series is not None:
+                loaded.append((series.ring.last_timestamp() or 0, key, series))
+        now = time.monotonic()
+        for _, key, series in sorted(loaded, key=lambda item: item[0]):
+            series.last_seen = now
+            self._series[key] = series
+
+    def _map_series(self, key, create: bool):
+        """
+        映射 (或建立) 指定程序的環形檔案。capacity/欄位與設定不同的檔案在讀寫模式下會被改寫。
+
+        Returns:
+            _Series: 映射後的緩衝區；檔案不存在且不建立、或無法使用時返回 None。
+        """
+        file_path = os.path.join(self.path, metrics_persist.key_to_filename(key))
+        ring = metrics_persist.open_ring_file(file_path, readonly=self.readonly)
+        if ring is not None and (int(ring.meta[0]) != self.capacity or ring.columns != self.columns):
+            ring = None if self.readonly else metrics_persist.resize_ring_file(file_path, self.capacity, self.columns)
+        if ring is None and create and not self.readonly:
+            ring = metrics_persist.create_ring_file(file_path, self.capacity, self.columns)
+        if ring is None:
+            return None
+        return _Series(self.capacity, len(self.columns), ring)
+
+    def _lookup(self, key):
+        """
+        取得程序的緩衝區；唯讀模式下會映射其他實例在啟動後才建立的檔案。必須持有鎖。
+        """
+        series = self._series.get(key)
+        if series is None and self.readonly and self.path is not None:
+            series = self._map_series(key, create=False)
+            if series is not None:
+                series.last_seen = time.monotonic()
+                self._series[key] = series
+        return series
+
+    def append(self, key, timestamp_ms: int, now: float = None, **values):
+        """
+        為指定程序新增一筆數據。未提供的欄位記為 0。
+
+        Args:
+            key: 程序的識別值 (通常是 pm_id)。
+            timestamp_ms (int): 數據的 epoch 毫秒時間戳。
+            now (float, optional): 用於 TTL/LRU 的單調時間。默認為 time.monotonic()。
+            **values: 欄位名稱與數值，例如 cpu=1.5, memory=120.0。
+        """
+        row = [0.0] * len(self.columns)
+        for name, value in values.items():
+            row[self._column_index[name]] = value
+        self.append_row(key, timestamp_ms, row, now)
+
+    def append_row(self, key, timestamp_ms: int, row, now: float = None):
+        """
+        以欄位順序的序列 (或 NumPy 陣列) 為指定程序新增一筆數據。
+
+        Args:
+            key: 程序的識別值。
+            timestamp_ms (int): 數據的 epoch 毫秒時間戳。
+            row: 依 columns 順序排列的數值。
+            now (float, optional): 用於 TTL/LRU 的單調時間。默認為 time.monotonic()。
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.readonly:
+                series = self._lookup(key)
+                if series is not None:
+                    self._series.move_to_end(key)
+                    series.last_seen = now
+                return
+            series = self._series.get(key)
+            if series is None:
+                if self.path is not None:
+                    series = self._map_series(key, create=True)
+                else:
+                    series = _Series(self.capacity, len(self.columns))
+                self._series[key] = series
+                if self.max_series is not None:
+                    while len(self._series) > self.max_series:
+                        self._series.popitem(last=False)
+            else:
+                self._series.move_to_end(key)
+            series.append(timestamp_ms, row)
+            series.last_seen = now
+
+    def times(self, key, points: int = None, copy: bool = False) -> np.ndarray:
+        """
+        取得程序最近的時間戳視圖 (由舊到新)。
+
+        Args:
+            key: 程序的識別值。
+            points (int, optional): 最多返回的點數。默認為全部。
+            copy (bool, optional): 返回複製的陣列而不是視圖。默認為 False。
+
+        Returns:
+            np.ndarray: int64 epoch 毫秒時間戳；程序不存在時返回空陣列。
+        """
+        with self._lock:
+            series = self._lookup(key)
+            if series is None:
+                return self._empty_times
+            start, end = series.bounds(points)
+            times = series.times[start:end]
+            return times.copy() if copy else times
+
+    def values(self, key, column: str, points: int = None, copy: bool = False) -> np.ndarray:
+        """
+        取得程序某個欄位最近的數值視圖 (由舊到新)。
+
+        Args:
+            key: 程序的識別值。
+            column (str): 欄位名稱。
+            points (int, optional): 最多返回的點數。默認為全部。
+            copy (bool, optional): 返回複製的陣列而不是視圖。默認為 False。
+
+        Returns:
+            np.ndarray: float32 數值；程序不存在時返回空陣列。
+        """
+        index = self._column_index[column]
+        with self._lock:
+            series = self._lookup(key)
+            if series is None:
+                return self._empty_values
+            start, end = series.bounds(points)
+            values = series.values[index, start:end]
+            return values.copy() if copy else values
+
+    def window(self, key, points: int = None, copy: bool = False) -> dict:
+        """
+        一次取得程序的時間戳與所有欄位的視圖。
+
+        Args:
+            key: 程序的識別值。
+            points (int, optional): 最多返回的點數。默認為全部。
+            copy (bool, optional): 返回複製的陣列而不是視圖。默認為 False。
+
+        Returns:
+            dict: {"time": 時間戳視圖, <欄位名稱>: 數值視圖, ...}。
+        """
+        with self._lock:
+            series = self._lookup(key)
+            if series is None:
+                window = {name: self._empty_values for name in self.columns}
+                window["time"] = self._empty_times
+                return window
+            start, end = series.bounds(points)
+            values = series.values[:, start:end]
+            times = series.times[start:end]
+            if copy:
+                values, times = values.copy(), times.copy()
+            window = {name: values[i] for i, name in enumerate(self.columns)}
+            window["time"] = times
+            return window
+
+    def block(self, key, start_ms: int, end_ms: int, copy: bool = False) -> tuple:
+        """
+        取得時間戳落在 [start_ms, end_ms) 內的數據視圖。時間戳必須是遞增的。
+
+        Args:
+            key: 程序的識別值。
+            start_ms (int): 起始時間戳 (包含)。
+            end_ms (int): 結束時間戳 (不包含)。
+            copy (bool, optional): 返回複製的陣列而不是視圖。默認為 False。
+
+        Returns:
+            tuple: (時間戳視圖, 形狀為 (欄位數, 點數) 的數值視圖)。
+        """
+        with self._lock:
+            series = self._lookup(key)
+            if series is None:
+                return self._empty_times, np.zeros((len(self.columns), 0), dtype=np.float32)
+            start, end = series.bounds()
+            times = series.times[start:end]
+            lo, hi = np.searchsorted(times, (start_ms, end_ms))
+            times, values = times[lo:hi], series.values[:, start + lo:start + hi]
+            return (times.copy(), values.copy()) if copy else (times, values)
+
+    def evict_stale(self, now: float = None) -> list:
+        """
+        移除超過 TTL 沒有新數據的程序。
+
+        Args:
+            now (float, optional): 單調時間。默認為 time.monotonic()。
+
+        Returns:
+            list: 被移除的程序識別值。
+        """
+        if self.ttl is None:
+            return []
+        now = time.monotonic() if now is None else now
+        evicted = []
+        with self._lock:
+            while self._series:
+                key, series = next(iter(self._series.items()))
+                if now - series.last_seen <= self.ttl:
+                    break
+                del self._series[key]
+                evicted.append(key)
+        return evicted
+
+    def compact(self, retention_ms: int = None, max_bytes: int = None, now_ms: int = None) -> list:
+        """
+        整理磁碟上的環形檔案：刪除最後一筆數據超過保留期限的檔案、改寫格式與目前設定不同的檔案，
+        並在總大小超過上限時刪除最久沒有更新的檔案。仍在記憶體中的程序不會被刪除。
+        沒有指定 path 或唯讀時不做任何事。
+
+        Args:
+            retention_ms (int, optional): 保留期限 (毫秒)。默認為不限。
+            max_bytes (int, optional): 目錄總大小上限。默認為不限。
+            now_ms (int, optional): 目前的 epoch 毫秒時間戳。默認為 time.time()。
+
+        Returns:
+            list: 被刪除的程序識別值。
+        """
+        if self.path is None or self.readonly:
+            return []
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        with self._lock:
+            active = set(self._series)
+        return metrics_persist.compact_directory(self.path, self.capacity, self.columns,
+                                                 retention_ms, now_ms, max_bytes, keep=active)
+
+    def remove(self, key):
+        """
+        移除指定程序在記憶體中的數據 (磁碟上的檔案會保留到 compact() 清理)。
+        """
+        with self._lock:
+            self._series.pop(key, None)
+
+    def clear(self):
+        """
+        移除所有程序的數據。
+        """
+        with self._lock:
+            self._series.clear()
+
+    def keys(self) -> list:
+        """
+        返回目前保存的程序識別值 (由最久沒更新到最近更新)。
+        """
+        with self._lock:
+            return list(self._series)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._series
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._series)
+
+
+class TieredMetricsStore:
+    """
+    多解析度的指標儲存區。
+
+    第一層保存原始數據點，之後每一層都是前一層依固定時間桶彙總出的 min/avg/max。
+    每當新數據跨過某一層的時間桶邊界時，才以 NumPy 一次彙總剛結束的時間桶
+    (向量化，不逐點累加)，因此每個程序的記憶體用量只取決於各層的點數上限。
+    指定 path 時每一層都保存在 path 下以解析度命名的子目錄中 (例如 "60s")。
+
+    Attributes:
+        tiers (list): (解析度秒數, 保留秒數) 的列表，第一層為原始數據。
+        columns (tuple): 原始數據的欄位名稱。
+        ttl (float): 程序多久 (秒) 沒有新數據就會被移除，None 表示不依時間移除。
+        max_series (int): 最多保留的程序數，None 表示不限制。
+        path (str): 環形檔案所在的目錄，None 表示只保存在記憶體中。
+        readonly (bool): 是否以唯讀方式映射檔案。
+    """
+    def __init__(self, tiers: list, columns: tuple = DEFAULT_COLUMNS,
+                 ttl: float = None, max_series: int = None, path: str = None, readonly: bool = False):
+        """
+        初始化 TieredMetricsStore。
+
+        Args:
+            tiers (list): (解析度秒數, 保留秒數) 的列表，由細到粗排列。
+            columns (tuple, optional): 原始數據的欄位名稱。默認為 ("cpu", "memory")。
+            ttl (float, optional): 程序的存活秒數。默認為 None。
+            max_series (int, optional): 最多保留的程序數。默認為 None。
+            path (str, optional): 環形檔案所在的目錄。默認為 None。
+            readonly (bool, optional): 是否以唯讀方式映射檔案。默認為 False。
+        """
+        self.tiers = [(int(resolution), int(retention)) for resolution, retention in tiers]
+        self.columns = tuple(columns)
+        self.ttl = ttl
+        self.max_series = max_series
+        self.path = path
+        self.readonly = readonly
+        rollup_columns = ["count"]
+        for name in self.columns:
+            rollup_columns += [f"{name}_min", f"{name}_avg", f"{name}_max"]
+        self._stores = []
+        for index, (resolution, retention) in enumerate(self.tiers):
+            capacity = max(1, retention // max(resolution, 1))
+            tier_path = None if path is None else os.path.join(path, f"{resolution}s")
+            self._stores.append(MetricsStore(capacity, self.columns if index == 0 else rollup_columns,
+                                             path=tier_path, readonly=readonly))
+        self._open = OrderedDict()  # key -> [last_seen, 各彙總層目前的時間桶編號]
+        self._lock = threading.Lock()
+        now = time.monotonic()
+        for key in self._stores[0].keys():
+            self._open[key] = self._resume_state(key, now)
+
+    @property
+    def raw(self) -> MetricsStore:
+        """
+        原始數據層。
+        """
+        return self._stores[0]
+
+    def append(self, key, timestamp_ms: int, now: float = None, **values):
+        """
+        新增一筆原始數據，並彙總所有因此結束的時間桶。
+
+        Args:
+            key: 程序的識別值 (通常是 pm_id)。
+            timestamp_ms (int): 數據的 epoch 毫秒時間戳。
+            now (float, optional): 用於 TTL/LRU 的單調時間。默認為 time.monotonic()。
+            **values: 欄位名稱與數值。
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._open.get(key)
+            if state is None:
+                state = self._resume_state(key, now)
+                self._open[key] = state
+                if self.max_series is not None:
+                    while len(self._open) > self.max_series:
+                        self._remove_locked(next(iter(self._open)))
+            else:
+                self._open.move_to_end(key)
+                state[0] = now
+            self._stores[0].append(key, timestamp_ms, now, **values)
+            if self.readonly:
+                return
+            for tier in range(1, len(self.tiers)):
+                bucket_ms = self.tiers[tier][0] * 1000
+                bucket = timestamp_ms // bucket_ms
+                if state[tier] is not None and bucket != state[tier]:
+                    self._close_bucket(key, tier, state[tier] * bucket_ms, bucket_ms, now)
+                state[tier] = bucket
+
+    def _resume_state(self, key, now: float) -> list:
+        """
+        建立程序的時間桶狀態。如果檔案中已有數據 (例如應用程式重新啟動)，
+        最後一筆原始數據所在、但尚未彙總的時間桶會被視為仍在進行中，下次跨過邊界時一樣會被彙總。
+        """
+        state = [now] + [None] * (len(self.tiers) - 1)
+        last = self._stores[0].times(key, points=1)
+        if last.size:
+            for tier in range(1, len(self.tiers)):
+                bucket_ms = self.tiers[tier][0] * 1000
+                bucket = int(last[0]) // bucket_ms
+                closed = self._stores[tier].times(key, points=1)
+                if not closed.size or int(closed[0]) // bucket_ms < bucket:
+                    state[tier] = bucket
+        return state
+
+    def _close_bucket(self, key, tier: int, start_ms: int, bucket_ms: int, now: float):
+        """
+        將前一層在 [start_ms, start_ms + bucket_ms) 內的數據彙總成這一層的一個點。
+        """
+        _, block = self._stores[tier - 1].block(key, start_ms, start_ms + bucket_ms)
+        if block.shape[1] == 0:
+            return
+        if tier == 1:
+            count = block.shape[1]
+            stats = np.stack([block.min(axis=1), block.mean(axis=1), block.max(axis=1)], axis=1)
+        else:
+            counts = block[0]
+            count = counts.sum()
+            mins, avgs, maxs = block[1::3], block[2::3], block[3::3]
+            weighted = (avgs * counts).sum(axis=1) / count if count else avgs.mean(axis=1)
+            stats = np.stack([mins.min(axis=1), weighted, maxs.max(axis=1)], axis=1)
+        row = np.concatenate(([count], stats.ravel()))
+        self._stores[tier].append_row(key, start_ms, row, now)
+
+    def window(self, key, points: int = None, copy: bool = False) -> dict:
+        """
+        取得原始數據層最近的視圖，與 MetricsStore.window() 相同。
+        """
+        return self._stores[0].window(key, points, copy)
+
+    def query(self, key, since_ms: int, until_ms: int = None, copy: bool = False) -> dict:
+        """
+        取得一段時間範圍內的歷史數據，自動選擇能涵蓋整個範圍的最細解析度。
+
+        Args:
+            key: 程序的識別值。
+            since_ms (int): 起始 epoch 毫秒時間戳。
+            until_ms (int, optional): 結束 epoch 毫秒時間戳 (不包含)。默認為不限。
+            copy (bool, optional): 返回複製的陣列而不是視圖。默認為 False。
+
+        Returns:
+            dict: {"resolution": 解析度秒數, "time": 時間戳視圖, <欄位>: 平均值視圖,
+                   <欄位>_min: 最小值視圖, <欄位>_max: 最大值視圖}。原始數據層的最小/最大值即為數值本身。
+        """
+        until_ms = np.iinfo(np.int64).max if until_ms is None else until_ms
+        return self._tier_range(self._choose_tier(key, since_ms), key, since_ms, until_ms, copy)
+
+    def query_sum(self, keys: list, since_ms: int, until_ms: int = None) -> dict:
+        """
+        取得多個程序 (例如 cluster 模式的所有實例) 加總後的歷史數據。
+        所有程序使用同一個解析度 (各程序所需解析度中最粗的一個)，只保留所有程序都有數據的時間點；
+        同一輪輪詢/取樣的數據點共用同一個時間戳，彙總層的時間戳則是時間桶的起點，因此可以直接對齊。
+
+        Args:
+            keys (list): 程序的識別值。
+            since_ms (int): 起始 epoch 毫秒時間戳。
+            until_ms (int, optional): 結束 epoch 毫秒時間戳 (不包含)。默認為不限。
+
+        Returns:
+            dict: 與 query() 相同結構的字典，數值為新配置的陣列 (各欄位的最小/最大值為各程序最小/最大值的總和)。
+        """
+        until_ms = np.iinfo(np.int64).max if until_ms is None else until_ms
+        tier = max((self._choose_tier(key, since_ms) for key in keys), default=0)
+        # 在鎖內複製每個程序的數據，加總時不會讀到同時被寫入的數據點
+        ranges = [self._tier_range(tier, key, since_ms, until_ms, copy=True) for key in keys]
+        if not ranges:
+            return self._tier_range(tier, None, since_ms, until_ms)
+        times = ranges[0]["time"]
+        for result in ranges[1:]:
+            times = np.intersect1d(times, result["time"], assume_unique=True)
+        summed = {"resolution": self.tiers[tier][0], "time": times}
+        for result in ranges:
+            indices = np.searchsorted(result["time"], times)
+            for name, values in result.items():
+                if name in ("resolution", "time"):
+                    continue
+                summed[name] = summed.get(name, 0) + values[indices].astype(np.float64)
+        return summed
+
+    def _choose_tier(self, key, since_ms: int) -> int:
+        """
+        選擇能涵蓋 since_ms 之後整個範圍的最細解析度層；都無法涵蓋時選擇數據最久遠的一層。
+        """
+        candidates = []
+        for tier, store in enumerate(self._stores):
+            times = store.times(key)
+            oldest = int(times[0]) if times.size else None
+            if oldest is not None and oldest <= since_ms:
+                return tier
+            if oldest is not None:
+                candidates.append((oldest, tier))
+        return min(candidates)[1] if candidates else 0
+
+    def _tier_range(self, tier: int, key, since_ms: int, until_ms: int, copy: bool = False) -> dict:
+        times, block = self._stores[tier].block(key, since_ms, until_ms, copy)
+        result = {"resolution": self.tiers[tier][0], "time": times}
+        for i, name in enumerate(self.columns):
+            if tier == 0:
+                result[name] = result[f"{name}_min"] = result[f"{name}_max"] = block[i]
+            else:
+                result[f"{name}_min"] = block[1 + 3 * i]
+                result[name] = block[2 + 3 * i]
+                result[f"{name}_max"] = block[3 + 3 * i]
+        return result
+
+    def evict_stale(self, now: float = None) -> list:
+        """
+        移除超過 TTL 沒有新數據的程序 (所有層)。
+
+        Args:
+            now (float, optional): 單調時間。默認為 time.monotonic()。
+
+        Returns:
+            list: 被移除的程序識別值。
+        """
+        if self.ttl is None:
+            return []
+        now = time.monotonic() if now is None else now
+        evicted = []
+        with self._lock:
+            while self._open:
+                key, state = next(iter(self._open.items()))
+                if now - state[0] <= self.ttl:
+                    break
+                self._remove_locked(key)
+                evicted.append(key)
+        return evicted
+
+    def compact(self, retention_ms: int = None, max_bytes: int = None, now_ms: int = None) -> list:
+        """
+        整理所有層在磁碟上的環形檔案，max_bytes 依各層檔案大小的比例分配。
+
+        Args:
+            retention_ms (int, optional): 最後一筆數據超過多久 (毫秒) 就刪除。默認為不限。
+            max_bytes (int, optional): 所有層的總大小上限。默認為不限。
+            now_ms (int, optional): 目前的 epoch 毫秒時間戳。默認為 time.time()。
+
+        Returns:
+            list: 被刪除的程序識別值 (不重複)。
+        """
+        sizes = [metrics_persist.ring_file_size(store.capacity, len(store.columns)) for store in self._stores]
+        removed = []
+        for store, size in zip(self._stores, sizes):
+            budget = None if max_bytes is None else int(max_bytes * size / sum(sizes))
+            for key in store.compact(retention_ms, budget, now_ms):
+                if key not in removed:
+                    removed.append(key)
+        return removed
+
+    def _remove_locked(self, key):
+        self._open.pop(key, None)
+        for store in self._stores:
+            store.remove(key)
+
+    def remove(self, key):
+        """
+        移除指定程序在所有層的數據。
+        """
+        with self._lock:
+            self._remove_locked(key)
+
+    def clear(self):
+        """
+        移除所有程序的數據。
+        """
+        with self._lock:
+            self._open.clear()
+            for store in self._stores:
+                store.clear()
+
+    def keys(self) -> list:
+        """
+        返回目前保存的程序識別值 (由最久沒更新到最近更新)。
+        """
+        with self._lock:
+            return list(self._open)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._open
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._open)
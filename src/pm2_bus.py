@@ -0,0 +1,181 @@
+"""
+pm2_bus.py
+
+此模組訂閱 PM2 守護程序的事件匯流排 ($PM2_HOME/pub.sock)。守護程序會在程序狀態改變
+(online、exit、stop、restart、delete 等) 以及程序輸出日誌時，以 AMP 訊息 [事件名稱, 數據] 廣播，
+訂閱端因此可以在事件發生時立即更新狀態，定時輪詢只需要作為低頻率的對帳。
+"""
+
+import os
+import socket
+import threading
+import time
+
+from src import pm2_rpc
+
+PROCESS_EVENT = "process:event"
+EXCEPTION_EVENT = "process:exception"
+LOG_EVENTS = ("log:out", "log:err")
+
+# 事件名稱在沒有附帶程序狀態時對應的狀態
+_EVENT_STATUS = {
+    "online": "online",
+    "start": "launching",
+    "restart": "launching",
+    "stop": "stopped",
+    "exit": "stopped",
+    "delete": "deleted",
+    "restart overlimit": "errored",
+    "exception": "errored",
+}
+
+
+def parse_bus_message(message: list):
+    """
+    將匯流排的 AMP 訊息轉換為事件字典。
+
+    Args:
+        message (list): 解碼後的 AMP 參數，格式為 [事件名稱, 數據]。
+
+    Returns:
+        dict: 事件字典，包含 type ("process"、"exception" 或 "log")、event、pm_id、name、status、at
+              以及 (日誌事件的) data 和 stream；無法辨識的訊息返回 None。
+    """
+    if len(message) < 2 or not isinstance(message[0], str) or not isinstance(message[1], dict):
+        return None
+    topic, data = message[0], message[1]
+    process = data.get("process") or {}
+    pm2_env = process.get("pm2_env") or {}
+    event = {
+        "pm_id": process.get("pm_id", pm2_env.get("pm_id")),
+        "name": process.get("name", pm2_env.get("name")),
+        "at": data.get("at") or int(time.time() * 1000),
+    }
+    if topic == PROCESS_EVENT:
+        name = data.get("event")
+        event.update(type="process", event=name,
+                     status=process.get("status") or pm2_env.get("status") or _EVENT_STATUS.get(name, "unknown"))
+    elif topic == EXCEPTION_EVENT:
+        event.update(type="exception", event="exception", status="errored", data=data.get("data"))
+    elif topic in LOG_EVENTS:
+        event.update(type="log", event=topic, stream=topic.split(":", 1)[1], data=data.get("data", ""))
+    else:
+        return None
+    return event
+
+
+class PM2BusSubscriber:
+    """
+    在背景線程中訂閱 PM2 事件匯流排，斷線時以指數退避自動重新連線。
+
+    Attributes:
+        pm2_home (str): PM2 主目錄。
+        callback (callable): 接收事件字典的回調函數，會在訂閱線程中被呼叫。
+        connection_callback (callable): 連線狀態改變時以 True/False 呼叫的回調函數。
+        event_types (set): 要轉發的事件類型，None 表示全部。
+        connected (bool): 目前是否已連線到匯流排。
+    """
+    def __init__(self, callback, pm2_home: str = None, connection_callback=None,
+                 event_types: set = None, reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        """
+        初始化 PM2BusSubscriber。
+
+        Args:
+            callback (callable): 接收事件字典的回調函數。
+            pm2_home (str, optional): PM2 主目錄。默認為 pm2_rpc.get_pm2_home()。
+            connection_callback (callable, optional): 連線狀態回調函數。默認為 None。
+            event_types (set, optional): 要轉發的事件類型，例如 {"process"}。默認為全部。
+            reconnect_delay (float, optional): 第一次重新連線前等待的秒數。默認為 1 秒。
+            max_reconnect_delay (float, optional): 重新連線的最長等待秒數。默認為 30 秒。
+        """
+        self.callback = callback
+        self.pm2_home = pm2_home or pm2_rpc.get_pm2_home()
+        self.connection_callback = connection_callback
+        self.event_types = event_types
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connected = False
+        self._sock = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def pub_socket_path(self) -> str:
+        """
+        返回 pub.sock 的完整路徑。
+        """
+        return os.path.join(self.pm2_home, pm2_rpc.PUB_SOCKET_NAME)
+
+    def start(self):
+        """
+        啟動訂閱線程。
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="pm2-bus", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        """
+        停止訂閱線程並關閉連線。
+        """
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _set_connected(self, connected: bool):
+        if self.connected == connected:
+            return
+        self.connected = connected
+        if self.connection_callback is not None:
+            try:
+                self.connection_callback(connected)
+            except Exception as e:
+                print(f"匯流排連線狀態回調時發生錯誤：{e}")
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.pub_socket_path)
+            except OSError:
+                sock.close()
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+            self._sock = sock
+            delay = self.reconnect_delay
+            self._set_connected(True)
+            try:
+                self._read_loop(sock)
+            finally:
+                self._sock = None
+                sock.close()
+                self._set_connected(False)
+
+    def _read_loop(self, sock):
+        decoder = pm2_rpc.AmpDecoder()
+        while not self._stop.is_set():
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                return
+            if not data:
+                return
+            for message in decoder.feed(data):
+                event = parse_bus_message(message)
+                if event is None or (self.event_types is not None and event["type"] not in self.event_types):
+                    continue
+                try:
+                    self.callback(event)
+                except Exception as e:
+                    print(f"處理 PM2 事件時發生錯誤：{e}")
@@ -5,68 +5,139 @@ pm2_manager.py
 """ 
 
 import subprocess
+import functools
 import json
 import os
-from datetime import datetime
-from collections import deque
+import re
+import threading
+import time
+from src import access_log
+from src import axm_metrics
+from src import command_engine
+from src import config
 from src import data_parser
-
-# 用於儲存 API 歷史數據的字典
-# 每個 API 的歷史數據將是一個 deque，限制其大小以避免記憶體無限增長
-_api_history_data = {}
-MAX_HISTORY_POINTS = 60 # 儲存最近 60 個數據點 (例如 60 秒的數據)
-
-def get_pm2_list():
+from src import jlist_decoder
+from src import metrics_persist
+from src import metrics_store
+from src import pm2_rpc
+from src import proc_sampler
+from src import process_tree
+
+# 用於儲存 API 歷史數據的多解析度環形緩衝區，以 pm_id 為鍵
+# 已刪除的程序會在 METRICS_SERIES_TTL 秒後被移除，避免記憶體無限增長
+_METRIC_COLUMNS = metrics_store.DEFAULT_COLUMNS + proc_sampler.METRIC_COLUMNS
+_BYTE_COLUMNS = ("memory", "pss", "swap") # 以 MB 儲存的欄位
+_metrics_store = metrics_store.TieredMetricsStore(config.METRICS_ROLLUP_TIERS, _METRIC_COLUMNS,
+                                                  ttl=config.METRICS_SERIES_TTL,
+                                                  max_series=config.METRICS_MAX_SERIES)
+# PM2/io 自訂指標 (事件迴圈延遲、heap、HTTP 延遲等) 的歷史數據。只有回報這些指標的程序才會有數據，
+# 與 CPU/記憶體分開儲存，避免 /proc 取樣的數據點把自訂指標記為 0
+_axm_store = metrics_store.TieredMetricsStore(config.METRICS_ROLLUP_TIERS, axm_metrics.METRIC_COLUMNS,
+                                              ttl=config.METRICS_SERIES_TTL,
+                                              max_series=config.METRICS_MAX_SERIES)
+# 從存取記錄推導的請求速率、狀態碼組成與延遲分位數 (access_log.ACCESS_COLUMNS)，只有設定了存取記錄格式的程序才會有數據
+_access_store = metrics_store.TieredMetricsStore(config.METRICS_ROLLUP_TIERS, access_log.ACCESS_COLUMNS,
+                                                 ttl=config.METRICS_SERIES_TTL,
+                                                 max_series=config.METRICS_MAX_SERIES)
+_metrics_writer_lock = None
+_metrics_last_compaction = 0.0
+
+# 直接讀取 /proc 的取樣器。根 pid 在每次取得程序列表時更新，每輪取樣前以增量更新的程序樹
+# 展開為所有子孫程序 (鍵為 (pm_id, pid))，取樣結果再依 pm_id 加總
+_proc_sampler = proc_sampler.ProcSampler(smaps_interval=config.PROC_SMAPS_INTERVAL)
+_process_tree = process_tree.ProcessTree()
+_root_pids = {}
+_latest_samples = {}
+
+# 已啟動的 pm2 子程序數，供輪詢排程器量測本身的開銷
+_subprocess_count = 0
+
+# 所有 pm2 CLI 命令與 RPC 呼叫共用的執行引擎 (期限、重試、取消與守護程序健康追蹤)，
+# 以及守護程序沒有回應時代替新查詢返回的上一次成功取得的程序列表
+_command_engine = command_engine.CommandEngine()
+_last_good_list = None
+
+# PM2 快照快取：在 TTL 內所有呼叫端共用同一份 get_pm2_list() 結果，
+# 同時間只會有一個查詢在進行，其他呼叫端等待它的結果 (single-flight)。
+_snapshot_cond = threading.Condition()
+_snapshot_cache = None
+_snapshot_taken_at = 0.0
+_snapshot_generation = 0 # 每次 invalidate 都會遞增，用來丟棄操作前開始的查詢結果
+_snapshot_inflight = None # 正在進行的查詢所屬的 generation，沒有查詢時為 None
+_snapshot_fetch_seq = 0
+_snapshot_last_result = None
+_snapshot_last_generation = None
+
+def get_pm2_list(scheduler=None):
     """
     執行 'pm2 jlist' 命令並解析輸出，同時更新 API 歷史數據。
 
+    Args:
+        scheduler (PollScheduler, optional): 輪詢排程器。提供時只記錄已到期 (或狀態改變) 的程序，
+                                            並把結果回報給排程器以決定下一次的輪詢間隔。默認為 None (全部記錄)。
+
     Returns:
         list: 包含 PM2 託管的 API 服務資訊的字典列表。
+              守護程序沒有回應 (命令逾時) 時返回上一次成功取得的列表，並且不記錄歷史數據；
               如果命令執行失敗或輸出解析失敗，則返回空列表。
+
+    Raises:
+        command_engine.CommandCancelled: 查詢被 cancel_pending_commands() 取消。
     """
-    global _api_history_data
+    global _last_good_list
     try:
-        command = ["pm2", "jlist"]
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        raw_list = json.loads(result.stdout)
+        raw_list = _fetch_pm2_processes()
 
         # 更新歷史數據
+        timestamp = int(time.time() * 1000)
+        _set_root_pids({api.get('pm_id'): api.get('pid') for api in raw_list
+                        if api.get('pm2_env', {}).get('status') == 'online'})
         for api in raw_list:
             pm_id = api.get('pm_id')
             cpu = api.get('monit', {}).get('cpu', 0)
             memory = api.get('monit', {}).get('memory', 0)
+            # 確保 cpu 是數字 (例如 "0.5%")，歷史數據以 float32 儲存
+            if isinstance(cpu, str):
+                try:
+                    cpu = float(cpu.strip().rstrip('%'))
+                except ValueError:
+                    cpu = 0
             # 確保 memory 是整數，以避免類型錯誤
             if isinstance(memory, str):
                 try:
                     memory = int(memory)
                 except ValueError:
                     memory = 0 # 如果無法轉換為整數，則預設為 0
-            timestamp = datetime.now().strftime("%H:%M:%S")
-
-            if pm_id not in _api_history_data:
-                _api_history_data[pm_id] = {
-                    'cpu_history': deque(maxlen=MAX_HISTORY_POINTS),
-                    'memory_history': deque(maxlen=MAX_HISTORY_POINTS),
-                    'time_history': deque(maxlen=MAX_HISTORY_POINTS)
-                }
-
-            _api_history_data[pm_id]['cpu_history'].append(cpu)
-            _api_history_data[pm_id]['memory_history'].append(memory / (1024 * 1024)) # 將位元組轉換為 MB
-            _api_history_data[pm_id]['time_history'].append(timestamp)
-        
-        # 將歷史數據添加到每個 API 字典中，以便 data_parser 處理
+            status = api.get('pm2_env', {}).get('status')
+            if scheduler is not None and not scheduler.is_due(pm_id, status=status):
+                continue
+            # 由 /proc 取樣器提供數據的程序不再記錄 monit，避免同一時間出現兩種來源的數據點
+            if not _sampler_covers(pm_id):
+                _metrics_store.append(pm_id, timestamp, cpu=cpu or 0, memory=memory / (1024 * 1024)) # 將位元組轉換為 MB
+            custom = axm_metrics.parse_axm_monitor(api.get('pm2_env', {}).get('axm_monitor'))
+            if custom:
+                _axm_store.append(pm_id, timestamp, **custom)
+            if scheduler is not None:
+                scheduler.observe(pm_id, status, cpu or 0, memory)
+        if scheduler is not None:
+            scheduler.retain(api.get('pm_id') for api in raw_list)
+        _metrics_store.evict_stale()
+        _axm_store.evict_stale()
+        _access_store.evict_stale()
+        _maybe_compact_history()
+
+        # 將歷史數據的視圖 (不複製) 添加到每個 API 字典中，以便 data_parser 處理
         for api in raw_list:
-            pm_id = api.get('pm_id')
-            if pm_id in _api_history_data:
-                api['cpu_history'] = list(_api_history_data[pm_id]['cpu_history'])
-                api['memory_history'] = list(_api_history_data[pm_id]['memory_history'])
-                api['time_history'] = list(_api_history_data[pm_id]['time_history'])
-            else:
-                api['cpu_history'] = []
-                api['memory_history'] = []
-                api['time_history'] = []
+            api.update(get_api_history(api.get('pm_id')))
+            api['resources'] = get_latest_process_sample(api.get('pm_id'))
 
+        _last_good_list = raw_list
         return raw_list
+    except command_engine.CommandCancelled:
+        raise
+    except (subprocess.TimeoutExpired, command_engine.DaemonUnresponsive) as e:
+        print(f"警告：PM2 守護程序沒有回應，使用上次取得的程序列表。錯誤訊息：{e}")
+        return _last_good_list or []
     except FileNotFoundError:
         print("錯誤：PM2 命令未找到。請確認 PM2 已全局安裝。")
         return []
@@ -80,6 +151,433 @@ def get_pm2_list():
         print(f"發生未知錯誤：{e}")
         return []
 
+def open_metrics_history(path=None):
+    """
+    將歷史數據改為保存在磁碟上的環形檔案中，並映射目錄中已有的數據 (應在應用程式啟動時呼叫一次)。
+    如果另一個應用程式實例已經在寫入同一個目錄，則以唯讀方式映射並顯示它寫入的數據。
+
+    Args:
+        path (str, optional): 歷史數據目錄。默認為 config.METRICS_PERSIST_DIR。
+
+    Returns:
+        bool: 成功開啟時返回 True；未設定目錄或開啟失敗時返回 False (繼續使用記憶體中的歷史數據)。
+    """
+    global _metrics_store, _axm_store, _access_store, _metrics_writer_lock, _metrics_last_compaction
+    path = path or config.METRICS_PERSIST_DIR
+    if not path:
+        return False
+    path = os.path.expanduser(path)
+    try:
+        os.makedirs(path, exist_ok=True)
+        lock = metrics_persist.WriterLock(path)
+        readonly = not lock.acquire()
+        if readonly:
+            print(f"另一個實例正在寫入歷史數據，以唯讀方式開啟：{path}")
+        store = metrics_store.TieredMetricsStore(config.METRICS_ROLLUP_TIERS, _METRIC_COLUMNS,
+                                                 ttl=config.METRICS_SERIES_TTL,
+                                                 max_series=config.METRICS_MAX_SERIES,
+                                                 path=path, readonly=readonly)
+        axm_store = metrics_store.TieredMetricsStore(config.METRICS_ROLLUP_TIERS, axm_metrics.METRIC_COLUMNS,
+                                                     ttl=config.METRICS_SERIES_TTL,
+                                                     max_series=config.METRICS_MAX_SERIES,
+                                                     path=os.path.join(path, "axm"), readonly=readonly)
+        access_store = metrics_store.TieredMetricsStore(config.METRICS_ROLLUP_TIERS, access_log.ACCESS_COLUMNS,
+                                                        ttl=config.METRICS_SERIES_TTL,
+                                                        max_series=config.METRICS_MAX_SERIES,
+                                                        path=os.path.join(path, "access"), readonly=readonly)
+        if not readonly:
+            store.compact(config.METRICS_PERSIST_RETENTION * 1000, config.METRICS_PERSIST_MAX_BYTES)
+            axm_store.compact(config.METRICS_PERSIST_RETENTION * 1000, config.METRICS_PERSIST_MAX_BYTES)
+            access_store.compact(config.METRICS_PERSIST_RETENTION * 1000, config.METRICS_PERSIST_MAX_BYTES)
+    except OSError as e:
+        print(f"錯誤：無法開啟歷史數據目錄 {path}。錯誤訊息：{e}")
+        return False
+    if _metrics_writer_lock is not None:
+        _metrics_writer_lock.release()
+    _metrics_store = store
+    _axm_store = axm_store
+    _access_store = access_store
+    _metrics_writer_lock = None if readonly else lock
+    _metrics_last_compaction = time.monotonic()
+    return True
+
+def _maybe_compact_history():
+    """
+    每 METRICS_COMPACT_INTERVAL 秒整理一次磁碟上的歷史數據。
+    """
+    global _metrics_last_compaction
+    if _metrics_store.path is None or _metrics_store.readonly:
+        return
+    if time.monotonic() - _metrics_last_compaction < config.METRICS_COMPACT_INTERVAL:
+        return
+    _metrics_last_compaction = time.monotonic()
+    try:
+        _metrics_store.compact(config.METRICS_PERSIST_RETENTION * 1000, config.METRICS_PERSIST_MAX_BYTES)
+        _axm_store.compact(config.METRICS_PERSIST_RETENTION * 1000, config.METRICS_PERSIST_MAX_BYTES)
+        _access_store.compact(config.METRICS_PERSIST_RETENTION * 1000, config.METRICS_PERSIST_MAX_BYTES)
+    except OSError as e:
+        print(f"整理歷史數據時發生錯誤：{e}")
+
+def start_process_sampler(interval=None):
+    """
+    啟動背景 /proc 取樣，每 interval 秒把已映射 pid 的程序的 CPU/記憶體寫入歷史數據。
+
+    Args:
+        interval (float, optional): 取樣間隔 (秒)。默認為 config.PROC_SAMPLE_INTERVAL。
+
+    Returns:
+        bool: 取樣已啟動時返回 True；已停用或此平台無法取樣時返回 False。
+    """
+    if not config.PROC_SAMPLER_ENABLED or not _proc_sampler.available:
+        return False
+    _proc_sampler.start(record_process_samples, interval or config.PROC_SAMPLE_INTERVAL, refresh=_refresh_process_tree)
+    return True
+
+def _set_root_pids(pids):
+    """
+    更新每個 PM2 程序的根 pid，並以目前的程序樹展開為要取樣的 pid。
+    """
+    global _root_pids
+    _root_pids = pids
+    _proc_sampler.set_pids(_process_tree.expand(pids))
+
+def _refresh_process_tree():
+    """
+    每輪取樣前以增量方式同步程序樹，讓新 fork 的子程序也被取樣。
+    """
+    _process_tree.refresh()
+    _proc_sampler.set_pids(_process_tree.expand(_root_pids))
+
+def _sampler_covers(pm_id):
+    """
+    判斷程序的 CPU/記憶體是否已由背景 /proc 取樣提供。
+    """
+    return _proc_sampler.is_running() and pm_id in _latest_samples
+
+def stop_process_sampler():
+    """
+    停止背景 /proc 取樣。
+    """
+    global _latest_samples
+    _proc_sampler.stop()
+    _latest_samples = {}
+
+def record_process_samples(samples):
+    """
+    將一輪 /proc 取樣結果 (CPU、記憶體與擴充指標) 依 pm_id 加總整棵程序樹後寫入歷史數據，
+    記憶體類欄位轉換為 MB。
+
+    Args:
+        samples (dict): ProcSampler.sample() 的結果，鍵為 (pm_id, pid)。
+    """
+    global _latest_samples
+    timestamp = int(time.time() * 1000)
+    samples = process_tree.rollup(samples)
+    for pm_id, sample in samples.items():
+        values = {name: sample[name] for name in _METRIC_COLUMNS if name in sample}
+        for name in _BYTE_COLUMNS:
+            if name in values:
+                values[name] = values[name] / (1024 * 1024)
+        _metrics_store.append(pm_id, timestamp, **values)
+    _latest_samples = samples
+
+def get_latest_process_sample(pm_id):
+    """
+    取得程序最近一次的 /proc 取樣結果。
+
+    Returns:
+        dict: 整棵程序樹加總的 cpu (%)、memory (bytes)、proc_sampler.METRIC_COLUMNS 各欄位，
+              以及 processes (程序數)；沒有取樣數據時返回 None。
+    """
+    return _latest_samples.get(pm_id)
+
+def get_api_history(pm_id, points=None):
+    """
+    取得 API 的歷史數據。
+
+    Args:
+        pm_id: API 的 PM2 ID。
+        points (int, optional): 最多返回的點數。默認為全部。
+
+    Returns:
+        dict: 包含 cpu_history (%)、memory_history (MB) 和 time_history (epoch 毫秒) 的 NumPy 陣列。
+              陣列是複製的，取樣線程之後的寫入不會改變它們，可以直接交給 GUI 線程。
+    """
+    window = _metrics_store.window(pm_id, points, copy=True)
+    return {
+        'cpu_history': window['cpu'],
+        'memory_history': window['memory'],
+        'time_history': window['time'],
+    }
+
+def get_api_history_range(pm_id, seconds):
+    """
+    取得 API 最近一段時間的歷史數據，自動選擇能涵蓋整段時間的最細解析度
+    (例如最近 10 分鐘為原始數據，最近 7 天為每小時彙總)。
+
+    Args:
+        pm_id: API 的 PM2 ID；傳入 pm_id 列表時 (例如 cluster 模式的所有實例) 返回加總後的數據。
+        seconds (float): 要取得的時間長度 (秒)。
+
+    Returns:
+        dict: 包含 resolution (秒)、time (epoch 毫秒)、cpu、memory (平均值)
+              以及 cpu_min、cpu_max、memory_min、memory_max 的 NumPy 陣列 (複製的，與 get_api_history() 相同)。
+    """
+    since = int((time.time() - seconds) * 1000)
+    if isinstance(pm_id, (list, tuple)):
+        if len(pm_id) != 1:
+            return _metrics_store.query_sum(pm_id, since)
+        pm_id = pm_id[0]
+    return _metrics_store.query(pm_id, since, copy=True)
+
+def get_resource_summary(pm_ids, since_ms, until_ms):
+    """
+    彙總一段時間內程序的 CPU/記憶體歷史數據，例如對照壓力測試期間的資源使用量。
+
+    Args:
+        pm_ids (list): 程序的 PM2 ID 列表 (多個實例時使用加總後的數據)。
+        since_ms (int): 起始 epoch 毫秒時間戳。
+        until_ms (int): 結束 epoch 毫秒時間戳 (不包含)。
+
+    Returns:
+        dict: 包含 samples (數據點數)、cpu_avg、cpu_max (%)、memory_avg、memory_max (MB) 的字典；
+              這段時間沒有數據時返回 None。
+    """
+    pm_ids = list(pm_ids)
+    if len(pm_ids) == 1:
+        history = _metrics_store.query(pm_ids[0], since_ms, until_ms, copy=True)
+    else:
+        history = _metrics_store.query_sum(pm_ids, since_ms, until_ms)
+    if not history["time"].size:
+        return None
+    return {
+        "samples": int(history["time"].size),
+        "cpu_avg": float(history["cpu"].mean()),
+        "cpu_max": float(history["cpu_max"].max()),
+        "memory_avg": float(history["memory"].mean()),
+        "memory_max": float(history["memory_max"].max()),
+    }
+
+def get_custom_metrics_range(pm_ids, seconds):
+    """
+    取得程序最近一段時間的 PM2/io 自訂指標歷史數據 (解析度的選擇與 get_api_history_range() 相同)。
+    延遲類指標相加沒有意義，因此 cluster 模式的多個實例會分別返回。
+
+    Args:
+        pm_ids (list): 程序的 PM2 ID 列表。
+        seconds (float): 要取得的時間長度 (秒)。
+
+    Returns:
+        dict: pm_id 到歷史數據的對應，只包含有自訂指標數據的程序。
+              歷史數據包含 resolution、time 以及 axm_metrics.METRIC_COLUMNS 各欄位 (與彙總時的 _min/_max)。
+    """
+    since = int((time.time() - seconds) * 1000)
+    histories = {}
+    for pm_id in pm_ids:
+        history = _axm_store.query(pm_id, since, copy=True)
+        if history["time"].size:
+            histories[pm_id] = history
+    return histories
+
+def record_access_metrics(pm_id, timestamp_ms, values):
+    """
+    寫入一輪存取記錄統計 (AccessLogMonitor 的 record 回調)。
+
+    Args:
+        pm_id: 程序的 PM2 ID。
+        timestamp_ms (int): epoch 毫秒時間戳。
+        values (dict): access_log.ACCESS_COLUMNS 各欄位的數值。
+    """
+    _access_store.append(pm_id, timestamp_ms, **values)
+
+def get_access_metrics_range(pm_ids, seconds):
+    """
+    取得程序最近一段時間的存取記錄統計歷史數據 (解析度的選擇與 get_api_history_range() 相同)。
+    延遲分位數相加沒有意義，因此 cluster 模式的多個實例會分別返回。
+
+    Args:
+        pm_ids (list): 程序的 PM2 ID 列表。
+        seconds (float): 要取得的時間長度 (秒)。
+
+    Returns:
+        dict: pm_id 到歷史數據的對應，只包含有存取記錄數據的程序。
+              歷史數據包含 resolution、time 以及 access_log.ACCESS_COLUMNS 各欄位 (與彙總時的 _min/_max)。
+    """
+    since = int((time.time() - seconds) * 1000)
+    histories = {}
+    for pm_id in pm_ids:
+        history = _access_store.query(pm_id, since, copy=True)
+        if history["time"].size:
+            histories[pm_id] = history
+    return histories
+
+def get_pm2_snapshot(max_age=None):
+    """
+    取得共用的 PM2 快照 (get_pm2_list() 的結果)。
+    快照在 max_age 秒內會被重複使用；快取過期時只有一個呼叫端會真正查詢 PM2，
+    同時到達的其他呼叫端會等待並共用同一個結果。
+
+    Args:
+        max_age (float, optional): 可接受的快照最大年齡 (秒)。默認為 config.PM2_SNAPSHOT_TTL。
+                                   傳入 0 表示需要新的快照，但仍會加入正在進行的查詢。
+
+    Returns:
+        list: 與 get_pm2_list() 相同的程序資訊列表。呼叫端不應修改此列表。
+    """
+    global _snapshot_cache, _snapshot_taken_at, _snapshot_inflight, _snapshot_fetch_seq
+    global _snapshot_last_result, _snapshot_last_generation
+    ttl = config.PM2_SNAPSHOT_TTL if max_age is None else max_age
+    with _snapshot_cond:
+        while True:
+            if _snapshot_cache is not None and time.monotonic() - _snapshot_taken_at <= ttl:
+                return _snapshot_cache
+            if _snapshot_inflight is None:
+                break
+            # 已有查詢在進行：等待它完成。只有在它開始後沒有被 invalidate 時才共用結果。
+            joinable = _snapshot_inflight == _snapshot_generation
+            seq = _snapshot_fetch_seq
+            while _snapshot_fetch_seq == seq:
+                _snapshot_cond.wait()
+            if joinable and _snapshot_last_generation == _snapshot_generation:
+                return _snapshot_last_result
+        generation = _snapshot_generation
+        _snapshot_inflight = generation
+
+    pm2_list = []
+    completed = False
+    try:
+        pm2_list = get_pm2_list()
+        completed = True
+    finally:
+        with _snapshot_cond:
+            _snapshot_inflight = None
+            _snapshot_fetch_seq += 1
+            _snapshot_last_result = pm2_list
+            # 被取消的查詢不提供結果，等待它的呼叫端會自行重新查詢
+            _snapshot_last_generation = generation if completed else None
+            if completed and generation == _snapshot_generation:
+                _snapshot_cache = pm2_list
+                _snapshot_taken_at = time.monotonic()
+            _snapshot_cond.notify_all()
+    return pm2_list
+
+def invalidate_pm2_snapshot():
+    """
+    使目前的 PM2 快照失效。任何會改變程序狀態的操作完成後都應呼叫此函數，
+    在失效前就已開始的查詢結果也不會被放入快取。
+    """
+    global _snapshot_cache, _snapshot_generation
+    with _snapshot_cond:
+        _snapshot_cache = None
+        _snapshot_generation += 1
+
+def _invalidates_snapshot(func):
+    """
+    裝飾器：在會改變程序狀態的操作結束後 (無論成功與否) 使 PM2 快照失效。
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            invalidate_pm2_snapshot()
+    return wrapper
+
+def get_subprocess_count():
+    """
+    返回本模組累計啟動的 pm2 子程序數。
+    """
+    return _subprocess_count
+
+def get_daemon_health():
+    """
+    返回 PM2 守護程序的健康狀態 (見 CommandEngine.get_health())。
+    """
+    return _command_engine.get_health()
+
+def get_command_stats():
+    """
+    返回每種 PM2 命令類型的呼叫次數、錯誤、逾時與延遲分位數 (見 CommandEngine.get_stats())。
+    """
+    return _command_engine.get_stats()
+
+def cancel_pending_commands():
+    """
+    取消所有進行中的 PM2 命令，它們會在下一個檢查點拋出 command_engine.CommandCancelled。
+    """
+    _command_engine.cancel_pending()
+
+def _run_pm2_command(command, **kwargs):
+    """
+    經由命令引擎以期限執行 pm2 CLI 命令並計入子程序啟動次數，參數與 subprocess.run 相同。
+    """
+    global _subprocess_count
+    _subprocess_count += 1
+    return _command_engine.run(command, **kwargs)
+
+def _fetch_pm2_processes():
+    """
+    取得 PM2 託管程序的原始列表。
+    優先透過持久的 RPC 連線向守護程序查詢，無法使用時改為執行 'pm2 jlist'。
+
+    Returns:
+        list: 與 'pm2 jlist' 輸出相同結構的程序資訊列表，只保留 jlist_decoder.JLIST_FIELDS 中的欄位。
+
+    Raises:
+        FileNotFoundError: PM2 命令未找到。
+        subprocess.CalledProcessError: PM2 命令執行失敗。
+        subprocess.TimeoutExpired: PM2 命令超過期限。
+        command_engine.DaemonUnresponsive: 守護程序被判定為沒有回應。
+        json.JSONDecodeError: PM2 輸出不是有效的 JSON。
+    """
+    client = pm2_rpc.get_shared_client()
+    if client is not None:
+        try:
+            return _command_engine.call("rpc:list", client.list_processes)
+        except command_engine.DaemonUnresponsive:
+            raise
+        except (OSError, pm2_rpc.PM2RpcError) as e:
+            print(f"警告：PM2 RPC 查詢失敗，改用 pm2 CLI。錯誤訊息：{e}")
+
+    command = ["pm2", "jlist"]
+    result = _run_pm2_command(command, capture_output=True, text=True, check=True)
+    return jlist_decoder.decode_jlist(result.stdout)
+
+def _perform_rpc_action(method_name, name_or_id):
+    """
+    嘗試透過 RPC 連線對指定的 PM2 ID 執行操作。
+
+    Args:
+        method_name (str): PM2RpcClient 上的方法名稱 (e.g., "start_process")。
+        name_or_id (str): API 的名稱或 PM2 ID。只有數字 ID 會走 RPC。
+
+    Returns:
+        bool | None: 操作成功返回 True，守護程序回報失敗或請求送出後連線失敗返回 False；
+                     RPC 無法使用 (或傳入的是名稱) 時返回 None，呼叫端應改用 pm2 CLI。
+                     請求可能已經送出時不返回 None，以免同一個操作被 CLI 再執行一次。
+    """
+    if not str(name_or_id).isdigit():
+        return None
+    client = pm2_rpc.get_shared_client()
+    if client is None:
+        return None
+    try:
+        _command_engine.call(f"rpc:{method_name}", getattr(client, method_name), int(name_or_id))
+        return True
+    except command_engine.DaemonUnresponsive as e:
+        print(f"錯誤：{e}")
+        return False
+    except pm2_rpc.PM2RpcError as e:
+        print(f"錯誤：PM2 守護程序回報失敗 (ID: {name_or_id})。錯誤訊息：{e}")
+        return False
+    except pm2_rpc.PM2RpcNotConnected as e:
+        print(f"警告：無法連線到 PM2 RPC，改用 pm2 CLI。錯誤訊息：{e}")
+        return None
+    except OSError as e:
+        print(f"錯誤：PM2 RPC 呼叫失敗 (ID: {name_or_id})，操作可能已經執行，不改用 pm2 CLI 重試。錯誤訊息：{e}")
+        return False
+
+@_invalidates_snapshot
 def start_api(name_or_id):
     """
     啟動指定的 PM2 API 服務。
@@ -89,10 +587,19 @@ def start_api(name_or_id):
 
     Returns:
         bool: 如果命令執行成功則返回 True，否則返回 False。
+
+    Raises:
+        command_engine.CommandCancelled: 命令在開始前被 cancel_pending_commands() 取消。
     """
+    rpc_result = _perform_rpc_action("start_process", name_or_id)
+    if rpc_result is not None:
+        if rpc_result:
+            print(f"成功啟動 API: {name_or_id}")
+        return rpc_result
+
     try:
         command = ["pm2", "start", str(name_or_id)]
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        result = _run_pm2_command(command, capture_output=True, text=True, check=True)
         print(f"成功啟動 API: {name_or_id}")
         return True
     except FileNotFoundError:
@@ -101,10 +608,13 @@ def start_api(name_or_id):
     except subprocess.CalledProcessError as e:
         print(f"錯誤：執行 PM2 命令失敗。錯誤訊息：{e.stderr.strip()}")
         return False
+    except command_engine.CommandCancelled:
+        raise
     except Exception as e:
         print(f"啟動 API {name_or_id} 時發生未知錯誤：{e}")
         return False
 
+@_invalidates_snapshot
 def restart_api(name_or_id):
     """
     重啟指定的 PM2 API 服務。
@@ -114,10 +624,19 @@ def restart_api(name_or_id):
 
     Returns:
         bool: 如果命令執行成功則返回 True，否則返回 False。
+
+    Raises:
+        command_engine.CommandCancelled: 命令在開始前被 cancel_pending_commands() 取消。
     """
+    rpc_result = _perform_rpc_action("restart_process", name_or_id)
+    if rpc_result is not None:
+        if rpc_result:
+            print(f"成功重啟 API: {name_or_id}")
+        return rpc_result
+
     try:
         command = ["pm2", "restart", str(name_or_id)]
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        result = _run_pm2_command(command, capture_output=True, text=True, check=True)
         print(f"成功重啟 API: {name_or_id}")
         return True
     except FileNotFoundError:
@@ -126,10 +645,13 @@ def restart_api(name_or_id):
     except subprocess.CalledProcessError as e:
         print(f"錯誤：重啟 API {name_or_id} 失敗。錯誤訊息：{e.stderr.strip()}")
         return False
+    except command_engine.CommandCancelled:
+        raise
     except Exception as e:
         print(f"重啟 API {name_or_id} 時發生未知錯誤：{e}")
         return False
 
+@_invalidates_snapshot
 def stop_api(name_or_id):
     """
     停止指定的 PM2 API 服務。
@@ -139,10 +661,19 @@ def stop_api(name_or_id):
 
     Returns:
         bool: 如果命令執行成功則返回 True，否則返回 False。
+
+    Raises:
+        command_engine.CommandCancelled: 命令在開始前被 cancel_pending_commands() 取消。
     """
+    rpc_result = _perform_rpc_action("stop_process", name_or_id)
+    if rpc_result is not None:
+        if rpc_result:
+            print(f"成功停止 API: {name_or_id}")
+        return rpc_result
+
     try:
         command = ["pm2", "stop", str(name_or_id)]
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        result = _run_pm2_command(command, capture_output=True, text=True, check=True)
         print(f"成功停止 API: {name_or_id}")
         return True
     except FileNotFoundError:
@@ -151,114 +682,249 @@ def stop_api(name_or_id):
     except subprocess.CalledProcessError as e:
         print(f"錯誤：停止 API {name_or_id} 失敗。錯誤訊息：{e.stderr.strip()}")
         return False
+    except command_engine.CommandCancelled:
+        raise
     except Exception as e:
         print(f"停止 API {name_or_id} 時發生未知錯誤：{e}")
         return False
 
-def start_project_apis(project_name):
+# 操作名稱與其中文顯示名稱的對應
+ACTION_VERBS = {"start": "啟動", "restart": "重啟", "stop": "停止", "reload": "重新載入"}
+
+# `pm2 <verb> id1 id2 …` 輸出中代表單一程序成功或失敗的行
+_CLI_SUCCESS_PATTERN = re.compile(r"\[(?P<name>[^\]]*)\]\((?P<id>\d+)\)\s*✓")
+_CLI_NOT_FOUND_PATTERN = re.compile(r"Process (?P<id>\S+) not found")
+
+def plan_project_action(verb, project_names, pm2_list=None):
     """
-    根據專案名稱批量啟動所有相關 API 服務。
+    從同一份 PM2 快照中一次解析出多個專案下所有要操作的 API。
 
     Args:
-        project_name (str): 專案的名稱。
+        verb (str): 操作名稱，"start"、"restart" 或 "stop"。
+        project_names (iterable): 專案名稱 (不區分大小寫)。
+        pm2_list (list, optional): 已取得的 PM2 快照。默認為 get_pm2_snapshot()。
 
     Returns:
-        bool: 如果所有相關 API 服務成功啟動則返回 True，否則返回 False。
+        dict: 操作計劃，包含:
+              - "verb" (str): 操作名稱。
+              - "targets" (list): 目標 API 字典列表，每個包含 pm_id、name、project_name、
+                                  host (api.json 中的 host，默認為 "localhost")、port、health_path
+                                  (api.json 中的設定，默認為 config.HEALTH_PROBE_PATH)、exec_mode (PM2 的執行模式)，
+                                  以及啟動順序用的 depends_on、ready 和 ready_timeout (api.json 中的設定)。
+              - "missing_projects" (list): 沒有找到任何 API 的專案名稱。
     """
-    pm2_list = get_pm2_list()
-    if not pm2_list:
-        print("沒有找到任何 PM2 託管的 API 服務。")
-        return False
-
+    if pm2_list is None:
+        pm2_list = get_pm2_snapshot()
     all_api_configs = data_parser.load_all_api_configs()
 
-    success = True
-    apis_found_for_project = False
-    for api in pm2_list:
-        if data_parser.get_project_name(api, all_api_configs).lower() == project_name.lower():
-            apis_found_for_project = True
-            api_id = api.get('pm_id')
-            api_name = api.get('name')
-            print(f"嘗試啟動專案 '{project_name}' 中的 API: {api_name} (ID: {api_id})")
-            if not start_api(api_id):
-                success = False
-                print(f"啟動 API: {api_name} (ID: {api_id}) 失敗。")
-    
-    if not apis_found_for_project:
-        print(f"未找到專案 '{project_name}' 下的任何 API 服務。")
-        return False # If no APIs found, or if any failed and no APIs were found for the project
+    wanted = {name.lower(): name for name in project_names}
+    found = set()
+    targets = []
+    for api in pm2_list or []:
+        project_name, api_config = data_parser.find_api_in_configs(api.get('name'), all_api_configs)
+        if project_name.lower() in wanted:
+            found.add(project_name.lower())
+            targets.append({
+                "pm_id": api.get('pm_id'),
+                "name": api.get('name'),
+                "project_name": wanted[project_name.lower()],
+                "host": api_config.get('host', 'localhost'),
+                "port": api_config.get('port'),
+                "health_path": api_config.get('health_path', config.HEALTH_PROBE_PATH),
+                "exec_mode": (api.get('pm2_env') or {}).get('exec_mode'),
+                "depends_on": api_config.get('depends_on', []),
+                "ready": api_config.get('ready'),
+                "ready_timeout": api_config.get('ready_timeout'),
+            })
+    missing_projects = [name for key, name in wanted.items() if key not in found]
+    return {"verb": verb, "targets": targets, "missing_projects": missing_projects}
+
+@_invalidates_snapshot
+def run_bulk_action(verb, pm_ids):
+    """
+    以單一往返對多個 PM2 ID 執行同一個操作：RPC 可用時使用一次 pipelined 批次呼叫，
+    否則執行一個 `pm2 <verb> id1 id2 …` 命令，並從輸出中解析每個 ID 的結果。
+    只有在 RPC 連線沒有建立 (請求沒有送出) 時才會改用 CLI。
 
-    return success
+    Args:
+        verb (str): 操作名稱，"start"、"restart"、"stop" 或 "reload"。
+        pm_ids (list): 目標程序的 PM2 ID 列表。
 
-def restart_project_apis(project_name):
+    Returns:
+        dict: 以 pm_id 為鍵的錯誤訊息字典，成功的 ID 值為 None。
+
+    Raises:
+        command_engine.CommandCancelled: 命令在開始前被 cancel_pending_commands() 取消。
     """
-    根據專案名稱批量重啟所有相關 API 服務。
+    pm_ids = list(pm_ids)
+    if not pm_ids:
+        return {}
+
+    client = pm2_rpc.get_shared_client()
+    if client is not None:
+        try:
+            return _command_engine.call(f"rpc:{verb}", client.batch_action, verb, pm_ids)
+        except command_engine.DaemonUnresponsive as e:
+            return {pm_id: str(e) for pm_id in pm_ids}
+        except pm2_rpc.PM2RpcNotConnected as e:
+            print(f"警告：無法連線到 PM2 RPC，改用 pm2 CLI。錯誤訊息：{e}")
+        except OSError as e:
+            # 請求可能已經送出，用 CLI 重送會讓同一個操作執行兩次
+            print(f"錯誤：PM2 RPC 批次操作失敗，操作可能已經執行，不改用 pm2 CLI 重試。錯誤訊息：{e}")
+            return {pm_id: str(e) for pm_id in pm_ids}
+
+    try:
+        command = ["pm2", verb] + [str(pm_id) for pm_id in pm_ids]
+        result = _run_pm2_command(command, capture_output=True, text=True)
+    except FileNotFoundError:
+        print("錯誤：PM2 命令未找到。請確認 PM2 已全局安裝。")
+        return {pm_id: "PM2 命令未找到" for pm_id in pm_ids}
+    except command_engine.CommandCancelled:
+        raise
+    except Exception as e:
+        print(f"批量{ACTION_VERBS.get(verb, verb)} API 時發生未知錯誤：{e}")
+        return {pm_id: str(e) for pm_id in pm_ids}
+    return _parse_bulk_output(pm_ids, result.returncode, result.stdout or "", result.stderr or "")
+
+def _parse_bulk_output(pm_ids, returncode, stdout, stderr):
+    """
+    解析 `pm2 <verb> id1 id2 …` 的輸出，得到每個 ID 的結果。
+
+    Args:
+        pm_ids (list): 命令中的 PM2 ID。
+        returncode (int): 命令的結束碼。
+        stdout (str): 標準輸出。
+        stderr (str): 標準錯誤輸出。
+
+    Returns:
+        dict: 以 pm_id 為鍵的錯誤訊息字典，成功的 ID 值為 None。
+    """
+    output = stdout + "\n" + stderr
+    succeeded = {match.group('id') for match in _CLI_SUCCESS_PATTERN.finditer(output)}
+    not_found = {match.group('id') for match in _CLI_NOT_FOUND_PATTERN.finditer(output)}
+    error_lines = [line.strip() for line in stderr.splitlines() if line.strip()]
+    fallback_error = error_lines[-1] if error_lines else f"pm2 結束碼 {returncode}"
+
+    results = {}
+    for pm_id in pm_ids:
+        key = str(pm_id)
+        if key in succeeded:
+            results[pm_id] = None
+        elif key in not_found:
+            results[pm_id] = f"Process {key} not found"
+        elif returncode == 0 and not succeeded:
+            # 沒有逐一回報的輸出格式 (例如舊版 PM2)，以結束碼為準
+            results[pm_id] = None
+        else:
+            results[pm_id] = fallback_error
+    return results
+
+def execute_action_plan(plan):
+    """
+    執行 plan_project_action() 產生的計劃，所有目標只發出一個批次操作。
+    啟動計劃中有 API 宣告 depends_on 時改由 startup_dag.StartupScheduler 依依賴圖並行啟動。
+
+    Args:
+        plan (dict): plan_project_action() 的回傳值。
+
+    Returns:
+        list: 每個目標 API 的結果字典，包含 pm_id、name、project_name、ok (bool) 和 error (str 或 None)。
+
+    Raises:
+        ValueError: 如果啟動計劃的依賴圖中有循環。
+    """
+    targets = plan["targets"]
+    from src import startup_dag  # startup_dag 使用本模組的 run_bulk_action，延遲匯入以避免循環匯入
+    if plan["verb"] == "start" and startup_dag.has_dependencies(targets):
+        return startup_dag.StartupScheduler().run(targets)
+    errors = run_bulk_action(plan["verb"], [target["pm_id"] for target in targets])
+    results = []
+    for target in targets:
+        error = errors.get(target["pm_id"], "沒有收到結果")
+        results.append(dict(target, ok=error is None, error=error))
+    return results
+
+def _perform_project_action(verb, project_name, pm2_list):
+    """
+    對單一專案執行批量操作的共用實作。
 
     Args:
+        verb (str): 操作名稱，"start"、"restart" 或 "stop"。
         project_name (str): 專案的名稱。
+        pm2_list (list): PM2 快照，None 時使用 get_pm2_snapshot()。
 
     Returns:
-        bool: 如果所有相關 API 服務成功重啟則返回 True，否則返回 False。
+        bool: 如果所有相關 API 服務都操作成功則返回 True，否則返回 False。
     """
-    pm2_list = get_pm2_list()
+    if pm2_list is None:
+        pm2_list = get_pm2_snapshot()
     if not pm2_list:
         print("沒有找到任何 PM2 託管的 API 服務。")
         return False
 
-    all_api_configs = data_parser.load_all_api_configs()
-
-    success = True
-    apis_found_for_project = False
-    for api in pm2_list:
-        if data_parser.get_project_name(api, all_api_configs).lower() == project_name.lower():
-            apis_found_for_project = True
-            api_id = api.get('pm_id')
-            api_name = api.get('name')
-            print(f"嘗試重啟專案 '{project_name}' 中的 API: {api_name} (ID: {api_id})")
-            if not restart_api(api_id):
-                success = False
-                print(f"重啟 API: {api_name} (ID: {api_id}) 失敗。")
-    
-    if not apis_found_for_project:
+    verb_name = ACTION_VERBS[verb]
+    plan = plan_project_action(verb, [project_name], pm2_list)
+    if not plan["targets"]:
         print(f"未找到專案 '{project_name}' 下的任何 API 服務。")
         return False
 
+    for target in plan["targets"]:
+        print(f"嘗試{verb_name}專案 '{project_name}' 中的 API: {target['name']} (ID: {target['pm_id']})")
+
+    try:
+        results = execute_action_plan(plan)
+    except ValueError as e:
+        print(f"無法{verb_name}專案 '{project_name}'：{e}")
+        return False
+
+    success = True
+    for result in results:
+        if not result["ok"]:
+            success = False
+            print(f"{verb_name} API: {result['name']} (ID: {result['pm_id']}) 失敗。錯誤訊息：{result['error']}")
     return success
 
-def stop_project_apis(project_name):
+def start_project_apis(project_name, pm2_list=None):
     """
-    根據專案名稱批量停止所有相關 API 服務。
+    根據專案名稱批量啟動所有相關 API 服務，所有 API 只發出一個 PM2 操作。
 
     Args:
         project_name (str): 專案的名稱。
+        pm2_list (list, optional): 已取得的 PM2 快照，批量操作多個專案時可共用同一份。
+                                   默認為 get_pm2_snapshot()。
 
     Returns:
-        bool: 如果所有相關 API 服務成功停止則返回 True，否則返回 False。
+        bool: 如果所有相關 API 服務成功啟動則返回 True，否則返回 False。
     """
-    pm2_list = get_pm2_list()
-    if not pm2_list:
-        print("沒有找到任何 PM2 託管的 API 服務。")
-        return False
+    return _perform_project_action("start", project_name, pm2_list)
 
-    all_api_configs = data_parser.load_all_api_configs()
+def restart_project_apis(project_name, pm2_list=None):
+    """
+    根據專案名稱批量重啟所有相關 API 服務，所有 API 只發出一個 PM2 操作。
 
-    success = True
-    apis_found_for_project = False
-    for api in pm2_list:
-        if data_parser.get_project_name(api, all_api_configs).lower() == project_name.lower():
-            apis_found_for_project = True
-            api_id = api.get('pm_id')
-            api_name = api.get('name')
-            print(f"嘗試停止專案 '{project_name}' 中的 API: {api_name} (ID: {api_id})")
-            if not stop_api(api_id):
-                success = False
-                print(f"停止 API: {api_name} (ID: {api_id}) 失敗。")
-
-    if not apis_found_for_project:
-        print(f"未找到專案 '{project_name}' 下的任何 API 服務。")
-        return False
+    Args:
+        project_name (str): 專案的名稱。
+        pm2_list (list, optional): 已取得的 PM2 快照，批量操作多個專案時可共用同一份。
+                                   默認為 get_pm2_snapshot()。
 
-    return success
+    Returns:
+        bool: 如果所有相關 API 服務成功重啟則返回 True，否則返回 False。
+    """
+    return _perform_project_action("restart", project_name, pm2_list)
+
+def stop_project_apis(project_name, pm2_list=None):
+    """
+    根據專案名稱批量停止所有相關 API 服務，所有 API 只發出一個 PM2 操作。
+
+    Args:
+        project_name (str): 專案的名稱。
+        pm2_list (list, optional): 已取得的 PM2 快照，批量操作多個專案時可共用同一份。
+                                   默認為 get_pm2_snapshot()。
+
+    Returns:
+        bool: 如果所有相關 API 服務成功停止則返回 True，否則返回 False。
+    """
+    return _perform_project_action("stop", project_name, pm2_list)
 
 def get_all_project_names():
     """
@@ -267,7 +933,7 @@ def get_all_project_names():
     Returns:
         set: 包含所有專案名稱的集合。
     """
-    pm2_list = get_pm2_list()
+    pm2_list = get_pm2_snapshot()
     if not pm2_list:
         return set()
 
@@ -0,0 +1,567 @@
+"""
+pm2_rpc.py
+
+此模組實作 PM2 守護程序 (God daemon) 的原生 RPC 客戶端。
+客戶端透過 $PM2_HOME 下的 rpc.sock 與守護程序保持一條持久連線，
+使用與 pm2-axon 相同的 AMP 訊息格式，避免每次查詢或操作都啟動一個 Node.js `pm2` 子程序。
+"""
+
+import itertools
+import json
+import os
+import socket
+import struct
+import threading
+
+from src import config
+from src import jlist_decoder
+
+AMP_VERSION = 1
+"""
+AMP (Abstract Message Protocol) 協議版本，寫在每個訊息標頭的高 4 位元。
+"""
+RPC_SOCKET_NAME = "rpc.sock"
+PUB_SOCKET_NAME = "pub.sock"
+
+
+class PM2RpcError(Exception):
+    """
+    PM2 守護程序回傳錯誤時拋出的例外。
+    """
+
+
+class PM2RpcNotConnected(ConnectionError):
+    """
+    無法連線到守護程序 (socket 不存在或拒絕連線) 時拋出的例外。
+    此時請求一定還沒有送出，呼叫端可以安全地改用其他方式重新執行。
+    """
+
+
+def get_pm2_home() -> str:
+    """
+    取得 PM2_HOME 目錄路徑。
+    優先使用 config.PM2_HOME，其次是環境變數 PM2_HOME，最後是 ~/.pm2。
+
+    Returns:
+        str: PM2_HOME 目錄的絕對路徑。
+    """
+    pm2_home = getattr(config, 'PM2_HOME', None) or os.environ.get('PM2_HOME')
+    if not pm2_home:
+        pm2_home = os.path.join(os.path.expanduser('~'), '.pm2')
+    return os.path.abspath(pm2_home)
+
+
+def encode_message(args: list) -> bytes:
+    """
+    將參數列表編碼為一個 AMP 訊息。
+    bytes 原樣傳送，字串加上 `s:` 前綴，其餘物件以 `j:` 前綴的 JSON 傳送。
+
+    Args:
+        args (list): 訊息的參數列表，最多 15 個。
+
+    Returns:
+        bytes: 編碼後的訊息。
+    """
+    parts = [bytes([AMP_VERSION << 4 | len(args)])]
+    for arg in args:
+        if isinstance(arg, (bytes, bytearray)):
+            data = bytes(arg)
+        elif isinstance(arg, str):
+            data = b's:' + arg.encode('utf-8')
+        else:
+            data = b'j:' + json.dumps(arg, separators=(',', ':')).encode('utf-8')
+        parts.append(struct.pack('>I', len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+class RawJson(bytes):
+    """
+    尚未解析的 `j:` 參數本文。讓呼叫端可以自行選擇性地解碼大型回覆。
+    """
+
+
+def _decode_arg(data: bytes, lazy_json: bool = False):
+    """
+    解碼 AMP 訊息中的單一參數。
+
+    Args:
+        data (bytes): 參數的原始位元組。
+        lazy_json (bool): 為 True 時 JSON 參數以 RawJson 返回，不立即解析。
+
+    Returns:
+        str | object | bytes: 解碼後的參數。
+    """
+    prefix = data[:2]
+    if prefix == b's:':
+        return data[2:].decode('utf-8')
+    if prefix == b'j:':
+        if lazy_json:
+            return RawJson(data[2:])
+        return json.loads(data[2:])
+    return data
+
+
+class AmpDecoder:
+    """
+    增量式 AMP 訊息解碼器，可接受任意切割的位元組流。
+
+    Attributes:
+        lazy_json (bool): 是否將 JSON 參數以 RawJson 返回而不立即解析。
+        _buffer (bytearray): 尚未組成完整訊息的位元組。
+    """
+    def __init__(self, lazy_json: bool = False):
+        """
+        初始化 AmpDecoder。
+
+        Args:
+            lazy_json (bool, optional): 是否延後解析 JSON 參數。默認為 False。
+        """
+        self.lazy_json = lazy_json
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list:
+        """
+        餵入新的位元組並取出所有已完整的訊息。
+
+        Args:
+            data (bytes): 從 socket 讀到的位元組。
+
+        Returns:
+            list: 已解碼的訊息列表，每個訊息都是參數列表。
+        """
+        self._buffer.extend(data)
+        messages = []
+        offset = 0
+        buffer = self._buffer
+        while offset < len(buffer):
+            argc = buffer[offset] & 0x0f
+            position = offset + 1
+            args = []
+            for _ in range(argc):
+                if position + 4 > len(buffer):
+                    break
+                (length,) = struct.unpack_from('>I', buffer, position)
+                position += 4
+                if position + length > len(buffer):
+                    break
+                args.append(_decode_arg(bytes(buffer[position:position + length]), self.lazy_json))
+                position += length
+            if len(args) < argc:
+                break
+            messages.append(args)
+            offset = position
+        if offset:
+            del self._buffer[:offset]
+        return messages
+
+
+class PM2RpcClient:
+    """
+    PM2 守護程序的持久 RPC 客戶端 (對應 pm2-axon-rpc 的 req socket)。
+    同一個客戶端可以被多個線程共用，每次呼叫都會持有內部鎖。
+
+    Attributes:
+        pm2_home (str): PM2_HOME 目錄。
+        timeout (float): 每次 socket 讀寫的逾時秒數。
+    """
+    def __init__(self, pm2_home: str = None, timeout: float = None):
+        """
+        初始化 PM2RpcClient，不會立即連線。
+
+        Args:
+            pm2_home (str, optional): PM2_HOME 目錄。默認為 get_pm2_home()。
+            timeout (float, optional): socket 逾時秒數。默認為 config.PM2_RPC_TIMEOUT。
+        """
+        self.pm2_home = pm2_home or get_pm2_home()
+        self.timeout = timeout if timeout is not None else getattr(config, 'PM2_RPC_TIMEOUT', 5.0)
+        self._sock = None
+        self._decoder = AmpDecoder(lazy_json=True)
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._identity = f"{socket.gethostname()}-{os.getpid()}"
+
+    @property
+    def rpc_socket_path(self) -> str:
+        """
+        Returns:
+            str: 守護程序 RPC socket 的路徑。
+        """
+        return os.path.join(self.pm2_home, RPC_SOCKET_NAME)
+
+    def is_available(self) -> bool:
+        """
+        檢查守護程序的 RPC socket 是否存在。
+
+        Returns:
+            bool: socket 檔案存在時返回 True。
+        """
+        return os.path.exists(self.rpc_socket_path)
+
+    def connect(self):
+        """
+        連線到守護程序，已連線時不做任何事。
+
+        Raises:
+            PM2RpcNotConnected: RPC socket 不存在或守護程序拒絕連線。
+            OSError: 其他連線錯誤 (e.g., 連線逾時)。
+        """
+        if self._sock is not None:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.rpc_socket_path)
+        except (ConnectionRefusedError, FileNotFoundError) as e:
+            sock.close()
+            raise PM2RpcNotConnected(f"無法連線到 PM2 RPC socket：{e}") from e
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self._decoder = AmpDecoder(lazy_json=True)
+
+    def close(self):
+        """
+        關閉與守護程序的連線。
+        """
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+    def call(self, method: str, *args):
+        """
+        呼叫守護程序上的一個方法並等待回覆。
+
+        Args:
+            method (str): 守護程序的方法名稱 (e.g., "getMonitorData")。
+            *args: 傳給方法的參數。
+
+        Returns:
+            list: 方法回傳的參數列表 (不含 err)。
+
+        Raises:
+            PM2RpcError: 守護程序回傳錯誤。
+            OSError: 連線或讀寫失敗。
+        """
+        reply = self.call_many([(method, args)])[0]
+        if reply['error'] is not None:
+            raise PM2RpcError(reply['error'])
+        return reply['args']
+
+    def call_many(self, calls: list, raw: bool = False) -> list:
+        """
+        將多個呼叫一次送出 (pipelining)，再依序收集回覆。
+        單一呼叫的錯誤不會拋出例外，而是記錄在該呼叫的結果中。
+
+        Args:
+            calls (list): (method, args) 元組的列表。
+            raw (bool, optional): 為 True 時不解析回覆，結果字典的 `raw` 為回覆的 JSON 本文 (bytes)。
+
+        Returns:
+            list: 與 calls 同順序的結果字典列表，每個字典包含 `error` (str 或 None) 和 `args` (list)。
+
+        Raises:
+            PM2RpcNotConnected: 無法連線到守護程序，請求沒有送出。
+            OSError: 連線或讀寫失敗，此時連線會被關閉以便下次重新連線。
+                     請求可能已經送出，呼叫端不應重新執行有副作用的操作。
+        """
+        if not calls:
+            return []
+        with self._lock:
+            try:
+                self.connect()
+                pending = {}
+                payload = []
+                for index, (method, args) in enumerate(calls):
+                    request_id = f"{self._identity}:{next(self._ids)}"
+                    pending[request_id] = index
+                    request = {"type": "call", "method": method, "args": list(args)}
+                    payload.append(encode_message([request, request_id]))
+                self._sock.sendall(b''.join(payload))
+
+                results = [None] * len(calls)
+                while pending:
+                    data = self._sock.recv(65536)
+                    if not data:
+                        raise ConnectionResetError("PM2 守護程序關閉了 RPC 連線")
+                    for message in self._decoder.feed(data):
+                        if not message:
+                            continue
+                        index = pending.pop(message[-1], None)
+                        if index is None:
+                            continue
+                        body = message[0] if len(message) > 1 else {}
+                        if raw and isinstance(body, RawJson):
+                            results[index] = {"error": None, "args": [], "raw": bytes(body)}
+                            continue
+                        if isinstance(body, RawJson):
+                            body = json.loads(body)
+                        results[index] = _parse_reply(body)
+                return results
+            except OSError:
+                self.close()
+                raise
+
+    def list_processes(self) -> list:
+        """
+        取得所有 PM2 託管程序的資訊，內容與 `pm2 jlist` 相同。
+
+        Returns:
+            list: 程序資訊字典的列表，只包含 jlist_decoder.JLIST_FIELDS 中的欄位。
+
+        Raises:
+            PM2RpcError: 守護程序回傳錯誤。
+            OSError: 連線或讀寫失敗。
+        """
+        reply = self.call_many([('getMonitorData', ({},))], raw=True)[0]
+        if 'raw' not in reply:
+            body = reply
+        else:
+            decoded = jlist_decoder.decode_monitor_reply(reply['raw'])
+            if isinstance(decoded, list):
+                return decoded
+            body = _parse_reply(decoded)
+        if body['error'] is not None:
+            raise PM2RpcError(body['error'])
+        return body['args'][0] if body['args'] else []
+
+    def batch_action(self, verb: str, pm_ids: list) -> dict:
+        """
+        以一次 pipelined 往返對多個程序執行同一個操作。
+
+        Args:
+            verb (str): "start"、"stop"、"restart" 或 "reload" (cluster 模式的零停機重新載入)。
+            pm_ids (list): 目標程序的 PM2 ID 列表。
+
+        Returns:
+            dict: 以 pm_id 為鍵的錯誤訊息字典，成功的程序值為 None。
+                  對已經在運行的程序執行 start 視為成功。
+
+        Raises:
+            OSError: 連線或讀寫失敗。
+        """
+        method, make_args = _ACTION_CALLS[verb]
+        replies = self.call_many([(method, make_args(int(pm_id))) for pm_id in pm_ids])
+        results = {}
+        for pm_id, reply in zip(pm_ids, replies):
+            error = reply['error']
+            if error is not None and verb == "start" and 'already online' in error:
+                error = None
+            results[pm_id] = error
+        return results
+
+    def start_process(self, pm_id: int):
+        """
+        啟動指定 PM2 ID 的程序。已經在運行的程序視為成功。
+
+        Args:
+            pm_id (int): 程序的 PM2 ID。
+        """
+        self._single_action("start", pm_id)
+
+    def stop_process(self, pm_id: int):
+        """
+        停止指定 PM2 ID 的程序。
+
+        Args:
+            pm_id (int): 程序的 PM2 ID。
+        """
+        self._single_action("stop", pm_id)
+
+    def restart_process(self, pm_id: int):
+        """
+        重啟指定 PM2 ID 的程序。
+
+        Args:
+            pm_id (int): 程序的 PM2 ID。
+        """
+        self._single_action("restart", pm_id)
+
+    def _single_action(self, verb: str, pm_id: int):
+        error = self.batch_action(verb, [pm_id])[pm_id]
+        if error is not None:
+            raise PM2RpcError(error)
+
+
+_ACTION_CALLS = {
+    "start": ("startProcessId", lambda pm_id: (pm_id,)),
+    "stop": ("stopProcessId", lambda pm_id: (pm_id,)),
+    "restart": ("restartProcessId", lambda pm_id: ({"id": pm_id, "env": {}},)),
+    "reload": ("reloadProcessId", lambda pm_id: ({"id": pm_id, "env": {}},)),
+}
+"""
+操作名稱與守護程序 RPC 方法 (及其參數格式) 的對應表。
+"""
+
+
+def _parse_reply(body) -> dict:
+    """
+    將 pm2-axon-rpc 的回覆轉換為統一的結果字典。
+
+    Args:
+        body (dict): 守護程序回覆的第一個參數，包含 `args` 或 `error`。
+
+    Returns:
+        dict: 包含 `error` 與 `args` 的結果字典。
+    """
+    if not isinstance(body, dict):
+        return {"error": f"無法識別的回覆: {body!r}", "args": []}
+    if 'error' in body:
+        error = body['error']
+        if isinstance(error, dict):
+            error = error.get('message') or json.dumps(error, ensure_ascii=False)
+        return {"error": str(error), "args": []}
+    return {"error": None, "args": body.get('args', [])}
+
+
+class PM2RpcPool:
+    """
+    PM2RpcClient 的連線池，提供與 PM2RpcClient 相同的查詢與操作方法。
+    每次呼叫借用一個閒置的客戶端 (沒有時建立新的)，完成後歸還；
+    最多保留 size 條持久連線，多出來的客戶端歸還時立即關閉，並行的操作不會在同一個 socket 上排隊，
+    也不會每個線程各留下一條沒有關閉的連線。
+
+    Attributes:
+        pm2_home (str): PM2_HOME 目錄。
+        size (int): 保留的閒置連線數上限。
+    """
+    def __init__(self, pm2_home: str = None, size: int = None):
+        """
+        初始化 PM2RpcPool，不會立即連線。
+
+        Args:
+            pm2_home (str, optional): PM2_HOME 目錄。默認為 get_pm2_home()。
+            size (int, optional): 保留的閒置連線數上限。默認為 config.PM2_RPC_POOL_SIZE。
+        """
+        self.pm2_home = pm2_home or get_pm2_home()
+        self.size = max(1, size or getattr(config, 'PM2_RPC_POOL_SIZE', 4))
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def rpc_socket_path(self) -> str:
+        """
+        Returns:
+            str: 守護程序 RPC socket 的路徑。
+        """
+        return os.path.join(self.pm2_home, RPC_SOCKET_NAME)
+
+    def is_available(self) -> bool:
+        """
+        檢查守護程序的 RPC socket 是否存在。
+
+        Returns:
+            bool: socket 檔案存在時返回 True。
+        """
+        return os.path.exists(self.rpc_socket_path)
+
+    def idle_count(self) -> int:
+        """
+        Returns:
+            int: 目前保留的閒置客戶端數量。
+        """
+        with self._lock:
+            return len(self._idle)
+
+    def close(self):
+        """
+        關閉所有閒置的連線。借出中的客戶端在歸還時關閉。
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for client in idle:
+            client.close()
+
+    def _acquire(self) -> PM2RpcClient:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return PM2RpcClient(self.pm2_home)
+
+    def _release(self, client: PM2RpcClient):
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(client)
+                return
+        client.close()
+
+    def _with_client(self, method: str, *args):
+        client = self._acquire()
+        try:
+            return getattr(client, method)(*args)
+        finally:
+            self._release(client)
+
+    def call(self, method: str, *args):
+        """
+        同 PM2RpcClient.call()。
+        """
+        return self._with_client('call', method, *args)
+
+    def call_many(self, calls: list, raw: bool = False) -> list:
+        """
+        同 PM2RpcClient.call_many()。
+        """
+        return self._with_client('call_many', calls, raw)
+
+    def list_processes(self) -> list:
+        """
+        同 PM2RpcClient.list_processes()。
+        """
+        return self._with_client('list_processes')
+
+    def batch_action(self, verb: str, pm_ids: list) -> dict:
+        """
+        同 PM2RpcClient.batch_action()。
+        """
+        return self._with_client('batch_action', verb, pm_ids)
+
+    def start_process(self, pm_id: int):
+        """
+        同 PM2RpcClient.start_process()。
+        """
+        self._with_client('start_process', pm_id)
+
+    def stop_process(self, pm_id: int):
+        """
+        同 PM2RpcClient.stop_process()。
+        """
+        self._with_client('stop_process', pm_id)
+
+    def restart_process(self, pm_id: int):
+        """
+        同 PM2RpcClient.restart_process()。
+        """
+        self._with_client('restart_process', pm_id)
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_client():
+    """
+    取得全域共用的 PM2 RPC 連線池。
+    並行的操作各自從池中借用一條持久連線，讓它們不會在同一個 socket 上排隊。
+    如果 RPC 被停用或守護程序的 socket 不存在，返回 None 讓呼叫端改用 pm2 CLI。
+
+    Returns:
+        PM2RpcPool | None: 共用的連線池，或 None。
+    """
+    global _shared_pool
+    if not getattr(config, 'PM2_USE_RPC', True):
+        return None
+    with _shared_pool_lock:
+        pm2_home = get_pm2_home()
+        if _shared_pool is None or _shared_pool.pm2_home != pm2_home:
+            if _shared_pool is not None:
+                _shared_pool.close()
+            _shared_pool = PM2RpcPool(pm2_home)
+        if not _shared_pool.is_available():
+            return None
+        return _shared_pool
@@ -0,0 +1,237 @@
+"""
+poll_scheduler.py
+
+此模組提供自適應的指標輪詢排程器。每個程序有自己的輪詢間隔：使用者正在查看的 API
+以及指標或狀態剛改變的程序會以最短間隔輪詢，穩定的程序則以指數方式退避到最長間隔。
+排程器同時量測應用程式本身 (包含 pm2 子程序) 的 CPU 使用率與子程序啟動次數，
+超過設定的上限時會整體放慢輪詢，回到上限以下時再逐步恢復。
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from src import config
+
+
+def process_cpu_time() -> float:
+    """
+    返回本程序以及已結束子程序 (例如 `pm2 jlist`) 累計使用的 CPU 秒數。
+    """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class PollScheduler:
+    """
+    每個程序各自的輪詢節奏與整體的開銷預算。
+
+    Attributes:
+        min_interval (float): 活躍程序的輪詢間隔 (秒)。
+        max_interval (float): 穩定程序退避到的最長間隔 (秒)。
+        backoff (float): 每次沒有變化時間隔的放大倍數。
+        cpu_budget (float): 允許的 CPU 使用率上限 (1.0 表示一個核心)。
+        subprocess_budget (int): 每分鐘允許啟動的子程序數上限，None 表示不限制。
+        throttle (float): 目前因超出預算而套用在所有間隔上的倍數 (>= 1)。
+    """
+    def __init__(self, min_interval: float = None, max_interval: float = None, backoff: float = None,
+                 cpu_budget: float = None, subprocess_budget: int = None, budget_window: float = 60.0,
+                 cpu_clock=process_cpu_time, subprocess_counter=None, clock=time.monotonic):
+        """
+        初始化 PollScheduler。
+
+        Args:
+            min_interval (float, optional): 最短間隔。默認為 config.POLL_MIN_INTERVAL。
+            max_interval (float, optional): 最長間隔。默認為 config.POLL_MAX_INTERVAL。
+            backoff (float, optional): 退避倍數。默認為 config.POLL_BACKOFF。
+            cpu_budget (float, optional): CPU 使用率上限。默認為 config.POLL_CPU_BUDGET。
+            subprocess_budget (int, optional): 每分鐘子程序數上限。默認為 config.POLL_SUBPROCESS_BUDGET。
+            budget_window (float, optional): 計算開銷的時間窗口 (秒)。默認為 60 秒。
+            cpu_clock (callable, optional): 返回累計 CPU 秒數的函數。默認為 process_cpu_time。
+            subprocess_counter (callable, optional): 返回累計子程序啟動次數的函數。默認為 None。
+            clock (callable, optional): 單調時鐘。默認為 time.monotonic。
+        """
+        self.min_interval = min_interval or config.POLL_MIN_INTERVAL
+        self.max_interval = max_interval or config.POLL_MAX_INTERVAL
+        self.backoff = backoff or config.POLL_BACKOFF
+        self.cpu_budget = config.POLL_CPU_BUDGET if cpu_budget is None else cpu_budget
+        self.subprocess_budget = config.POLL_SUBPROCESS_BUDGET if subprocess_budget is None else subprocess_budget
+        self.budget_window = budget_window
+        self.throttle = 1.0
+        self._cpu_clock = cpu_clock
+        self._subprocess_counter = subprocess_counter
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._processes = {}  # key -> {"interval", "next_due", "last"}
+        self._focus = set()
+        self._samples = deque()  # (時間, 累計 CPU 秒數, 累計子程序數)
+        self._last_adjust = None
+        self._usage = {"cpu": 0.0, "subprocesses_per_minute": 0.0}
+
+    @property
+    def focus(self) -> set:
+        """
+        返回目前的焦點程序。
+        """
+        with self._lock:
+            return set(self._focus)
+
+    def set_focus(self, keys):
+        """
+        設定使用者正在查看的程序，這些程序永遠以最短間隔輪詢並立即到期。
+
+        Args:
+            keys (iterable): 程序識別值。
+        """
+        now = self._clock()
+        with self._lock:
+            self._focus = set(keys)
+            for key in self._focus:
+                state = self._processes.get(key)
+                if state is not None:
+                    state["interval"] = self.min_interval
+                    state["next_due"] = now
+
+    def observe(self, key, status: str, cpu: float, memory: float):
+        """
+        記錄一次輪詢結果並決定此程序的下一個間隔。
+        狀態改變、CPU 變化超過 config.POLL_CPU_CHANGE 個百分點、或記憶體變化超過
+        config.POLL_MEMORY_CHANGE 比例時視為活躍，間隔重設為最短；否則依退避倍數放大。
+
+        Args:
+            key: 程序識別值。
+            status (str): 程序狀態。
+            cpu (float): CPU 使用率 (%)。
+            memory (float): 記憶體使用量。
+        """
+        now = self._clock()
+        with self._lock:
+            state = self._processes.get(key)
+            if state is None:
+                state = {"interval": self.min_interval, "next_due": now, "last": None}
+                self._processes[key] = state
+            last = state["last"]
+            changed = last is None or key in self._focus or self._changed(last, (status, cpu, memory))
+            if changed:
+                state["interval"] = self.min_interval
+            else:
+                state["interval"] = min(state["interval"] * self.backoff, self.max_interval)
+            state["last"] = (status, cpu, memory)
+            state["next_due"] = now + state["interval"] * self.throttle
+
+    @staticmethod
+    def _changed(last: tuple, current: tuple) -> bool:
+        if last[0] != current[0]:
+            return True
+        if abs((current[1] or 0) - (last[1] or 0)) >= config.POLL_CPU_CHANGE:
+            return True
+        previous_memory = last[2] or 0
+        return abs((current[2] or 0) - previous_memory) > config.POLL_MEMORY_CHANGE * max(previous_memory, 1)
+
+    def is_due(self, key, status: str = None, now: float = None) -> bool:
+        """
+        判斷程序是否到了該記錄新數據的時間。未知的程序永遠到期；
+        傳入 status 時，狀態與上次記錄不同的程序也會立即到期。
+        """
+        now = self._clock() if now is None else now
+        with self._lock:
+            state = self._processes.get(key)
+            if state is None or key in self._focus or state["next_due"] <= now:
+                return True
+            return status is not None and state["last"] is not None and state["last"][0] != status
+
+    def due(self, now: float = None) -> list:
+        """
+        返回已到期的程序識別值。
+        """
+        now = self._clock() if now is None else now
+        with self._lock:
+            return [key for key, state in self._processes.items()
+                    if key in self._focus or state["next_due"] <= now]
+
+    def next_delay(self, now: float = None) -> float:
+        """
+        返回距離下一個程序到期還有多少秒 (至少為 min_interval × throttle)。
+        """
+        now = self._clock() if now is None else now
+        floor = self.min_interval * self.throttle
+        with self._lock:
+            if not self._processes:
+                return floor
+            if self._focus & self._processes.keys():
+                return floor
+            earliest = min(state["next_due"] for state in self._processes.values())
+        return max(floor, earliest - now)
+
+    def cadence(self, key) -> float:
+        """
+        返回程序目前實際的輪詢間隔 (秒，已套用預算倍數)，未知的程序返回 None。
+        """
+        with self._lock:
+            state = self._processes.get(key)
+            if state is None:
+                return None
+            interval = self.min_interval if key in self._focus else state["interval"]
+            return interval * self.throttle
+
+    def cadences(self) -> dict:
+        """
+        返回所有程序目前的輪詢間隔 (秒)。
+        """
+        with self._lock:
+            keys = list(self._processes)
+        return {key: self.cadence(key) for key in keys}
+
+    def forget(self, key):
+        """
+        移除已不存在的程序。
+        """
+        with self._lock:
+            self._processes.pop(key, None)
+            self._focus.discard(key)
+
+    def retain(self, keys):
+        """
+        只保留 keys 中的程序，其餘視為已被刪除。
+        """
+        keys = set(keys)
+        with self._lock:
+            for key in list(self._processes):
+                if key not in keys:
+                    del self._processes[key]
+
+    def update_budget(self) -> dict:
+        """
+        量測最近 budget_window 秒內的 CPU 使用率與子程序啟動速率，並調整 throttle：
+        超過任一上限時放大 1.5 倍，兩者都低於上限的一半時縮小 1.5 倍 (最小為 1)。
+        為了讓量測反映上一次調整的效果，throttle 每 budget_window / 6 秒最多調整一次。
+        應在每次輪詢完成後呼叫。
+
+        Returns:
+            dict: 包含 cpu (使用率)、subprocesses_per_minute 與 throttle 的字典。
+        """
+        now = self._clock()
+        sample = (now, self._cpu_clock(), self._subprocess_counter() if self._subprocess_counter else 0)
+        with self._lock:
+            self._samples.append(sample)
+            while len(self._samples) > 2 and now - self._samples[1][0] >= self.budget_window:
+                self._samples.popleft()
+            first = self._samples[0]
+            elapsed = now - first[0]
+            if elapsed > 0:
+                cpu = (sample[1] - first[1]) / elapsed
+                spawn_rate = (sample[2] - first[2]) * 60.0 / elapsed
+                self._usage = {"cpu": cpu, "subprocesses_per_minute": spawn_rate}
+                if self._last_adjust is not None and now - self._last_adjust < self.budget_window / 6:
+                    return dict(self._usage, throttle=self.throttle)
+                self._last_adjust = now
+                over = cpu > self.cpu_budget or (
+                    self.subprocess_budget is not None and spawn_rate > self.subprocess_budget)
+                under = cpu < self.cpu_budget / 2 and (
+                    self.subprocess_budget is None or spawn_rate < self.subprocess_budget / 2)
+                if over:
+                    self.throttle = min(self.throttle * 1.5, config.POLL_MAX_THROTTLE)
+                elif under:
+                    self.throttle = max(self.throttle / 1.5, 1.0)
+            return dict(self._usage, throttle=self.throttle)
@@ -0,0 +1,331 @@
+"""
+proc_sampler.py
+
+此模組直接讀取 /proc 取得 PM2 託管程序的 CPU 與記憶體使用量。pid 只在程序列表更新時映射一次，
+之後每次取樣在同一輪中讀取每個程序的 /proc/<pid>/stat、statm、status、io 與 fd 目錄，
+CPU 使用率、磁碟讀寫與上下文切換速率由兩次取樣之間的累計值差自行計算，
+不需要啟動 pm2 子程序，每個程序的成本只有幾次系統呼叫。
+PSS 需要讀取 smaps_rollup (核心會走訪整個位址空間)，因此只每 smaps_interval 秒讀取一次。
+沒有 /proc 的平台 (例如 macOS) 改用 psutil。
+"""
+
+import os
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # psutil 只在沒有 /proc 時使用
+    psutil = None
+
+try:
+    CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    CLOCK_TICKS = 100
+    PAGE_SIZE = 4096
+
+METRIC_COLUMNS = ("threads", "fds", "io_read", "io_write", "ctx_vol", "ctx_invol", "pss", "swap")
+"""
+CPU/記憶體以外的擴充欄位：執行緒數、開啟的檔案描述符數、磁碟讀取/寫入 (KB/s)、
+自願/非自願上下文切換 (次/s)、PSS 與 swap (bytes)。
+"""
+
+# 累計計數器 -> (速率欄位名稱, 每單位的倍數)
+_COUNTERS = {
+    "cpu_seconds": ("cpu", 100.0),
+    "read_bytes": ("io_read", 1 / 1024),
+    "write_bytes": ("io_write", 1 / 1024),
+    "ctx_voluntary": ("ctx_vol", 1.0),
+    "ctx_involuntary": ("ctx_invol", 1.0),
+}
+_STATUS_FIELDS = {
+    b"voluntary_ctxt_switches": ("ctx_voluntary", 1),
+    b"nonvoluntary_ctxt_switches": ("ctx_involuntary", 1),
+    b"VmSwap": ("swap", 1024),
+}
+_READ_SIZE = 8192
+_SAMPLE_ERRORS = (OSError, ValueError, IndexError) + ((psutil.Error,) if psutil is not None else ())
+
+
+def read_proc_file(path: str) -> bytes:
+    """
+    以單次 read 讀取 /proc 下的小檔案。
+
+    Raises:
+        OSError: 檔案不存在 (程序已結束) 或沒有權限。
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, _READ_SIZE)
+    finally:
+        os.close(fd)
+
+
+def parse_stat(data: bytes) -> dict:
+    """
+    解析 /proc/<pid>/stat。程序名稱可能包含空白或括號，因此從最後一個 ')' 之後開始分割。
+
+    Returns:
+        dict: 包含 ppid、cpu_ticks (utime + stime)、threads 與 start_time (開機後的 clock ticks) 的字典。
+    """
+    fields = data[data.rindex(b')') + 2:].split()
+    # fields[0] 是第 3 個欄位 (state)，因此第 n 個欄位位於 fields[n - 3]
+    return {
+        "ppid": int(fields[1]),
+        "cpu_ticks": int(fields[11]) + int(fields[12]),
+        "threads": int(fields[17]),
+        "start_time": int(fields[19]),
+    }
+
+
+def parse_statm(data: bytes) -> int:
+    """
+    解析 /proc/<pid>/statm，返回常駐記憶體 (RSS，bytes)。
+    """
+    return int(data.split(None, 2)[1]) * PAGE_SIZE
+
+
+def parse_status(data: bytes) -> dict:
+    """
+    解析 /proc/<pid>/status，返回 ctx_voluntary、ctx_involuntary (累計次數) 與 swap (bytes)。
+    """
+    result = {}
+    for line in data.splitlines():
+        name, _, value = line.partition(b':')
+        field = _STATUS_FIELDS.get(name)
+        if field is not None:
+            result[field[0]] = int(value.split()[0]) * field[1]
+    return result
+
+
+def parse_smaps_rollup(data: bytes) -> int:
+    """
+    解析 /proc/<pid>/smaps_rollup，返回 PSS (bytes)。
+    """
+    start = data.index(b"\nPss:") + 5
+    return int(data[start:data.index(b"kB", start)]) * 1024
+
+
+def parse_io(data: bytes) -> dict:
+    """
+    解析 /proc/<pid>/io，返回 read_bytes 與 write_bytes。
+    """
+    result = {}
+    for line in data.splitlines():
+        name, _, value = line.partition(b':')
+        if name in (b'read_bytes', b'write_bytes'):
+            result[name.decode()] = int(value)
+    return result
+
+
+class ProcSampler:
+    """
+    批量取樣程序的 CPU/記憶體使用量以及 METRIC_COLUMNS 中的擴充指標。
+
+    Attributes:
+        proc_root (str): /proc 的路徑。
+        use_proc (bool): 是否直接讀取 /proc；為 False 時使用 psutil。
+        interval (float): 背景取樣的間隔 (秒)。
+    """
+    def __init__(self, proc_root: str = "/proc", smaps_interval: float = 10.0, clock=time.monotonic):
+        """
+        初始化 ProcSampler。
+
+        Args:
+            proc_root (str, optional): /proc 的路徑。默認為 "/proc"。
+            smaps_interval (float, optional): 讀取 PSS 的間隔 (秒)。默認為 10 秒。
+            clock (callable, optional): 單調時鐘。默認為 time.monotonic。
+        """
+        self.proc_root = proc_root
+        self.smaps_interval = smaps_interval
+        self.use_proc = os.path.exists(os.path.join(proc_root, "self", "stat"))
+        self.interval = None
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pids = {}  # key -> pid
+        self._baselines = {}  # key -> (pid, start_time, 累計計數器, 取樣時間)
+        self._pss = {}  # key -> (讀取時間, PSS)
+        self._psutil_processes = {}  # pid -> psutil.Process
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def available(self) -> bool:
+        """
+        此平台是否可以取樣 (有 /proc 或已安裝 psutil)。
+        """
+        return self.use_proc or psutil is not None
+
+    def set_pids(self, pids: dict):
+        """
+        更新要取樣的程序。pid 改變 (例如程序重啟) 的程序會重新建立 CPU 基準。
+
+        Args:
+            pids (dict): 程序識別值 (pm_id) 到 pid 的對應，pid 為 0 或 None 的程序會被忽略。
+        """
+        with self._lock:
+            self._pids = {key: pid for key, pid in pids.items() if pid}
+            for key in list(self._baselines):
+                if self._pids.get(key) != self._baselines[key][0]:
+                    del self._baselines[key]
+                    self._pss.pop(key, None)
+            active = set(self._pids.values())
+            for pid in list(self._psutil_processes):
+                if pid not in active:
+                    del self._psutil_processes[pid]
+
+    def covers(self, key) -> bool:
+        """
+        判斷程序是否已由取樣器提供數據 (已映射 pid 且背景取樣正在進行)。
+        """
+        with self._lock:
+            return self.is_running() and key in self._baselines
+
+    def sample(self) -> dict:
+        """
+        取樣所有已映射的程序。第一次取樣 (或程序重啟後) 只建立 CPU 基準，不會出現在結果中。
+
+        Returns:
+            dict: 程序識別值到 {"cpu": 使用率 (%), "memory": RSS (bytes)} 加上 METRIC_COLUMNS 各欄位的對應
+                  (沒有權限讀取的欄位會省略，例如其他使用者的程序的 io 與 fd)。
+        """
+        with self._lock:
+            pids = dict(self._pids)
+            previous_baselines = dict(self._baselines)
+            pss_cache = dict(self._pss)
+        read = self._read_proc if self.use_proc else self._read_psutil
+        now = self._clock()
+        results = {}
+        baselines = {}
+        for key, pid in pids.items():
+            cached_pss = pss_cache.get(key)
+            read_pss = cached_pss is None or now - cached_pss[0] >= self.smaps_interval
+            try:
+                raw = read(pid, read_pss)
+            except _SAMPLE_ERRORS:
+                continue  # 程序已結束或 pid 尚未更新
+            if "pss" in raw:
+                pss_cache[key] = (now, raw["pss"])
+            elif cached_pss is not None:
+                raw["pss"] = cached_pss[1]
+            counters = {name: raw.pop(name) for name in _COUNTERS if name in raw}
+            baselines[key] = (pid, raw.pop("start_time"), counters, now)
+            previous = previous_baselines.get(key)
+            if previous is None or previous[:2] != baselines[key][:2] or now <= previous[3]:
+                continue
+            elapsed = now - previous[3]
+            for name, value in counters.items():
+                if name in previous[2]:
+                    column, scale = _COUNTERS[name]
+                    raw[column] = max(0.0, (value - previous[2][name]) / elapsed * scale)
+            results[key] = raw
+        with self._lock:
+            for key, baseline in baselines.items():
+                if self._pids.get(key) == baseline[0]:
+                    self._baselines[key] = baseline
+                    if key in pss_cache:
+                        self._pss[key] = pss_cache[key]
+        return results
+
+    def _read_proc(self, pid: int, read_pss: bool) -> dict:
+        base = os.path.join(self.proc_root, str(pid))
+        stat = parse_stat(read_proc_file(base + "/stat"))
+        sample = {
+            "cpu_seconds": stat["cpu_ticks"] / CLOCK_TICKS,
+            "start_time": stat["start_time"],
+            "memory": parse_statm(read_proc_file(base + "/statm")),
+            "threads": stat["threads"],
+        }
+        sample.update(parse_status(read_proc_file(base + "/status")))
+        # 以下檔案只有程序擁有者 (或 root) 可以讀取
+        try:
+            sample.update(parse_io(read_proc_file(base + "/io")))
+        except OSError:
+            pass
+        try:
+            sample["fds"] = len(os.listdir(base + "/fd"))
+        except OSError:
+            pass
+        if read_pss:
+            try:
+                sample["pss"] = parse_smaps_rollup(read_proc_file(base + "/smaps_rollup"))
+            except (OSError, ValueError):
+                pass
+        return sample
+
+    def _read_psutil(self, pid: int, read_pss: bool) -> dict:
+        if psutil is None:
+            raise OSError("沒有 /proc 也沒有安裝 psutil")
+        process = self._psutil_processes.get(pid)
+        if process is None:
+            process = self._psutil_processes[pid] = psutil.Process(pid)
+        with process.oneshot():
+            cpu_times = process.cpu_times()
+            sample = {
+                "cpu_seconds": cpu_times.user + cpu_times.system,
+                "start_time": process.create_time(),
+                "memory": process.memory_info().rss,
+                "threads": process.num_threads(),
+            }
+            ctx = process.num_ctx_switches()
+            sample.update(ctx_voluntary=ctx.voluntary, ctx_involuntary=ctx.involuntary)
+            try:
+                io = process.io_counters()
+                sample.update(read_bytes=io.read_bytes, write_bytes=io.write_bytes)
+            except (AttributeError, psutil.Error):
+                pass  # macOS 不提供 io_counters
+            try:
+                sample["fds"] = process.num_fds()
+            except (AttributeError, psutil.Error):
+                pass  # Windows 沒有 num_fds
+            if read_pss:
+                try:
+                    full = process.memory_full_info()
+                    sample.update({name: getattr(full, name) for name in ("pss", "swap") if hasattr(full, name)})
+                except psutil.Error:
+                    pass
+        return sample
+
+    def is_running(self) -> bool:
+        """
+        背景取樣線程是否正在運行。
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, callback, interval: float = 1.0, refresh=None):
+        """
+        啟動背景取樣線程，每 interval 秒取樣一次並以結果呼叫 callback。
+
+        Args:
+            callback (callable): 接收 sample() 結果的回調函數，會在取樣線程中被呼叫。
+            interval (float, optional): 取樣間隔 (秒)。默認為 1 秒。
+            refresh (callable, optional): 每輪取樣前呼叫的函數，可用來更新 pid (例如展開程序樹)。默認為 None。
+        """
+        if self.is_running():
+            return self
+        self.interval = interval
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(callback, refresh), name="proc-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        """
+        停止背景取樣線程。
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, callback, refresh):
+        while not self._stop.is_set():
+            started = self._clock()
+            try:
+                if refresh is not None:
+                    refresh()
+                callback(self.sample())
+            except Exception as e:
+                print(f"取樣程序指標時發生錯誤：{e}")
+            self._stop.wait(max(0.0, self.interval - (self._clock() - started)))
@@ -0,0 +1,201 @@
+"""
+process_tree.py
+
+此模組把資源使用量彙總到 PM2 程序的整棵程序樹，以及把 cluster 模式下同名的多個實例彙總成一個邏輯服務。
+
+PM2 的 monit 只涵蓋最上層的 pid，會 fork worker 的 Node API 或帶有子程序的 PHP 伺服器因此會被嚴重低估。
+ProcessTree 維護整台主機的 pid -> 父 pid 對應：每次 refresh() 只列出 /proc 目錄，
+並只讀取新出現的 pid 的 stat，消失的 pid 直接移除，因此兩次輪詢之間不需要從頭重新走訪 /proc。
+"""
+
+import os
+from collections import defaultdict
+
+from src import proc_sampler
+
+try:
+    import psutil
+except ImportError:  # psutil 只在沒有 /proc 時使用
+    psutil = None
+
+# 多個實例的狀態不一致時顯示的狀態
+MIXED_STATUS = "unstable"
+
+
+class ProcessTree:
+    """
+    以增量方式維護的程序父子關係。
+
+    Attributes:
+        proc_root (str): /proc 的路徑。
+        use_proc (bool): 是否直接讀取 /proc；為 False 時改用 psutil 查詢子程序。
+    """
+    def __init__(self, proc_root: str = "/proc"):
+        """
+        初始化 ProcessTree。
+
+        Args:
+            proc_root (str, optional): /proc 的路徑。默認為 "/proc"。
+        """
+        self.proc_root = proc_root
+        self.use_proc = os.path.exists(os.path.join(proc_root, "self", "stat"))
+        self._parents = {}  # pid -> 父 pid
+        self._children = defaultdict(set)  # 父 pid -> 子 pid 集合
+
+    def __len__(self) -> int:
+        return len(self._parents)
+
+    def refresh(self) -> tuple:
+        """
+        同步目前存在的程序：只讀取新出現的 pid 的 stat，並移除已結束的 pid。
+
+        Returns:
+            tuple: (新增的 pid 數, 移除的 pid 數)。
+        """
+        if not self.use_proc:
+            return 0, 0
+        try:
+            current = {int(name) for name in os.listdir(self.proc_root) if name.isdigit()}
+        except OSError:
+            return 0, 0
+        removed = self._parents.keys() - current
+        for pid in removed:
+            parent = self._parents.pop(pid)
+            children = self._children.get(parent)
+            if children is not None:
+                children.discard(pid)
+                if not children:
+                    del self._children[parent]
+        added = 0
+        for pid in current - self._parents.keys():
+            try:
+                stat = proc_sampler.parse_stat(proc_sampler.read_proc_file(f"{self.proc_root}/{pid}/stat"))
+            except (OSError, ValueError, IndexError):
+                continue  # 列出之後就結束的程序
+            self._parents[pid] = stat["ppid"]
+            self._children[stat["ppid"]].add(pid)
+            added += 1
+        return added, len(removed)
+
+    def descendants(self, pid: int) -> list:
+        """
+        返回 pid 的所有子孫程序 (不包含 pid 本身)。
+        """
+        if not self.use_proc:
+            return self._psutil_descendants(pid)
+        result = []
+        stack = list(self._children.get(pid, ()))
+        while stack:
+            child = stack.pop()
+            result.append(child)
+            stack.extend(self._children.get(child, ()))
+        return result
+
+    @staticmethod
+    def _psutil_descendants(pid: int) -> list:
+        if psutil is None:
+            return []
+        try:
+            return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+
+    def expand(self, roots: dict) -> dict:
+        """
+        把每個程序的根 pid 展開為整棵程序樹。
+
+        Args:
+            roots (dict): 程序識別值 (pm_id) 到根 pid 的對應。
+
+        Returns:
+            dict: (程序識別值, pid) 到 pid 的對應，可以直接傳給 ProcSampler.set_pids()。
+        """
+        expanded = {}
+        for key, root in roots.items():
+            if not root:
+                continue
+            expanded[(key, root)] = root
+            for pid in self.descendants(root):
+                expanded[(key, pid)] = pid
+        return expanded
+
+
+def rollup(samples: dict) -> dict:
+    """
+    把以 (程序識別值, pid) 為鍵的取樣結果加總為每個程序識別值一筆。
+    所有欄位都直接相加；RSS 會重複計算父子程序共用的頁面，PSS 則不會。
+
+    Args:
+        samples (dict): ProcSampler.sample() 的結果，鍵為 ProcessTree.expand() 產生的 (程序識別值, pid)。
+
+    Returns:
+        dict: 程序識別值到加總後取樣結果的對應，另外包含 processes (程序樹中被取樣的程序數)。
+    """
+    totals = {}
+    for (key, _), sample in samples.items():
+        total = totals.get(key)
+        if total is None:
+            total = totals[key] = {"processes": 0}
+        total["processes"] += 1
+        for name, value in sample.items():
+            total[name] = total.get(name, 0) + value
+    return totals
+
+
+def group_instances(apis: list) -> dict:
+    """
+    依名稱把 API 分組，cluster 模式 (或以相同名稱啟動多次) 的實例會在同一組中。
+
+    Args:
+        apis (list): parse_pm2_list_output() 返回的 API 字典列表。
+
+    Returns:
+        dict: 名稱到實例列表的對應 (依 pm_id 排序)，保留名稱第一次出現的順序。
+    """
+    groups = {}
+    for api in apis:
+        groups.setdefault(api.get("name"), []).append(api)
+    for instances in groups.values():
+        instances.sort(key=lambda api: api.get("pm_id") if isinstance(api.get("pm_id"), int) else -1)
+    return groups
+
+
+def aggregate_instances(instances: list) -> dict:
+    """
+    把同名的多個實例彙總成一個邏輯服務。
+
+    Args:
+        instances (list): 同名實例的 API 字典列表。
+
+    Returns:
+        dict: 服務字典，包含 type ("service")、name、pm_id (名稱，pm2 以名稱操作時會作用在所有實例上)、
+              port 與 metadata (實例共用)、instance_ids、status (全部相同時為該狀態，否則為 MIXED_STATUS)、
+              加總的 cpu、memory、restarts、instances (每個實例的 pm_id、status、cpu、memory)
+              以及顯示用的 instances_summary。
+    """
+    def number(value):
+        try:
+            return float(str(value).strip().rstrip('%')) if value else 0.0
+        except ValueError:
+            return 0.0
+
+    statuses = {api.get("status", "unknown") for api in instances}
+    first = instances[0] if instances else {}
+    return {
+        "type": "service",
+        "name": first.get("name"),
+        "pm_id": first.get("name"),
+        "project_name": first.get("project_name"),
+        "port": first.get("port"),
+        "metadata": first.get("metadata"),
+        "instance_ids": [api.get("pm_id") for api in instances],
+        "status": statuses.pop() if len(statuses) == 1 else MIXED_STATUS,
+        "cpu": round(sum(number(api.get("cpu")) for api in instances), 1),
+        "memory": int(sum(number(api.get("memory")) for api in instances)),
+        "restarts": int(sum(number(api.get("restarts")) for api in instances)),
+        "instances": [{"pm_id": api.get("pm_id"), "status": api.get("status"),
+                       "cpu": api.get("cpu"), "memory": api.get("memory")} for api in instances],
+        "instances_summary": "；".join(
+            f"#{api.get('pm_id')} {api.get('status', 'unknown')} {number(api.get('cpu')):.1f}% "
+            f"{number(api.get('memory')) / (1024 * 1024):.0f} MB" for api in instances),
+    }
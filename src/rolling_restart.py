@@ -0,0 +1,282 @@
+"""
+rolling_restart.py
+
+此模組提供滾動重啟：把專案的 API 實例分成每批 batch_size 個依序重啟，
+每一批都要等到 PM2 回報 online (且 pm_uptime 已更新，確定是新的程序) 並通過端口健康檢查後才繼續下一批，
+因此重啟期間其他實例仍然在服務。cluster 模式的實例使用 `pm2 reload` (先啟動新的 worker 再結束舊的)，
+fork 模式使用 restart。
+
+每一批之後會比較錯誤率 (例如存取記錄的 5xx 比例) 與重啟前的基準，上升超過門檻、逾時或操作失敗時中止，
+剩下的實例維持原狀繼續服務。PM2 不保留舊版本，因此無法真正回滾已重啟的實例，中止是唯一安全的做法。
+開始時不是 online 的實例 (被手動停止或處於 errored) 會被略過，不會被滾動重啟啟動。
+每一批的操作、等待 online 與健康檢查各自計時，方便依總耗時調整批次大小。
+"""
+
+import http.client
+import time
+
+from src import config
+from src import pm2_manager
+from src.action_executor import STATE_FAILED, STATE_OK, STATE_QUEUED, STATE_RUNNING
+
+STEP_EVENT = "step"
+"""
+每一批完成時進度事件的 state，事件中包含該批的計時 (見 RollingRestart.run() 的 steps)。
+"""
+
+
+def check_health(host: str, port: int, path: str, timeout: float) -> str:
+    """
+    對 API 發出一次 HTTP GET 健康檢查。與 HealthProber 相同，狀態碼小於 500 視為健康。
+
+    Returns:
+        str: 健康時返回 None，否則返回錯誤訊息。
+    """
+    connection = http.client.HTTPConnection(host, int(port), timeout=timeout)
+    try:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        return None if response.status < 500 else f"HTTP {response.status}"
+    except (OSError, http.client.HTTPException) as e:
+        return str(e) or type(e).__name__
+    finally:
+        connection.close()
+
+
+def _process_state(pm2_list: list) -> dict:
+    """
+    返回 pm_id 到 (status, pm_uptime) 的對應。
+    """
+    states = {}
+    for process in pm2_list or []:
+        env = process.get("pm2_env") or {}
+        states[process.get("pm_id")] = (env.get("status", process.get("status")), env.get("pm_uptime"))
+    return states
+
+
+class RollingRestart:
+    """
+    依批次重啟 API 實例並以 online 狀態、健康檢查與錯誤率把關。
+
+    Attributes:
+        batch_size (int): 每一批同時重啟的實例數。
+        online_timeout (float): 等待實例回到 online 的秒數上限。
+        health_timeout (float): 等待健康檢查通過的秒數上限。
+        max_error_rate_increase (float): 錯誤率 (0-1) 相對重啟前基準可以上升的幅度，超過即中止。
+        progress_callback (callable): 接收進度事件字典的回調函數，格式與 ActionExecutor 相同，
+                                      另外每一批完成時發出 state 為 STEP_EVENT 的事件。
+    """
+    def __init__(self, batch_size: int = None, online_timeout: float = None, health_timeout: float = None,
+                 max_error_rate_increase: float = None, progress_callback=None, error_rate=None,
+                 snapshot=None, action=None, health_check=check_health, sleep=time.sleep, clock=time.monotonic):
+        """
+        初始化 RollingRestart。
+
+        Args:
+            batch_size (int, optional): 每批實例數。默認為 config.ROLLING_RESTART_BATCH_SIZE。
+            online_timeout (float, optional): 默認為 config.ROLLING_RESTART_ONLINE_TIMEOUT。
+            health_timeout (float, optional): 默認為 config.ROLLING_RESTART_HEALTH_TIMEOUT。
+            max_error_rate_increase (float, optional): 默認為 config.ROLLING_RESTART_MAX_ERROR_RATE_INCREASE。
+            progress_callback (callable, optional): 進度回調函數。默認為 None。
+            error_rate (callable, optional): 以 pm_id 列表呼叫、返回目前錯誤率 (0-1，沒有數據時為 None) 的函數。
+                                             默認為 None (不檢查錯誤率)。
+            snapshot (callable, optional): 返回新的 PM2 程序列表的函數。默認為 get_pm2_snapshot(max_age=0)。
+            action (callable, optional): 具有 pm2_manager.run_bulk_action() 簽名的函數。
+            health_check (callable, optional): 具有 check_health() 簽名的函數。
+            sleep (callable, optional): 等待用的函數 (測試用)。
+            clock (callable, optional): 單調時鐘 (測試用)。
+        """
+        self.batch_size = max(1, batch_size or config.ROLLING_RESTART_BATCH_SIZE)
+        self.online_timeout = online_timeout or config.ROLLING_RESTART_ONLINE_TIMEOUT
+        self.health_timeout = health_timeout or config.ROLLING_RESTART_HEALTH_TIMEOUT
+        self.max_error_rate_increase = (config.ROLLING_RESTART_MAX_ERROR_RATE_INCREASE
+                                        if max_error_rate_increase is None else max_error_rate_increase)
+        self.progress_callback = progress_callback
+        self._error_rate = error_rate
+        self._snapshot = snapshot or (lambda: pm2_manager.get_pm2_snapshot(max_age=0))
+        self._action = action or pm2_manager.run_bulk_action
+        self._health_check = health_check
+        self._sleep = sleep
+        self._clock = clock
+
+    def run(self, targets: list) -> dict:
+        """
+        依序重啟所有目標。
+
+        Args:
+            targets (list): plan_project_action() 回傳的目標字典列表。開始時不是 online 的目標會被略過。
+
+        Returns:
+            dict: 包含:
+                  - "ok" (bool): 所有沒有被略過的目標都成功重啟且通過檢查。
+                  - "aborted" (str): 中止的原因，沒有中止時為 None。
+                  - "results" (list): 與 targets 同順序的結果字典 (目標欄位加上 ok、error、duration、skipped)，
+                                      因中止而沒有重啟的目標 error 為 "已中止"，
+                                      被略過的目標 ok 為 False、skipped 為 True，error 說明它的狀態。
+                  - "skipped" (list): 被略過的目標名稱。
+                  - "steps" (list): 每一批的計時字典，包含 batch、pm_ids、action、online、health、total (秒)、ok 與 error。
+                  - "duration" (float): 總耗時 (秒)。
+        """
+        started = self._clock()
+        results = {}
+        states = _process_state(self._snapshot())
+        active = []
+        for target in targets:
+            status = states.get(target["pm_id"], (None, None))[0]
+            if status == "online":
+                active.append(target)
+                self._emit(target, STATE_QUEUED)
+            else:
+                results[target["pm_id"]] = dict(target, ok=False, skipped=True, duration=0.0,
+                                                error=f"狀態為 {status or '未知'}，已略過")
+        pm_ids = [target["pm_id"] for target in active]
+        baseline = None
+        if self._error_rate is not None and active:
+            baseline = self._error_rate(pm_ids) or 0.0  # 重啟前沒有流量時以 0 為基準
+        steps = []
+        aborted = None
+        for number, start in enumerate(range(0, len(active), self.batch_size), 1):
+            batch = active[start:start + self.batch_size]
+            if aborted is not None:
+                for target in batch:
+                    results[target["pm_id"]] = dict(target, ok=False, skipped=False, error="已中止", duration=0.0)
+                    self._emit(target, STATE_FAILED, error="已中止")
+                continue
+            step = self._run_batch(number, batch, results)
+            if step["ok"] and baseline is not None:
+                self._sleep(config.ROLLING_RESTART_SETTLE)  # 讓錯誤率反映重啟後的流量
+                rate = self._error_rate(pm_ids)
+                if rate is not None and rate > baseline + self.max_error_rate_increase:
+                    step.update(ok=False, error=f"錯誤率由 {baseline:.1%} 上升至 {rate:.1%}")
+            steps.append(step)
+            self._emit({"name": ", ".join(target["name"] for target in batch)}, STEP_EVENT, step["total"],
+                       step["error"], step=step)
+            if not step["ok"]:
+                aborted = f"第 {number} 批：{step['error']}"
+        ordered = [results[target["pm_id"]] for target in targets]
+        return {"ok": aborted is None and all(result["ok"] for result in ordered if not result["skipped"]),
+                "aborted": aborted, "results": ordered, "steps": steps,
+                "skipped": [result["name"] for result in ordered if result["skipped"]],
+                "duration": self._clock() - started}
+
+    def _run_batch(self, number: int, batch: list, results: dict) -> dict:
+        """
+        重啟一批實例並等待它們回到 online 且通過健康檢查。
+        """
+        pm_ids = [target["pm_id"] for target in batch]
+        step = {"batch": number, "pm_ids": pm_ids, "action": 0.0, "online": 0.0, "health": 0.0, "total": 0.0,
+                "ok": True, "error": None}
+        started = self._clock()
+        before = _process_state(self._snapshot())
+        for target in batch:
+            self._emit(target, STATE_RUNNING)
+        errors = {}
+        by_verb = {}
+        for target in batch:
+            verb = "reload" if target.get("exec_mode") == "cluster_mode" else "restart"
+            by_verb.setdefault(verb, []).append(target["pm_id"])
+        for verb, verb_ids in by_verb.items():
+            try:
+                errors.update(self._action(verb, verb_ids))
+            except Exception as e:
+                errors.update({pm_id: str(e) for pm_id in verb_ids})
+        step["action"] = self._clock() - started
+
+        pending = [target for target in batch if errors.get(target["pm_id"]) is None]
+        phase = self._clock()
+        pending = self._wait_online(pending, before, errors)
+        step["online"] = self._clock() - phase
+        phase = self._clock()
+        self._wait_healthy(pending, errors)
+        step["health"] = self._clock() - phase
+        step["total"] = self._clock() - started
+
+        for target in batch:
+            error = errors.get(target["pm_id"])
+            results[target["pm_id"]] = dict(target, ok=error is None, skipped=False, error=error,
+                                            duration=step["total"])
+            self._emit(target, STATE_OK if error is None else STATE_FAILED, step["total"], error)
+            if error is not None and step["ok"]:
+                step.update(ok=False, error=f"{target['name']} (ID: {target['pm_id']})：{error}")
+        return step
+
+    def _wait_online(self, targets: list, before: dict, errors: dict) -> list:
+        """
+        等待實例回到 online 且 pm_uptime 與重啟前不同，逾時的實例記錄錯誤。
+
+        Returns:
+            list: 已經 online 的目標。
+        """
+        waiting = {target["pm_id"]: target for target in targets}
+        deadline = self._clock() + self.online_timeout
+        while waiting:
+            states = _process_state(self._snapshot())
+            for pm_id in list(waiting):
+                status, uptime = states.get(pm_id, (None, None))
+                if status == "online" and uptime != before.get(pm_id, (None, None))[1]:
+                    del waiting[pm_id]
+                elif status == "errored":
+                    errors[pm_id] = "程序狀態為 errored"
+                    del waiting[pm_id]
+            if not waiting or self._clock() >= deadline:
+                break
+            self._sleep(config.ROLLING_RESTART_POLL_INTERVAL)
+        for pm_id, target in waiting.items():
+            errors[pm_id] = f"{self.online_timeout:g} 秒內沒有回到 online (狀態：{states.get(pm_id, (None,))[0]})"
+        return [target for target in targets if errors.get(target["pm_id"]) is None]
+
+    def _wait_healthy(self, targets: list, errors: dict):
+        """
+        等待有端口的實例通過健康檢查，逾時的實例記錄最後一次的錯誤。
+        """
+        waiting = {target["pm_id"]: target for target in targets if str(target.get("port") or "").isdigit()}
+        last_error = {}
+        deadline = self._clock() + self.health_timeout
+        while waiting:
+            for pm_id, target in list(waiting.items()):
+                error = self._health_check(target.get("host", "localhost"), int(target["port"]),
+                                           target.get("health_path") or config.HEALTH_PROBE_PATH,
+                                           config.HEALTH_PROBE_TIMEOUT)
+                if error is None:
+                    del waiting[pm_id]
+                else:
+                    last_error[pm_id] = error
+            if not waiting or self._clock() >= deadline:
+                break
+            self._sleep(config.ROLLING_RESTART_POLL_INTERVAL)
+        for pm_id in waiting:
+            errors[pm_id] = f"健康檢查在 {self.health_timeout:g} 秒內沒有通過 ({last_error.get(pm_id)})"
+
+    def _emit(self, target: dict, state: str, duration: float = 0.0, error: str = None, **extra):
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback(dict({
+                "pm_id": target.get("pm_id"),
+                "name": target.get("name"),
+                "project_name": target.get("project_name"),
+                "host": target.get("host", "localhost"),
+                "state": state,
+                "duration": duration,
+                "error": error,
+            }, **extra))
+        except Exception as e:
+            print(f"進度回調時發生錯誤：{e}")
+
+
+def format_steps(report: dict) -> str:
+    """
+    將 RollingRestart.run() 的計時格式化為多行文字，每一批一行。
+    """
+    lines = []
+    for step in report["steps"]:
+        line = (f"第 {step['batch']} 批 {step['pm_ids']}：操作 {step['action']:.1f} 秒，等待 online {step['online']:.1f} 秒，"
+                f"健康檢查 {step['health']:.1f} 秒，共 {step['total']:.1f} 秒")
+        if step["error"]:
+            line += f" ({step['error']})"
+        lines.append(line)
+    if report.get("skipped"):
+        lines.append(f"略過沒有在運行的實例：{', '.join(report['skipped'])}")
+    lines.append(f"總耗時 {report['duration']:.1f} 秒")
+    return "\n".join(lines)
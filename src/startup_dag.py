@@ -0,0 +1,315 @@
+"""
+startup_dag.py
+
+此模組提供依賴感知的並行啟動。api.json 中的 API 可以用 `depends_on` 列出它依賴的 API 名稱，
+並以 `ready` 指定就緒檢查 ("online"、"tcp" 或 "http"，有端口時默認為 "http"，否則為 "online")。
+啟動時先建立依賴圖 (有循環時拋出 ValueError)，沒有依賴的 API 同時啟動，
+其他 API 在所有依賴都就緒後立即啟動，而不是等待整個層級完成，
+因此冷啟動整個專案的耗時接近依賴圖的關鍵路徑長度，而不是所有啟動時間的總和。
+依賴的 API 啟動失敗時，所有依賴它的 API 都不會被啟動。
+"""
+
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src import config
+from src import pm2_manager
+from src.action_executor import STATE_FAILED, STATE_OK, STATE_QUEUED, STATE_RUNNING
+from src.rolling_restart import check_health
+
+READY_CHECKS = ("online", "tcp", "http")
+
+
+def has_dependencies(targets: list) -> bool:
+    """
+    返回目標中是否有任何 API 宣告了 depends_on。
+    """
+    return any(target.get("depends_on") for target in targets)
+
+
+def check_tcp(host: str, port: int, path: str, timeout: float) -> str:
+    """
+    檢查端口是否接受 TCP 連線。簽名與 rolling_restart.check_health() 相同 (path 不使用)。
+
+    Returns:
+        str: 可以連線時返回 None，否則返回錯誤訊息。
+    """
+    try:
+        socket.create_connection((host, int(port)), timeout=timeout).close()
+        return None
+    except OSError as e:
+        return str(e) or type(e).__name__
+
+
+def build_graph(targets: list) -> dict:
+    """
+    以 API 名稱為節點建立依賴圖。同名的多個實例 (cluster 或 instances > 1) 屬於同一個節點，
+    depends_on 中不在 targets 內的名稱 (例如其他專案中已在執行的 API) 會被忽略。
+
+    Args:
+        targets (list): plan_project_action() 回傳的目標字典列表。
+
+    Returns:
+        dict: 以 API 名稱為鍵的節點字典，每個節點包含:
+              - "targets" (list): 該 API 的所有實例目標。
+              - "depends_on" (list): 依賴的節點名稱。
+              - "dependents" (list): 依賴此節點的節點名稱。
+              - "level" (int): 節點所在的層級 (沒有依賴為 0)。
+
+    Raises:
+        ValueError: 如果依賴圖中有循環。
+    """
+    nodes = {}
+    for target in targets:
+        node = nodes.setdefault(target["name"], {"targets": [], "depends_on": [], "dependents": [], "level": 0})
+        node["targets"].append(target)
+    for name, node in nodes.items():
+        depends_on = node["targets"][0].get("depends_on") or []
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        for dependency in dict.fromkeys(depends_on):
+            if dependency in nodes and dependency != name:
+                node["depends_on"].append(dependency)
+                nodes[dependency]["dependents"].append(name)
+            elif dependency == name:
+                raise ValueError(f"依賴圖中有循環：{name} -> {name}")
+
+    remaining = {name: len(node["depends_on"]) for name, node in nodes.items()}
+    frontier = [name for name, count in remaining.items() if count == 0]
+    visited = 0
+    while frontier:
+        name = frontier.pop()
+        visited += 1
+        for dependent in nodes[name]["dependents"]:
+            nodes[dependent]["level"] = max(nodes[dependent]["level"], nodes[name]["level"] + 1)
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                frontier.append(dependent)
+    if visited < len(nodes):
+        cycle = _find_cycle(nodes, [name for name, count in remaining.items() if count])
+        raise ValueError(f"依賴圖中有循環：{' -> '.join(cycle)}")
+    return nodes
+
+
+def _find_cycle(nodes: dict, candidates: list) -> list:
+    """
+    在拓撲排序剩下的節點中找出一個循環，返回首尾相同的節點名稱列表。
+    """
+    path = []
+    position = {}
+    name = candidates[0]
+    # 剩下的節點都至少有一個同樣剩下的依賴，沿著依賴走下去一定會回到走過的節點
+    while name not in position:
+        position[name] = len(path)
+        path.append(name)
+        name = next(dependency for dependency in nodes[name]["depends_on"] if dependency in candidates)
+    return path[position[name]:] + [name]
+
+
+def get_levels(nodes: dict) -> list:
+    """
+    將 build_graph() 的節點依層級分組，同一層級的 API 之間沒有依賴。
+
+    Returns:
+        list: 每個層級的 API 名稱列表。
+    """
+    levels = []
+    for name, node in nodes.items():
+        while len(levels) <= node["level"]:
+            levels.append([])
+        levels[node["level"]].append(name)
+    return levels
+
+
+class StartupScheduler:
+    """
+    依依賴圖並行啟動 API，每個 API 在依賴就緒後才啟動。
+
+    Attributes:
+        max_workers (int): 同時啟動中 (包含等待就緒) 的 API 數量上限。
+        ready_timeout (float): 每個 API 從啟動到就緒的默認秒數上限，可以在 api.json 中以 ready_timeout 設定。
+        progress_callback (callable): 接收進度事件字典的回調函數，格式與 ActionExecutor 相同，會在工作線程中被呼叫。
+    """
+    def __init__(self, max_workers: int = None, ready_timeout: float = None, progress_callback=None,
+                 snapshot=None, action=None, checks=None, sleep=time.sleep, clock=time.monotonic):
+        """
+        初始化 StartupScheduler。
+
+        Args:
+            max_workers (int, optional): 最大並行數。默認為 config.STARTUP_MAX_WORKERS。
+            ready_timeout (float, optional): 默認為 config.STARTUP_READY_TIMEOUT。
+            progress_callback (callable, optional): 進度回調函數。默認為 None。
+            snapshot (callable, optional): 返回 PM2 程序列表的函數。默認為 get_pm2_snapshot()，
+                                           快取時間為 STARTUP_POLL_INTERVAL，讓同時等待的 API 共用同一次查詢。
+            action (callable, optional): 具有 pm2_manager.run_bulk_action() 簽名的函數。
+            checks (dict, optional): 就緒檢查名稱 ("tcp"、"http") 到檢查函數的對應 (測試用)。
+            sleep (callable, optional): 等待用的函數 (測試用)。
+            clock (callable, optional): 單調時鐘 (測試用)。
+        """
+        self.max_workers = max(1, max_workers or config.STARTUP_MAX_WORKERS)
+        self.ready_timeout = ready_timeout or config.STARTUP_READY_TIMEOUT
+        self.progress_callback = progress_callback
+        self._snapshot = snapshot or (lambda: pm2_manager.get_pm2_snapshot(max_age=config.STARTUP_POLL_INTERVAL))
+        self._action = action or pm2_manager.run_bulk_action
+        self._checks = checks or {"tcp": check_tcp, "http": check_health}
+        self._sleep = sleep
+        self._clock = clock
+        self._started = 0.0
+
+    def run(self, targets: list) -> list:
+        """
+        依依賴圖啟動所有目標並等待全部完成。
+
+        Args:
+            targets (list): plan_project_action() 回傳的目標字典列表。
+
+        Returns:
+            list: 與 targets 同順序的結果字典，包含目標的欄位以及 ok、error、duration (該 API 從啟動到就緒的秒數)
+                  和 ready_at (從開始執行到該 API 就緒的秒數，失敗時為 None)。
+
+        Raises:
+            ValueError: 如果依賴圖中有循環。此時不會啟動任何 API。
+        """
+        nodes = build_graph(targets)
+        self._started = self._clock()
+        for target in targets:
+            self._emit(target, STATE_QUEUED)
+
+        remaining = {name: len(node["depends_on"]) for name, node in nodes.items()}
+        node_results = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(nodes) or 1),
+                                thread_name_prefix="pm2-startup") as pool:
+            running = {pool.submit(self._start_node, name, node): name
+                       for name, node in nodes.items() if remaining[name] == 0}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    node_results[name] = future.result()
+                    if node_results[name]["error"] is not None:
+                        self._skip_dependents(nodes, name, node_results)
+                        continue
+                    for dependent in nodes[name]["dependents"]:
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0 and dependent not in node_results:
+                            running[pool.submit(self._start_node, dependent, nodes[dependent])] = dependent
+
+        results = []
+        for target in targets:
+            result = node_results[target["name"]]
+            error = result["errors"].get(target["pm_id"], result["error"])
+            results.append(dict(target, ok=error is None, error=error, duration=result["duration"],
+                                ready_at=result["ready_at"] if error is None else None))
+        return results
+
+    def _skip_dependents(self, nodes: dict, name: str, node_results: dict):
+        """
+        將所有直接或間接依賴失敗節點的 API 標記為失敗。
+        """
+        pending = list(nodes[name]["dependents"])
+        while pending:
+            dependent = pending.pop()
+            if dependent in node_results:
+                continue
+            error = f"依賴的 {name} 沒有就緒，未啟動"
+            node_results[dependent] = {"error": error, "errors": {}, "duration": 0.0, "ready_at": None}
+            for target in nodes[dependent]["targets"]:
+                self._emit(target, STATE_FAILED, error=error)
+            pending.extend(nodes[dependent]["dependents"])
+
+    def _start_node(self, name: str, node: dict) -> dict:
+        """
+        啟動一個 API 的所有實例並等待它們 online 且通過就緒檢查。
+
+        Returns:
+            dict: 包含 error (第一個錯誤，成功時為 None)、errors (以 pm_id 為鍵的錯誤)、duration 與 ready_at。
+        """
+        targets = node["targets"]
+        for target in targets:
+            self._emit(target, STATE_RUNNING)
+        started = self._clock()
+        pm_ids = [target["pm_id"] for target in targets]
+        try:
+            errors = {pm_id: error for pm_id, error in self._action("start", pm_ids).items() if error is not None}
+        except Exception as e:
+            errors = {pm_id: str(e) for pm_id in pm_ids}
+        timeout = float(targets[0].get("ready_timeout") or self.ready_timeout)
+        deadline = started + timeout
+        if not errors:
+            self._wait_online(pm_ids, deadline, timeout, errors)
+        if not errors:
+            error = self._wait_ready(targets[0], deadline, timeout)
+            if error is not None:
+                errors = {pm_id: error for pm_id in pm_ids}
+
+        duration = self._clock() - started
+        for target in targets:
+            error = errors.get(target["pm_id"])
+            self._emit(target, STATE_OK if error is None else STATE_FAILED, duration, error)
+        first_error = next((errors[pm_id] for pm_id in pm_ids if pm_id in errors), None)
+        return {"error": first_error, "errors": errors, "duration": duration,
+                "ready_at": self._clock() - self._started}
+
+    def _wait_online(self, pm_ids: list, deadline: float, timeout: float, errors: dict):
+        """
+        等待所有實例的 PM2 狀態變成 online，逾時或 errored 的實例記錄錯誤。
+        """
+        waiting = set(pm_ids)
+        statuses = {}
+        while waiting:
+            for process in self._snapshot() or []:
+                env = process.get("pm2_env") or {}
+                statuses[process.get("pm_id")] = env.get("status", process.get("status"))
+            for pm_id in list(waiting):
+                if statuses.get(pm_id) == "online":
+                    waiting.discard(pm_id)
+                elif statuses.get(pm_id) == "errored":
+                    errors[pm_id] = "程序狀態為 errored"
+                    waiting.discard(pm_id)
+            if not waiting or self._clock() >= deadline:
+                break
+            self._sleep(config.STARTUP_POLL_INTERVAL)
+        for pm_id in waiting:
+            errors[pm_id] = f"{timeout:g} 秒內沒有 online (狀態：{statuses.get(pm_id)})"
+
+    def _wait_ready(self, target: dict, deadline: float, timeout: float) -> str:
+        """
+        重複執行 API 的就緒檢查直到通過或逾時。
+
+        Returns:
+            str: 就緒時返回 None，否則返回錯誤訊息。
+        """
+        has_port = str(target.get("port") or "").isdigit()
+        kind = target.get("ready") or ("http" if has_port else "online")
+        if kind == "online":
+            return None
+        if kind not in READY_CHECKS:
+            return f"未知的就緒檢查：{kind}"
+        if not has_port:
+            return f"就緒檢查 {kind} 需要在 api.json 中設定 port"
+        check = self._checks[kind]
+        while True:
+            error = check(target.get("host", "localhost"), int(target["port"]),
+                          target.get("health_path") or config.HEALTH_PROBE_PATH, config.HEALTH_PROBE_TIMEOUT)
+            if error is None:
+                return None
+            if self._clock() >= deadline:
+                return f"{timeout:g} 秒內沒有就緒 ({error})"
+            self._sleep(config.STARTUP_POLL_INTERVAL)
+
+    def _emit(self, target: dict, state: str, duration: float = 0.0, error: str = None):
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback({
+                "pm_id": target.get("pm_id"),
+                "name": target.get("name"),
+                "project_name": target.get("project_name"),
+                "host": target.get("host", "localhost"),
+                "state": state,
+                "duration": duration,
+                "error": error,
+            })
+        except Exception as e:
+            print(f"進度回調時發生錯誤：{e}")
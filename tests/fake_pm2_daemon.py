@@ -0,0 +1,296 @@
+"""
+fake_pm2_daemon.py
+
+一個在本機執行的 PM2 守護程序替身，透過 $PM2_HOME/rpc.sock 說與 PM2 相同的 AMP/RPC 協議，
+並在 $PM2_HOME/pub.sock 上像 PM2 一樣廣播 process:event 與日誌事件。
+用於單元測試與基準測試，不需要安裝 Node.js 或 PM2。
+
+直接執行此檔案時，它會扮演一個最小的 `pm2` CLI (支援 jlist/start/stop/restart)，
+每次呼叫都啟動一個新的直譯器並連線到 PM2_HOME 下的守護程序，用來模擬 CLI 路徑的成本。
+"""
+
+import copy
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pm2_rpc import AmpDecoder, encode_message, RPC_SOCKET_NAME, PUB_SOCKET_NAME
+
+
+def make_process(pm_id: int, name: str, status: str = "online", **monit) -> dict:
+    """
+    建立一筆與 `pm2 jlist` 結構相同的程序資訊。
+
+    Args:
+        pm_id (int): PM2 ID。
+        name (str): 程序名稱。
+        status (str): 程序狀態。默認為 "online"。
+        **monit: 覆寫 monit 區塊的 cpu / memory。
+
+    Returns:
+        dict: 程序資訊字典。
+    """
+    return {
+        "name": name,
+        "pm_id": pm_id,
+        "pid": 10000 + pm_id if status == "online" else 0,
+        "monit": {"cpu": monit.get("cpu", 0), "memory": monit.get("memory", 0)},
+        "pm2_env": {
+            "status": status,
+            "restart_time": 0,
+            "created_at": int(time.time() * 1000),
+            "pm_out_log_path": f"/tmp/{name}-out.log",
+            "pm_err_log_path": f"/tmp/{name}-error.log",
+            "args": [],
+        },
+    }
+
+
+class FakePM2Daemon:
+    """
+    PM2 守護程序替身。
+
+    Attributes:
+        pm2_home (str): 放置 rpc.sock 的目錄。
+        processes (dict): 以 pm_id 為鍵的程序資訊。
+        latency (float): 每個 RPC 方法的模擬處理延遲 (秒)。
+        calls (list): 收到的 (method, args) 記錄。
+    """
+    def __init__(self, pm2_home: str, processes: list = None, latency: float = 0.0):
+        """
+        初始化 FakePM2Daemon。
+
+        Args:
+            pm2_home (str): PM2_HOME 目錄。
+            processes (list, optional): 初始程序列表。
+            latency (float, optional): 每個方法的模擬延遲秒數。默認為 0。
+        """
+        self.pm2_home = pm2_home
+        self.processes = {p["pm_id"]: p for p in (processes or [])}
+        self.latency = latency
+        self.calls = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._pub_server = None
+        self._connections = set()
+        self._subscribers = set()
+        self._pub_lock = threading.Lock()
+        self._running = False
+
+    @property
+    def rpc_socket_path(self) -> str:
+        return os.path.join(self.pm2_home, RPC_SOCKET_NAME)
+
+    @property
+    def pub_socket_path(self) -> str:
+        return os.path.join(self.pm2_home, PUB_SOCKET_NAME)
+
+    def start(self):
+        """
+        建立 rpc.sock 與 pub.sock 並在背景線程中開始接受連線。
+        """
+        os.makedirs(self.pm2_home, exist_ok=True)
+        self._server = self._listen(self.rpc_socket_path)
+        self._pub_server = self._listen(self.pub_socket_path)
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._accept_subscribers, args=(self._pub_server,), daemon=True).start()
+        return self
+
+    @staticmethod
+    def _listen(path: str):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(16)
+        return server
+
+    def wait_for_subscribers(self, count: int = 1, timeout: float = 2.0) -> bool:
+        """
+        等待至少 count 個匯流排訂閱者連線。
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if len(self._subscribers) >= count:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def publish(self, topic: str, data: dict):
+        """
+        在 pub.sock 上廣播一個事件給所有訂閱者。
+        """
+        message = encode_message([topic, data])
+        with self._pub_lock:
+            for conn in list(self._subscribers):
+                try:
+                    conn.sendall(message)
+                except OSError:
+                    self._subscribers.discard(conn)
+
+    def publish_process_event(self, event: str, proc: dict):
+        """
+        以 PM2 的格式廣播 process:event。
+        """
+        process = {"name": proc["name"], "pm_id": proc["pm_id"], "status": proc["pm2_env"]["status"],
+                   "pm2_env": copy.deepcopy(proc["pm2_env"])}
+        self.publish("process:event", {"event": event, "process": process, "at": int(time.time() * 1000)})
+
+    def publish_log(self, pm_id: int, line: str, stream: str = "out"):
+        """
+        以 PM2 的格式廣播 log:out / log:err。
+        """
+        proc = self.processes[pm_id]
+        self.publish(f"log:{stream}", {"process": {"name": proc["name"], "pm_id": pm_id},
+                                        "data": line, "at": int(time.time() * 1000)})
+
+    def stop(self):
+        """
+        停止守護程序替身並移除 socket 檔案。
+        """
+        self._running = False
+        for server in (self._server, self._pub_server):
+            if server is not None:
+                try:
+                    server.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                server.close()
+        self._server = self._pub_server = None
+        for conn in list(self._connections) + list(self._subscribers):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._subscribers.clear()
+        for path in (self.rpc_socket_path, self.pub_socket_path):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            self._connections.add(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _accept_subscribers(self, server):
+        while self._running:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            self._subscribers.add(conn)
+
+    def _serve(self, conn):
+        decoder = AmpDecoder()
+        with conn:
+            while self._running:
+                try:
+                    data = conn.recv(65536)
+                except OSError:
+                    return
+                if not data:
+                    return
+                for message in decoder.feed(data):
+                    request, request_id = message[0], message[-1]
+                    reply = self._dispatch(request.get("method"), request.get("args", []))
+                    try:
+                        conn.sendall(encode_message([reply, request_id]))
+                    except OSError:
+                        return
+        self._connections.discard(conn)
+
+    def _dispatch(self, method: str, args: list) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls.append((method, args))
+            handler = getattr(self, f"_rpc_{method}", None)
+            if handler is None:
+                return {"error": f'method "{method}" does not exist'}
+            try:
+                return {"args": [handler(*args)]}
+            except KeyError as e:
+                return {"error": {"message": f"{e.args[0]} id unknown"}}
+            except RuntimeError as e:
+                return {"error": {"message": str(e)}}
+
+    def _get(self, target):
+        pm_id = target.get("id") if isinstance(target, dict) else target
+        pm_id = int(pm_id)
+        if pm_id not in self.processes:
+            raise KeyError(pm_id)
+        return self.processes[pm_id]
+
+    def _rpc_ping(self):
+        return {"msg": "pong"}
+
+    def _rpc_getMonitorData(self, _env=None):
+        return copy.deepcopy(list(self.processes.values()))
+
+    def _rpc_startProcessId(self, target):
+        proc = self._get(target)
+        if proc["pm2_env"]["status"] == "online":
+            raise RuntimeError("process already online")
+        proc["pm2_env"]["status"] = "online"
+        proc["pid"] = 10000 + proc["pm_id"]
+        self.publish_process_event("online", proc)
+        return copy.deepcopy(proc)
+
+    def _rpc_stopProcessId(self, target):
+        proc = self._get(target)
+        proc["pm2_env"]["status"] = "stopped"
+        proc["pid"] = 0
+        self.publish_process_event("stop", proc)
+        return copy.deepcopy(proc)
+
+    def _rpc_restartProcessId(self, target):
+        proc = self._get(target)
+        proc["pm2_env"]["status"] = "online"
+        proc["pm2_env"]["restart_time"] += 1
+        proc["pid"] = 10000 + proc["pm_id"]
+        self.publish_process_event("restart", proc)
+        self.publish_process_event("online", proc)
+        return copy.deepcopy(proc)
+
+
+def _cli_main(argv: list) -> int:
+    """
+    最小的 `pm2` CLI 替身：連線到 PM2_HOME 下的守護程序執行一個命令後結束。
+    """
+    from src.pm2_rpc import PM2RpcClient, PM2RpcError
+    client = PM2RpcClient(os.environ.get("PM2_HOME"))
+    verb, targets = argv[0], argv[1:]
+    if verb == "jlist":
+        print(json.dumps(client.list_processes()))
+        return 0
+    method = {"start": client.start_process, "stop": client.stop_process,
+              "restart": client.restart_process}[verb]
+    exit_code = 0
+    for target in targets:
+        try:
+            method(int(target))
+            print(f"[PM2] [{target}]({target}) ✓")
+        except PM2RpcError as e:
+            print(f"[PM2][ERROR] {e}", file=sys.stderr)
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(_cli_main(sys.argv[1:]))
@@ -0,0 +1,161 @@
+"""
+test_access_log.py
+
+此模組包含 `access_log.py` 的單元測試。
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import pm2_manager
+from src.access_log import AccessLogMonitor, AccessLogParser, AccessStats, build_sources, format_access
+
+COMBINED_TIMED = (b'10.0.0.1 - - [17/Oct/2026:07:00:00 +0000] "GET /a HTTP/1.1" 200 12 "-" "curl/8" 0.010\n'
+                  b'2026-10-17T07:00:00: 10.0.0.2 - bob [17/Oct/2026:07:00:01 +0000] "POST /b HTTP/1.1" 503 0 '
+                  b'"-" "Mozilla/5.0 (X11)" 0.200\n'
+                  b'Server listening on port 3001\n'
+                  b'10.0.0.3 - - [17/Oct/2026:07:00:02 +0000] "GET /c HTTP/1.1" 404 0 "-" "curl/8" -\n')
+
+
+class TestAccessLogParser(unittest.TestCase):
+
+    def parse(self, parser, data):
+        stats = AccessStats()
+        parser.parse(data, stats)
+        return stats
+
+    def test_preset_with_latency(self):
+        stats = self.parse(AccessLogParser("combined_timed"), COMBINED_TIMED)
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(dict(stats.statuses), {b"200": 1, b"503": 1, b"404": 1})
+        values = stats.values(2.0)
+        self.assertEqual(values["req_rate"], 1.5)
+        self.assertEqual((values["rate_2xx"], values["rate_4xx"], values["rate_5xx"]), (0.5, 0.5, 0.5))
+        self.assertAlmostEqual(values["latency_p50"], 105.0)  # 秒換算為毫秒，"-" 不計入
+
+    def test_template_and_regex(self):
+        stats = self.parse(AccessLogParser("$method $url -> $status in $response_time ms"),
+                           b"GET / -> 200 in 4.5 ms\r\nGET /x -> 500 in 12 ms\nGET / -> ??? in 1 ms\n")
+        self.assertEqual(stats.count, 2)
+        self.assertEqual(stats.values(1.0)["latency_p99"], 12.0 - 0.01 * (12.0 - 4.5))
+        parser = AccessLogParser(regex=r"status=(?P<status>\d+) took=(?P<latency_us>\d+)us")
+        stats = self.parse(parser, b"status=201 took=1500us\nstatus=302 took=500us\n")
+        self.assertEqual(stats.values(1.0)["latency_p50"], 1.0)
+        stats = self.parse(AccessLogParser(regex=r"^(?P<status>\d{3})$"), b"200\n301\n")
+        self.assertEqual(stats.values(1.0)["rate_3xx"], 1.0)
+
+    def test_invalid_formats(self):
+        with self.assertRaises(ValueError):
+            AccessLogParser("$remote_addr $request")
+        with self.assertRaises(ValueError):
+            AccessLogParser(regex="(?P<status>")
+        with self.assertRaises(ValueError):
+            AccessLogParser()
+
+    def test_format_access(self):
+        self.assertEqual(format_access(None), "N/A")
+        values = self.parse(AccessLogParser("combined_timed"), COMBINED_TIMED).values(1.0)
+        self.assertEqual(format_access(values),
+                         "3.0 req/s｜2xx 33% 4xx 33% 5xx 33%｜p50 105 ms p95 190 ms p99 198 ms")
+        self.assertEqual(format_access(AccessStats().values(1.0)), "0.0 req/s")
+
+
+class TestAccessLogMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "api-out.log")
+        self.now = 1_700_000_000.0
+        self.records = []
+        self.monitor = AccessLogMonitor(lambda *args: self.records.append(args), clock=lambda: self.now)
+        self.apis = [{"pm_id": 3, "name": "api", "log_file_path": self.path,
+                      "metadata": {"access_log_format": "combined_timed"}},
+                     {"pm_id": 4, "name": "other", "log_file_path": "/logs/other.log", "metadata": {}}]
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def append(self, data):
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def test_build_sources(self):
+        self.assertEqual([source["pm_id"] for source in build_sources(self.apis)], [3])
+        with patch('src.config.ACCESS_LOG_DEFAULT_FORMAT', "common"):
+            self.assertEqual([source["template"] for source in build_sources(self.apis)], ["combined_timed", "common"])
+
+    def test_incremental_rates(self):
+        self.append(b"10.0.0.9 - - [old] \"GET / HTTP/1.1\" 200 1 \"-\" \"x\" 0.5\n")
+        self.monitor.set_sources(self.apis)
+        self.monitor.poll()  # 從結尾開始，舊的行不計入
+        self.assertEqual(self.records, [])
+        self.append(COMBINED_TIMED + b'10.0.0.4 - - [partial')
+        self.now += 2
+        self.assertEqual(self.monitor.poll(), len(COMBINED_TIMED))
+        pm_id, timestamp, values = self.records[-1]
+        self.assertEqual((pm_id, timestamp, values["req_rate"]), (3, int(self.now * 1000), 1.5))
+        self.assertEqual(self.monitor.latest(3), values)
+        self.append(b'] "GET / HTTP/1.1" 200 1 "-" "x" 0.001\n')
+        self.now += 1
+        self.monitor.poll()
+        self.assertEqual(self.records[-1][2]["req_rate"], 1.0)  # 寫完的行在下一輪計入
+        self.now += 5
+        self.monitor.poll()
+        self.assertEqual(self.records[-1][2]["req_rate"], 0.0)
+
+    def test_line_longer_than_read_chunk(self):
+        self.append(b"startup line\n")
+        self.monitor.set_sources(self.apis)
+        self.monitor.poll()
+        self.append(b"x" * 1000 + b"\n" + COMBINED_TIMED)
+        self.now += 2
+        with patch('src.config.ACCESS_LOG_READ_BYTES', 256):
+            self.assertEqual(self.monitor.poll(), 1001 + len(COMBINED_TIMED))  # 跳過過長的行，不會卡住
+        self.assertEqual(self.records[-1][2]["req_rate"], 1.5)
+
+    def test_rotation_and_invalid_format(self):
+        self.append(b"startup line\n" * 100)
+        self.monitor.set_sources(self.apis)
+        self.monitor.poll()
+        os.remove(self.path)
+        self.append(COMBINED_TIMED)
+        self.monitor.poll()
+        self.assertEqual(self.records, [])  # 新檔案同樣從結尾開始
+        apis = [dict(self.apis[0], metadata={"access_log_format": "$request"})]
+        with patch('builtins.print') as mock_print:
+            self.monitor.set_sources(apis)
+            self.monitor.set_sources(apis)
+        mock_print.assert_called_once()
+        self.assertIsNone(self.monitor.latest(3))
+
+    def test_records_into_history(self):
+        pm2_manager._access_store.clear()
+        try:
+            monitor = AccessLogMonitor(pm2_manager.record_access_metrics)
+            self.append(b"")
+            monitor.set_sources(self.apis)
+            monitor.poll()
+            self.append(COMBINED_TIMED)
+            monitor.poll()
+            histories = pm2_manager.get_access_metrics_range([3, 4], 600)
+            self.assertEqual(list(histories), [3])
+            self.assertAlmostEqual(float(histories[3]["rate_5xx"][-1]) * 3 / float(histories[3]["req_rate"][-1]), 1.0,
+                                   places=5)
+        finally:
+            pm2_manager._access_store.clear()
+
+    def test_background_thread(self):
+        self.monitor.set_sources(self.apis)
+        self.monitor.start(0.01)
+        self.monitor.stop()
+        self.assertFalse(self.monitor.is_running())
+
+
+if __name__ == '__main__':
+    unittest.main()
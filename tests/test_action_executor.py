@@ -0,0 +1,91 @@
+"""
+test_action_executor.py
+
+此模組包含 `action_executor.py` 的單元測試。
+"""
+
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import threading
+import time
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.action_executor import ActionExecutor
+
+
+def make_targets(count, host="localhost"):
+    return [{"pm_id": i, "name": f"api-{i}", "project_name": "p", "host": host} for i in range(count)]
+
+
+class TestActionExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.active = {}
+        self.max_active = {}
+        self.calls = []
+
+    def fake_bulk_action(self, delay=0.2, fail_ids=()):
+        def run_bulk_action(verb, pm_ids):
+            host = "db" if pm_ids and pm_ids[0] >= 100 else "localhost"
+            with self.lock:
+                self.calls.append((verb, list(pm_ids)))
+                self.active[host] = self.active.get(host, 0) + 1
+                self.max_active[host] = max(self.max_active.get(host, 0), self.active[host])
+            time.sleep(delay)
+            with self.lock:
+                self.active[host] -= 1
+            return {pm_id: ("boom" if pm_id in fail_ids else None) for pm_id in pm_ids}
+        return run_bulk_action
+
+    def test_runs_in_parallel(self):
+        with patch('src.action_executor.pm2_manager.run_bulk_action', side_effect=self.fake_bulk_action()):
+            executor = ActionExecutor(max_workers=8, host_concurrency=8, batch_size=1)
+            started = time.perf_counter()
+            results = executor.run("restart", make_targets(8))
+            elapsed = time.perf_counter() - started
+        self.assertLess(elapsed, 0.6)  # 依序執行需要 1.6 秒
+        self.assertEqual(len(self.calls), 8)
+        self.assertTrue(all(r["ok"] for r in results))
+        self.assertEqual([r["pm_id"] for r in results], list(range(8)))
+
+    def test_per_host_limit(self):
+        targets = make_targets(6) + [dict(t, pm_id=100 + t["pm_id"], host="db") for t in make_targets(6)]
+        with patch('src.action_executor.pm2_manager.run_bulk_action', side_effect=self.fake_bulk_action(0.05)):
+            ActionExecutor(max_workers=12, host_concurrency=2, batch_size=1).run("stop", targets)
+        self.assertEqual(self.max_active, {"localhost": 2, "db": 2})
+
+    def test_auto_batch_size_spreads_targets_over_slots(self):
+        with patch('src.action_executor.pm2_manager.run_bulk_action', side_effect=self.fake_bulk_action(0)):
+            ActionExecutor(max_workers=8, host_concurrency=3, batch_size=0).run("start", make_targets(10))
+        self.assertEqual(sorted(len(ids) for _, ids in self.calls), [2, 4, 4])
+
+    def test_progress_events_per_api(self):
+        events = []
+        with patch('src.action_executor.pm2_manager.run_bulk_action',
+                   side_effect=self.fake_bulk_action(0.01, fail_ids={1})):
+            results = ActionExecutor(max_workers=2, host_concurrency=2, batch_size=1,
+                                     progress_callback=events.append).run("restart", make_targets(3))
+        for pm_id, final in [(0, "ok"), (1, "failed"), (2, "ok")]:
+            states = [e["state"] for e in events if e["pm_id"] == pm_id]
+            self.assertEqual(states, ["queued", "running", final])
+        failed = [e for e in events if e["state"] == "failed"][0]
+        self.assertEqual(failed["error"], "boom")
+        self.assertGreater(failed["duration"], 0)
+        self.assertEqual([r["ok"] for r in results], [True, False, True])
+
+    def test_exception_in_batch_marks_apis_failed(self):
+        with patch('src.action_executor.pm2_manager.run_bulk_action', side_effect=RuntimeError("daemon gone")):
+            results = ActionExecutor(batch_size=1).run("stop", make_targets(2))
+        self.assertEqual([r["error"] for r in results], ["daemon gone", "daemon gone"])
+
+    def test_empty_targets(self):
+        self.assertEqual(ActionExecutor().run("stop", []), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+test_action_queue.py
+
+此模組包含 `action_queue.py` 的單元測試。
+"""
+
+import unittest
+import os
+import sys
+import threading
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.action_queue import ActionQueue, merge_verbs
+
+
+def make_targets(*pm_ids):
+    return [{"pm_id": pm_id, "name": f"api{pm_id}", "project_name": "proj", "host": "localhost"} for pm_id in pm_ids]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestActionQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.clock = FakeClock()
+        self.queue = ActionQueue(execute=self.execute, batch_window=0.2, max_delay=1.0, clock=self.clock)
+
+    def execute(self, verb, targets):
+        self.calls.append((verb, [target["pm_id"] for target in targets]))
+        return [dict(target, ok=target["pm_id"] != 99, error=None if target["pm_id"] != 99 else "boom")
+                for target in targets]
+
+    def collect(self):
+        results = []
+        return results, results.append
+
+    def test_merge_verbs(self):
+        self.assertEqual(merge_verbs("restart", "restart"), "restart")
+        self.assertEqual(merge_verbs("start", "restart"), "restart")
+        self.assertEqual(merge_verbs("restart", "start"), "restart")
+        self.assertEqual(merge_verbs("start", "reload"), "reload")
+        self.assertEqual(merge_verbs("reload", "restart"), "restart")
+        self.assertEqual(merge_verbs("restart", "stop"), "stop")
+        self.assertEqual(merge_verbs("stop", "start"), "start")
+
+    def test_duplicates_are_merged(self):
+        first, first_callback = self.collect()
+        second, second_callback = self.collect()
+        self.queue.submit("restart", make_targets(1, 2), first_callback)
+        self.queue.submit("restart", make_targets(2, 3), second_callback)
+        self.queue.submit("start", make_targets(1))
+        self.assertEqual(self.queue.get_metrics()["depth"], 3)
+        self.assertEqual(self.queue.dispatch(), 3)
+        self.assertEqual(self.calls, [("restart", [1, 2, 3])])  # 同一種操作只派發一次
+        self.assertEqual([result["pm_id"] for result in first[0]], [1, 2])
+        self.assertTrue(all(result["ok"] and result["verb"] == "restart" for result in second[0]))
+        metrics = self.queue.get_metrics()
+        self.assertEqual((metrics["submitted"], metrics["merged"], metrics["dispatched"], metrics["batches"]),
+                         (3, 2, 3, 1))
+        self.assertEqual((metrics["depth"], metrics["pending_requests"]), (0, 0))
+
+    def test_conflicting_operations_are_superseded(self):
+        started, start_callback = self.collect()
+        stopped, stop_callback = self.collect()
+        self.queue.submit("start", make_targets(1, 2), start_callback)
+        self.queue.submit("stop", make_targets(2, 99), stop_callback)
+        self.queue.dispatch()
+        self.assertEqual(sorted(self.calls), [("start", [1]), ("stop", [2, 99])])
+        results = {result["pm_id"]: result for result in started[0]}
+        self.assertTrue(results[1]["ok"])
+        self.assertEqual((results[2]["ok"], results[2]["superseded"]), (False, True))
+        self.assertEqual(results[2]["error"], "已被後續的 stop 取代")
+        self.assertEqual([(result["ok"], result["error"]) for result in stopped[0]], [(True, None), (False, "boom")])
+        self.assertEqual(self.queue.get_metrics()["superseded"], 1)
+
+    def test_superseded_request_completes_without_dispatch(self):
+        started, start_callback = self.collect()
+        self.queue.submit("start", make_targets(5), start_callback)
+        self.queue.submit("stop", make_targets(5))
+        self.assertEqual(len(started), 1)  # 被取代時立即回報，不必等到派發
+        self.assertTrue(started[0][0]["superseded"])
+
+    def test_execute_errors_are_reported(self):
+        queue = ActionQueue(execute=lambda verb, targets: 1 / 0, clock=self.clock)
+        results, callback = self.collect()
+        queue.submit("stop", make_targets(1), callback)
+        queue.dispatch()
+        self.assertEqual(results[0][0]["error"], "division by zero")
+
+    def test_wait_metrics_and_batch_window(self):
+        self.queue.submit("restart", make_targets(1))
+        self.clock.now = 0.15
+        self.assertAlmostEqual(self.queue._next_dispatch_delay(), 0.05)
+        self.queue.submit("restart", make_targets(2))  # 新的請求延後派發
+        self.assertAlmostEqual(self.queue._next_dispatch_delay(), 0.2)
+        self.clock.now = 0.9
+        for pm_id in range(3, 10):
+            self.queue.submit("stop", make_targets(pm_id))
+        self.assertAlmostEqual(self.queue._next_dispatch_delay(), 0.1)  # 最早的操作最多等待 max_delay
+        self.clock.now = 1.0
+        self.queue.dispatch()
+        metrics = self.queue.get_metrics()
+        self.assertAlmostEqual(metrics["wait_max"], 1000.0)
+        self.assertAlmostEqual(metrics["wait_p50"], 100.0)
+        self.assertIsNone(self.queue._next_dispatch_delay())
+
+    def test_background_thread(self):
+        done = threading.Event()
+        queue = ActionQueue(execute=self.execute, batch_window=0.01).start()
+        try:
+            queue.submit("restart", make_targets(1), lambda results: done.set())
+            queue.submit("restart", make_targets(1))
+            self.assertTrue(done.wait(5))
+        finally:
+            queue.stop()
+        self.assertFalse(queue.is_running())
+        self.assertEqual(self.calls, [("restart", [1])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+test_axm_metrics.py
+
+此模組包含 `axm_metrics.py` 的單元測試。
+"""
+
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import pm2_manager
+from src.axm_metrics import parse_axm_monitor, parse_value
+
+AXM_MONITOR = {
+    "Heap Size": {"value": "32.00", "unit": "MiB", "historic": True},
+    "Used Heap Size": {"value": "16384", "unit": "KiB"},
+    "Heap Usage": {"value": "50.0", "unit": "%"},
+    "Event Loop Latency": {"value": "0.52", "unit": "ms"},
+    "Event Loop Latency p95": {"value": "1500", "unit": "µs"},
+    "Active handles": {"value": 4},
+    "HTTP": {"value": "12.5", "unit": "req/min"},
+    "HTTP P95 Latency": {"value": "N/A", "unit": "ms"},
+    "Custom Counter": {"value": 7},
+}
+
+
+class TestParseAxmMonitor(unittest.TestCase):
+
+    def test_known_metrics_are_converted_to_fixed_units(self):
+        values = parse_axm_monitor(AXM_MONITOR)
+        self.assertEqual(values, {
+            "heap_size": 32.0, "heap_used": 16.0, "heap_usage": 50.0, "loop_lag": 0.52,
+            "loop_lag_p95": 1.5, "active_handles": 4.0, "http_rate": 12.5,
+        })
+
+    def test_invalid_input(self):
+        self.assertEqual(parse_axm_monitor(None), {})
+        self.assertEqual(parse_axm_monitor({"Event Loop Latency": {"value": True}}), {})
+        self.assertEqual(parse_value("nan"), (None, ""))
+        self.assertEqual(parse_value({"value": "3.5%", "unit": "%"}), (3.5, "%"))
+
+
+class TestCustomMetricsHistory(unittest.TestCase):
+
+    def setUp(self):
+        pm2_manager._metrics_store.clear()
+        pm2_manager._axm_store.clear()
+
+    def tearDown(self):
+        pm2_manager._metrics_store.clear()
+        pm2_manager._axm_store.clear()
+
+    def test_get_pm2_list_records_custom_metrics(self):
+        processes = [{"pm_id": 0, "name": "node-api", "pm2_env": {"status": "online", "axm_monitor": AXM_MONITOR},
+                      "monit": {"cpu": 1, "memory": 1024}},
+                     {"pm_id": 1, "name": "php-api", "pm2_env": {"status": "online"},
+                      "monit": {"cpu": 1, "memory": 1024}}]
+        with patch('src.pm2_manager._fetch_pm2_processes', return_value=processes):
+            pm2_manager.get_pm2_list()
+        histories = pm2_manager.get_custom_metrics_range([0, 1], 600)
+        self.assertEqual(list(histories), [0])
+        self.assertAlmostEqual(float(histories[0]["loop_lag"][-1]), 0.52, places=5)
+        self.assertEqual(float(histories[0]["http_p95"][-1]), 0)  # 沒有回報的欄位
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+"""
+test_command_engine.py
+
+此模組包含 `command_engine.py` 的單元測試。
+"""
+
+import unittest
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import pm2_manager
+from src.command_engine import CommandCancelled, CommandEngine, DaemonUnresponsive
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCommandEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.runner = MagicMock(return_value=MagicMock(returncode=0, stdout="[]"))
+
+    def engine(self, **kwargs):
+        options = dict(timeouts={"jlist": 5.0}, default_timeout=20.0, retries={"jlist": 2}, backoff=0.0,
+                       failure_threshold=2, probe_interval=10.0, runner=self.runner, clock=self.clock)
+        options.update(kwargs)
+        return CommandEngine(**options)
+
+    def hang(self, command, timeout, **kwargs):
+        self.clock.now += timeout
+        raise subprocess.TimeoutExpired(command, timeout)
+
+    def test_deadlines_per_kind(self):
+        engine = self.engine()
+        engine.run(["pm2", "jlist"], capture_output=True)
+        self.runner.assert_called_with(["pm2", "jlist"], timeout=5.0, capture_output=True)
+        engine.run(["pm2", "restart", "1"])
+        self.runner.assert_called_with(["pm2", "restart", "1"], timeout=20.0)
+        engine.run(["pm2", "restart", "1"], timeout=1.5)
+        self.runner.assert_called_with(["pm2", "restart", "1"], timeout=1.5)
+
+    def test_retries_only_listed_kinds(self):
+        engine = self.engine(failure_threshold=10)
+        self.runner.side_effect = [subprocess.TimeoutExpired("pm2", 5.0), MagicMock(stdout="ok")]
+        self.assertEqual(engine.run(["pm2", "jlist"]).stdout, "ok")
+        self.runner.side_effect = self.hang
+        with self.assertRaises(subprocess.TimeoutExpired):
+            engine.run(["pm2", "jlist"])
+        with self.assertRaises(subprocess.TimeoutExpired):
+            engine.run(["pm2", "stop", "1"])
+        self.assertEqual(self.runner.call_count, 2 + 3 + 1)  # 會改變狀態的操作不重試
+        stats = engine.get_stats()
+        self.assertEqual((stats["jlist"]["count"], stats["jlist"]["timeouts"], stats["jlist"]["retries"]), (5, 4, 3))
+        self.assertEqual(stats["jlist"]["max"], 5000.0)
+        self.assertEqual(stats["stop"]["timeouts"], 1)
+
+    def test_unresponsive_daemon_fails_fast_and_probes(self):
+        engine = self.engine(retries={})
+        self.runner.side_effect = self.hang
+        for _ in range(2):
+            with self.assertRaises(subprocess.TimeoutExpired):
+                engine.run(["pm2", "jlist"])
+        self.assertFalse(engine.is_responsive())
+        with self.assertRaises(DaemonUnresponsive):
+            engine.run(["pm2", "jlist"])
+        self.assertEqual(self.runner.call_count, 2)
+        self.assertEqual(engine.get_stats()["jlist"]["rejected"], 1)
+
+        self.clock.now += 10.0  # 到了探測的時間，放行一個命令
+        self.runner.side_effect = None
+        engine.run(["pm2", "jlist"])
+        self.assertTrue(engine.is_responsive())
+        health = engine.get_health()
+        self.assertEqual((health["consecutive_timeouts"], health["since_success"]), (0, 0.0))
+
+    def test_command_errors_do_not_mark_daemon_unresponsive(self):
+        engine = self.engine(failure_threshold=1)
+        self.runner.side_effect = subprocess.CalledProcessError(1, ["pm2", "jlist"], stderr="boom")
+        with self.assertRaises(subprocess.CalledProcessError):
+            engine.run(["pm2", "jlist"])
+        self.runner.side_effect = FileNotFoundError("pm2")
+        with self.assertRaises(FileNotFoundError):
+            engine.run(["pm2", "jlist"])
+        with self.assertRaises(ConnectionRefusedError):
+            engine.call("rpc:list", MagicMock(side_effect=ConnectionRefusedError()))
+        self.assertTrue(engine.is_responsive())
+        with self.assertRaises(TimeoutError):
+            engine.call("rpc:list", MagicMock(side_effect=TimeoutError("timed out")))
+        self.assertFalse(engine.is_responsive())
+        self.assertEqual(engine.get_health()["last_error"], "timed out")
+
+    def test_rpc_socket_timeout_counts_as_timeout(self):
+        engine = self.engine(failure_threshold=1)
+        engine.call("rpc:list", lambda: "ok")
+        with self.assertRaises(socket.timeout):
+            engine.call("rpc:list", MagicMock(side_effect=socket.timeout("timed out")))
+        self.assertFalse(engine.is_responsive())  # 不會被當成成功的呼叫而重設逾時次數
+        self.assertEqual(engine.get_health()["consecutive_timeouts"], 1)
+        self.assertEqual(engine.get_stats()["rpc:list"]["timeouts"], 1)
+
+    def test_cancel_pending(self):
+        engine = CommandEngine(retries={"jlist": 1}, backoff=30.0, failure_threshold=10,
+                               runner=MagicMock(side_effect=subprocess.TimeoutExpired("pm2", 1.0)))
+        errors = []
+
+        def run():
+            try:
+                engine.run(["pm2", "jlist"])
+            except CommandCancelled as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=run)
+        started = time.monotonic()
+        thread.start()
+        time.sleep(0.05)  # 讓命令進入退避等待
+        engine.cancel_pending()
+        thread.join(5)
+        self.assertEqual(len(errors), 1)
+        self.assertLess(time.monotonic() - started, 5)
+
+        def returns_after_cancel():
+            engine.cancel_pending()
+            return "late"
+
+        with self.assertRaises(CommandCancelled):
+            engine.call("rpc:list", returns_after_cancel)  # 取消後才返回的結果被丟棄
+        self.assertEqual(engine.call("rpc:list", lambda: "ok"), "ok")
+
+    def test_cancel_keeps_completed_mutations(self):
+        engine = CommandEngine(retries={}, failure_threshold=10)
+
+        def restarts_after_cancel(*args, **kwargs):
+            engine.cancel_pending()
+            return "restarted"
+
+        self.assertEqual(engine.call("rpc:restart_process", restarts_after_cancel, 1), "restarted")
+        engine._runner = restarts_after_cancel
+        self.assertEqual(engine.run(["pm2", "restart", "1"]), "restarted")  # 操作已經執行，不能回報為取消
+        with self.assertRaises(CommandCancelled):
+            engine.run(["pm2", "jlist"])
+
+
+class TestPM2ManagerDegradation(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = CommandEngine(retries={}, failure_threshold=1, probe_interval=60.0)
+        for name, value in (('_command_engine', self.engine), ('_last_good_list', None)):
+            patcher = patch(f'src.pm2_manager.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(pm2_manager.invalidate_pm2_snapshot)
+        patcher = patch('src.pm2_manager.pm2_rpc.get_shared_client', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_get_pm2_list_uses_last_good_list(self, mock_run, mock_print):
+        mock_run.return_value = MagicMock(stdout='[{"name": "api", "pm_id": 950}]')
+        first = pm2_manager.get_pm2_list()
+        self.assertEqual(first[0]["pm_id"], 950)
+        mock_run.side_effect = subprocess.TimeoutExpired(["pm2", "jlist"], 10.0)
+        self.assertIs(pm2_manager.get_pm2_list(), first)
+        self.assertIs(pm2_manager.get_pm2_list(), first)  # 第二次不再執行命令
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertFalse(pm2_manager.get_daemon_health()["responsive"])
+        self.assertEqual(pm2_manager.get_command_stats()["jlist"]["rejected"], 1)
+        self.assertTrue(pm2_manager.run_bulk_action("restart", [950])[950].startswith("PM2 守護程序沒有回應"))
+
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_action_completed_after_cancel_reports_success(self, mock_run, mock_print):
+        def restart(*args, **kwargs):
+            self.engine.cancel_pending()
+            return MagicMock(returncode=0, stdout="", stderr="")
+
+        mock_run.side_effect = restart
+        self.assertTrue(pm2_manager.restart_api("3"))
+        with patch('src.pm2_manager._run_pm2_command', side_effect=CommandCancelled("cancelled")):
+            for action in (pm2_manager.start_api, pm2_manager.restart_api, pm2_manager.stop_api):
+                with self.assertRaises(CommandCancelled):
+                    action("3")
+            with self.assertRaises(CommandCancelled):
+                pm2_manager.run_bulk_action("restart", [3])
+
+    @patch('src.pm2_manager.get_pm2_list')
+    def test_cancelled_snapshot_is_not_cached(self, mock_get_pm2_list):
+        mock_get_pm2_list.side_effect = [CommandCancelled("cancelled"), [{"pm_id": 1}]]
+        pm2_manager.invalidate_pm2_snapshot()
+        with self.assertRaises(CommandCancelled):
+            pm2_manager.get_pm2_snapshot()
+        self.assertEqual(pm2_manager.get_pm2_snapshot(), [{"pm_id": 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,7 +14,8 @@ from datetime import datetime, timedelta
 # 將專案根目錄添加到 sys.path，以便找到 src 模組
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.data_parser import parse_pm2_list_output, get_project_name, load_api_metadata
+from src.data_parser import parse_pm2_list_output, get_project_name, load_api_metadata, format_process_resources, \
+    format_custom_metrics
 from src.config import API_METADATA_FILENAME, API_METADATA_DIRNAME
 
 class TestDataParser(unittest.TestCase):
@@ -161,5 +162,28 @@ class TestDataParser(unittest.TestCase):
         metadata = load_api_metadata("N/A")
         self.assertEqual(metadata, {})
 
+    def test_format_process_resources(self):
+        resources = format_process_resources({
+            "threads": 11, "fds": 42, "io_read": 1.25, "io_write": 0,
+            "ctx_vol": 30, "ctx_invol": 2, "memory": 100 * 1024 * 1024, "pss": 80 * 1024 * 1024,
+        })
+        self.assertEqual(resources["threads"], "11")
+        self.assertEqual(resources["fds"], "42")
+        self.assertEqual(resources["disk_io"], "讀 1.2 KB/s，寫 0.0 KB/s")
+        self.assertEqual(resources["context_switches"], "自願 30/s，非自願 2/s")
+        self.assertEqual(resources["memory_breakdown"], "RSS 100.0 MB，PSS 80.0 MB，Swap N/A")
+        self.assertEqual(set(format_process_resources(None).values()), {"N/A"})
+
+    def test_format_custom_metrics(self):
+        metrics = format_custom_metrics({
+            "Event Loop Latency": {"value": "0.52", "unit": "ms"},
+            "Heap Size": {"value": "18.5", "unit": "MiB"},
+            "Active handles": {"value": 4},
+            "Broken": {"value": "N/A"},
+        })
+        self.assertEqual(metrics["event_loop_lag"], "0.52 ms (p95 N/A)")
+        self.assertEqual(metrics["custom_metrics"], "Event Loop Latency 0.52 ms，Heap Size 18.5 MiB，Active handles 4")
+        self.assertEqual(set(format_custom_metrics(None).values()), {"N/A"})
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
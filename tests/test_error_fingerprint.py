@@ -0,0 +1,177 @@
+"""
+test_error_fingerprint.py
+
+此模組包含 `error_fingerprint.py` 的單元測試。
+"""
+
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import config
+from src.error_fingerprint import ErrorTable, ErrorTracker, FingerprintStream, fingerprint, format_top_errors, \
+    normalize
+
+NODE_TRACE = """TypeError: Cannot read properties of undefined (reading 'id') at request {request}
+    at getUser (/srv/api/users.js:{line}:15)
+    at Layer.handle (/srv/api/node_modules/express/lib/router/layer.js:95:5)
+"""
+
+PYTHON_TRACE = """Traceback (most recent call last):
+  File "/srv/api/app.py", line {line}, in handler
+    raise ValueError(f"bad order {{order_id}}")
+ValueError: bad order {request}
+"""
+
+
+def collect(text, now=100):
+    events = []
+    stream = FingerprintStream(lambda *event: events.append(event))
+    for line in text.encode().split(b"\n"):
+        stream.feed(line, now)
+    stream.flush()
+    return events
+
+
+class TestNormalize(unittest.TestCase):
+
+    def test_placeholders(self):
+        self.assertEqual(
+            normalize("2024-05-01T12:00:00: request 5f0c6e2a-1b2c-4d5e-8f90-1234567890ab from 10.0.0.12 took 35 ms "
+                      "(0x7ffd, deadbeef42)"),
+            "request <uuid> from <ip> took <n> ms (<hex>, <hex>)")
+        self.assertEqual(normalize("Error:   connect ECONNREFUSED"), "Error: connect ECONNREFUSED")
+
+    def test_fingerprint_ignores_numbers(self):
+        self.assertEqual(fingerprint("bad order 17", ["  at f (a.js:1:2)"]),
+                         fingerprint("bad order 42", ["  at f (a.js:9:9)"]))
+        self.assertNotEqual(fingerprint("bad order 17", []), fingerprint("bad user 17", []))
+        self.assertNotEqual(fingerprint("boom", ["  at f"]), fingerprint("boom", ["  at g"]))
+
+
+class TestFingerprintStream(unittest.TestCase):
+
+    def test_node_and_python_traces(self):
+        text = "".join(NODE_TRACE.format(request=i, line=10 + i) for i in range(3))
+        text += "".join(PYTHON_TRACE.format(request=i, line=20 + i) for i in range(2))
+        events = collect(text)
+        self.assertEqual(len(events), 5)
+        self.assertEqual(len({event[0] for event in events[:3]}), 1)
+        self.assertEqual(len({event[0] for event in events[3:]}), 1)
+        self.assertNotEqual(events[0][0], events[3][0])
+        self.assertEqual(events[3][2], "ValueError: bad order 0")
+        self.assertEqual(events[4][1], "ValueError: bad order <n>")
+
+    def test_pm2_timestamps_on_every_line(self):
+        text = "2024-05-01T12:00:00: Error: boom\n2024-05-01T12:00:00:     at f (a.js:1:2)\n" \
+               "2024-05-01T12:00:01: Error: boom\n2024-05-01T12:00:01:     at f (a.js:1:2)\n"
+        events = collect(text)
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0][0], events[1][0])
+        self.assertEqual(events[0][0], fingerprint("Error: boom", ["    at f (a.js:1:2)"]))
+        self.assertNotEqual(events[0][3], 100)  # 使用行首的時間戳
+
+
+class TestErrorTable(unittest.TestCase):
+
+    def test_top_per_api_and_project(self):
+        table = ErrorTable()
+        for _ in range(3):
+            table.record("a", "P", "f1", "boom", "boom 1", 10)
+        table.record("b", "P", "f1", "boom", "boom 2", 30)
+        table.record("b", "P", "f2", "other", "other", 20)
+        table.record("c", "Q", "f3", "elsewhere", "elsewhere", 5)
+        top = table.top(project_name="P")
+        self.assertEqual([(entry["fingerprint"], entry["count"]) for entry in top], [("f1", 4), ("f2", 1)])
+        self.assertEqual((top[0]["first_seen"], top[0]["last_seen"], top[0]["names"]), (10, 30, ["a", "b"]))
+        self.assertEqual([entry["count"] for entry in table.top(name="b")], [1, 1])
+        self.assertEqual(len(table.top(limit=2)), 2)
+        self.assertEqual(format_top_errors(table.top(name="a")), "×3 boom 1")
+        self.assertEqual(format_top_errors([]), "N/A")
+
+    def test_bounded(self):
+        table = ErrorTable(max_entries=10)
+        for _ in range(5):
+            table.record("a", "P", "frequent", "x", "x", 1)
+        for i in range(100):
+            table.record("a", "P", f"rare{i}", "y", "y", i)
+        self.assertLessEqual(len(table), 10)
+        self.assertEqual(table.top(limit=1)[0]["fingerprint"], "frequent")
+
+
+class TestErrorTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "a-error.log")
+        self.apis = [{"pm_id": 0, "name": "a", "project_name": "P", "log_file_path": "N/A",
+                      "error_log_path": self.path}]
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def append(self, text):
+        with open(self.path, "a") as f:
+            f.write(text)
+
+    def test_incremental_across_chunks(self):
+        self.append(NODE_TRACE.format(request=1, line=1) + "TypeError: Cannot read")
+        tracker = ErrorTracker(clock=lambda: 100)
+        tracker.set_sources(self.apis)
+        tracker.poll()
+        self.assertEqual(tracker.top(), [])  # 第一個事件的框架可能還沒寫完
+        self.append(" properties of undefined (reading 'id') at request 2\n    at getUser (/srv/api/users.js:3:15)\n")
+        tracker.poll()
+        self.assertEqual(tracker.top()[0]["count"], 1)
+        self.append("    at Layer.handle (/srv/api/node_modules/express/lib/router/layer.js:95:5)\n")
+        tracker.poll()
+        self.assertEqual(tracker.poll(), 0)  # 沒有新內容時結束最後一個事件
+        top = tracker.top(name="a")
+        self.assertEqual(len(top), 1)
+        self.assertEqual(top[0]["count"], 2)
+
+    def test_backfill_only_reads_the_tail(self):
+        self.append("Error: old\n" * 1000 + "Error: recent\n")
+        original = config.ERROR_FINGERPRINT_BACKFILL_BYTES
+        config.ERROR_FINGERPRINT_BACKFILL_BYTES = 100
+        try:
+            tracker = ErrorTracker()
+            tracker.set_sources(self.apis)
+            tracker.poll()
+            tracker.poll()
+        finally:
+            config.ERROR_FINGERPRINT_BACKFILL_BYTES = original
+        counts = {entry["sample"]: entry["count"] for entry in tracker.top()}
+        self.assertEqual(counts["Error: recent"], 1)
+        self.assertLess(counts["Error: old"], 10)
+
+    def test_rotation(self):
+        self.append("Error: before\n")
+        tracker = ErrorTracker()
+        tracker.set_sources(self.apis)
+        tracker.poll()
+        os.remove(self.path)
+        self.append("Error: after\n")
+        tracker.poll()
+        tracker.poll()
+        self.assertEqual(sorted(entry["sample"] for entry in tracker.top()), ["Error: after", "Error: before"])
+
+    def test_line_longer_than_read_chunk(self):
+        self.append("Error: " + "x" * 300 + "\nError: after\n")
+        with patch('src.config.ERROR_FINGERPRINT_READ_BYTES', 64):
+            tracker = ErrorTracker()
+            tracker.set_sources(self.apis)
+            for _ in range(8):
+                tracker.poll()
+        self.assertEqual(tracker._files[self.path]["offset"], os.path.getsize(self.path))  # 沒有卡在過長的行
+        samples = sorted(entry["sample"] for entry in tracker.top())
+        self.assertEqual(samples, ["Error: after", "Error: " + "x" * 57])  # 過長的行只保留開頭
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,14 @@
 import unittest
+import os
+import tempfile
+import time
 from PyQt6.QtWidgets import QApplication, QTableWidget, QHeaderView
 from PyQt6.QtCore import Qt
-from src.gui_components import ApiStatusLight, ApiDetailPanel, PerformanceGraph, ApiDataTable
+import numpy as np
+from src.gui_components import ApiStatusLight, ApiDetailPanel, PerformanceGraph, HistoryGraph, ApiDataTable, \
+    LoadTestDialog, LogViewerDialog, LogSearchDialog, TopErrorsDialog, LoadingOverlay
+from src.error_fingerprint import ErrorTable
+from src.log_search import LogIndex
 
 app = QApplication([]) # Initialize QApplication once for all tests
 
@@ -30,6 +37,11 @@ class TestApiStatusLight(unittest.TestCase):
         light_unstable = ApiStatusLight("unstable")
         self.assertEqual(light_unstable.get_status(), "unstable")
 
+        # Test degraded status (orange)
+        light_degraded = ApiStatusLight("degraded")
+        self.assertEqual(light_degraded.get_status(), "degraded")
+        self.assertIn("#fd7e14", light_degraded.color_circle.styleSheet())
+
     def test_set_status(self):
         light = ApiStatusLight("stopped")
         self.assertEqual(light.get_status(), "stopped")
@@ -245,6 +257,50 @@ class TestPerformanceGraph(unittest.TestCase):
         self.assertEqual(self.graph.cpu_data[0], 1) # First element should be removed
 
 
+class TestHistoryGraph(unittest.TestCase):
+
+    def test_plot_history_from_arrays(self):
+        graph = HistoryGraph()
+        times = np.array([1700000000000, 1700000030000, 1700000060000], dtype=np.int64)
+        graph.plot_history(times, np.array([1, 2, 3], dtype=np.float32), np.array([10, 20, 30], dtype=np.float32))
+        cpu_line = graph.ax.get_lines()[0]
+        self.assertEqual(list(cpu_line.get_ydata()), [1, 2, 3])
+        self.assertEqual(len(graph.mem_ax.get_lines()), 1)
+
+    def test_rollup_range_band_and_range_selector(self):
+        graph = HistoryGraph()
+        received = []
+        graph.range_changed.connect(received.append)
+        graph.range_combo.setCurrentIndex(3)
+        self.assertEqual(received, [7 * 86400])
+        times = np.array([0, 3600000], dtype=np.int64)
+        values = np.array([1, 2], dtype=np.float32)
+        graph.plot_history(times, values, values, cpu_range=(values - 1, values + 1))
+        self.assertEqual(len(graph.ax.collections), 1)
+        self.assertEqual(len(graph.mem_ax.collections), 0)
+
+    def test_empty_history_clears(self):
+        graph = HistoryGraph()
+        graph.plot_history([], [], [])
+        self.assertEqual(graph.ax.get_lines(), [])
+
+    def test_plot_latency(self):
+        graph = HistoryGraph()
+        times = np.array([0, 1000], dtype=np.int64)
+        graph.plot_latency([("loop_lag", times, np.array([0.5, 1.5], dtype=np.float32)), ("empty", [], [])])
+        self.assertEqual(len(graph.lag_ax.get_lines()), 1)
+        graph.plot_latency([])
+        self.assertEqual(graph.lag_ax.get_lines(), [])
+
+    def test_plot_request_rate(self):
+        graph = HistoryGraph()
+        times = np.array([0, 5000], dtype=np.int64)
+        graph.plot_request_rate([("req/s", times, np.array([10, 12], dtype=np.float32))])
+        self.assertEqual(list(graph.rate_ax.get_lines()[0].get_ydata()), [10, 12])
+        graph.clear_graph()
+        self.assertEqual(graph.rate_ax.get_lines(), [])
+
+
 class TestApiDataTable(unittest.TestCase):
 
     def setUp(self):
@@ -295,5 +351,134 @@ class TestApiDataTable(unittest.TestCase):
         self.assertEqual(self.table.horizontalHeader().sectionResizeMode(0), QHeaderView.ResizeMode.Stretch)
 
 
+class TestLoadTestDialog(unittest.TestCase):
+
+    def test_options_follow_mode(self):
+        dialog = LoadTestDialog("python-api", "/health")
+        requested = []
+        dialog.start_requested.connect(requested.append)
+        self.assertFalse(dialog.rate_spin.isEnabled())
+        dialog.mode_combo.setCurrentIndex(1)
+        self.assertTrue(dialog.rate_spin.isEnabled())
+        self.assertFalse(dialog.concurrency_spin.isEnabled())
+        dialog.start_button.click()
+        self.assertEqual(requested[0]["mode"], "open")
+        self.assertEqual(requested[0]["path"], "/health")
+        self.assertFalse(dialog.start_button.isEnabled())
+        dialog.show_report("done")
+        self.assertTrue(dialog.start_button.isEnabled())
+        self.assertEqual(dialog.result_view.toPlainText(), "done")
+
+
+class TestLogViewerDialog(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "out.log")
+        with open(self.path, "w") as f:
+            f.write("".join(f"line {i}\n" for i in range(500)))
+        self.dialog = LogViewerDialog("python-api", {"輸出": self.path, "錯誤": os.path.join(self.dir.name, "missing")})
+        self.view = self.dialog.view
+        self.view.resize(400, 200)
+
+    def tearDown(self):
+        self.dialog.done(0)
+        self.dir.cleanup()
+
+    def texts(self):
+        return [text for _, text in self.view.visible_lines()]
+
+    def test_opens_at_tail_and_jumps(self):
+        self.assertTrue(self.view.follow)
+        self.assertEqual(self.texts()[-1], "line 499")
+        self.dialog.jump_to_line(101)
+        self.assertFalse(self.view.follow)
+        self.assertEqual(self.texts()[0], "line 100")
+        self.view.scroll_lines(-3)
+        self.assertEqual(self.texts()[0], "line 97")
+        self.dialog.jump_to_line(10000)
+        self.assertIn("沒有第 10000 行", self.dialog.status_label.text())
+        self.view.scroll_to_offset(0)
+        self.assertEqual(self.texts()[0], "line 0")
+
+    def test_follows_appends(self):
+        with open(self.path, "a") as f:
+            f.write("appended\n")
+        deadline = time.time() + 3
+        while self.texts()[-1] != "appended" and time.time() < deadline:
+            app.processEvents()  # 等待 QFileSystemWatcher 的通知
+            time.sleep(0.01)
+        self.assertEqual(self.texts()[-1], "appended")
+
+        self.dialog.jump_to_line(1)
+        with open(self.path, "a") as f:
+            f.write("more\n")
+        self.dialog._file_changed(self.path)
+        self.assertEqual(self.texts()[0], "line 0")  # 不在結尾時保持位置
+
+    def test_missing_log(self):
+        self.dialog.log_combo.setCurrentIndex(1)
+        self.assertIn("無法開啟日誌", self.dialog.status_label.text())
+        self.assertEqual(self.texts(), [])
+
+
+class TestLogSearchDialog(unittest.TestCase):
+
+    def test_search_and_open_hit(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "b-out.log")
+            with open(path, "w") as f:
+                f.write("line 0\nread ECONNRESET\n" + "".join(f"line {i}\n" for i in range(300)))
+            index = LogIndex(os.path.join(directory, "index"))
+            index.set_sources([{"path": path, "stream": "out", "pm_id": 1, "name": "b", "project_name": "project_B"}])
+            index.index_once()
+            dialog = LogSearchDialog(index.search, ["project_A", "project_B"], "project_B")
+            self.assertEqual(dialog.project_combo.currentData(), "project_B")
+            dialog.query_edit.setText("econnreset")
+            dialog.search_button.click()
+            self.assertEqual(dialog.results_table.rowCount(), 1)
+            self.assertEqual(dialog.results_table.item(0, 3).text(), "read ECONNRESET")
+            self.assertIn("1 筆結果", dialog.status_label.text())
+            viewer = dialog.open_hit(0)
+            self.assertFalse(viewer.view.follow)
+            self.assertEqual(viewer.view.visible_lines()[0][1], "read ECONNRESET")
+            viewer.done(0)
+            dialog.project_combo.setCurrentIndex(1)
+            dialog.search()
+            self.assertEqual(dialog.results_table.rowCount(), 0)
+            index.close()
+
+
+class TestTopErrorsDialog(unittest.TestCase):
+
+    def test_live_refresh(self):
+        table = ErrorTable()
+        table.record("a", "P", "f1", "Error: x <n>", "Error: x 1", 100)
+        dialog = TopErrorsDialog("P", lambda: table.top(project_name="P"))
+        self.assertEqual(dialog.table.rowCount(), 1)
+        self.assertEqual(dialog.table.item(0, 4).text(), "Error: x 1")
+        self.assertEqual(dialog.table.item(0, 4).toolTip(), "Error: x <n>")
+        self.assertTrue(dialog.timer.isActive())
+        table.record("b", "P", "f1", "Error: x <n>", "Error: x 2", 200)
+        table.record("b", "P", "f2", "TypeError: y", "TypeError: y", 150)
+        dialog.refresh()
+        self.assertEqual(dialog.table.rowCount(), 2)
+        self.assertEqual(dialog.table.item(0, 0).text(), "2")
+        self.assertEqual(dialog.table.item(0, 1).text(), "a, b")
+        self.assertIn("2 種錯誤", dialog.status_label.text())
+        dialog.done(0)
+        self.assertFalse(dialog.timer.isActive())
+
+
+class TestLoadingOverlay(unittest.TestCase):
+
+    def test_cancel_button(self):
+        overlay = LoadingOverlay()
+        requested = []
+        overlay.cancel_requested.connect(lambda: requested.append(True))
+        overlay.cancel_button.click()
+        self.assertEqual(requested, [True])
+
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
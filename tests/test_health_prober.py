@@ -0,0 +1,205 @@
+"""
+test_health_prober.py
+
+此模組包含 `health_prober.py` 的單元測試，並以隨附的 python_api.py 與 dummy_api.js 在 localhost 上進行實際檢查。
+"""
+
+import unittest
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import python_api
+from src import health_prober
+from src.health_prober import HealthProber, LatencyHistogram, build_targets, derive_status, format_health
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = b"ok"
+        self.send_response(500 if self.path == "/broken" else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class QuietPythonApiHandler(python_api.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve(handler):
+    server = HTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def target(port, path="/", timeout=2.0, interval=0.05):
+    return {"host": "127.0.0.1", "port": port, "path": path, "timeout": timeout, "interval": interval}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+        for latency in [0.5] * 90 + [30] * 9 + [8000]:
+            histogram.record(latency)
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.percentile(50), 1)  # 區間上限
+        self.assertEqual(histogram.percentile(95), 50)
+        self.assertEqual(histogram.percentile(100), 8000)
+        self.assertAlmostEqual(histogram.mean, (45 + 270 + 8000) / 100)
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_build_targets(self):
+        apis = [{"pm_id": 0, "status": "online", "port": "8001", "metadata": {"health_path": "/health"}},
+                {"pm_id": 1, "status": "stopped", "port": "8002", "metadata": {}},
+                {"pm_id": 2, "status": "online", "port": "N/A", "metadata": {}}]
+        targets = build_targets(apis)
+        self.assertEqual(list(targets), [0])
+        self.assertEqual(targets[0]["path"], "/health")
+        self.assertEqual(targets[0]["host"], "localhost")
+
+    def test_derive_status(self):
+        self.assertEqual(derive_status("online", {"degraded": True}), health_prober.DEGRADED_STATUS)
+        self.assertEqual(derive_status("online", {"degraded": False}), "online")
+        self.assertEqual(derive_status("stopped", {"degraded": True}), "stopped")
+        self.assertEqual(derive_status("online", None), "online")
+        self.assertEqual(format_health(None), "N/A")
+
+
+class TestProbe(unittest.TestCase):
+
+    def setUp(self):
+        KeepAliveHandler.delay = 0.0
+        self.server = serve(KeepAliveHandler)
+        self.port = self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def run_rounds(self, prober, targets, rounds):
+        async def run():
+            results = [await prober.probe_all(targets) for _ in range(rounds)]
+            self.connections = dict(prober._connections)
+            prober.close()
+            return results
+        return asyncio.run(run())
+
+    def test_keep_alive_connection_is_reused(self):
+        prober = HealthProber(failure_threshold=2)
+        results = self.run_rounds(prober, {0: target(self.port)}, 3)
+        self.assertTrue(all(result[0]["ok"] for result in results))
+        self.assertEqual(prober.result(0)["histogram"].count, 3)
+        self.assertEqual(self.connections[0].connections_opened, 1)
+        self.assertIn("HTTP 200", format_health(prober.result(0)))
+
+    def test_failures_mark_degraded(self):
+        prober = HealthProber(failure_threshold=2)
+        targets = {0: target(self.port, "/broken"), 1: target(free_port())}
+        first, second = self.run_rounds(prober, targets, 2)
+        self.assertEqual(first[0]["error"], "HTTP 500")
+        self.assertFalse(first[0]["degraded"])
+        self.assertTrue(second[0]["degraded"])
+        self.assertTrue(second[1]["degraded"])
+        self.assertFalse(second[1]["ok"])
+
+    def test_timeout_and_slow_responses(self):
+        KeepAliveHandler.delay = 0.3
+        prober = HealthProber(failure_threshold=1, degraded_latency=100)
+        result = self.run_rounds(prober, {0: target(self.port, timeout=0.1)}, 1)[0][0]
+        self.assertEqual(result["error"], "逾時")
+        result = self.run_rounds(prober, {0: target(self.port, timeout=2)}, 1)[0][0]
+        self.assertTrue(result["ok"])
+        self.assertTrue(result["degraded"])  # 回應了，但超過 100 ms
+
+    def test_background_thread(self):
+        received = []
+        prober = HealthProber(callback=lambda pm_id, result: received.append(pm_id), jitter=0.5).start()
+        try:
+            prober.set_targets({7: target(self.port)})
+            deadline = time.time() + 5
+            while received.count(7) < 3 and time.time() < deadline:
+                time.sleep(0.02)
+            self.assertGreaterEqual(received.count(7), 3)
+            prober.set_targets({})
+            time.sleep(0.1)
+            self.assertIsNone(prober.result(7))
+        finally:
+            prober.stop()
+        self.assertFalse(prober.is_running())
+
+
+class TestBundledApis(unittest.TestCase):
+
+    def test_python_api(self):
+        server = serve(QuietPythonApiHandler)
+        try:
+            prober = HealthProber()
+            result = asyncio.run(prober.probe_all({0: target(server.server_address[1])}))[0]
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertTrue(result["ok"])
+        self.assertEqual(result["status_code"], 200)
+
+    def test_dummy_node_api(self):
+        if shutil.which("node") is None:
+            self.skipTest("沒有安裝 node")
+        port = free_port()
+        process = subprocess.Popen(["node", os.path.join(ROOT, "dummy_api.js"), "--port", str(port)],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.time() + 10
+            while time.time() < deadline:
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                    break
+                except OSError:
+                    time.sleep(0.05)
+
+            async def run():
+                prober = HealthProber()
+                for _ in range(3):
+                    result = (await prober.probe_all({0: target(port)}))[0]
+                    self.assertTrue(result["ok"])
+                connection = prober._connections[0]
+                prober.close()
+                return connection
+
+            connection = asyncio.run(run())
+        finally:
+            process.kill()
+            process.wait()
+        self.assertEqual(connection.connections_opened, 1)  # Node 預設保持 keep-alive 連線
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,7 +10,7 @@ import unittest.mock # 導入 unittest.mock
 # 將專案根目錄添加到 Python 路徑中
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.main_app import MainApp
+from src.main_app import MainApp, Worker
 from src import pm2_manager
 from src.data_parser import parse_pm2_list_output, get_project_name
 
@@ -88,6 +88,26 @@ class TestIntegration(unittest.TestCase):
         # 恢復原來的函數
         pm2_manager.get_pm2_list = original_get_pm2_list
 
+    def test_bus_event_updates_status_in_place(self):
+        """
+        測試 PM2 事件匯流排的狀態改變會直接更新列表中的狀態燈號，未知的程序則觸發延遲對帳。
+        """
+        self.window.update_api_tree_widget([
+            {"name": "bus-api", "pm_id": 77, "status": "online", "project_name": "Bus Project"},
+        ])
+        api_item = self.window._find_api_item(77)
+        self.assertIsNotNone(api_item)
+
+        self.window.bus_event_received.emit({"type": "process", "event": "exit", "pm_id": 77, "status": "errored"})
+        QTest.qWait(50)
+        self.assertEqual(self.window.api_list_widget.itemWidget(api_item, 1).get_status(), "errored")
+        self.assertEqual(api_item.data(0, Qt.ItemDataRole.UserRole)["status"], "errored")
+        self.assertFalse(self.window.reconcile_timer.isActive())
+
+        self.window.handle_bus_event({"type": "process", "event": "online", "pm_id": 999, "status": "online"})
+        self.assertTrue(self.window.reconcile_timer.isActive())
+        self.window.reconcile_timer.stop()
+
     def test_api_control_buttons(self):
         """
         測試啟動、重啟、停止按鈕是否能正確觸發後端功能。
@@ -136,6 +156,43 @@ class TestIntegration(unittest.TestCase):
         else:
             self.skipTest("沒有專案可供測試控制按鈕")
 
+
+class TestWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.app = QApplication.instance() or QApplication(sys.argv)
+        self.worker = Worker()
+        self.completed = []
+        self.worker.action_completed.connect(lambda *args: self.completed.append(args))
+
+    @unittest.mock.patch('builtins.print')
+    @unittest.mock.patch('src.main_app.startup_dag.StartupScheduler')
+    @unittest.mock.patch('src.main_app.pm2_manager.plan_project_action')
+    def test_dependency_start_reports_scheduler_results(self, mock_plan, mock_scheduler, mock_print):
+        """
+        測試依依賴圖啟動時，完成信號的成功數來自 StartupScheduler 的結果。
+        """
+        targets = [{"pm_id": 1, "name": "db", "depends_on": []},
+                   {"pm_id": 2, "name": "users", "depends_on": ["db"]},
+                   {"pm_id": 3, "name": "orders", "depends_on": ["users"]}]
+        mock_plan.return_value = {"verb": "start", "targets": targets, "missing_projects": []}
+        mock_scheduler.return_value.run.return_value = [
+            dict(targets[0], ok=True, error=None),
+            dict(targets[1], ok=True, error=None),
+            dict(targets[2], ok=False, error="依賴的 users 沒有就緒，未啟動"),
+        ]
+        self.worker.perform_action_task("start", "啟動", {"Shop"})
+        mock_scheduler.return_value.run.assert_called_once_with(targets)
+        self.assertEqual(self.completed, [(True, 2, 3, "啟動")])
+        mock_print.assert_called_once_with("啟動 - orders (ID: 3) 失敗：依賴的 users 沒有就緒，未啟動")
+
+    @unittest.mock.patch('src.main_app.pm2_manager.plan_project_action')
+    def test_no_targets_reports_zero(self, mock_plan):
+        mock_plan.return_value = {"verb": "stop", "targets": [], "missing_projects": ["Shop"]}
+        self.worker.perform_action_task("stop", "停止", {"Shop"})
+        self.assertEqual(self.completed, [(True, 0, 0, "停止")])
+
+
 if __name__ == '__main__':
     # 需要先初始化 QApplication 才能運行 Qt 相關測試
     app = QApplication(sys.argv)
@@ -0,0 +1,108 @@
+"""
+test_jlist_decoder.py
+
+此模組包含 `jlist_decoder.py` 的單元測試。
+"""
+
+import unittest
+import io
+import json
+import os
+import sys
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.jlist_decoder import JlistDecoder, decode_jlist, decode_jlist_stream, decode_monitor_reply
+
+PROCESSES = [
+    {
+        "name": "python-api",
+        "pm_id": 0,
+        "pid": 1234,
+        "monit": {"cpu": 1.5, "memory": 2048},
+        "pm2_env": {
+            "status": "online",
+            "created_at": 1678886400000,
+            "args": ["--port", "8001"],
+            "pm_out_log_path": "/logs/python-api-out.log",
+            "env": {"PATH": "/usr/bin", "SECRET": "x" * 1000},
+            "axm_options": {"huge": list(range(100))},
+        },
+    },
+    {
+        "name": "go-api 服務",
+        "pm_id": 1,
+        "monit": {"cpu": 0, "memory": 0},
+        "pm2_env": {"status": "stopped", "env": {"LANG": "zh_TW.UTF-8"}},
+    },
+]
+
+
+class TestJlistDecoder(unittest.TestCase):
+
+    def test_keeps_only_selected_fields(self):
+        processes = decode_jlist(json.dumps(PROCESSES, indent=2))
+        self.assertEqual(len(processes), 2)
+        first = processes[0]
+        self.assertEqual(first["monit"], {"cpu": 1.5, "memory": 2048})
+        self.assertEqual(first["pm2_env"]["args"], ["--port", "8001"])
+        self.assertEqual(first["pm2_env"]["pm_out_log_path"], "/logs/python-api-out.log")
+        self.assertNotIn("env", first["pm2_env"])
+        self.assertNotIn("axm_options", first["pm2_env"])
+        self.assertEqual(processes[1]["name"], "go-api 服務")
+
+    def test_byte_at_a_time_including_split_utf8(self):
+        data = json.dumps(PROCESSES, ensure_ascii=False).encode('utf-8')
+        decoder = JlistDecoder()
+        items = []
+        for i in range(len(data)):
+            items.extend(decoder.feed(data[i:i + 1]))
+        items.extend(decoder.close())
+        self.assertEqual(items, decode_jlist(json.dumps(PROCESSES)))
+
+    def test_items_are_emitted_as_soon_as_complete(self):
+        text = json.dumps(PROCESSES)
+        split = text.index('{"name": "go-api')
+        decoder = JlistDecoder()
+        self.assertEqual([p["pm_id"] for p in decoder.feed(text[:split])], [0])
+        self.assertEqual([p["pm_id"] for p in decoder.feed(text[split:])], [1])
+        self.assertEqual(decoder.close(), [])
+
+    def test_partial_item_threshold_ignores_parsed_prefix(self):
+        text = json.dumps(PROCESSES)
+        split = text.index('{"name": "go-api') + 5
+        decoder = JlistDecoder()
+        self.assertEqual([p["pm_id"] for p in decoder.feed(text[:split])], [0])
+        # 剩下的部分比已解析的第一個程序短，仍然要立即取出第二個程序
+        self.assertEqual([p["pm_id"] for p in decoder.feed(text[split:])], [1])
+        self.assertEqual(decoder._need, 0)
+        self.assertEqual(decoder.close(), [])
+
+    def test_stream(self):
+        data = json.dumps(PROCESSES).encode('utf-8')
+        self.assertEqual(len(decode_jlist_stream(io.BytesIO(data))), 2)
+
+    def test_empty_list(self):
+        self.assertEqual(decode_jlist(" [ ] \n"), [])
+
+    def test_invalid_input_raises(self):
+        for bad in ["invalid json", "[{\"name\": 1}", "[{\"name\": 1} {\"name\": 2}]", ""]:
+            with self.assertRaises(json.JSONDecodeError, msg=bad):
+                decode_jlist(bad)
+
+    def test_custom_fields(self):
+        processes = decode_jlist(json.dumps(PROCESSES), fields={"pm_id": True, "pm2_env": {"status": True}})
+        self.assertEqual(processes, [{"pm_id": 0, "pm2_env": {"status": "online"}},
+                                     {"pm_id": 1, "pm2_env": {"status": "stopped"}}])
+
+    def test_monitor_reply(self):
+        body = json.dumps({"args": [PROCESSES]}, separators=(',', ':')).encode('utf-8')
+        processes = decode_monitor_reply(body)
+        self.assertEqual([p["name"] for p in processes], ["python-api", "go-api 服務"])
+        self.assertNotIn("env", processes[0]["pm2_env"])
+        self.assertEqual(decode_monitor_reply(b'{"error":"boom"}'), {"error": "boom"})
+
+
+if __name__ == '__main__':
+    unittest.main()
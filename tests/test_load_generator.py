@@ -0,0 +1,111 @@
+"""
+test_load_generator.py
+
+此模組包含 `load_generator.py` 的單元測試，對 localhost 上的測試伺服器實際發出請求。
+"""
+
+import unittest
+import asyncio
+import os
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import load_generator, pm2_manager
+from src.load_generator import MODE_CLOSED, MODE_OPEN, format_report, run_load_test
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(503 if self.path == "/busy" else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestLoadGenerator(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        cls.port = cls.server.server_address[1]
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_closed_loop(self):
+        report = asyncio.run(run_load_test("127.0.0.1", self.port, mode=MODE_CLOSED, concurrency=4, duration=0.3))
+        self.assertGreater(report["requests"], 4)
+        self.assertEqual(report["errors"], 0)
+        self.assertEqual(report["status_codes"], {200: report["requests"]})
+        latency = report["latency"]
+        self.assertLessEqual(latency["p50"], latency["p95"])
+        self.assertLessEqual(latency["p99"], latency["max"])
+        self.assertGreater(report["throughput"], 0)
+        self.assertLessEqual(report["started_at"], report["ended_at"])
+        self.assertIn("固定並行數 4", format_report(report))
+
+    def test_open_loop_sends_at_fixed_rate(self):
+        report = asyncio.run(run_load_test("127.0.0.1", self.port, mode=MODE_OPEN, rate=50, duration=0.4))
+        self.assertEqual(report["requests"], 20)
+        self.assertEqual(report["rate"], 50)
+        self.assertIsNone(report["concurrency"])
+
+    def test_server_errors_and_refused_connections(self):
+        report = asyncio.run(run_load_test("127.0.0.1", self.port, "/busy", MODE_OPEN, rate=20, duration=0.2))
+        self.assertEqual(report["error_rate"], 1.0)
+        self.assertEqual(report["error_kinds"], {"HTTP 503": 4})
+        self.assertEqual(report["throughput"], 0)
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            closed_port = sock.getsockname()[1]
+        report = asyncio.run(run_load_test("127.0.0.1", closed_port, mode=MODE_OPEN, rate=20, duration=0.2))
+        self.assertEqual(report["requests"], 4)
+        self.assertIsNone(report["latency"])
+        self.assertEqual(report["error_rate"], 1.0)
+        self.assertIn("錯誤：", format_report(report))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(run_load_test("127.0.0.1", self.port, mode="burst", duration=0.1))
+
+
+class TestResourceSummary(unittest.TestCase):
+
+    def setUp(self):
+        pm2_manager._metrics_store.clear()
+
+    def tearDown(self):
+        pm2_manager._metrics_store.clear()
+
+    def test_summary_covers_test_window(self):
+        for t, cpu in ((1000, 10), (2000, 30), (3000, 50), (9000, 90)):
+            pm2_manager._metrics_store.append(5, t, cpu=cpu, memory=100 + cpu)
+        summary = pm2_manager.get_resource_summary([5], 1000, 3001)
+        self.assertEqual(summary["samples"], 3)
+        self.assertAlmostEqual(summary["cpu_avg"], 30)
+        self.assertEqual(summary["cpu_max"], 50)
+        self.assertEqual(summary["memory_max"], 150)
+        self.assertIsNone(pm2_manager.get_resource_summary([5], 4000, 5000))
+        report = {"mode": load_generator.MODE_CLOSED, "concurrency": 1, "target": "x", "duration": 1.0,
+                  "requests": 1, "throughput": 1.0, "error_rate": 0.0, "latency": None, "error_kinds": {},
+                  "resources": summary}
+        self.assertIn("CPU 平均 30.0%", format_report(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
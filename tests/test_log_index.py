@@ -0,0 +1,93 @@
+"""
+test_log_index.py
+
+此模組包含 `log_index.py` 的單元測試。
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import log_index
+from src.log_index import LogFile
+
+
+class TestLogFile(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "out.log")
+        self.write([f"line {i}" for i in range(25)])
+        self.log = LogFile(self.path, stride=4)
+
+    def tearDown(self):
+        self.log.close()
+        self.dir.cleanup()
+
+    def write(self, lines, mode="w", newline=True):
+        with open(self.path, mode) as f:
+            f.write("\n".join(lines) + ("\n" if newline else ""))
+
+    def test_offset_of_line(self):
+        for line in (0, 3, 4, 17, 24):
+            offset = self.log.offset_of_line(line)
+            self.assertEqual(self.log.lines_from(offset, 1)[0][1], f"line {line}")
+            self.assertEqual(self.log.line_number(offset), line)
+        self.assertIsNone(self.log.offset_of_line(25))
+        self.assertIsNone(self.log.offset_of_line(-1))
+
+    def test_index_is_built_lazily(self):
+        self.assertEqual(self.log._offsets, [0])
+        self.log.offset_of_line(5)
+        self.assertEqual(len(self.log._offsets), 7)  # 整段掃描：第 0、4、...、24 行
+
+    def test_tail_and_paging(self):
+        self.assertEqual([text for _, text in self.log.tail(2)], ["line 23", "line 24"])
+        middle = self.log.offset_of_line(10)
+        self.assertEqual([text for _, text in self.log.lines_before(middle, 2)], ["line 8", "line 9"])
+        self.assertEqual([text for _, text in self.log.lines_from(middle + 3, 2)], ["line 10", "line 11"])
+        self.assertEqual(self.log.lines_before(0, 5), [])
+
+    def test_append_without_trailing_newline(self):
+        self.log.offset_of_line(24)
+        self.write(["line 25", "partial"], mode="a", newline=False)
+        self.assertTrue(self.log.refresh())
+        self.assertFalse(self.log.refresh())
+        self.assertEqual([text for _, text in self.log.tail(2)], ["line 25", "partial"])
+        self.assertEqual(self.log.lines_from(self.log.offset_of_line(26), 1)[0][1], "partial")
+        self.assertEqual(self.log.line_number(self.log.size), 26)
+
+    def test_truncation_resets_index(self):
+        self.log.offset_of_line(24)
+        self.write(["rotated"])
+        self.assertTrue(self.log.refresh())
+        self.assertEqual(self.log._offsets, [0])
+        self.assertEqual(self.log.tail(5), [(0, "rotated")])
+        self.assertIsNone(self.log.offset_of_line(1))
+
+    def test_empty_file(self):
+        self.write([], newline=False)
+        self.log.refresh()
+        self.assertEqual(self.log.size, 0)
+        self.assertEqual(self.log.tail(3), [])
+        self.assertIsNone(self.log.offset_of_line(0))
+        self.assertEqual(self.log.lines_from(0, 3), [])
+
+    def test_scan_across_chunks(self):
+        original = log_index._SCAN_CHUNK
+        log_index._SCAN_CHUNK = 7  # 讓換行符號落在掃描區段的邊界
+        try:
+            log = LogFile(self.path, stride=3)
+            for line in (2, 3, 13, 22):
+                self.assertEqual(log.lines_from(log.offset_of_line(line), 1)[0][1], f"line {line}")
+            log.close()
+        finally:
+            log_index._SCAN_CHUNK = original
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+"""
+test_log_search.py
+
+此模組包含 `log_search.py` 的單元測試。
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import time
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import config
+from src.log_search import LogIndex, build_sources, line_timestamp, tokenize
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Error: ECONNRESET on /api/v1 x"), {b"error", b"econnreset", b"on", b"api", b"v1"})
+        self.assertEqual(tokenize("連線逾時"), {"連線".encode(), "線逾".encode(), "逾時".encode()})
+        self.assertEqual(len(max(tokenize("a" * 100), key=len)), 32)
+
+    def test_line_timestamp(self):
+        expected = int(time.mktime((2024, 5, 1, 12, 0, 0, 0, 0, -1)))
+        self.assertEqual(line_timestamp(b"2024-05-01T12:00:00: request failed", 7), expected)
+        self.assertEqual(line_timestamp(b"2024-05-01 12:00:00 request failed", 7), expected)
+        self.assertEqual(line_timestamp(b"request failed", 7), 7)
+
+    def test_build_sources(self):
+        apis = [{"pm_id": 0, "name": "a", "project_name": "P", "log_file_path": "/logs/a-out.log",
+                 "error_log_path": "/logs/a-error.log"},
+                {"pm_id": 1, "name": "a", "project_name": "P", "log_file_path": "/logs/a-out.log",
+                 "error_log_path": "N/A"}]
+        sources = build_sources(apis)
+        self.assertEqual([(source["path"], source["stream"]) for source in sources],
+                         [("/logs/a-out.log", "out"), ("/logs/a-error.log", "err")])
+
+
+class TestLogIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.now = 1_700_000_000
+        self.logs = {name: os.path.join(self.dir.name, f"{name}.log") for name in ("a-out", "a-err", "b-out")}
+        self.sources = [
+            {"path": self.logs["a-out"], "stream": "out", "pm_id": 0, "name": "a", "project_name": "project_A"},
+            {"path": self.logs["a-err"], "stream": "err", "pm_id": 0, "name": "a", "project_name": "project_A"},
+            {"path": self.logs["b-out"], "stream": "out", "pm_id": 1, "name": "b", "project_name": "project_B"},
+        ]
+        self.index = self.open_index()
+
+    def tearDown(self):
+        self.index.close()
+        self.dir.cleanup()
+
+    def open_index(self, **kwargs):
+        index = LogIndex(os.path.join(self.dir.name, "index"), clock=lambda: self.now, **kwargs)
+        index.set_sources(self.sources)
+        return index
+
+    def append(self, name, *lines, newline=True):
+        with open(self.logs[name], "a") as f:
+            f.write("\n".join(lines) + ("\n" if newline else ""))
+
+    def test_search_across_logs_and_projects(self):
+        self.append("a-out", "GET / 200", "upstream ECONNRESET while proxying")
+        self.append("a-err", "Error: read ECONNRESET")
+        self.append("b-out", "Error: read ECONNRESET", "other line")
+        self.index.index_once()
+
+        hits = self.index.search("econnreset")
+        self.assertEqual(len(hits), 3)
+        hits = self.index.search("ECONNRESET", projects={"project_B"})
+        self.assertEqual([(hit["name"], hit["line"], hit["offset"]) for hit in hits],
+                         [("b", "Error: read ECONNRESET", 0)])
+        hits = self.index.search("read econnreset", names={"a"})
+        self.assertEqual([(hit["stream"], hit["line"]) for hit in hits], [("err", "Error: read ECONNRESET")])
+        self.assertEqual(self.index.search("missing"), [])
+        self.assertEqual(self.index.search("!!"), [])
+
+    def test_time_range(self):
+        self.append("a-out", "old timeout")
+        self.index.index_once()
+        self.now += 7200
+        self.append("a-out", "new timeout", "2020-01-01 00:00:00 ancient timeout")
+        self.index.index_once()
+        hits = self.index.search("timeout", since=self.now - 3600)
+        self.assertEqual([hit["line"] for hit in hits], ["new timeout"])
+        hits = self.index.search("timeout")
+        self.assertEqual([hit["line"] for hit in hits][0], "new timeout")  # 最新的在前
+        self.assertEqual(hits[-1]["line"], "2020-01-01 00:00:00 ancient timeout")
+
+    def test_incremental_and_partial_lines(self):
+        self.append("a-out", "first failure", "second fail", newline=False)
+        self.index.index_once()
+        self.assertEqual([hit["line"] for hit in self.index.search("failure")], ["first failure"])
+        self.assertEqual(self.index.search("second"), [])  # 還沒寫完的行不索引
+        self.append("a-out", "ure done")
+        self.index.index_once()
+        self.assertEqual([hit["line"] for hit in self.index.search("second")], ["second failure done"])
+
+    def test_resume_after_restart(self):
+        self.append("a-out", "before restart")
+        self.index.index_once()
+        self.index.close()
+        self.append("a-out", "after restart")
+        self.index = self.open_index()
+        self.assertEqual(len(self.index.search("before")), 1)
+        self.index.index_once()
+        self.assertEqual(len(self.index.search("restart")), 2)  # 舊的行沒有被重複索引
+
+    def test_rotation_starts_over(self):
+        self.append("a-out", "rotated away", "rotated away again")
+        self.index.index_once()
+        os.remove(self.logs["a-out"])
+        self.append("a-out", "fresh line")
+        self.index.index_once()
+        self.assertEqual(self.index.search("rotated"), [])  # 舊檔案已不存在
+        self.assertEqual([hit["line"] for hit in self.index.search("fresh")], ["fresh line"])
+
+    def test_bounded_buffer_and_merging(self):
+        self.index.close()
+        self.index = self.open_index(buffer_postings=4, max_segments=3)
+        for i in range(10):
+            self.append("a-out", f"request {i} failed with code{i}")
+        self.index.index_once()
+        self.assertLessEqual(len(self.index._segment_meta), 3)
+        hits = self.index.search("failed")
+        self.assertEqual(len(hits), 10)
+        self.assertEqual(self.index.search("code7")[0]["line"], "request 7 failed with code7")
+        names = set(os.listdir(self.index.path))
+        self.assertEqual(names - {meta["name"] for meta in self.index._segment_meta}, {"state.json", ".lock"})
+
+    def test_retention(self):
+        self.append("a-out", "expired entry")
+        self.index.index_once()
+        self.now += config.LOG_SEARCH_RETENTION + 1
+        self.append("a-out", "recent entry")
+        self.index.index_once()
+        self.assertEqual(self.index.search("expired"), [])
+        self.assertEqual(len(self.index.search("entry")), 1)
+
+    def test_second_instance_is_readonly(self):
+        self.append("b-out", "shared result")
+        other = self.open_index()
+        try:
+            self.assertTrue(other.readonly)
+            self.assertEqual(other.index_once(), 0)
+            self.index.index_once()
+            self.assertEqual(len(other.search("shared")), 1)  # 重新載入寫入實例的狀態
+        finally:
+            other.close()
+
+    def test_background_thread(self):
+        self.append("a-out", "background hit")
+        self.index.start(0.01)
+        deadline = time.time() + 5
+        while not self.index.search("background") and time.time() < deadline:
+            time.sleep(0.02)
+        self.index.stop()
+        self.assertFalse(self.index.is_running())
+        self.assertEqual(len(self.index.search("background")), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
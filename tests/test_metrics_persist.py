@@ -0,0 +1,142 @@
+"""
+test_metrics_persist.py
+
+此模組包含 `metrics_persist.py` 以及 MetricsStore 磁碟模式的單元測試。
+"""
+
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import config, metrics_persist, pm2_manager
+from src.metrics_store import MetricsStore, TieredMetricsStore
+
+
+class TestPersistentMetricsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_history_survives_reopen(self):
+        store = MetricsStore(capacity=4, path=self.path)
+        for i in range(6):
+            store.append(3, 1000 * i, cpu=i, memory=i * 2)
+        del store
+        reopened = MetricsStore(capacity=4, path=self.path)
+        self.assertEqual(reopened.keys(), [3])
+        self.assertEqual(reopened.values(3, "cpu").tolist(), [2, 3, 4, 5])
+        reopened.append(3, 6000, cpu=6)
+        self.assertEqual(reopened.times(3).tolist(), [3000, 4000, 5000, 6000])
+
+    def test_readonly_reader_sees_writer_data(self):
+        writer = MetricsStore(capacity=4, path=self.path)
+        writer.append(0, 1, cpu=1)
+        reader = MetricsStore(capacity=4, path=self.path, readonly=True)
+        writer.append(0, 2, cpu=2)
+        writer.append(1, 2, cpu=7)  # 讀取端開啟之後才建立的檔案
+        self.assertEqual(reader.values(0, "cpu").tolist(), [1, 2])
+        self.assertEqual(reader.values(1, "cpu").tolist(), [7])
+        reader.append(0, 3, cpu=3)  # 唯讀時不寫入
+        self.assertEqual(writer.values(0, "cpu").tolist(), [1, 2])
+        self.assertFalse(reader.values(0, "cpu").flags.writeable)
+
+    def test_capacity_change_keeps_newest_points(self):
+        store = MetricsStore(capacity=5, path=self.path)
+        for i in range(5):
+            store.append(0, i, cpu=i)
+        del store
+        resized = MetricsStore(capacity=3, columns=("cpu", "memory", "threads"), path=self.path)
+        self.assertEqual(resized.values(0, "cpu").tolist(), [2, 3, 4])
+        self.assertEqual(resized.values(0, "threads").tolist(), [0, 0, 0])
+        size = metrics_persist.ring_file_size(3, 3)
+        self.assertEqual(os.path.getsize(os.path.join(self.path, "0.ring")), size)
+
+    def test_header_fits_rollup_columns(self):
+        tiered = TieredMetricsStore(config.METRICS_ROLLUP_TIERS, pm2_manager._METRIC_COLUMNS)
+        for index, store in enumerate(tiered._stores):
+            ring = metrics_persist.create_ring_file(os.path.join(self.path, f"{index}.ring"), 4, store.columns)
+            self.assertEqual(ring.columns, store.columns)
+
+    def test_compact_applies_retention_and_size_limit(self):
+        store = MetricsStore(capacity=4, path=self.path)
+        for key, last in [(0, 1000), (1, 50000), (2, 90000), (3, 95000)]:
+            store.append(key, last, cpu=1)
+        store.remove(0)
+        store.remove(1)
+        store.remove(2)
+        with open(os.path.join(self.path, "junk.ring"), 'wb') as f:
+            f.write(b"not a ring file")
+        removed = store.compact(retention_ms=60000, now_ms=100000)
+        self.assertEqual(sorted(map(str, removed)), ["0", "junk"])
+        removed = store.compact(max_bytes=metrics_persist.ring_file_size(4, 2) * 2, now_ms=100000)
+        self.assertEqual(removed, [1])
+        self.assertEqual(sorted(os.listdir(self.path)), ["2.ring", "3.ring"])
+
+    def test_rollup_bucket_open_at_shutdown_is_closed_after_restart(self):
+        tiers = [(1, 600), (60, 3600)]
+        store = TieredMetricsStore(tiers, path=self.path)
+        for t in range(0, 90, 10):
+            store.append(0, t * 1000, cpu=t)
+        del store
+        restarted = TieredMetricsStore(tiers, path=self.path)
+        restarted.append(0, 125000, cpu=0)
+        minutes = restarted._stores[1].window(0)
+        self.assertEqual(minutes["time"].tolist(), [0, 60000])
+        self.assertEqual(minutes["count"].tolist(), [6, 3])
+        self.assertEqual(minutes["cpu_max"].tolist(), [50, 80])
+
+    def test_writer_lock_is_exclusive(self):
+        first = metrics_persist.WriterLock(self.path)
+        second = metrics_persist.WriterLock(self.path)
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        first.release()
+        self.assertTrue(second.acquire())
+        second.release()
+
+
+class TestOpenMetricsHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_store = pm2_manager._metrics_store
+        self.original_lock = pm2_manager._metrics_writer_lock
+
+    def tearDown(self):
+        if pm2_manager._metrics_writer_lock is not None:
+            pm2_manager._metrics_writer_lock.release()
+        pm2_manager._metrics_store = self.original_store
+        pm2_manager._metrics_writer_lock = self.original_lock
+        self.tmpdir.cleanup()
+
+    def test_second_instance_opens_read_only(self):
+        self.assertTrue(pm2_manager.open_metrics_history(self.tmpdir.name))
+        self.assertFalse(pm2_manager._metrics_store.readonly)
+        other = metrics_persist.WriterLock(self.tmpdir.name)
+        self.assertFalse(other.acquire())
+        pm2_manager._metrics_writer_lock.release()
+        pm2_manager._metrics_writer_lock = None
+        self.assertTrue(other.acquire())
+        with patch('builtins.print') as mock_print:
+            self.assertTrue(pm2_manager.open_metrics_history(self.tmpdir.name))
+        self.assertTrue(pm2_manager._metrics_store.readonly)
+        mock_print.assert_called_once()
+        other.release()
+
+    def test_disabled_by_config(self):
+        with patch.object(config, 'METRICS_PERSIST_DIR', None):
+            self.assertFalse(pm2_manager.open_metrics_history())
+        self.assertIs(pm2_manager._metrics_store, self.original_store)
+
+
+if __name__ == '__main__':
+    unittest.main()
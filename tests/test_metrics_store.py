@@ -0,0 +1,175 @@
+"""
+test_metrics_store.py
+
+此模組包含 `metrics_store.py` 的單元測試。
+"""
+
+import unittest
+import os
+import sys
+
+import numpy as np
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.metrics_store import MetricsStore, TieredMetricsStore
+
+
+class TestMetricsStore(unittest.TestCase):
+
+    def test_window_is_ordered_and_bounded(self):
+        store = MetricsStore(capacity=4)
+        for i in range(10):
+            store.append(0, 1000 * i, cpu=i, memory=i * 10)
+        window = store.window(0)
+        self.assertEqual(window["time"].tolist(), [6000, 7000, 8000, 9000])
+        self.assertEqual(window["cpu"].tolist(), [6, 7, 8, 9])
+        self.assertEqual(window["memory"].tolist(), [60, 70, 80, 90])
+        self.assertEqual(store.values(0, "cpu", points=2).tolist(), [8, 9])
+        self.assertEqual(window["time"].dtype, np.int64)
+        self.assertEqual(window["cpu"].dtype, np.float32)
+
+    def test_partial_fill(self):
+        store = MetricsStore(capacity=5)
+        store.append("a", 1, cpu=1.5)
+        store.append("a", 2, cpu=2.5)
+        self.assertEqual(store.values("a", "cpu").tolist(), [1.5, 2.5])
+        self.assertEqual(store.values("a", "memory").tolist(), [0, 0])
+        self.assertEqual(store.times("a", points=10).tolist(), [1, 2])
+
+    def test_views_are_zero_copy(self):
+        store = MetricsStore(capacity=3)
+        for i in range(5):
+            store.append(0, i, cpu=i)
+        first = store.values(0, "cpu")
+        second = store.values(0, "cpu")
+        self.assertFalse(first.flags.owndata)
+        self.assertTrue(np.shares_memory(first, second))
+
+    def test_copies_survive_later_appends(self):
+        store = MetricsStore(capacity=3)
+        for i in range(3):
+            store.append(0, i, cpu=i)
+        window = store.window(0, copy=True)
+        times, block = store.block(0, 0, 10, copy=True)
+        values = store.values(0, "cpu", copy=True)
+        store.append(0, 3, cpu=3)  # 環形緩衝區已滿，覆寫最舊的數據點
+        self.assertEqual(window["time"].tolist(), [0, 1, 2])
+        self.assertEqual(window["cpu"].tolist(), [0, 1, 2])
+        self.assertEqual(times.tolist(), [0, 1, 2])
+        self.assertEqual(block[0].tolist(), [0, 1, 2])
+        self.assertEqual(values.tolist(), [0, 1, 2])
+        self.assertFalse(np.shares_memory(window["cpu"], store.values(0, "cpu")))
+
+    def test_unknown_key_returns_empty_arrays(self):
+        store = MetricsStore()
+        window = store.window(42)
+        self.assertEqual(window["time"].size, 0)
+        self.assertEqual(window["cpu"].size, 0)
+        self.assertNotIn(42, store)
+
+    def test_ttl_eviction(self):
+        store = MetricsStore(ttl=10)
+        store.append(0, 1, now=0, cpu=1)
+        store.append(1, 1, now=5, cpu=1)
+        self.assertEqual(store.evict_stale(now=12), [0])
+        self.assertEqual(store.keys(), [1])
+        store.append(1, 2, now=14, cpu=1)
+        self.assertEqual(store.evict_stale(now=20), [])
+
+    def test_lru_eviction(self):
+        store = MetricsStore(max_series=2)
+        store.append(0, 1, cpu=1)
+        store.append(1, 1, cpu=1)
+        store.append(0, 2, cpu=1)  # 0 變成最近使用
+        store.append(2, 1, cpu=1)
+        self.assertEqual(sorted(store.keys()), [0, 2])
+
+    def test_custom_columns(self):
+        store = MetricsStore(capacity=2, columns=("rps",))
+        store.append(0, 1, rps=3)
+        self.assertEqual(store.values(0, "rps").tolist(), [3])
+        with self.assertRaises(KeyError):
+            store.append(0, 2, cpu=1)
+
+
+class TestTieredMetricsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = TieredMetricsStore([(1, 600), (60, 86400), (3600, 30 * 86400)])
+
+    def feed(self, seconds, step=1, key=0):
+        for t in range(0, seconds, step):
+            self.store.append(key, t * 1000, cpu=t % 60, memory=100 + (t // 60))
+
+    def test_minute_rollup_min_avg_max(self):
+        self.feed(121)
+        minutes = self.store.query(0, 0)
+        # 原始數據仍涵蓋整段時間，所以返回原始數據
+        self.assertEqual(minutes["resolution"], 1)
+        self.store.raw.clear()
+        minutes = self.store.query(0, 0)
+        self.assertEqual(minutes["resolution"], 60)
+        self.assertEqual(minutes["time"].tolist(), [0, 60000])
+        self.assertEqual(minutes["cpu_min"].tolist(), [0, 0])
+        self.assertEqual(minutes["cpu"].tolist(), [29.5, 29.5])
+        self.assertEqual(minutes["cpu_max"].tolist(), [59, 59])
+        self.assertEqual(minutes["memory"].tolist(), [100, 101])
+
+    def test_hour_rollup_is_weighted_by_sample_count(self):
+        self.feed(2 * 3600 + 61, step=30)
+        hours = self.store._stores[2].window(0)
+        self.assertEqual(hours["time"].tolist(), [0, 3600000])
+        self.assertEqual(hours["count"].tolist(), [120, 120])
+        self.assertAlmostEqual(float(hours["cpu_avg"][0]), 15.0)
+        self.assertEqual(hours["memory_min"].tolist(), [100, 160])
+        self.assertEqual(hours["memory_max"].tolist(), [159, 219])
+
+    def test_query_picks_finest_tier_covering_range(self):
+        self.feed(3 * 86400, step=60)
+        now = 3 * 86400 * 1000
+        self.assertEqual(self.store.query(0, now - 300 * 1000)["resolution"], 1)
+        self.assertEqual(self.store.query(0, now - 12 * 3600 * 1000)["resolution"], 60)
+        week = self.store.query(0, now - 7 * 86400 * 1000)
+        self.assertEqual(week["resolution"], 3600)
+        self.assertEqual(len(week["time"]), 71)
+
+    def test_query_sum_aligns_shared_timestamps(self):
+        self.feed(5, key=0)
+        self.feed(5, step=2, key=1)
+        summed = self.store.query_sum([0, 1], 0)
+        self.assertEqual(summed["resolution"], 1)
+        self.assertEqual(summed["time"].tolist(), [0, 2000, 4000])
+        self.assertEqual(summed["cpu"].tolist(), [0, 4, 8])
+        self.assertEqual(summed["memory"].tolist(), [200, 200, 200])
+
+    def test_query_copy_is_detached(self):
+        self.feed(5)
+        copied = self.store.query(0, 0, copy=True)
+        view = self.store.query(0, 0)
+        self.assertFalse(np.shares_memory(copied["time"], view["time"]))
+        self.assertFalse(np.shares_memory(copied["cpu"], view["cpu"]))
+        summed = self.store.query_sum([0], 0)
+        self.assertFalse(np.shares_memory(summed["time"], view["time"]))
+
+    def test_memory_per_process_is_bounded(self):
+        self.feed(40 * 86400, step=600)
+        sizes = [len(self.store._stores[i].times(0)) for i in range(3)]
+        self.assertEqual(sizes[0], 600)
+        self.assertLessEqual(sizes[1], 1440)
+        self.assertEqual(sizes[2], 720)
+
+    def test_eviction_removes_all_tiers(self):
+        store = TieredMetricsStore([(1, 10), (60, 600)], ttl=5, max_series=1)
+        store.append(0, 0, now=0, cpu=1)
+        store.append(0, 61000, now=1, cpu=1)
+        store.append(1, 0, now=2, cpu=1)  # 超過 max_series，移除 0
+        self.assertEqual(store.keys(), [1])
+        self.assertEqual(store._stores[1].keys(), [])
+        self.assertEqual(store.evict_stale(now=10), [1])
+        self.assertEqual(len(store), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
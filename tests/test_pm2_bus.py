@@ -0,0 +1,94 @@
+"""
+test_pm2_bus.py
+
+此模組包含 `pm2_bus.py` 的單元測試，使用 fake_pm2_daemon 的 pub.sock 作為事件來源。
+"""
+
+import unittest
+import os
+import queue
+import sys
+import tempfile
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from src.pm2_bus import PM2BusSubscriber, parse_bus_message
+from src.pm2_rpc import PM2RpcClient
+from fake_pm2_daemon import FakePM2Daemon, make_process
+
+
+class TestParseBusMessage(unittest.TestCase):
+
+    def test_process_event_uses_process_status(self):
+        event = parse_bus_message(["process:event", {
+            "event": "exit", "at": 123,
+            "process": {"name": "api", "pm_id": 4, "status": "errored"}}])
+        self.assertEqual(event, {"type": "process", "event": "exit", "pm_id": 4, "name": "api",
+                                 "status": "errored", "at": 123})
+
+    def test_status_falls_back_to_event_name(self):
+        event = parse_bus_message(["process:event", {"event": "stop", "process": {"pm2_env": {"pm_id": 1}}}])
+        self.assertEqual((event["pm_id"], event["status"]), (1, "stopped"))
+
+    def test_log_and_unknown_messages(self):
+        event = parse_bus_message(["log:err", {"process": {"name": "api", "pm_id": 2}, "data": "boom\n"}])
+        self.assertEqual((event["type"], event["stream"], event["data"]), ("log", "err", "boom\n"))
+        self.assertIsNone(parse_bus_message(["axm:monitor", {"process": {}}]))
+        self.assertIsNone(parse_bus_message(["process:event"]))
+
+
+class TestPM2BusSubscriber(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.daemon = FakePM2Daemon(self.tmpdir.name, [make_process(0, "python-api"),
+                                                       make_process(1, "go-api")]).start()
+        self.events = queue.Queue()
+        self.states = queue.Queue()
+        self.subscriber = None
+
+    def tearDown(self):
+        if self.subscriber is not None:
+            self.subscriber.stop()
+        self.daemon.stop()
+        self.tmpdir.cleanup()
+
+    def subscribe(self, **kwargs):
+        self.subscriber = PM2BusSubscriber(self.events.put, pm2_home=self.tmpdir.name,
+                                           connection_callback=self.states.put,
+                                           reconnect_delay=0.05, **kwargs).start()
+        self.assertTrue(self.daemon.wait_for_subscribers())
+        self.assertTrue(self.states.get(timeout=2))
+
+    def test_status_changes_are_pushed(self):
+        self.subscribe()
+        client = PM2RpcClient(self.tmpdir.name, timeout=2.0)
+        client.stop_process(1)
+        client.restart_process(0)
+        client.close()
+        received = [self.events.get(timeout=2) for _ in range(3)]
+        self.assertEqual([(e["pm_id"], e["event"], e["status"]) for e in received],
+                         [(1, "stop", "stopped"), (0, "restart", "online"), (0, "online", "online")])
+
+    def test_event_type_filter(self):
+        self.subscribe(event_types={"process"})
+        self.daemon.publish_log(0, "hello\n")
+        self.daemon.publish_process_event("exit", self.daemon.processes[0])
+        self.assertEqual(self.events.get(timeout=2)["event"], "exit")
+        self.assertTrue(self.events.empty())
+
+    def test_reconnects_after_daemon_restart(self):
+        self.subscribe()
+        self.daemon.stop()
+        self.assertFalse(self.states.get(timeout=2))
+        self.daemon.start()
+        self.assertTrue(self.states.get(timeout=2))
+        self.assertTrue(self.daemon.wait_for_subscribers())
+        self.daemon.publish_log(1, "back\n", stream="out")
+        self.assertEqual(self.events.get(timeout=2)["data"], "back\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,13 +10,27 @@ import json
 import sys
 import os
 import subprocess
+import threading
+import time
 
 # 將專案根目錄添加到 sys.path，以便找到 src 模組
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.pm2_manager import get_pm2_list, start_api, restart_api, stop_api, \
-                          start_project_apis, restart_project_apis, stop_project_apis
-from src import config
+                          start_project_apis, restart_project_apis, stop_project_apis, \
+                          get_pm2_snapshot, invalidate_pm2_snapshot, get_all_project_names, \
+                          plan_project_action, run_bulk_action, execute_action_plan
+from src import config, pm2_manager
+
+PROJECT_CONFIGS = {
+    "project_A": {"api-projA-1": {}, "api-projA-2": {}},
+    "project_B": {"api-projB-1": {}},
+}
+PROJECT_PM2_LIST = [
+    {'name': 'api-projA-1', 'pm_id': 100, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
+    {'name': 'api-projA-2', 'pm_id': 101, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
+    {'name': 'api-projB-1', 'pm_id': 200, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_B'}},
+]
 
 class TestPM2Manager(unittest.TestCase):
 
@@ -24,6 +38,7 @@ class TestPM2Manager(unittest.TestCase):
         # Backup original PM2_PATH and set it for testing
         self.original_pm2_path = getattr(config, 'PM2_PATH', None)
         config.PM2_PATH = "pm2" # For testing, assume pm2 is in PATH
+        invalidate_pm2_snapshot() # 避免其他測試留下的快照
 
     def tearDown(self):
         # Restore original PM2_PATH
@@ -57,7 +72,7 @@ class TestPM2Manager(unittest.TestCase):
 
         pm2_list = get_pm2_list()
 
-        mock_subprocess_run.assert_called_once_with(["pm2", "jlist"], capture_output=True, text=True, check=True)
+        mock_subprocess_run.assert_called_once_with(["pm2", "jlist"], timeout=10.0, capture_output=True, text=True, check=True)
 
         self.assertEqual(len(pm2_list), 2)
         self.assertEqual(pm2_list[0]['name'], 'dummy-api-1')
@@ -66,6 +81,29 @@ class TestPM2Manager(unittest.TestCase):
         self.assertEqual(pm2_list[1]['name'], 'another-api')
         self.assertEqual(pm2_list[1]['status'], 'stopped')
 
+    @patch('subprocess.run')
+    def test_get_pm2_list_attaches_history_views(self, mock_subprocess_run):
+        processes = [{"name": "api", "pm_id": 900, "monit": {"cpu": 1.5, "memory": 2 * 1024 * 1024}}]
+        mock_subprocess_run.return_value = MagicMock(stdout=json.dumps(processes))
+        with patch.object(pm2_manager._metrics_store, 'ttl', None):
+            get_pm2_list()
+            pm2_list = get_pm2_list()
+        self.assertEqual(pm2_list[0]['cpu_history'].tolist(), [1.5, 1.5])
+        self.assertEqual(pm2_list[0]['memory_history'].tolist(), [2.0, 2.0])
+        self.assertEqual(len(pm2_list[0]['time_history']), 2)
+        self.assertFalse(pm2_list[0]['cpu_history'].flags.owndata)
+
+    @patch('subprocess.run')
+    def test_vanished_processes_are_evicted_from_history(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = MagicMock(stdout=json.dumps([{"name": "gone", "pm_id": 901}]))
+        get_pm2_list()
+        self.assertIn(901, pm2_manager._metrics_store)
+        mock_subprocess_run.return_value = MagicMock(stdout="[]")
+        with patch.object(pm2_manager._metrics_store, 'ttl', 0):
+            time.sleep(0.01)
+            get_pm2_list()
+        self.assertNotIn(901, pm2_manager._metrics_store)
+
     @patch('subprocess.run')
     @patch('builtins.print')
     def test_get_pm2_list_file_not_found_error(self, mock_print, mock_subprocess_run):
@@ -104,11 +142,11 @@ class TestPM2Manager(unittest.TestCase):
         mock_subprocess_run.return_value.stdout = ""
         mock_subprocess_run.return_value.stderr = ""
         result_name = start_api("test-api-name")
-        mock_subprocess_run.assert_any_call(["pm2", "start", "test-api-name"], capture_output=True, text=True, check=True)
+        mock_subprocess_run.assert_any_call(["pm2", "start", "test-api-name"], timeout=30.0, capture_output=True, text=True, check=True)
         self.assertTrue(result_name)
         mock_subprocess_run.reset_mock()
         result_id = start_api(123)
-        mock_subprocess_run.assert_any_call(["pm2", "start", "123"], capture_output=True, text=True, check=True)
+        mock_subprocess_run.assert_any_call(["pm2", "start", "123"], timeout=30.0, capture_output=True, text=True, check=True)
         self.assertTrue(result_id)
 
     @patch('subprocess.run')
@@ -141,11 +179,11 @@ class TestPM2Manager(unittest.TestCase):
         mock_subprocess_run.return_value.stdout = ""
         mock_subprocess_run.return_value.stderr = ""
         result_name = restart_api("test-api-name")
-        mock_subprocess_run.assert_any_call(["pm2", "restart", "test-api-name"], capture_output=True, text=True, check=True)
+        mock_subprocess_run.assert_any_call(["pm2", "restart", "test-api-name"], timeout=30.0, capture_output=True, text=True, check=True)
         self.assertTrue(result_name)
         mock_subprocess_run.reset_mock()
         result_id = restart_api(123)
-        mock_subprocess_run.assert_any_call(["pm2", "restart", "123"], capture_output=True, text=True, check=True)
+        mock_subprocess_run.assert_any_call(["pm2", "restart", "123"], timeout=30.0, capture_output=True, text=True, check=True)
         self.assertTrue(result_id)
 
     @patch('subprocess.run')
@@ -178,11 +216,11 @@ class TestPM2Manager(unittest.TestCase):
         mock_subprocess_run.return_value.stdout = ""
         mock_subprocess_run.return_value.stderr = ""
         result_name = stop_api("test-api-name")
-        mock_subprocess_run.assert_any_call(["pm2", "stop", "test-api-name"], capture_output=True, text=True, check=True)
+        mock_subprocess_run.assert_any_call(["pm2", "stop", "test-api-name"], timeout=30.0, capture_output=True, text=True, check=True)
         self.assertTrue(result_name)
         mock_subprocess_run.reset_mock()
         result_id = stop_api(123)
-        mock_subprocess_run.assert_any_call(["pm2", "stop", "123"], capture_output=True, text=True, check=True)
+        mock_subprocess_run.assert_any_call(["pm2", "stop", "123"], timeout=30.0, capture_output=True, text=True, check=True)
         self.assertTrue(result_id)
 
     @patch('subprocess.run')
@@ -210,154 +248,261 @@ class TestPM2Manager(unittest.TestCase):
         mock_print.assert_called_with("停止 API error-api 時發生未知錯誤：some unexpected error")
 
     @patch('src.pm2_manager.get_pm2_list')
-    @patch('src.pm2_manager.start_api')
+    @patch('src.pm2_manager.run_bulk_action')
+    @patch('src.pm2_manager.data_parser.load_all_api_configs', return_value=PROJECT_CONFIGS)
     @patch('builtins.print')
-    def test_start_project_apis_success(self, mock_print, mock_start_api, mock_get_pm2_list):
-        mock_get_pm2_list.return_value = [
-            {'name': 'api-projA-1', 'pm_id': 100, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
-            {'name': 'api-projA-2', 'pm_id': 101, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
-            {'name': 'api-projB-1', 'pm_id': 200, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_B'}},
-        ]
-        mock_start_api.return_value = True
+    def test_start_project_apis_success(self, mock_print, mock_configs, mock_run_bulk_action, mock_get_pm2_list):
+        mock_get_pm2_list.return_value = PROJECT_PM2_LIST
+        mock_run_bulk_action.return_value = {100: None, 101: None}
 
         result = start_project_apis("project_A")
 
         self.assertTrue(result)
-        mock_start_api.assert_any_call(100)
-        mock_start_api.assert_any_call(101)
+        mock_run_bulk_action.assert_called_once_with("start", [100, 101])
         mock_print.assert_any_call("嘗試啟動專案 'project_A' 中的 API: api-projA-1 (ID: 100)")
         mock_print.assert_any_call("嘗試啟動專案 'project_A' 中的 API: api-projA-2 (ID: 101)")
 
     @patch('src.pm2_manager.get_pm2_list')
-    @patch('src.pm2_manager.start_api')
+    @patch('src.pm2_manager.run_bulk_action')
+    @patch('src.pm2_manager.data_parser.load_all_api_configs', return_value=PROJECT_CONFIGS)
     @patch('builtins.print')
-    def test_start_project_apis_no_apis_found(self, mock_print, mock_start_api, mock_get_pm2_list):
-        mock_get_pm2_list.return_value = [
-            {'name': 'api-projB-1', 'pm_id': 200, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_B'}},
-        ]
+    def test_start_project_apis_no_apis_found(self, mock_print, mock_configs, mock_run_bulk_action, mock_get_pm2_list):
+        mock_get_pm2_list.return_value = PROJECT_PM2_LIST[2:]
 
         result = start_project_apis("project_A")
 
         self.assertFalse(result)
-        mock_start_api.assert_not_called()
+        mock_run_bulk_action.assert_not_called()
         mock_print.assert_called_with("未找到專案 'project_A' 下的任何 API 服務。")
 
     @patch('src.pm2_manager.get_pm2_list')
-    @patch('src.pm2_manager.start_api')
+    @patch('src.pm2_manager.run_bulk_action')
+    @patch('src.pm2_manager.data_parser.load_all_api_configs', return_value=PROJECT_CONFIGS)
     @patch('builtins.print')
-    def test_start_project_apis_partial_failure(self, mock_print, mock_start_api, mock_get_pm2_list):
-        mock_get_pm2_list.return_value = [
-            {'name': 'api-projA-1', 'pm_id': 100, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
-            {'name': 'api-projA-2', 'pm_id': 101, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
-        ]
-        mock_start_api.side_effect = [True, False]
+    def test_start_project_apis_partial_failure(self, mock_print, mock_configs, mock_run_bulk_action, mock_get_pm2_list):
+        mock_get_pm2_list.return_value = PROJECT_PM2_LIST
+        mock_run_bulk_action.return_value = {100: None, 101: "Process 101 not found"}
 
         result = start_project_apis("project_A")
 
         self.assertFalse(result)
-        mock_start_api.assert_any_call(100)
-        mock_start_api.assert_any_call(101)
-        mock_print.assert_any_call("啟動 API: api-projA-2 (ID: 101) 失敗。")
+        mock_run_bulk_action.assert_called_once_with("start", [100, 101])
+        mock_print.assert_any_call("啟動 API: api-projA-2 (ID: 101) 失敗。錯誤訊息：Process 101 not found")
 
     @patch('src.pm2_manager.get_pm2_list')
-    @patch('src.pm2_manager.restart_api')
+    @patch('src.pm2_manager.run_bulk_action')
+    @patch('src.pm2_manager.data_parser.load_all_api_configs', return_value=PROJECT_CONFIGS)
     @patch('builtins.print')
-    def test_restart_project_apis_success(self, mock_print, mock_restart_api, mock_get_pm2_list):
-        mock_get_pm2_list.return_value = [
-            {'name': 'api-projA-1', 'pm_id': 100, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
-            {'name': 'api-projA-2', 'pm_id': 101, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
-            {'name': 'api-projB-1', 'pm_id': 200, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_B'}},
-        ]
-        mock_restart_api.return_value = True
+    def test_restart_project_apis_success(self, mock_print, mock_configs, mock_run_bulk_action, mock_get_pm2_list):
+        mock_get_pm2_list.return_value = PROJECT_PM2_LIST
+        mock_run_bulk_action.return_value = {100: None, 101: None}
 
         result = restart_project_apis("project_A")
 
         self.assertTrue(result)
-        mock_restart_api.assert_any_call(100)
-        mock_restart_api.assert_any_call(101)
+        mock_run_bulk_action.assert_called_once_with("restart", [100, 101])
         mock_print.assert_any_call("嘗試重啟專案 'project_A' 中的 API: api-projA-1 (ID: 100)")
         mock_print.assert_any_call("嘗試重啟專案 'project_A' 中的 API: api-projA-2 (ID: 101)")
 
     @patch('src.pm2_manager.get_pm2_list')
-    @patch('src.pm2_manager.restart_api')
+    @patch('src.pm2_manager.run_bulk_action')
+    @patch('src.pm2_manager.data_parser.load_all_api_configs', return_value=PROJECT_CONFIGS)
     @patch('builtins.print')
-    def test_restart_project_apis_no_apis_found(self, mock_print, mock_restart_api, mock_get_pm2_list):
-        mock_get_pm2_list.return_value = [
-            {'name': 'api-projB-1', 'pm_id': 200, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_B'}},
-        ]
+    def test_restart_project_apis_no_apis_found(self, mock_print, mock_configs, mock_run_bulk_action, mock_get_pm2_list):
+        mock_get_pm2_list.return_value = PROJECT_PM2_LIST[2:]
 
         result = restart_project_apis("project_A")
 
         self.assertFalse(result)
-        mock_restart_api.assert_not_called()
+        mock_run_bulk_action.assert_not_called()
         mock_print.assert_called_with("未找到專案 'project_A' 下的任何 API 服務。")
 
     @patch('src.pm2_manager.get_pm2_list')
-    @patch('src.pm2_manager.restart_api')
+    @patch('src.pm2_manager.run_bulk_action')
+    @patch('src.pm2_manager.data_parser.load_all_api_configs', return_value=PROJECT_CONFIGS)
     @patch('builtins.print')
-    def test_restart_project_apis_partial_failure(self, mock_print, mock_restart_api, mock_get_pm2_list):
-        mock_get_pm2_list.return_value = [
-            {'name': 'api-projA-1', 'pm_id': 100, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
-            {'name': 'api-projA-2', 'pm_id': 101, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
-        ]
-        mock_restart_api.side_effect = [True, False]
+    def test_restart_project_apis_partial_failure(self, mock_print, mock_configs, mock_run_bulk_action, mock_get_pm2_list):
+        mock_get_pm2_list.return_value = PROJECT_PM2_LIST
+        mock_run_bulk_action.return_value = {100: None, 101: "Process 101 not found"}
 
         result = restart_project_apis("project_A")
 
         self.assertFalse(result)
-        mock_restart_api.assert_any_call(100)
-        mock_restart_api.assert_any_call(101)
-        mock_print.assert_any_call("重啟 API: api-projA-2 (ID: 101) 失敗。")
+        mock_run_bulk_action.assert_called_once_with("restart", [100, 101])
+        mock_print.assert_any_call("重啟 API: api-projA-2 (ID: 101) 失敗。錯誤訊息：Process 101 not found")
 
     @patch('src.pm2_manager.get_pm2_list')
-    @patch('src.pm2_manager.stop_api')
+    @patch('src.pm2_manager.run_bulk_action')
+    @patch('src.pm2_manager.data_parser.load_all_api_configs', return_value=PROJECT_CONFIGS)
     @patch('builtins.print')
-    def test_stop_project_apis_success(self, mock_print, mock_stop_api, mock_get_pm2_list):
-        mock_get_pm2_list.return_value = [
-            {'name': 'api-projA-1', 'pm_id': 100, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
-            {'name': 'api-projA-2', 'pm_id': 101, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
-            {'name': 'api-projB-1', 'pm_id': 200, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_B'}},
-        ]
-        mock_stop_api.return_value = True
+    def test_stop_project_apis_success(self, mock_print, mock_configs, mock_run_bulk_action, mock_get_pm2_list):
+        mock_get_pm2_list.return_value = PROJECT_PM2_LIST
+        mock_run_bulk_action.return_value = {100: None, 101: None}
 
         result = stop_project_apis("project_A")
 
         self.assertTrue(result)
-        mock_stop_api.assert_any_call(100)
-        mock_stop_api.assert_any_call(101)
+        mock_run_bulk_action.assert_called_once_with("stop", [100, 101])
         mock_print.assert_any_call("嘗試停止專案 'project_A' 中的 API: api-projA-1 (ID: 100)")
         mock_print.assert_any_call("嘗試停止專案 'project_A' 中的 API: api-projA-2 (ID: 101)")
 
     @patch('src.pm2_manager.get_pm2_list')
-    @patch('src.pm2_manager.stop_api')
+    @patch('src.pm2_manager.run_bulk_action')
+    @patch('src.pm2_manager.data_parser.load_all_api_configs', return_value=PROJECT_CONFIGS)
     @patch('builtins.print')
-    def test_stop_project_apis_no_apis_found(self, mock_print, mock_stop_api, mock_get_pm2_list):
-        mock_get_pm2_list.return_value = [
-            {'name': 'api-projB-1', 'pm_id': 200, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_B'}},
-        ]
+    def test_stop_project_apis_no_apis_found(self, mock_print, mock_configs, mock_run_bulk_action, mock_get_pm2_list):
+        mock_get_pm2_list.return_value = PROJECT_PM2_LIST[2:]
 
         result = stop_project_apis("project_A")
 
         self.assertFalse(result)
-        mock_stop_api.assert_not_called()
+        mock_run_bulk_action.assert_not_called()
         mock_print.assert_called_with("未找到專案 'project_A' 下的任何 API 服務。")
 
     @patch('src.pm2_manager.get_pm2_list')
-    @patch('src.pm2_manager.stop_api')
+    @patch('src.pm2_manager.run_bulk_action')
+    @patch('src.pm2_manager.data_parser.load_all_api_configs', return_value=PROJECT_CONFIGS)
     @patch('builtins.print')
-    def test_stop_project_apis_partial_failure(self, mock_print, mock_stop_api, mock_get_pm2_list):
-        mock_get_pm2_list.return_value = [
-            {'name': 'api-projA-1', 'pm_id': 100, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
-            {'name': 'api-projA-2', 'pm_id': 101, 'pm2_env': {'pm_cwd': '/Users/gamepig/projects/API_Manager/project_A'}},
-        ]
-        mock_stop_api.side_effect = [True, False]
+    def test_stop_project_apis_partial_failure(self, mock_print, mock_configs, mock_run_bulk_action, mock_get_pm2_list):
+        mock_get_pm2_list.return_value = PROJECT_PM2_LIST
+        mock_run_bulk_action.return_value = {100: None, 101: "Process 101 not found"}
 
         result = stop_project_apis("project_A")
 
         self.assertFalse(result)
-        mock_stop_api.assert_any_call(100)
-        mock_stop_api.assert_any_call(101)
-        mock_print.assert_any_call("停止 API: api-projA-2 (ID: 101) 失敗。")
+        mock_run_bulk_action.assert_called_once_with("stop", [100, 101])
+        mock_print.assert_any_call("停止 API: api-projA-2 (ID: 101) 失敗。錯誤訊息：Process 101 not found")
+
+    @patch('subprocess.run')
+    def test_run_bulk_action_issues_one_cli_command(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = MagicMock(
+            returncode=1,
+            stdout="[PM2] Applying action restartProcessId on app [1](ids: [ 1 ])\n"
+                   "[PM2] [api-a](1) ✓\n[PM2] [api-b](2) ✓\n",
+            stderr="[PM2][ERROR] Process 7 not found\n")
+
+        results = run_bulk_action("restart", [1, 2, 7])
+
+        mock_subprocess_run.assert_called_once_with(["pm2", "restart", "1", "2", "7"], timeout=30.0, capture_output=True, text=True)
+        self.assertEqual(results, {1: None, 2: None, 7: "Process 7 not found"})
+
+    @patch('subprocess.run')
+    def test_run_bulk_action_unparsed_output_uses_returncode(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = MagicMock(returncode=0, stdout="done", stderr="")
+        self.assertEqual(run_bulk_action("stop", [3, 4]), {3: None, 4: None})
+        mock_subprocess_run.return_value = MagicMock(returncode=1, stdout="", stderr="daemon not running\n")
+        self.assertEqual(run_bulk_action("stop", [3]), {3: "daemon not running"})
+
+    @patch('src.pm2_manager.get_pm2_list')
+    @patch('src.pm2_manager.data_parser.load_all_api_configs', return_value=PROJECT_CONFIGS)
+    def test_plan_project_action_resolves_all_projects_once(self, mock_configs, mock_get_pm2_list):
+        mock_get_pm2_list.return_value = PROJECT_PM2_LIST
+        plan = plan_project_action("stop", ["project_a", "project_B", "project_Z"])
+        self.assertEqual([t["pm_id"] for t in plan["targets"]], [100, 101, 200])
+        self.assertEqual(plan["targets"][0]["project_name"], "project_a")
+        self.assertEqual(plan["missing_projects"], ["project_Z"])
+        mock_get_pm2_list.assert_called_once()
+
+    @patch('src.pm2_manager.run_bulk_action', return_value={100: None, 101: "boom"})
+    def test_execute_action_plan_reports_per_api(self, mock_run_bulk_action):
+        plan = {"verb": "start", "targets": [{"pm_id": 100, "name": "a", "project_name": "p"},
+                                             {"pm_id": 101, "name": "b", "project_name": "p"}]}
+        results = execute_action_plan(plan)
+        self.assertEqual([(r["name"], r["ok"], r["error"]) for r in results], [("a", True, None), ("b", False, "boom")])
+
+    @patch('builtins.print')
+    @patch('src.pm2_manager.run_bulk_action')
+    @patch('src.pm2_manager.plan_project_action')
+    def test_start_project_with_dependency_cycle(self, mock_plan, mock_run_bulk_action, mock_print):
+        mock_plan.return_value = {"verb": "start", "missing_projects": [], "targets": [
+            {"pm_id": 1, "name": "a", "project_name": "p", "depends_on": ["b"]},
+            {"pm_id": 2, "name": "b", "project_name": "p", "depends_on": ["a"]}]}
+        self.assertFalse(start_project_apis("p", pm2_list=[{"pm_id": 1}]))
+        mock_run_bulk_action.assert_not_called()
+        mock_print.assert_any_call("無法啟動專案 'p'：依賴圖中有循環：a -> b -> a")
+
+class TestPM2Snapshot(unittest.TestCase):
+
+    def setUp(self):
+        invalidate_pm2_snapshot()
+
+    def tearDown(self):
+        invalidate_pm2_snapshot()
+
+    @patch('src.pm2_manager.get_pm2_list')
+    def test_snapshot_reused_within_ttl(self, mock_get_pm2_list):
+        mock_get_pm2_list.return_value = [{'name': 'a', 'pm_id': 0}]
+        first = get_pm2_snapshot()
+        second = get_pm2_snapshot()
+        self.assertIs(first, second)
+        mock_get_pm2_list.assert_called_once()
+
+    @patch('src.pm2_manager.get_pm2_list')
+    def test_snapshot_expires_and_max_age_zero(self, mock_get_pm2_list):
+        mock_get_pm2_list.return_value = []
+        get_pm2_snapshot()
+        get_pm2_snapshot(max_age=0)
+        self.assertEqual(mock_get_pm2_list.call_count, 2)
+        with patch.object(config, 'PM2_SNAPSHOT_TTL', 0):
+            get_pm2_snapshot()
+        self.assertEqual(mock_get_pm2_list.call_count, 3)
+
+    @patch('src.pm2_manager.get_pm2_list')
+    def test_invalidate_forces_refetch(self, mock_get_pm2_list):
+        mock_get_pm2_list.side_effect = [[{'pm_id': 0}], [{'pm_id': 1}]]
+        self.assertEqual(get_pm2_snapshot(), [{'pm_id': 0}])
+        invalidate_pm2_snapshot()
+        self.assertEqual(get_pm2_snapshot(), [{'pm_id': 1}])
+
+    @patch('src.pm2_manager.get_pm2_list')
+    def test_concurrent_callers_share_one_fetch(self, mock_get_pm2_list):
+        def slow_list():
+            time.sleep(0.2)
+            return [{'pm_id': 0}]
+        mock_get_pm2_list.side_effect = slow_list
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_pm2_snapshot(max_age=0))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(r is results[0] for r in results))
+        mock_get_pm2_list.assert_called_once()
+
+    @patch('src.pm2_manager.get_pm2_list')
+    def test_fetch_started_before_invalidate_is_not_cached(self, mock_get_pm2_list):
+        started = threading.Event()
+        release = threading.Event()
+        def blocking_list():
+            started.set()
+            release.wait(2)
+            return [{'pm_id': 'stale'}]
+        mock_get_pm2_list.side_effect = blocking_list
+        thread = threading.Thread(target=get_pm2_snapshot)
+        thread.start()
+        started.wait(2)
+        invalidate_pm2_snapshot()
+        release.set()
+        thread.join()
+        mock_get_pm2_list.side_effect = None
+        mock_get_pm2_list.return_value = [{'pm_id': 'fresh'}]
+        self.assertEqual(get_pm2_snapshot(), [{'pm_id': 'fresh'}])
+
+    @patch('src.pm2_manager.get_pm2_list')
+    @patch('src.pm2_manager.run_bulk_action', side_effect=lambda verb, ids: {i: None for i in ids})
+    @patch('src.pm2_manager.data_parser.load_all_api_configs')
+    @patch('builtins.print')
+    def test_project_actions_share_one_snapshot(self, mock_print, mock_configs, mock_run_bulk_action, mock_get_pm2_list):
+        mock_configs.return_value = {f"project_{i}": {f"api-{i}": {}} for i in range(20)}
+        mock_get_pm2_list.return_value = [{'name': f"api-{i}", 'pm_id': i} for i in range(20)]
+        names = get_all_project_names()
+        pm2_list = get_pm2_snapshot()
+        for name in names:
+            self.assertTrue(start_project_apis(name, pm2_list))
+        mock_get_pm2_list.assert_called_once()
+        self.assertEqual(mock_run_bulk_action.call_count, 20)
+
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
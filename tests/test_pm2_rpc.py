@@ -0,0 +1,206 @@
+"""
+test_pm2_rpc.py
+
+此模組包含 `pm2_rpc.py` 的單元測試，使用 fake_pm2_daemon 作為 PM2 守護程序替身。
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import socket
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from src import config, pm2_manager, pm2_rpc
+from src.command_engine import CommandEngine
+from src.pm2_rpc import AmpDecoder, PM2RpcClient, PM2RpcError, PM2RpcNotConnected, PM2RpcPool, encode_message
+from fake_pm2_daemon import FakePM2Daemon, make_process
+
+
+class TestAmpCodec(unittest.TestCase):
+
+    def test_roundtrip_split_across_chunks(self):
+        message = encode_message([{"type": "call", "method": "ping", "args": []}, "host-1:0", b"raw"])
+        decoder = AmpDecoder()
+        self.assertEqual(decoder.feed(message[:5]), [])
+        self.assertEqual(decoder.feed(message[5:-1]), [])
+        decoded = decoder.feed(message[-1:] + encode_message(["s2"]))
+        self.assertEqual(decoded, [[{"type": "call", "method": "ping", "args": []}, "host-1:0", b"raw"], ["s2"]])
+
+    def test_header_encodes_version_and_argc(self):
+        message = encode_message(["a", "b", "c"])
+        self.assertEqual(message[0] >> 4, 1)
+        self.assertEqual(message[0] & 0x0f, 3)
+
+
+class TestPM2RpcClient(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.daemon = FakePM2Daemon(self.tmpdir.name, [
+            make_process(0, "python-api"),
+            make_process(1, "go-api", status="stopped"),
+        ]).start()
+        self.client = PM2RpcClient(self.tmpdir.name, timeout=2.0)
+
+    def tearDown(self):
+        self.client.close()
+        self.daemon.stop()
+        self.tmpdir.cleanup()
+
+    def test_list_processes(self):
+        processes = self.client.list_processes()
+        self.assertEqual([p["name"] for p in processes], ["python-api", "go-api"])
+        self.assertEqual(processes[1]["pm2_env"]["status"], "stopped")
+
+    def test_start_stop_restart(self):
+        self.client.start_process(1)
+        self.assertEqual(self.daemon.processes[1]["pm2_env"]["status"], "online")
+        self.client.stop_process(0)
+        self.assertEqual(self.daemon.processes[0]["pm2_env"]["status"], "stopped")
+        self.client.restart_process(0)
+        self.assertEqual(self.daemon.processes[0]["pm2_env"]["status"], "online")
+        self.assertEqual(self.daemon.processes[0]["pm2_env"]["restart_time"], 1)
+
+    def test_start_already_online_is_success(self):
+        self.client.start_process(0)
+        self.assertEqual(self.daemon.calls[-1][0], "startProcessId")
+
+    def test_unknown_id_raises(self):
+        with self.assertRaises(PM2RpcError) as ctx:
+            self.client.stop_process(42)
+        self.assertIn("42 id unknown", str(ctx.exception))
+
+    def test_call_many_reports_per_call_results(self):
+        results = self.client.call_many([("stopProcessId", (0,)), ("stopProcessId", (99,)), ("ping", ())])
+        self.assertIsNone(results[0]["error"])
+        self.assertIn("99", results[1]["error"])
+        self.assertEqual(results[2]["args"], [{"msg": "pong"}])
+
+    def test_reconnects_after_daemon_restart(self):
+        self.client.list_processes()
+        self.daemon.stop()
+        with self.assertRaises(OSError):
+            self.client.list_processes()
+        self.daemon.start()
+        self.assertEqual(len(self.client.list_processes()), 2)
+
+    def test_connect_failure_is_not_connected(self):
+        self.daemon.stop()
+        with self.assertRaises(PM2RpcNotConnected):
+            self.client.stop_process(0)
+
+
+class TestPM2RpcPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.daemon = FakePM2Daemon(self.tmpdir.name, [make_process(i, f"api-{i}") for i in range(8)]).start()
+        self.pool = PM2RpcPool(self.tmpdir.name, size=2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.daemon.stop()
+        self.tmpdir.cleanup()
+
+    def test_parallel_calls_keep_at_most_size_connections(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(self.pool.restart_process, range(8)))  # 每個工作線程各借用一條連線
+        self.assertEqual(self.pool.idle_count(), 2)
+        self.assertTrue(all(p["pm2_env"]["restart_time"] == 1 for p in self.daemon.processes.values()))
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: self.pool.list_processes(), range(8)))
+        self.assertEqual(self.pool.idle_count(), 2)  # 新的工作線程重用池中的連線，不會累積
+
+    def test_close_closes_idle_and_returned_clients(self):
+        client = self.pool._acquire()
+        self.pool.list_processes()
+        client.connect()
+        self.pool.close()
+        self.assertEqual(self.pool.idle_count(), 0)
+        self.pool._release(client)
+        self.assertIsNone(client._sock)
+        self.assertEqual(self.pool.idle_count(), 0)
+
+
+class TestPM2ManagerRpcPath(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_pm2_home = config.PM2_HOME
+        config.PM2_HOME = self.tmpdir.name
+
+    def tearDown(self):
+        config.PM2_HOME = self.original_pm2_home
+        self.tmpdir.cleanup()
+
+    @patch('subprocess.run')
+    def test_get_pm2_list_uses_rpc_when_daemon_available(self, mock_subprocess_run):
+        with FakePM2Daemon(self.tmpdir.name, [make_process(3, "php-api", cpu=5, memory=1024 * 1024)]):
+            pm2_list = pm2_manager.get_pm2_list()
+        mock_subprocess_run.assert_not_called()
+        self.assertEqual(pm2_list[0]["name"], "php-api")
+        self.assertEqual(pm2_list[0]["cpu_history"][-1], 5)
+
+    @patch('subprocess.run')
+    def test_actions_use_rpc_for_numeric_ids(self, mock_subprocess_run):
+        with FakePM2Daemon(self.tmpdir.name, [make_process(3, "php-api")]) as daemon:
+            self.assertTrue(pm2_manager.stop_api("3"))
+            self.assertTrue(pm2_manager.restart_api(3))
+            self.assertFalse(pm2_manager.start_api(7))
+        mock_subprocess_run.assert_not_called()
+        self.assertEqual([c[0] for c in daemon.calls], ["stopProcessId", "restartProcessId", "startProcessId"])
+
+    @patch('subprocess.run')
+    def test_bulk_action_is_one_rpc_batch(self, mock_subprocess_run):
+        processes = [make_process(i, f"api-{i}") for i in range(5)]
+        with FakePM2Daemon(self.tmpdir.name, processes) as daemon:
+            results = pm2_manager.run_bulk_action("stop", [0, 1, 2, 9])
+        mock_subprocess_run.assert_not_called()
+        self.assertEqual(results, {0: None, 1: None, 2: None, 9: "9 id unknown"})
+        self.assertEqual([p["pm2_env"]["status"] for p in daemon.processes.values()],
+                         ["stopped", "stopped", "stopped", "online", "online"])
+
+    @patch('subprocess.run')
+    def test_mutating_actions_not_resent_after_request_sent(self, mock_subprocess_run):
+        with FakePM2Daemon(self.tmpdir.name, [make_process(3, "php-api")]), \
+                patch.object(pm2_manager, '_command_engine', CommandEngine()), \
+                patch.object(PM2RpcPool, 'restart_process', side_effect=socket.timeout("timed out")), \
+                patch.object(PM2RpcPool, 'batch_action', side_effect=ConnectionResetError("reset")):
+            self.assertFalse(pm2_manager.restart_api("3"))
+            self.assertEqual(pm2_manager.run_bulk_action("restart", [3, 4]), {3: "reset", 4: "reset"})
+        mock_subprocess_run.assert_not_called()  # 守護程序可能已經執行了操作，不能用 CLI 再執行一次
+
+    @patch('subprocess.run')
+    def test_mutating_actions_fall_back_when_not_connected(self, mock_subprocess_run):
+        mock_subprocess_run.return_value = MagicMock(returncode=0, stdout="[PM2] [php-api](3) ✓\n", stderr="")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as dead:
+            dead.bind(os.path.join(self.tmpdir.name, pm2_rpc.RPC_SOCKET_NAME))  # socket 存在但沒有人接受連線
+            self.assertTrue(pm2_manager.restart_api("3"))
+            self.assertEqual(pm2_manager.run_bulk_action("restart", [3]), {3: None})
+        self.assertEqual([c.args[0] for c in mock_subprocess_run.call_args_list],
+                         [["pm2", "restart", "3"], ["pm2", "restart", "3"]])
+
+    @patch('subprocess.run')
+    def test_falls_back_to_cli_without_daemon(self, mock_subprocess_run):
+        mock_subprocess_run.return_value.stdout = "[]"
+        self.assertEqual(pm2_manager.get_pm2_list(), [])
+        mock_subprocess_run.assert_called_once_with(["pm2", "jlist"], timeout=10.0, capture_output=True, text=True, check=True)
+
+    @patch('subprocess.run')
+    def test_rpc_disabled_by_config(self, mock_subprocess_run):
+        mock_subprocess_run.return_value.stdout = "[]"
+        with patch.object(config, 'PM2_USE_RPC', False):
+            with FakePM2Daemon(self.tmpdir.name, [make_process(0, "api")]):
+                self.assertIsNone(pm2_rpc.get_shared_client())
+                pm2_manager.get_pm2_list()
+        mock_subprocess_run.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
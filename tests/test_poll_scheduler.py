@@ -0,0 +1,168 @@
+"""
+test_poll_scheduler.py
+
+此模組包含 `poll_scheduler.py` 的單元測試。
+"""
+
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import pm2_manager
+from src.poll_scheduler import PollScheduler, process_cpu_time
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.cpu = 0.0
+        self.spawned = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPollScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = PollScheduler(min_interval=2, max_interval=16, backoff=2, cpu_budget=0.1,
+                                       subprocess_budget=10, budget_window=60,
+                                       cpu_clock=lambda: self.clock.cpu,
+                                       subprocess_counter=lambda: self.clock.spawned,
+                                       clock=self.clock)
+
+    def test_stable_process_backs_off_to_max_interval(self):
+        cadences = []
+        for _ in range(6):
+            self.scheduler.observe(0, "online", 1.0, 100.0)
+            cadences.append(self.scheduler.cadence(0))
+        self.assertEqual(cadences, [2, 4, 8, 16, 16, 16])
+        self.assertFalse(self.scheduler.is_due(0))
+        self.clock.now += 16
+        self.assertTrue(self.scheduler.is_due(0))
+
+    def test_change_resets_interval(self):
+        for _ in range(4):
+            self.scheduler.observe(0, "online", 1.0, 100.0)
+        self.assertEqual(self.scheduler.cadence(0), 16)
+        self.scheduler.observe(0, "online", 30.0, 100.0)  # CPU 變化超過門檻
+        self.assertEqual(self.scheduler.cadence(0), 2)
+        self.scheduler.observe(0, "online", 30.0, 100.0)
+        self.scheduler.observe(0, "online", 30.0, 200.0)  # 記憶體變化超過門檻
+        self.assertEqual(self.scheduler.cadence(0), 2)
+
+    def test_status_change_makes_process_due(self):
+        for _ in range(4):
+            self.scheduler.observe(0, "online", 1.0, 100.0)
+        self.assertFalse(self.scheduler.is_due(0, status="online"))
+        self.assertTrue(self.scheduler.is_due(0, status="errored"))
+        self.assertTrue(self.scheduler.is_due(1, status="online"))  # 未知的程序
+
+    def test_focus_always_polls_at_min_interval(self):
+        for _ in range(4):
+            self.scheduler.observe(0, "online", 1.0, 100.0)
+            self.scheduler.observe(1, "online", 1.0, 100.0)
+        self.scheduler.set_focus({1})
+        self.assertEqual(self.scheduler.focus, {1})
+        self.assertTrue(self.scheduler.is_due(1))
+        self.assertEqual(self.scheduler.due(), [1])
+        self.scheduler.observe(1, "online", 1.0, 100.0)
+        self.assertEqual(self.scheduler.cadences(), {0: 16, 1: 2})
+        self.assertEqual(self.scheduler.next_delay(), 2)
+
+    def test_next_delay_follows_earliest_due_process(self):
+        self.assertEqual(self.scheduler.next_delay(), 2)
+        for _ in range(3):
+            self.scheduler.observe(0, "online", 1.0, 100.0)
+        self.assertEqual(self.scheduler.next_delay(), 8)
+        self.clock.now += 7
+        self.assertEqual(self.scheduler.next_delay(), 2)
+
+    def test_budget_throttles_and_recovers(self):
+        self.scheduler.observe(0, "online", 1.0, 100.0)
+        self.scheduler.update_budget()
+        # 10 秒內使用 5 秒 CPU，遠超過 10% 的上限
+        self.clock.now += 10
+        self.clock.cpu += 5
+        usage = self.scheduler.update_budget()
+        self.assertAlmostEqual(usage["cpu"], 0.5)
+        self.assertEqual(usage["throttle"], 1.5)
+        self.assertEqual(self.scheduler.cadence(0), 3)
+        # 調整後 budget_window / 6 秒內不會再次調整
+        self.clock.now += 1
+        self.clock.cpu += 1
+        self.assertEqual(self.scheduler.update_budget()["throttle"], 1.5)
+        # 閒置超過一個窗口後逐步恢復
+        for _ in range(10):
+            self.clock.now += 60
+            usage = self.scheduler.update_budget()
+        self.assertEqual(usage["throttle"], 1.0)
+
+    def test_subprocess_budget(self):
+        self.scheduler.update_budget()
+        self.clock.now += 30
+        self.clock.spawned += 20
+        usage = self.scheduler.update_budget()
+        self.assertAlmostEqual(usage["subprocesses_per_minute"], 40)
+        self.assertGreater(usage["throttle"], 1.0)
+
+    def test_retain_and_forget(self):
+        for pm_id in range(3):
+            self.scheduler.observe(pm_id, "online", 0, 0)
+        self.scheduler.retain([0, 2])
+        self.assertEqual(set(self.scheduler.cadences()), {0, 2})
+        self.scheduler.forget(2)
+        self.assertIsNone(self.scheduler.cadence(2))
+
+    def test_process_cpu_time(self):
+        self.assertGreaterEqual(process_cpu_time(), 0)
+
+
+class TestGetPm2ListWithScheduler(unittest.TestCase):
+
+    def setUp(self):
+        pm2_manager._metrics_store.clear()
+        self.clock = FakeClock()
+        self.scheduler = PollScheduler(min_interval=2, max_interval=16, backoff=2, clock=self.clock)
+
+    def tearDown(self):
+        pm2_manager._metrics_store.clear()
+
+    def _processes(self, status="online"):
+        return [{"pm_id": 0, "name": "a", "pm2_env": {"status": status}, "monit": {"cpu": 1, "memory": 1024}},
+                {"pm_id": 1, "name": "b", "pm2_env": {"status": "online"}, "monit": {"cpu": 1, "memory": 1024}}]
+
+    def test_records_only_due_processes(self):
+        with patch('src.pm2_manager._fetch_pm2_processes', side_effect=lambda: self._processes()):
+            pm2_manager.get_pm2_list(scheduler=self.scheduler)
+            self.clock.now += 1
+            pm2_manager.get_pm2_list(scheduler=self.scheduler)  # 尚未到期，不記錄
+            self.assertEqual(len(pm2_manager.get_api_history(0)["cpu_history"]), 1)
+            self.scheduler.set_focus({1})
+            self.clock.now += 1
+            pm2_manager.get_pm2_list(scheduler=self.scheduler)
+        self.assertEqual(len(pm2_manager.get_api_history(1)["cpu_history"]), 2)
+        self.assertEqual(self.scheduler.cadences(), {0: 4, 1: 2})
+
+        with patch('src.pm2_manager._fetch_pm2_processes', side_effect=lambda: self._processes("errored")):
+            self.clock.now += 0.5
+            pm2_manager.get_pm2_list(scheduler=self.scheduler)  # 狀態改變的程序立即記錄
+        self.assertEqual(len(pm2_manager.get_api_history(0)["cpu_history"]), 3)
+        self.assertEqual(self.scheduler.cadence(0), 2)
+
+    def test_subprocess_count(self):
+        before = pm2_manager.get_subprocess_count()
+        with patch('src.pm2_manager.pm2_rpc.get_shared_client', return_value=None), \
+             patch('src.pm2_manager.subprocess.run') as mock_run:
+            mock_run.return_value.stdout = "[]"
+            pm2_manager.get_pm2_list()
+        self.assertEqual(pm2_manager.get_subprocess_count(), before + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
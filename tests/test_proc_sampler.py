@@ -0,0 +1,181 @@
+"""
+test_proc_sampler.py
+
+此模組包含 `proc_sampler.py` 的單元測試。
+"""
+
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import pm2_manager
+from src import proc_sampler
+from src.proc_sampler import ProcSampler, parse_io, parse_smaps_rollup, parse_stat, parse_statm, parse_status
+
+
+def write_fake_process(root, pid, utime, stime, rss_pages, start_time=1000, name="node /app/(server) 1",
+                       read_bytes=4096, voluntary=10, fds=3, pss_kb=900):
+    base = os.path.join(root, str(pid))
+    os.makedirs(base, exist_ok=True)
+    fields = ["S"] + ["0"] * 10 + [str(utime), str(stime)] + ["0"] * 4 + ["7", "0", str(start_time)] + ["0"] * 20
+    with open(os.path.join(base, "stat"), "w") as f:
+        f.write(f"{pid} ({name}) {' '.join(fields)}\n")
+    with open(os.path.join(base, "statm"), "w") as f:
+        f.write(f"5000 {rss_pages} 100 10 0 200 0\n")
+    with open(os.path.join(base, "io"), "w") as f:
+        f.write(f"rchar: 10\nwchar: 20\nread_bytes: {read_bytes}\nwrite_bytes: 8192\n")
+    with open(os.path.join(base, "status"), "w") as f:
+        f.write(f"Name:\tnode\nVmSwap:\t     128 kB\nThreads:\t7\n"
+                f"voluntary_ctxt_switches:\t{voluntary}\nnonvoluntary_ctxt_switches:\t2\n")
+    with open(os.path.join(base, "smaps_rollup"), "w") as f:
+        f.write(f"00400000-7fff0000 ---p 00000000 00:00 0  [rollup]\nRss:    1200 kB\nPss:    {pss_kb} kB\n")
+    fd_dir = os.path.join(base, "fd")
+    shutil.rmtree(fd_dir, ignore_errors=True)
+    os.makedirs(fd_dir)
+    for fd in range(fds):
+        open(os.path.join(fd_dir, str(fd)), "w").close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestParsers(unittest.TestCase):
+
+    def test_parse_stat_with_parentheses_in_name(self):
+        root = tempfile.mkdtemp()
+        try:
+            write_fake_process(root, 42, utime=150, stime=50, rss_pages=10)
+            with open(os.path.join(root, "42", "stat"), "rb") as f:
+                stat = parse_stat(f.read())
+        finally:
+            shutil.rmtree(root)
+        self.assertEqual(stat, {"ppid": 0, "cpu_ticks": 200, "threads": 7, "start_time": 1000})
+
+    def test_parse_statm_and_io(self):
+        self.assertEqual(parse_statm(b"5000 10 100 10 0 200 0\n"), 10 * proc_sampler.PAGE_SIZE)
+        self.assertEqual(parse_io(b"rchar: 1\nread_bytes: 2\nwrite_bytes: 3\n"), {"read_bytes": 2, "write_bytes": 3})
+
+    def test_parse_status_and_smaps_rollup(self):
+        status = parse_status(b"Name:\tx\nVmSwap:\t  4 kB\nvoluntary_ctxt_switches:\t5\nnonvoluntary_ctxt_switches:\t6\n")
+        self.assertEqual(status, {"swap": 4096, "ctx_voluntary": 5, "ctx_involuntary": 6})
+        self.assertEqual(parse_smaps_rollup(b"0-1 ---p 0 00:00 0 [rollup]\nRss:  10 kB\nPss:   7 kB\n"), 7168)
+
+    def test_real_proc_self(self):
+        if not os.path.exists("/proc/self/stat"):
+            self.skipTest("此平台沒有 /proc")
+        stat = parse_stat(proc_sampler.read_proc_file(f"/proc/{os.getpid()}/stat"))
+        self.assertGreaterEqual(stat["threads"], 1)
+
+
+class TestProcSampler(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, "self"))
+        open(os.path.join(self.root, "self", "stat"), "w").close()
+        self.clock = FakeClock()
+        self.sampler = ProcSampler(proc_root=self.root, smaps_interval=10, clock=self.clock)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_cpu_is_computed_from_tick_deltas(self):
+        write_fake_process(self.root, 100, utime=0, stime=0, rss_pages=256)
+        self.sampler.set_pids({0: 100, 1: None})
+        self.assertEqual(self.sampler.sample(), {})  # 第一次只建立基準
+        ticks = proc_sampler.CLOCK_TICKS
+        write_fake_process(self.root, 100, utime=ticks // 2, stime=0, rss_pages=512)
+        self.clock.now += 2
+        samples = self.sampler.sample()
+        self.assertAlmostEqual(samples[0]["cpu"], 25.0)
+        self.assertEqual(samples[0]["memory"], 512 * proc_sampler.PAGE_SIZE)
+        self.assertEqual(samples[0]["threads"], 7)
+
+    def test_extended_metrics(self):
+        write_fake_process(self.root, 100, utime=0, stime=0, rss_pages=1)
+        self.sampler.set_pids({0: 100})
+        self.sampler.sample()
+        write_fake_process(self.root, 100, utime=0, stime=0, rss_pages=1, read_bytes=4096 + 20480,
+                           voluntary=30, fds=5, pss_kb=2000)
+        self.clock.now += 2
+        sample = self.sampler.sample()[0]
+        self.assertEqual(sample["fds"], 5)
+        self.assertAlmostEqual(sample["io_read"], 10.0)  # 20 KB / 2 秒
+        self.assertEqual(sample["io_write"], 0)
+        self.assertAlmostEqual(sample["ctx_vol"], 10.0)
+        self.assertEqual(sample["ctx_invol"], 0)
+        self.assertEqual(sample["swap"], 128 * 1024)
+        # smaps_rollup 在 smaps_interval 內不會重新讀取，沿用上次的 PSS
+        self.assertEqual(sample["pss"], 900 * 1024)
+        self.clock.now += 10
+        self.assertEqual(self.sampler.sample()[0]["pss"], 2000 * 1024)
+        for name in proc_sampler.METRIC_COLUMNS:
+            self.assertIn(name, sample)
+
+    def test_restarted_process_resets_baseline(self):
+        write_fake_process(self.root, 100, utime=500, stime=0, rss_pages=1)
+        self.sampler.set_pids({0: 100})
+        self.sampler.sample()
+        # 相同 pid 但啟動時間不同 (pid 被重用)
+        write_fake_process(self.root, 100, utime=1, stime=0, rss_pages=1, start_time=2000)
+        self.clock.now += 1
+        self.assertEqual(self.sampler.sample(), {})
+        self.clock.now += 1
+        self.assertIn(0, self.sampler.sample())
+
+    def test_exited_process_is_skipped(self):
+        self.sampler.set_pids({0: 999})
+        self.assertEqual(self.sampler.sample(), {})
+
+    def test_background_thread(self):
+        write_fake_process(self.root, 100, utime=0, stime=0, rss_pages=1)
+        sampler = ProcSampler(proc_root=self.root)
+        sampler.set_pids({0: 100})
+        received = []
+        sampler.start(received.append, interval=0.01)
+        try:
+            deadline = time.time() + 2
+            while not any(received) and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(sampler.covers(0))
+        finally:
+            sampler.stop()
+        self.assertIn(0, [key for samples in received for key in samples])
+        self.assertFalse(sampler.covers(0))
+
+
+class TestRecordProcessSamples(unittest.TestCase):
+
+    def setUp(self):
+        pm2_manager._metrics_store.clear()
+
+    def tearDown(self):
+        pm2_manager._metrics_store.clear()
+        pm2_manager.stop_process_sampler()
+
+    def test_samples_feed_history(self):
+        pm2_manager.record_process_samples({(3, 300): {"cpu": 12.5, "memory": 64 * 1024 * 1024, "fds": 9,
+                                                       "swap": 2 * 1024 * 1024}})
+        history = pm2_manager.get_api_history(3)
+        self.assertEqual(list(history["cpu_history"]), [12.5])
+        self.assertEqual(list(history["memory_history"]), [64.0])
+        window = pm2_manager._metrics_store.window(3)
+        self.assertEqual(list(window["fds"]), [9])
+        self.assertEqual(list(window["swap"]), [2.0])
+        self.assertEqual(pm2_manager.get_latest_process_sample(3)["cpu"], 12.5)
+        self.assertIsNone(pm2_manager.get_latest_process_sample(4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+test_process_tree.py
+
+此模組包含 `process_tree.py` 的單元測試。
+"""
+
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import process_tree
+from src.process_tree import ProcessTree, aggregate_instances, group_instances, rollup
+
+
+def write_stat(root, pid, ppid):
+    base = os.path.join(root, str(pid))
+    os.makedirs(base, exist_ok=True)
+    fields = ["S", str(ppid)] + ["0"] * 40
+    with open(os.path.join(base, "stat"), "w") as f:
+        f.write(f"{pid} (node) {' '.join(fields)}\n")
+
+
+class TestProcessTree(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, "self"))
+        open(os.path.join(self.root, "self", "stat"), "w").close()
+        for pid, ppid in ((1, 0), (10, 1), (11, 10), (12, 10), (13, 12), (20, 1)):
+            write_stat(self.root, pid, ppid)
+        self.tree = ProcessTree(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_descendants_and_expand(self):
+        self.assertEqual(self.tree.refresh(), (6, 0))
+        self.assertEqual(sorted(self.tree.descendants(10)), [11, 12, 13])
+        self.assertEqual(self.tree.descendants(20), [])
+        expanded = self.tree.expand({"a": 10, "b": 20, "c": None})
+        self.assertEqual(sorted(expanded), [("a", 10), ("a", 11), ("a", 12), ("a", 13), ("b", 20)])
+
+    def test_refresh_is_incremental(self):
+        self.tree.refresh()
+        self.assertEqual(self.tree.refresh(), (0, 0))
+        shutil.rmtree(os.path.join(self.root, "13"))
+        write_stat(self.root, 14, 11)
+        self.assertEqual(self.tree.refresh(), (1, 1))
+        self.assertEqual(sorted(self.tree.descendants(10)), [11, 12, 14])
+        self.assertEqual(len(self.tree), 6)
+
+
+class TestAggregation(unittest.TestCase):
+
+    def test_rollup_sums_process_tree(self):
+        totals = rollup({(0, 10): {"cpu": 1.5, "memory": 100},
+                         (0, 11): {"cpu": 2.5, "memory": 50, "fds": 3},
+                         (1, 20): {"cpu": 4.0, "memory": 10}})
+        self.assertEqual(totals[0], {"processes": 2, "cpu": 4.0, "memory": 150, "fds": 3})
+        self.assertEqual(totals[1]["processes"], 1)
+
+    def test_group_and_aggregate_instances(self):
+        apis = [{"pm_id": 3, "name": "web", "status": "online", "cpu": 10.0, "memory": 1048576, "restarts": 1},
+                {"pm_id": 0, "name": "worker", "status": "online", "cpu": 1.0, "memory": 0, "restarts": 0},
+                {"pm_id": 1, "name": "web", "status": "errored", "cpu": "5.5%", "memory": 2097152, "restarts": 2}]
+        groups = group_instances(apis)
+        self.assertEqual(list(groups), ["web", "worker"])
+        self.assertEqual([api["pm_id"] for api in groups["web"]], [1, 3])
+        service = aggregate_instances(groups["web"])
+        self.assertEqual(service["type"], "service")
+        self.assertEqual(service["pm_id"], "web")
+        self.assertEqual(service["instance_ids"], [1, 3])
+        self.assertEqual(service["status"], process_tree.MIXED_STATUS)
+        self.assertEqual(service["cpu"], 15.5)
+        self.assertEqual(service["memory"], 3145728)
+        self.assertEqual(service["restarts"], 3)
+        self.assertIn("#1 errored 5.5% 2 MB", service["instances_summary"])
+        self.assertEqual(aggregate_instances(groups["worker"])["status"], "online")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+test_python_api.py
+
+此模組包含 `python_api.py` 各個服務引擎的測試，以 keep-alive 連線在 localhost 上實際發出請求。
+"""
+
+import unittest
+from unittest.mock import patch
+import asyncio
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import python_api
+from src.health_prober import HttpConnection
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def fetch(port, count=3):
+    """
+    以同一個 keep-alive 連線發出 count 個請求，返回 (狀態碼列表, 開啟的連線數)。
+    """
+    async def run():
+        connection = HttpConnection("127.0.0.1", port)
+        codes = [await connection.get("/") for _ in range(count)]
+        connection.close()
+        return codes, connection.connections_opened
+    return asyncio.run(run())
+
+
+class TestBody(unittest.TestCase):
+
+    def test_body_matches_json_dumps(self):
+        body = python_api.build_body()
+        data = json.loads(body)
+        self.assertEqual(list(data), ["message", "timestamp", "language"])
+        self.assertEqual(body, json.dumps(data).encode("utf-8"))
+        self.assertAlmostEqual(data["timestamp"], time.time(), delta=5)
+
+
+class TestEngines(unittest.TestCase):
+
+    def test_threaded_keep_alive(self):
+        server = python_api.ThreadedServer(("127.0.0.1", 0), python_api.KeepAliveRequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            codes, opened = fetch(server.server_address[1])
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(codes, [200, 200, 200])
+        self.assertEqual(opened, 1)
+
+    def test_asyncio_keep_alive_and_close(self):
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(python_api.start_asyncio_server(0, "127.0.0.1"))
+        port = server.sockets[0].getsockname()[1]
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        try:
+            codes, opened = fetch(port)
+            with socket.create_connection(("127.0.0.1", port)) as sock:
+                sock.sendall(b"GET / HTTP/1.0\r\n\r\n")
+                response = b""
+                while chunk := sock.recv(4096):  # 伺服器回應後關閉 HTTP/1.0 連線
+                    response += chunk
+        finally:
+            loop.call_soon_threadsafe(server.close)
+            loop.call_soon_threadsafe(loop.stop)
+        self.assertEqual(codes, [200, 200, 200])
+        self.assertEqual(opened, 1)
+        head, body = response.split(b"\r\n\r\n", 1)
+        self.assertIn(b"Connection: close", head)
+        self.assertEqual(json.loads(body)["language"], "Python")
+
+    @unittest.skipUnless(hasattr(socket, "SO_REUSEPORT") and hasattr(os, "fork"), "需要 SO_REUSEPORT 與 fork")
+    def test_prefork_workers_share_port(self):
+        port = free_port()
+        process = subprocess.Popen([sys.executable, os.path.join(ROOT, "python_api.py"), "--engine", "prefork",
+                                    "--workers", "2", "--port", str(port)],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            self.assertTrue(wait_for_port(port))
+            codes, _ = fetch(port)
+            self.assertEqual(codes, [200, 200, 200])
+        finally:
+            process.terminate()
+            process.wait(10)
+        self.assertFalse(wait_for_port(port, timeout=1))  # 工作程序隨主程序結束
+
+
+class TestAccessLog(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(setattr, python_api.SimpleHTTPRequestHandler, "access_log",
+                        python_api.SimpleHTTPRequestHandler.access_log)
+
+    def test_threaded_logs_requests_by_default(self):
+        self.assertTrue(python_api.SimpleHTTPRequestHandler.access_log)
+        server = python_api.ThreadedServer(("127.0.0.1", 0), python_api.KeepAliveRequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            try:
+                fetch(server.server_address[1], count=2)
+            finally:
+                server.shutdown()
+                server.server_close()
+        self.assertEqual(stderr.getvalue().count('"GET / HTTP/1.1" 200 -'), 2)
+
+    def test_asyncio_logs_requests_by_default(self):
+        async def run(access_log):
+            server = await python_api.start_asyncio_server(0, "127.0.0.1", access_log=access_log)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET / HTTP/1.0\r\n\r\n")
+            await reader.read()  # HTTP/1.0 的連線在回應後由伺服器關閉
+            writer.close()
+            server.close()
+            await server.wait_closed()
+
+        with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            asyncio.run(run(True))
+            logged = stderr.getvalue()
+            asyncio.run(run(False))
+        self.assertRegex(logged, r'^127\.0\.0\.1 - - \[\d{2}/\w{3}/\d{4} [\d:]{8}\] "GET / HTTP/1\.0" 200 -\n$')
+        self.assertEqual(stderr.getvalue(), logged)  # access_log=False 時沒有新的記錄
+
+    def test_no_access_log_option(self):
+        with patch.object(python_api, 'run') as mock_run:
+            python_api.main(["--engine", "single"])
+            self.assertTrue(python_api.SimpleHTTPRequestHandler.access_log)
+            python_api.main(["--engine", "single", "--no-access-log"])
+            self.assertFalse(python_api.SimpleHTTPRequestHandler.access_log)
+        self.assertEqual(mock_run.call_count, 2)
+        with patch.object(python_api, 'run_asyncio') as mock_run_asyncio:
+            python_api.main(["--engine", "asyncio", "--no-access-log"])
+        mock_run_asyncio.assert_called_once_with(8001, False, False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+test_rolling_restart.py
+
+此模組包含 `rolling_restart.py` 的單元測試。
+"""
+
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.rolling_restart import RollingRestart, STEP_EVENT, format_steps
+
+
+class FakePM2:
+    """
+    模擬 PM2：重啟後經過 online_delay 秒才回到 online 並更新 pm_uptime。
+    """
+    def __init__(self, pm_ids, online_delay=1.0):
+        self.now = 0.0
+        self.online_delay = online_delay
+        self.processes = {pm_id: {"status": "online", "pm_uptime": 1, "ready_at": None} for pm_id in pm_ids}
+        self.calls = []
+        self.healthy = set(pm_ids)
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def snapshot(self):
+        processes = []
+        for pm_id, process in self.processes.items():
+            if process["ready_at"] is not None and self.now >= process["ready_at"]:
+                process.update(status="online", pm_uptime=process["pm_uptime"] + 1, ready_at=None)
+            processes.append({"pm_id": pm_id, "pm2_env": {"status": process["status"],
+                                                           "pm_uptime": process["pm_uptime"]}})
+        return processes
+
+    def action(self, verb, pm_ids):
+        self.calls.append((verb, list(pm_ids)))
+        self.now += 0.5
+        for pm_id in pm_ids:
+            if self.online_delay is not None:
+                self.processes[pm_id].update(status="launching", ready_at=self.now + self.online_delay)
+            else:
+                self.processes[pm_id]["status"] = "errored"
+        return {pm_id: None for pm_id in pm_ids}
+
+    def health_check(self, host, port, path, timeout):
+        return None if port in self.healthy else "Connection refused"
+
+
+def make_targets(count, exec_mode="fork_mode"):
+    return [{"pm_id": i, "name": f"api{i}", "project_name": "proj", "host": "localhost", "port": i,
+             "health_path": "/", "exec_mode": exec_mode} for i in range(count)]
+
+
+class TestRollingRestart(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        patcher = patch('src.config.ROLLING_RESTART_SETTLE', 2.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def restarter(self, pm2, **kwargs):
+        return RollingRestart(progress_callback=self.events.append, snapshot=pm2.snapshot, action=pm2.action,
+                              health_check=pm2.health_check, sleep=pm2.sleep, clock=pm2.clock, **kwargs)
+
+    def test_batches_and_verbs(self):
+        pm2 = FakePM2(range(5))
+        targets = make_targets(5)
+        targets[0]["exec_mode"] = "cluster_mode"
+        report = self.restarter(pm2, batch_size=2).run(targets)
+        self.assertTrue(report["ok"])
+        self.assertIsNone(report["aborted"])
+        self.assertEqual(pm2.calls, [("reload", [0]), ("restart", [1]), ("restart", [2, 3]), ("restart", [4])])
+        self.assertEqual([step["pm_ids"] for step in report["steps"]], [[0, 1], [2, 3], [4]])
+        self.assertTrue(all(result["ok"] for result in report["results"]))
+        self.assertTrue(all(process["pm_uptime"] == 2 for process in pm2.processes.values()))
+        step_events = [event for event in self.events if event["state"] == STEP_EVENT]
+        self.assertEqual(len(step_events), 3)
+        self.assertEqual(step_events[0]["name"], "api0, api1")
+
+    def test_step_timings(self):
+        pm2 = FakePM2(range(2), online_delay=3.0)
+        report = self.restarter(pm2, batch_size=2).run(make_targets(2))
+        step = report["steps"][0]
+        self.assertEqual(step["action"], 0.5)
+        self.assertGreaterEqual(step["online"], 3.0)  # 等到 pm_uptime 更新才算 online
+        self.assertEqual(step["health"], 0.0)
+        self.assertAlmostEqual(step["total"], step["action"] + step["online"] + step["health"])
+        self.assertEqual(report["duration"], pm2.now)
+        text = format_steps(report)
+        self.assertIn("第 1 批 [0, 1]：操作 0.5 秒", text)
+        self.assertTrue(text.endswith(f"總耗時 {pm2.now:.1f} 秒"))
+
+    def test_errored_process_aborts(self):
+        pm2 = FakePM2(range(3), online_delay=None)
+        report = self.restarter(pm2).run(make_targets(3))
+        self.assertFalse(report["ok"])
+        self.assertIn("errored", report["aborted"])
+        self.assertEqual(pm2.calls, [("restart", [0])])
+        self.assertEqual([result["error"] for result in report["results"][1:]], ["已中止", "已中止"])
+
+    def test_health_timeout_aborts(self):
+        pm2 = FakePM2(range(3))
+        pm2.healthy.discard(1)
+        report = self.restarter(pm2, health_timeout=5.0).run(make_targets(3))
+        self.assertFalse(report["ok"])
+        self.assertTrue(report["aborted"].startswith("第 2 批"))
+        self.assertIn("Connection refused", report["results"][1]["error"])
+        self.assertEqual(report["results"][2]["error"], "已中止")
+        self.assertGreaterEqual(report["steps"][1]["health"], 5.0)
+        self.assertEqual([event["state"] for event in self.events if event["pm_id"] == 2], ["queued", "failed"])
+
+    def test_error_rate_increase_aborts(self):
+        pm2 = FakePM2(range(3))
+        rates = iter([None, 0.01, 0.5])
+        report = self.restarter(pm2, max_error_rate_increase=0.05, error_rate=lambda pm_ids: next(rates)).run(
+            make_targets(3))
+        self.assertFalse(report["ok"])
+        self.assertIn("錯誤率由 0.0% 上升至 50.0%", report["aborted"])
+        self.assertEqual(pm2.calls, [("restart", [0]), ("restart", [1])])
+        self.assertTrue(report["results"][1]["ok"])  # 該實例本身已重啟，只是不再繼續
+
+    def test_action_failure(self):
+        pm2 = FakePM2(range(2))
+        restarter = RollingRestart(action=lambda verb, pm_ids: {pm_id: "boom" for pm_id in pm_ids},
+                                   snapshot=pm2.snapshot, health_check=pm2.health_check, sleep=pm2.sleep,
+                                   clock=pm2.clock)
+        report = restarter.run(make_targets(2))
+        self.assertEqual(report["aborted"], "第 1 批：api0 (ID: 0)：boom")
+        self.assertEqual(report["steps"][0]["online"], 0.0)
+
+    def test_stopped_instances_are_skipped(self):
+        pm2 = FakePM2(range(4))
+        pm2.processes[1]["status"] = "stopped"
+        pm2.processes[3]["status"] = "errored"
+        report = self.restarter(pm2, batch_size=1).run(make_targets(4))
+        self.assertTrue(report["ok"])
+        self.assertEqual(pm2.calls, [("restart", [0]), ("restart", [2])])  # 不會啟動被停止的實例
+        self.assertEqual([step["pm_ids"] for step in report["steps"]], [[0], [2]])
+        self.assertEqual(report["skipped"], ["api1", "api3"])
+        self.assertEqual([(result["ok"], result["skipped"]) for result in report["results"]],
+                         [(True, False), (False, True), (True, False), (False, True)])
+        self.assertEqual(report["results"][1]["error"], "狀態為 stopped，已略過")
+        self.assertEqual((pm2.processes[1]["status"], pm2.processes[3]["status"]), ("stopped", "errored"))
+        self.assertNotIn(1, [event.get("pm_id") for event in self.events])
+        self.assertIn("略過沒有在運行的實例：api1, api3", format_steps(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
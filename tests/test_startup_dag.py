@@ -0,0 +1,160 @@
+"""
+test_startup_dag.py
+
+此模組包含 `startup_dag.py` 的單元測試。
+"""
+
+import unittest
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+# 將專案根目錄添加到 sys.path，以便找到 src 模組
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.startup_dag import StartupScheduler, build_graph, get_levels, has_dependencies
+
+
+class FakePM2:
+    """
+    模擬 PM2：啟動後經過 delays[name] 秒才 online；名稱在 broken 中的 API 會進入 errored。
+    """
+    def __init__(self, targets, delays=None, broken=()):
+        self.names = {target["pm_id"]: target["name"] for target in targets}
+        self.delays = delays or {}
+        self.broken = set(broken)
+        self.online_at = {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def action(self, verb, pm_ids):
+        with self.lock:
+            self.calls.append((verb, list(pm_ids)))
+            for pm_id in pm_ids:
+                self.online_at[pm_id] = time.monotonic() + self.delays.get(self.names[pm_id], 0.0)
+        return {pm_id: None for pm_id in pm_ids}
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self.lock:
+            processes = []
+            for pm_id, name in self.names.items():
+                if name in self.broken and pm_id in self.online_at:
+                    status = "errored"
+                elif pm_id in self.online_at and now >= self.online_at[pm_id]:
+                    status = "online"
+                else:
+                    status = "stopped"
+                processes.append({"pm_id": pm_id, "pm2_env": {"status": status}})
+            return processes
+
+    def started(self):
+        return [pm_ids for _, pm_ids in self.calls]
+
+
+def make_target(pm_id, name, depends_on=None, **extra):
+    return dict({"pm_id": pm_id, "name": name, "project_name": "proj", "host": "localhost", "port": None,
+                 "depends_on": depends_on or []}, **extra)
+
+
+class TestBuildGraph(unittest.TestCase):
+
+    def test_levels_and_instances(self):
+        targets = [make_target(0, "db"), make_target(1, "api", ["db", "cache", "other-project-api"]),
+                   make_target(2, "api", ["db", "cache", "other-project-api"]), make_target(3, "cache"),
+                   make_target(4, "web", "api")]
+        nodes = build_graph(targets)
+        self.assertEqual(len(nodes["api"]["targets"]), 2)
+        self.assertEqual(nodes["api"]["depends_on"], ["db", "cache"])  # 不在目標中的依賴被忽略
+        self.assertEqual(get_levels(nodes), [["db", "cache"], ["api"], ["web"]])
+        self.assertTrue(has_dependencies(targets))
+        self.assertFalse(has_dependencies([make_target(0, "db")]))
+
+    def test_cycle_detection(self):
+        with self.assertRaisesRegex(ValueError, "b -> d -> c -> b"):
+            build_graph([make_target(0, "a"), make_target(1, "b", ["a", "d"]), make_target(2, "c", ["b"]),
+                         make_target(3, "d", ["c"]), make_target(4, "e", ["d"])])
+        with self.assertRaisesRegex(ValueError, "a -> a"):
+            build_graph([make_target(0, "a", ["a"])])
+
+
+class TestStartupScheduler(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('src.config.STARTUP_POLL_INTERVAL', 0.002)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.events = []
+
+    def scheduler(self, pm2, **kwargs):
+        return StartupScheduler(progress_callback=self.events.append, snapshot=pm2.snapshot, action=pm2.action,
+                                **kwargs)
+
+    def test_dependents_wait_for_ready(self):
+        targets = [make_target(0, "web", ["api"]), make_target(1, "api", ["db"]), make_target(2, "db")]
+        pm2 = FakePM2(targets, delays={"db": 0.03})
+        results = self.scheduler(pm2).run(targets)
+        self.assertEqual(pm2.started(), [[2], [1], [0]])
+        self.assertTrue(all(result["ok"] for result in results))
+        ready_at = {result["name"]: result["ready_at"] for result in results}
+        self.assertGreaterEqual(ready_at["db"], 0.03)
+        self.assertLessEqual(ready_at["db"], ready_at["api"])
+        self.assertLessEqual(ready_at["api"], ready_at["web"])
+
+    def test_critical_path_not_sum(self):
+        targets = [make_target(0, "root")] + [make_target(i, f"leaf{i}", ["root"]) for i in range(1, 21)]
+        delays = {target["name"]: 0.05 for target in targets}
+        pm2 = FakePM2(targets, delays=delays)
+        started = time.monotonic()
+        results = self.scheduler(pm2, max_workers=32).run(targets)
+        elapsed = time.monotonic() - started
+        self.assertTrue(all(result["ok"] for result in results))
+        self.assertLess(elapsed, 0.5)  # 關鍵路徑約 0.1 秒，依序啟動則需要 1.05 秒
+
+    def test_failure_skips_dependents(self):
+        targets = [make_target(0, "db"), make_target(1, "api", ["db"]), make_target(2, "web", ["api"]),
+                   make_target(3, "worker")]
+        pm2 = FakePM2(targets, broken={"db"})
+        results = {result["name"]: result for result in self.scheduler(pm2).run(targets)}
+        self.assertEqual(results["db"]["error"], "程序狀態為 errored")
+        self.assertEqual(results["api"]["error"], "依賴的 db 沒有就緒，未啟動")
+        self.assertEqual(results["web"]["error"], "依賴的 db 沒有就緒，未啟動")  # 間接依賴回報根本原因
+        self.assertTrue(results["worker"]["ok"])
+        self.assertNotIn([1], pm2.started())
+        self.assertEqual([event["state"] for event in self.events if event["pm_id"] == 2], ["queued", "failed"])
+
+    def test_ready_checks(self):
+        attempts = []
+
+        def tcp_check(host, port, path, timeout):
+            attempts.append(("tcp", port))
+            return None if len(attempts) >= 3 else "Connection refused"
+
+        def http_check(host, port, path, timeout):
+            attempts.append(("http", port, path))
+            return None
+
+        targets = [make_target(0, "db", port="5432", ready="tcp"),
+                   make_target(1, "api", ["db"], port="8000", health_path="/ready"),
+                   make_target(2, "worker", ["api"])]
+        pm2 = FakePM2(targets)
+        results = self.scheduler(pm2, checks={"tcp": tcp_check, "http": http_check}).run(targets)
+        self.assertTrue(all(result["ok"] for result in results))
+        # 有端口時默認使用 http，沒有端口的 worker 只等待 online
+        self.assertEqual(attempts, [("tcp", 5432)] * 3 + [("http", 8000, "/ready")])
+
+    def test_ready_timeout(self):
+        targets = [make_target(0, "db", port="5432", ready="tcp", ready_timeout=0.02), make_target(1, "api", ["db"])]
+        pm2 = FakePM2(targets)
+        results = self.scheduler(pm2, checks={"tcp": lambda *args: "Connection refused"}).run(targets)
+        self.assertEqual(results[0]["error"], "0.02 秒內沒有就緒 (Connection refused)")
+        self.assertFalse(results[1]["ok"])
+        invalid = [make_target(0, "db", ready="tcp")]
+        self.assertEqual(self.scheduler(FakePM2(invalid)).run(invalid)[0]["error"],
+                         "就緒檢查 tcp 需要在 api.json 中設定 port")
+
+
+if __name__ == '__main__':
+    unittest.main()